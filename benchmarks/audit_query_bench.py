@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+監査ログ検索のベンチマーク - インデックスの構築・差分更新と検索のレイテンシ
+
+数か月分の監査ログ（日次の tool-audit-YYYY-MM-DD.jsonl と、ローテーション済みの .gz）を
+合成し、spec_hooks/audit_query.py のインデックスについて以下を計測する。検索結果は
+全ファイルを展開して走査した結果（従来の検索方法）と一致することを確認する。
+
+使用方法:
+  python3 benchmarks/audit_query_bench.py
+  python3 benchmarks/audit_query_bench.py --days 180 --per-day 5000
+
+計測内容:
+  build      - 空のインデックスへの初回登録
+  noop       - 変更がない状態での更新（stat のみ）
+  append     - 当日のログに追記した後の更新（追記分のみ読む）
+  rotate     - 当日のログをリネームして gzip 圧縮した後の更新（登録済みの位置を引き継ぐ）
+  query/*    - 条件ごとの検索時間（インデックス）と全ファイル走査の時間
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hooks")
+sys.path.insert(0, os.path.abspath(HOOKS_DIR))
+
+from spec_hooks.audit_query import LOG_FILE_RE, AuditIndex  # noqa: E402
+
+TOOLS = ["Bash", "Read", "Write", "Edit", "Grep", "Glob", "WebFetch", "Task"]
+COMMANDS = ["git status", "npm test", "ls -la src", "pytest -q", "cargo build", "grep -rn TODO src"]
+
+
+def make_entry(rng: random.Random, ts: datetime, sessions: list[str]) -> dict:
+    tool = rng.choice(TOOLS)
+    if tool == "Bash":
+        summary = {"command": rng.choice(COMMANDS) + f" # {rng.randrange(10000)}"}
+    else:
+        summary = {"file_path": f"src/module_{rng.randrange(500)}.py"}
+    return {
+        "timestamp": ts.isoformat() + "Z",
+        "session_id": rng.choice(sessions),
+        "tool_name": tool,
+        "tool_input_summary": summary,
+    }
+
+
+def write_lines(path: str, entries: list[dict], compress: bool = False):
+    data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+    if compress:
+        with gzip.open(path, "wb") as f:
+            f.write(data)
+    else:
+        with open(path, "ab") as f:
+            f.write(data)
+
+
+def generate_logs(log_dir: str, days: int, per_day: int, rng: random.Random) -> datetime:
+    """日ごとに前半をローテーション済みの .gz、後半を非圧縮の日次ログとして書き込む。"""
+    start = datetime(2026, 1, 1)
+    for day in range(days):
+        date = start + timedelta(days=day)
+        sessions = [f"session-{day}-{i}" for i in range(5)]
+        entries = [make_entry(rng, date + timedelta(seconds=i * 86400 / per_day), sessions) for i in range(per_day)]
+        name = f"tool-audit-{date:%Y-%m-%d}.jsonl"
+        half = per_day // 2
+        write_lines(os.path.join(log_dir, f"{name}.120000.gz"), entries[:half], compress=True)
+        write_lines(os.path.join(log_dir, name), entries[half:])
+    return start + timedelta(days=days - 1)
+
+
+def scan_all(log_dir: str) -> list[dict]:
+    """全ファイルを展開して読む（インデックスなしの検索）。"""
+    entries = []
+    for name in sorted(os.listdir(log_dir)):
+        if not LOG_FILE_RE.match(name):
+            continue
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(os.path.join(log_dir, name), "rt", encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f)
+    return entries
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    log_dir = tempfile.mkdtemp(prefix="claude-audit-query-", dir="/tmp")
+    failures = []
+    try:
+        last_day = generate_logs(log_dir, args.days, args.per_day, rng)
+        total = args.days * args.per_day
+        print(f"{args.days} 日分、{total} エントリ")
+        print(f"{'step':<22} {'time':>10} {'added':>8}")
+
+        index = AuditIndex(log_dir)
+        added, ms = timed(index.update)
+        print(f"{'build':<22} {ms:>8.1f}ms {added:>8}")
+        if added != total:
+            failures.append(f"build: {added} 件登録（期待値 {total}）")
+
+        added, ms = timed(index.update)
+        print(f"{'noop':<22} {ms:>8.1f}ms {added:>8}")
+
+        current = os.path.join(log_dir, f"tool-audit-{last_day:%Y-%m-%d}.jsonl")
+        sessions = [f"session-{args.days - 1}-{i}" for i in range(5)]
+        extra = [make_entry(rng, last_day + timedelta(hours=23, seconds=i), sessions) for i in range(100)]
+        write_lines(current, extra)
+        added, ms = timed(index.update)
+        print(f"{'append':<22} {ms:>8.1f}ms {added:>8}")
+        if added != len(extra):
+            failures.append(f"append: {added} 件登録（期待値 {len(extra)}）")
+
+        rotated = current + ".235959"
+        os.rename(current, rotated)
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.unlink(rotated)
+        added, ms = timed(index.update)
+        print(f"{'rotate':<22} {ms:>8.1f}ms {added:>8}")
+        if added != 0:
+            failures.append(f"rotate: {added} 件を重複登録")
+
+        print()
+        entries, scan_ms = timed(lambda: scan_all(log_dir))
+        print(f"{'query':<22} {'index':>10} {'scan':>10} {'matches':>8}")
+        day = args.days // 2
+        since = f"{datetime(2026, 1, 1) + timedelta(days=day):%Y-%m-%d}"
+        until = f"{datetime(2026, 1, 1) + timedelta(days=day + 6):%Y-%m-%d}"
+        queries = {
+            "session": ({"session": f"session-{day}-3"}, lambda e: e["session_id"] == f"session-{day}-3"),
+            "tool": ({"tool": "WebFetch"}, lambda e: e["tool_name"] == "WebFetch"),
+            "time-range (7d)": ({"since": since, "until": until}, lambda e: since <= e["timestamp"][:10] <= until),
+            "substring": ({"substring": "cargo build # 42"}, lambda e: "cargo build # 42" in json.dumps(e)),
+            "tool+substring": ({"tool": "Bash", "substring": "pytest"},
+                               lambda e: e["tool_name"] == "Bash" and "pytest" in json.dumps(e)),
+        }
+        for name, (filters, predicate) in queries.items():
+            lines, ms = timed(lambda: list(index.query(**filters)))
+            expected, filter_ms = timed(lambda: sorted(
+                (e for e in entries if predicate(e)), key=lambda e: e["timestamp"]))
+            print(f"{name:<22} {ms:>8.1f}ms {scan_ms + filter_ms:>8.1f}ms {len(lines):>8}")
+            if [json.loads(line) for line in lines] != expected:
+                failures.append(f"{name}: 全ファイル走査の結果と一致しない")
+        index.close()
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
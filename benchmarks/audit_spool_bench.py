@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+監査ログのスプールモードのベンチマークと欠落検証
+
+audit_log.sh を同期モード（デフォルト）とスプールモード（SPEC_WORKFLOW_AUDIT_SPOOL=1）で
+起動し、フック1回あたりのレイテンシを比較する。さらにスプールモードで多数のフックを
+同時に発火させ、コミッターが書き込んだ日次ログにすべてのレコードが含まれることを
+確認する（欠落があれば exit 1）。
+
+使用方法:
+  python3 benchmarks/audit_spool_bench.py                 # レイテンシ比較 + 同時発火の検証
+  python3 benchmarks/audit_spool_bench.py --calls 200 --concurrency 64 --rounds 5
+  python3 benchmarks/audit_spool_bench.py --fsync off     # 耐久性ポリシーを変更して計測
+
+計測内容:
+  latency     - 逐次実行したフックのプロセス起動から終了までの時間（p50/p95）
+  concurrent  - --concurrency 個のフックを同時に起動するラウンドを --rounds 回実行し、
+                コミッターの終了（--once での書き込み）後に日次ログを検証
+  large       - 大きな tool_input のレコードでスプールの切り詰め（1MB 超）を発生させて検証
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+AUDIT_HOOK = os.path.join(HOOKS_DIR, "audit_log.sh")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+
+
+def make_project(workdir: str, name: str) -> str:
+    project = os.path.join(workdir, name)
+    os.makedirs(project)
+    subprocess.run(["git", "init", "-q", project], check=True)
+    return project
+
+
+def hook_env(spool: bool, fsync: str) -> dict:
+    env = dict(os.environ)
+    env.pop("SPEC_WORKFLOW_AUDIT_SPOOL", None)
+    if spool:
+        env["SPEC_WORKFLOW_AUDIT_SPOOL"] = "1"
+        env["SPEC_WORKFLOW_AUDIT_FSYNC"] = fsync
+        # 検証時にコミッターの終了を待ちすぎないよう短くする
+        env["SPEC_WORKFLOW_AUDIT_COMMITTER_IDLE"] = "1"
+    return env
+
+
+def payload(marker: str, fields: int = 1) -> bytes:
+    tool_input = {"command": f"echo {marker}"}
+    for i in range(1, fields):
+        tool_input[f"field_{i}"] = "x" * 200
+    return json.dumps({"tool_name": "Bash", "session_id": marker, "tool_input": tool_input}).encode("utf-8")
+
+
+def run_hook(project: str, env: dict, data: bytes) -> float:
+    start = time.perf_counter()
+    subprocess.run(["/bin/bash", AUDIT_HOOK], input=data, cwd=project, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def log_dirs(project: str) -> list[str]:
+    return glob.glob(os.path.join(project, ".claude", "workspaces", "*", "logs"))
+
+
+def wait_for_commit(project: str, env: dict, timeout: float = 30.0):
+    """コミッターの終了を待ち、残りを --once で書き込む。"""
+    deadline = time.monotonic() + timeout
+    for log_dir in log_dirs(project):
+        lock_path = os.path.join(log_dir, ".audit-committer.lock")
+        while time.monotonic() < deadline:
+            probe = subprocess.run(["flock", "-n", lock_path, "true"], capture_output=True)
+            if probe.returncode == 0:
+                break
+            time.sleep(0.1)
+        subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "audit-commit", log_dir, "--once"],
+                       cwd=project, env=env, check=True)
+
+
+def committed_markers(project: str) -> list[str]:
+    markers = []
+    for log_dir in log_dirs(project):
+        for path in sorted(glob.glob(os.path.join(log_dir, "tool-audit-*.jsonl"))):
+            with open(path, encoding="utf-8") as f:
+                markers.extend(json.loads(line)["session_id"] for line in f if line.strip())
+    return markers
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_latency(workdir: str, calls: int, fsync: str):
+    print(f"{'mode':<10} {'calls':>6} {'p50':>9} {'p95':>9} {'mean':>9}")
+    for mode, spool in (("sync", False), ("spool", True)):
+        project = make_project(workdir, f"latency-{mode}")
+        env = hook_env(spool, fsync)
+        times = [run_hook(project, env, payload(f"{mode}-{i}")) for i in range(calls)]
+        print(f"{mode:<10} {calls:>6} {statistics.median(times):>7.1f}ms {percentile(times, 95):>7.1f}ms"
+              f" {statistics.mean(times):>7.1f}ms")
+        if spool:
+            wait_for_commit(project, env)
+        missing = calls - len(set(committed_markers(project)))
+        if missing:
+            print(f"  {mode}: {missing} 件のレコードが欠落", file=sys.stderr)
+
+
+def check_concurrent(workdir: str, name: str, concurrency: int, rounds: int, fields: int, fsync: str) -> list[str]:
+    project = make_project(workdir, name)
+    env = hook_env(True, fsync)
+    expected = []
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for r in range(rounds):
+            markers = [f"{name}-{r}-{i}" for i in range(concurrency)]
+            expected.extend(markers)
+            list(pool.map(lambda m: run_hook(project, env, payload(m, fields)), markers))
+    elapsed = time.perf_counter() - start
+    wait_for_commit(project, env)
+
+    committed = committed_markers(project)
+    missing = sorted(set(expected) - set(committed))
+    duplicates = len(committed) - len(set(committed))
+    spool_size = sum(os.path.getsize(os.path.join(d, ".audit-spool")) for d in log_dirs(project)
+                     if os.path.exists(os.path.join(d, ".audit-spool")))
+    print(f"{name:<10} records {len(expected):>5}  committed {len(committed):>5}  missing {len(missing):>3}"
+          f"  duplicates {duplicates:>3}  spool {spool_size / 1024:>7.1f}KB  {len(expected) / elapsed:>6.1f} hooks/s")
+    return [f"{name}: 欠落 {marker}" for marker in missing[:10]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=50, help="レイテンシ計測のフック呼び出し回数")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時に起動するフック数")
+    parser.add_argument("--rounds", type=int, default=4, help="同時起動のラウンド数")
+    parser.add_argument("--fsync", choices=("batch", "off"), default="batch", help="スプールモードの耐久性ポリシー")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="claude-audit-spool-", dir="/tmp")
+    try:
+        bench_latency(workdir, args.calls, args.fsync)
+        print()
+        failures = check_concurrent(workdir, "concurrent", args.concurrency, args.rounds, 1, args.fsync)
+        # 約20KB のレコードで 1MB を超えさせ、切り詰めと同時書き込みの競合を発生させる
+        failures += check_concurrent(workdir, "large", args.concurrency, max(args.rounds, 3), 100, args.fsync)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("\n欠落したレコード:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
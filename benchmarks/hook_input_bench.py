@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+大きなフック入力の読み取りのベンチマーク - 時間とピークメモリ
+
+PostToolUse の入力（tool_response に数十 MB のツール出力を含む）を合成し、
+監査ログに必要なキー（tool_name、session_id、tool_input）を取り出すコストを比較する。
+
+  json.loads   - stdin 全体を読み込んで json.loads（従来の audit_log）
+  read_fields  - spec_hooks/hookinput.py のストリーミング読み取り（tool_response を保持しない）
+  audit_log.sh - フック全体（run_hook.py audit-log）
+
+各方式は hook_spawner.py（hook_replay_bench.py と同じ）から別プロセスとして起動し、
+ピーク RSS を計測する。read_fields の結果が json.loads の結果（文字列を同じ長さで
+打ち切ったもの）と一致することも確認する。
+
+使用方法:
+  python3 benchmarks/hook_input_bench.py
+  python3 benchmarks/hook_input_bench.py --sizes 1,10,50,100
+"""
+
+import argparse
+import io
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+AUDIT_HOOK = os.path.join(HOOKS_DIR, "audit_log.sh")
+
+sys.path.insert(0, HOOKS_DIR)
+
+from spec_hooks.audit_log import MAX_REDACTION_CHARS  # noqa: E402
+from spec_hooks.hookinput import read_fields  # noqa: E402
+
+MAX_STRING = MAX_REDACTION_CHARS + 1  # audit_log の read_hook_input と同じ
+
+KEYS = ("tool_name", "session_id", "tool_input")
+
+JSON_LOADS = f"""
+import json, sys
+data = json.loads(sys.stdin.buffer.read())
+json.dump({{k: data.get(k) for k in {KEYS!r}}}, sys.stdout)
+"""
+
+READ_FIELDS = f"""
+import json, sys
+sys.path.insert(0, {HOOKS_DIR!r})
+from spec_hooks.hookinput import read_fields
+json.dump(read_fields(sys.stdin.buffer, {KEYS!r}, max_string={MAX_STRING}), sys.stdout)
+"""
+
+
+def make_payload(size_mb: int) -> bytes:
+    """tool_response に size_mb MB のエスケープを含む出力を持つ PostToolUse 入力。"""
+    line = 'src/app.ts:12:    const message = "hello \\"world\\"";\t// TODO\n'
+    stdout = line * (size_mb * 1024 * 1024 // len(line))
+    return json.dumps({
+        "session_id": "bench-session",
+        "hook_event_name": "PostToolUse",
+        "tool_name": "Bash",
+        "tool_input": {"command": "grep -rn TODO src/", "description": "x" * 1000},
+        "tool_response": {"stdout": stdout, "stderr": "", "interrupted": False},
+    }).encode("utf-8")
+
+
+def truncate_strings(value, limit: int):
+    if isinstance(value, str):
+        return value[:limit]
+    if isinstance(value, dict):
+        return {k: truncate_strings(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [truncate_strings(v, limit) for v in value]
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="1,10,50", help="tool_response のサイズ（MB、カンマ区切り）")
+    args = parser.parse_args()
+
+    project = tempfile.mkdtemp(prefix="claude-hook-input-", dir="/tmp")
+    payload_path = os.path.join(project, "payload.json")
+    spawner = Spawner(dict(os.environ))
+    failures = []
+    try:
+        subprocess.run(["git", "init", "-q", project], check=True)
+        python = shlex.quote(sys.executable)
+        commands = {
+            "json.loads": f"{python} -I -S -c {shlex.quote(JSON_LOADS)}",
+            "read_fields": f"{python} -I -S -c {shlex.quote(READ_FIELDS)}",
+            "audit_log.sh": f"/bin/bash {shlex.quote(AUDIT_HOOK)}",
+        }
+        print(f"rss floor: {spawner.run('true', os.devnull, project)['peak_rss'] / 1e6:.1f}MB")
+        print(f"{'payload':>8} {'method':<13} {'time':>10} {'peak RSS':>10}")
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            data = make_payload(size_mb)
+            with open(payload_path, "wb") as f:
+                f.write(data)
+            label = f"{len(data) / 1024 / 1024:.0f}MB"
+            for name, command in commands.items():
+                result = spawner.run(command, payload_path, project)
+                if result["exit_code"] != 0:
+                    failures.append(f"{label} {name}: exit {result['exit_code']}")
+                print(f"{label:>8} {name:<13} {result['latency_ms']:>8.1f}ms {result['peak_rss'] / 1e6:>8.1f}MB")
+
+            data_loaded = json.loads(data)
+            expected = truncate_strings({k: data_loaded[k] for k in KEYS}, MAX_STRING)
+            if read_fields(io.BytesIO(data), KEYS, max_string=MAX_STRING) != expected:
+                failures.append(f"{label}: read_fields の結果が json.loads と一致しない")
+    finally:
+        spawner.close()
+        shutil.rmtree(project, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+フックのリプレイベンチマーク - hooks.json の全エントリのオーバーヘッド計測
+
+hook_corpus.py が生成したフック入力を hooks/hooks.json の各エントリ（マッチャーに
+一致するケースのみ）に流し、フック × ケースグループごとにレイテンシ（p50/p95/p99）、
+スループット、ピーク RSS を報告する。結果はベースラインファイルに保存し、以降の実行で
+回帰を検出できる。
+
+使用方法:
+  python3 benchmarks/hook_replay_bench.py                            # quick コーパスで計測
+  python3 benchmarks/hook_replay_bench.py --profile full --repeat 1  # 50MB/100MB の入力を含む
+  python3 benchmarks/hook_replay_bench.py --hooks 'safety|verify'    # フックを絞り込み
+  python3 benchmarks/hook_replay_bench.py --save-baseline            # ベースラインを保存
+  python3 benchmarks/hook_replay_bench.py --compare                  # ベースラインと比較（回帰で exit 1）
+
+出力列:
+  n        - 実行回数（ケース数 × repeat）
+  p50/p95/p99 - レイテンシ（ミリ秒、プロセス起動から終了まで）
+  calls/s  - 直列実行時の1秒あたりの呼び出し数
+  MB/s     - 入力（ペイロード + トランスクリプト）の処理速度
+  rss      - ピーク RSS（MB、シェルラッパーの子プロセスを含む）
+  over     - フックの timeout を超えた回数（本番では打ち切られる）
+  exit2    - exit 2 で終了した回数（ブロック。シェルの構文エラー等も exit 2 になるため注意）
+  err      - exit 0/2 以外で終了した回数
+
+設計上の判断:
+- フックは実際と同じくシェル経由で起動し、${CLAUDE_PLUGIN_ROOT} をこのリポジトリに置き換える
+- サンドボックスのプロジェクト（git リポジトリ）を cwd にするため、.claude/workspaces への
+  書き込みはこのリポジトリを汚さない
+- 常駐フックサーバーは既定で使用しない（--hook-server で起動して計測）
+- ピーク RSS は wait4() の rusage から取得（待機済みの子孫プロセスを含む最大値）。
+  fork 元の RSS が下限として引き継がれるため、軽量な hook_spawner.py から起動し、
+  その下限（rss floor）を併せて報告する。下限と同じ値は「それ以下」を意味する
+- 比較はケースグループ単位の p50 とピーク RSS で行う。サイズの異なる入力を1つの
+  パーセンタイルに混ぜると、大きな入力の回帰が小さな入力の件数に埋もれるため
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+HOOKS_JSON = os.path.join(ROOT_DIR, "hooks", "hooks.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "hook_replay_baseline.json")
+
+sys.path.insert(0, BENCH_DIR)
+
+from hook_corpus import PROFILES, create_project, default_corpus_dir, generate_corpus  # noqa: E402
+
+# ツール名でマッチャーを評価するイベント
+TOOL_EVENTS = {"PreToolUse", "PostToolUse", "PostToolUseFailure"}
+
+# 本番の timeout を超えても計測を続ける上限（秒）
+MAX_RUN_SECONDS = 300
+
+# 比較時に回帰とみなさない絶対差（タイマーやプロセス起動の揺らぎ）
+MIN_LATENCY_DELTA_MS = 10.0
+MIN_RSS_DELTA_MB = 5.0
+
+
+# =============================================================================
+# フックとケースの対応付け
+# =============================================================================
+
+class HookEntry:
+    def __init__(self, event: str, matcher: str, command: str, timeout: float):
+        self.event = event
+        self.matcher = matcher
+        self.command = command
+        self.timeout = timeout
+        script = command.replace("${CLAUDE_PLUGIN_ROOT}/hooks/", "")
+        script = re.sub(r"^python3(\s+-\S+)*\s+", "", script)
+        self.label = f"{event}/{script}"
+
+    def matches(self, case: dict) -> bool:
+        if case["event"] != self.event:
+            return False
+        if self.event not in TOOL_EVENTS or self.matcher in ("", "*"):
+            return True
+        return re.fullmatch(self.matcher, case["tool_name"]) is not None
+
+
+def load_hooks() -> list[HookEntry]:
+    with open(HOOKS_JSON, encoding="utf-8") as f:
+        config = json.load(f)
+    entries = []
+    for event, matchers in config.get("hooks", {}).items():
+        for matcher in matchers:
+            for hook in matcher.get("hooks", []):
+                if hook.get("type") == "command":
+                    entries.append(HookEntry(event, matcher.get("matcher", ""), hook["command"], hook.get("timeout", 60)))
+    return entries
+
+
+# =============================================================================
+# 実行と計測
+# =============================================================================
+
+class Spawner:
+    """hook_spawner.py を介してフックを起動する（ピーク RSS の下限を抑えるため）。"""
+
+    def __init__(self, env: dict):
+        self._proc = subprocess.Popen(
+            [sys.executable, "-I", "-S", os.path.join(BENCH_DIR, "hook_spawner.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True,
+        )
+
+    def run(self, command: str, payload_path: str, cwd: str, timeout: float = MAX_RUN_SECONDS) -> dict:
+        """戻り値: {"latency_ms", "exit_code", "peak_rss"}"""
+        request = {"command": command, "stdin": payload_path, "cwd": cwd, "timeout": timeout}
+        self._proc.stdin.write(json.dumps(request) + "\n")
+        self._proc.stdin.flush()
+        return json.loads(self._proc.stdout.readline())
+
+    def close(self):
+        self._proc.stdin.close()
+        self._proc.wait()
+
+
+def percentile(values: list[float], q: float) -> float:
+    """線形補間によるパーセンタイル（q は 0-100）。"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: list[dict], timeout: float) -> dict:
+    latencies = [s["latency_ms"] for s in samples]
+    total_seconds = sum(latencies) / 1000
+    total_bytes = sum(s["bytes"] for s in samples)
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "calls_per_s": round(len(samples) / total_seconds, 2) if total_seconds else 0.0,
+        "mb_per_s": round(total_bytes / 1e6 / total_seconds, 2) if total_seconds else 0.0,
+        "peak_rss_mb": round(max(s["peak_rss"] for s in samples) / 1e6, 1),
+        "over_timeout": sum(1 for s in latencies if s > timeout * 1000),
+        "exit2": sum(1 for s in samples if s["exit_code"] == 2),
+        "errors": sum(1 for s in samples if s["exit_code"] not in (0, 2)),
+    }
+
+
+def start_hook_server(project: str, env: dict):
+    subprocess.run([sys.executable, os.path.join(ROOT_DIR, "hooks", "hook_server.py"), "start"],
+                   cwd=project, env=env, check=False, capture_output=True)
+
+
+def stop_hook_server(project: str, env: dict):
+    subprocess.run([sys.executable, os.path.join(ROOT_DIR, "hooks", "hook_server.py"), "stop"],
+                   cwd=project, env=env, check=False, capture_output=True)
+
+
+def load_corpus(profile: str, corpus_dir: str, regenerate: bool) -> dict:
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+    if not regenerate and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("profile") == profile:
+            return manifest
+    print(f"コーパスを生成中: {corpus_dir} ({profile})", file=sys.stderr)
+    return generate_corpus(corpus_dir, profile)
+
+
+def run_benchmark(args) -> dict:
+    corpus_dir = args.corpus or default_corpus_dir(args.profile)
+    manifest = load_corpus(args.profile, corpus_dir, args.regenerate)
+
+    hooks = [h for h in load_hooks() if not args.hooks or re.search(args.hooks, h.label)]
+    cases = [c for c in manifest["cases"] if not args.groups or re.search(args.groups, c["group"])]
+
+    sandbox = tempfile.mkdtemp(prefix="claude-hook-replay-", dir="/tmp")
+    project = os.path.join(sandbox, "project")
+    create_project(project)
+
+    env = dict(os.environ)
+    env["CLAUDE_PLUGIN_ROOT"] = ROOT_DIR
+    env["CLAUDE_PROJECT_DIR"] = project
+    env.pop("SPEC_WORKFLOW_HOOK_SERVER", None)
+    if not args.hook_server:
+        env["SPEC_WORKFLOW_HOOK_SOCKET"] = os.path.join(sandbox, "no-server.sock")
+
+    results = {}
+    spawner = Spawner(env)
+    try:
+        if args.hook_server:
+            start_hook_server(project, env)
+
+        rss_floor = spawner.run("true", os.devnull, project)["peak_rss"]
+        print(f"rss floor: {rss_floor / 1e6:.1f}MB")
+
+        for hook in hooks:
+            matching = [c for c in cases if hook.matches(c)]
+            if not matching:
+                continue
+            by_group = {}
+            for case in matching:
+                payload_path = os.path.join(corpus_dir, case["file"])
+                for _ in range(args.repeat):
+                    sample = spawner.run(hook.command.replace("${CLAUDE_PLUGIN_ROOT}", ROOT_DIR), payload_path, project)
+                    sample["bytes"] = case["bytes"]
+                    by_group.setdefault(case["group"], []).append(sample)
+            results[hook.label] = {group: summarize(samples, hook.timeout) for group, samples in by_group.items()}
+            print_hook(hook.label, results[hook.label])
+    finally:
+        spawner.close()
+        if args.hook_server:
+            stop_hook_server(project, env)
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    return {
+        "profile": args.profile,
+        "repeat": args.repeat,
+        "hook_server": args.hook_server,
+        "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "rss_floor_mb": round(rss_floor / 1e6, 1),
+        "results": results,
+    }
+
+
+# =============================================================================
+# レポートとベースライン
+# =============================================================================
+
+def print_hook(label: str, groups: dict):
+    print(f"\n{label}")
+    print(f"  {'group':<18} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'calls/s':>8} {'MB/s':>8} {'rss':>7} {'over':>5} {'exit2':>5} {'err':>4}")
+    for group, s in groups.items():
+        print(
+            f"  {group:<18} {s['n']:>5} {s['p50_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms"
+            f" {s['calls_per_s']:>8.1f} {s['mb_per_s']:>8.1f} {s['peak_rss_mb']:>5.1f}MB"
+            f" {s['over_timeout']:>5} {s['exit2']:>5} {s['errors']:>4}"
+        )
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """ベースラインに対する回帰を列挙（共通するフック × グループのみ比較）。"""
+    regressions = []
+    if baseline.get("profile") != current["profile"]:
+        regressions.append(f"プロファイルが異なります（ベースライン: {baseline.get('profile')}）")
+        return regressions
+
+    for label, groups in current["results"].items():
+        for group, now in groups.items():
+            base = baseline.get("results", {}).get(label, {}).get(group)
+            if not base:
+                continue
+            delta = now["p50_ms"] - base["p50_ms"]
+            if delta > MIN_LATENCY_DELTA_MS and now["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{label} [{group}]: p50 {base['p50_ms']:.1f}ms -> {now['p50_ms']:.1f}ms")
+            delta = now["peak_rss_mb"] - base["peak_rss_mb"]
+            if delta > MIN_RSS_DELTA_MB and now["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f"{label} [{group}]: rss {base['peak_rss_mb']:.1f}MB -> {now['peak_rss_mb']:.1f}MB")
+            for key in ("errors", "exit2"):
+                if now[key] > base[key]:
+                    regressions.append(f"{label} [{group}]: {key} {base[key]} -> {now[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--corpus", help="コーパスのディレクトリ（デフォルト: /tmp/claude-hook-corpus-<profile>）")
+    parser.add_argument("--regenerate", action="store_true", help="コーパスを再生成")
+    parser.add_argument("--repeat", type=int, default=3, help="ケースごとの実行回数")
+    parser.add_argument("--hooks", help="フックのラベル（例: PreToolUse/run_hook.py hook-client safety_check）の正規表現")
+    parser.add_argument("--groups", help="ケースグループ（例: write-1MB、transcript-10MB）の正規表現")
+    parser.add_argument("--hook-server", action="store_true", help="常駐フックサーバーを起動して計測")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="ベースラインファイル")
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--compare", action="store_true", help="ベースラインと比較し、回帰があれば exit 1")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="回帰とみなす増加率（デフォルト: 0.5）")
+    parser.add_argument("--json", help="結果を JSON で書き出すファイル")
+    args = parser.parse_args()
+
+    current = run_benchmark(args)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nベースラインを保存しました: {os.path.relpath(args.baseline, ROOT_DIR)}")
+
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("\nベースラインからの回帰:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            return 1
+        print("\nベースラインからの回帰はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+フック起動用の軽量スポーナー（hook_replay_bench.py から起動）
+
+wait4() の ru_maxrss には fork 元プロセスのメモリ使用量の最高値が引き継がれるため、
+コーパスを読み込んだベンチマーク本体から直接フックを起動すると、本体の RSS が
+計測値の下限になってしまう。そのため import を最小限にしたこのプロセスから
+fork/exec し、下限をこのプロセスの RSS（数 MB）に抑える。
+
+プロトコル（stdin/stdout、1行1 JSON）:
+  リクエスト: {"command": "...", "stdin": "<入力ファイル>", "cwd": "...", "timeout": 秒}
+  レスポンス: {"latency_ms": ..., "exit_code": ..., "peak_rss": バイト}
+"""
+
+import json
+import os
+import signal
+import sys
+import time
+
+_running = 0
+
+
+def _on_timeout(_signum, _frame):
+    if _running:
+        try:
+            os.killpg(_running, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def run(request: dict) -> dict:
+    global _running
+
+    stdin_fd = os.open(request["stdin"], os.O_RDONLY)
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.setsid()
+            os.chdir(request["cwd"])
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(stdin_fd, 0)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+            os.execv("/bin/bash", ["/bin/bash", "-c", request["command"]])
+        finally:
+            os._exit(127)
+
+    os.close(stdin_fd)
+    _running = pid
+    signal.alarm(int(request.get("timeout", 300)))
+    try:
+        _pid, status, rusage = os.wait4(pid, 0)
+    finally:
+        signal.alarm(0)
+        _running = 0
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    # Linux は KB 単位、macOS はバイト単位
+    peak_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    return {"latency_ms": latency_ms, "exit_code": os.waitstatus_to_exitcode(status), "peak_rss": peak_rss}
+
+
+def main():
+    signal.signal(signal.SIGALRM, _on_timeout)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        sys.stdout.write(json.dumps(run(json.loads(line))) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+アーカイブのパックのベンチマーク - 圧縮した追記専用のセグメント
+
+spec_hooks/insight_archive.py で archive/ のインサイトをパックした場合のサイズ、パックの時間、
+ID によるランダムアクセス、全件の検索（ストリーミング）、統計（workspace-stats）の時間を
+個別のファイルのままの場合と比較する。
+
+使用方法:
+  python3 benchmarks/insight_archive_bench.py
+  python3 benchmarks/insight_archive_bench.py --insights 50000
+
+検証内容:
+  - パック後に archive/ の個別のファイルがなくなり、すべてのインサイトを ID で元の内容のまま読めること
+  - 検索と展開（unpack）がすべてのインサイトを返し、展開したファイルが次のパックで削除されること
+  - パックの中断（フレームの途中、索引の追記前、個別のファイルの削除前）から回復すること
+  - 重複排除の索引、マニフェストの件数、workspace-stats がパックしたインサイトをアーカイブとして扱うこと
+  - insight-archive サブコマンドと archive_processed_insights（SPEC_WORKFLOW_ARCHIVE_PACK=1）、
+    無効なインサイト ID（archive/ の外を指す ID）を拒否すること
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+WORKSPACE_UTILS = os.path.join(HOOKS_DIR, "workspace_utils.sh")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import make_insights, make_insights_dir, project_workspace  # noqa: E402
+from spec_hooks import insight_archive, insight_manifest, insight_store, workspace_stats  # noqa: E402
+from spec_hooks.insight_index import InsightIndex  # noqa: E402
+
+
+
+def du(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.lstat(os.path.join(root, name)).st_blocks * 512
+    return total
+
+
+def loose(insights_dir: str) -> list[str]:
+    return sorted(name for name in os.listdir(os.path.join(insights_dir, "archive")) if name.endswith(".json"))
+
+
+def measure(work_dir: str, count: int, failures: list):
+    insights = make_insights(count)
+    by_id = {insight["id"]: insight for insight in insights}
+    insights_dir = make_insights_dir(os.path.join(work_dir, "measure"), {"archive": insights})
+    archive_dir = os.path.join(insights_dir, "archive")
+    before = du(archive_dir)
+    start = time.perf_counter()
+    workspace_stats.count_archived(insights_dir)
+    stats_loose = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    search_loose = sum(1 for i in insight_archive.iter_archived(insights_dir) if "コード 7 " in i["content"])
+    search_loose_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    packed = insight_archive.pack(insights_dir)
+    pack_ms = (time.perf_counter() - start) * 1000
+    after = du(archive_dir)
+    if packed != count or loose(insights_dir):
+        failures.append(f"pack: {packed} 件をパック、個別のファイルが {len(loose(insights_dir))} 件残る")
+
+    index = insight_archive.load_index(insights_dir)
+    sample = random.Random(1).sample(sorted(by_id), min(200, count))
+    times = []
+    for insight_id in sample:
+        start = time.perf_counter()
+        record = insight_archive.get_packed(insights_dir, insight_id, index)
+        times.append((time.perf_counter() - start) * 1e6)
+        if record != by_id[insight_id]:
+            failures.append(f"get: {insight_id} の内容が一致しない")
+            break
+    start = time.perf_counter()
+    insight_archive.load_index(insights_dir)
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    search_packed = sum(1 for i in insight_archive.iter_archived(insights_dir) if "コード 7 " in i["content"])
+    search_packed_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    archived = workspace_stats.count_archived(insights_dir)
+    stats_packed = (time.perf_counter() - start) * 1000
+    if search_packed != search_loose or archived != count:
+        failures.append(f"search/stats: 検索 {search_packed} 件（期待値 {search_loose}）、件数 {archived}")
+
+    print(f"アーカイブ {count} 件:")
+    print(f"  ディスク使用量  個別のファイル {before / 1024:8.0f}KB  パック {after / 1024:8.0f}KB（{packed} 件、{pack_ms:.0f}ms）")
+    print(f"  検索（全件）    個別のファイル {search_loose_ms:8.0f}ms  パック {search_packed_ms:8.0f}ms")
+    print(f"  件数（統計）    個別のファイル {stats_loose:8.1f}ms  パック {stats_packed:8.1f}ms")
+    print(f"  ランダムアクセス p50 {statistics.median(times):.0f}µs（索引の読み込み {load_ms:.1f}ms）")
+
+
+def check_unpack(work_dir: str, failures: list):
+    insights = make_insights(300)
+    insights_dir = make_insights_dir(os.path.join(work_dir, "unpack"), {"archive": insights})
+    insight_archive.pack(insights_dir)
+    dest = os.path.join(work_dir, "unpacked")
+    if insight_archive.unpack(insights_dir, dest) != 300 or len(os.listdir(dest)) != 300:
+        failures.append("unpack: 全件を展開できない")
+    with open(os.path.join(dest, f"{insights[5]['id']}.json"), encoding="utf-8") as f:
+        if json.load(f) != insights[5]:
+            failures.append("unpack: 展開した内容が一致しない")
+
+    # archive/ への展開と、次のパックでの削除（変更したファイルは新しいフレームとして追記）
+    archive_dir = os.path.join(insights_dir, "archive")
+    insight_archive.unpack(insights_dir, archive_dir, [insights[0]["id"], insights[1]["id"]])
+    changed = dict(insights[1], content="変更した内容")
+    with open(os.path.join(archive_dir, f"{insights[1]['id']}.json"), "w", encoding="utf-8") as f:
+        json.dump(changed, f, ensure_ascii=False)
+    insight_archive.pack(insights_dir)
+    if loose(insights_dir) or insight_archive.get(insights_dir, insights[1]["id"]) != changed:
+        failures.append("unpack: 展開したファイルが再パックされない、または変更が失われた")
+    if sum(1 for _ in insight_archive.iter_archived(insights_dir)) != 300:
+        failures.append("unpack: 再パック後の件数が一致しない")
+
+
+def check_recovery(work_dir: str, failures: list):
+    insights = make_insights(50)
+    insights_dir = make_insights_dir(os.path.join(work_dir, "recovery"), {"archive": insights[:20]})
+    insight_archive.pack(insights_dir)
+    directory = insight_archive.packs_dir(insights_dir)
+    segment = os.path.join(directory, "seg-000001.pack")
+    idx = os.path.join(directory, "seg-000001.idx")
+
+    # 索引の追記前に中断: フレームはあるが索引にない。個別のファイルも残る
+    insight_store.write_batch(insights[20:30], os.path.join(insights_dir, "archive"))
+    block = [(i["id"], json.dumps(i, ensure_ascii=False).encode()) for i in insights[20:30]]
+    size = os.path.getsize(segment)
+    with open(idx, "rb") as f:
+        idx_data = f.read()
+    insight_archive._append_frame(directory, "seg-000001", block)
+    with open(idx, "wb") as f:
+        f.write(idx_data + b"INS-torn\t0")
+    # フレームの途中で中断
+    with open(segment, "ab") as f:
+        f.write(insight_archive.FRAME_MAGIC + b"\x00\x00")
+    if insight_archive.get(insights_dir, "INS-torn") is not None or insights[25]["id"] in insight_archive.load_index(insights_dir):
+        failures.append("recovery: 不完全な索引の行が読まれた")
+
+    insight_store.write_batch(insights[30:50], os.path.join(insights_dir, "archive"))
+    insight_archive.pack(insights_dir)
+    index = insight_archive.load_index(insights_dir)
+    if set(index) != {i["id"] for i in insights} or loose(insights_dir):
+        failures.append(f"recovery: 回復後の索引 {len(index)} 件（期待値 50）、個別のファイル {len(loose(insights_dir))} 件")
+    if any(insight_archive.get_packed(insights_dir, i["id"], index) != i for i in insights):
+        failures.append("recovery: 回復後に読めないインサイトがある")
+    if os.path.getsize(segment) <= size:
+        failures.append("recovery: セグメントが切り詰められすぎた")
+
+
+def check_integration(work_dir: str, failures: list):
+    insights = make_insights(30)
+    insights_dir = make_insights_dir(os.path.join(work_dir, "integration"), {"archive": insights})
+    with InsightIndex.open(insights_dir) as index:
+        index.find(insights[0]["contentHash"])  # 索引を作成
+    insight_archive.pack(insights_dir)
+    with InsightIndex.open(insights_dir) as index:
+        found = index.find(insights[3]["contentHash"])
+    if found != (insights[3]["id"], "archive"):
+        failures.append(f"insight_index: パックしたインサイトが重複として見つからない: {found}")
+    # 索引の作り直し
+    for name in ("content-index.bin", "content-index.log"):
+        os.unlink(os.path.join(insights_dir, name))
+    with InsightIndex.open(insights_dir) as index:
+        found = index.find(insights[4]["contentHash"])
+    if found != (insights[4]["id"], "archive"):
+        failures.append(f"insight_index: 作り直した索引にパックしたインサイトがない: {found}")
+    # セグメントログの展開でアーカイブ済みのインサイトが復活しない
+    insight_store.append_segment(insights_dir, insights[:2])
+    if insight_store.compact(insights_dir) != 0 or os.listdir(os.path.join(insights_dir, "pending")):
+        failures.append("compact: パックしたインサイトが pending/ に復活した")
+    counts = insight_manifest.counts(insight_manifest.load(insights_dir))
+    if counts["archive"] != 30:
+        failures.append(f"manifest: アーカイブの件数 {counts['archive']}（期待値 30）")
+
+
+def check_commands(work_dir: str, failures: list):
+    project = os.path.join(work_dir, "project")
+    workspace_id, insights_dir = project_workspace(project)
+    insights = make_insights(20)
+    make_insights_dir(insights_dir)
+    insight_store.write_batch(insights[:10], os.path.join(insights_dir, "applied"))
+    insight_store.write_batch(insights[10:], os.path.join(insights_dir, "rejected"))
+    env = dict(os.environ, SPEC_WORKFLOW_ARCHIVE_PACK="1")
+    subprocess.run(["bash", "-c", f'source "{WORKSPACE_UTILS}" && archive_processed_insights'],
+                   cwd=project, env=env, capture_output=True)
+    if loose(insights_dir) or len(insight_archive.load_index(insights_dir)) != 20:
+        failures.append("archive_processed_insights: パックされない")
+
+    def run(*args):
+        return subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-archive", *args], cwd=project,
+                              capture_output=True)
+
+    result = run("get", workspace_id, insights[12]["id"])
+    if result.returncode != 0 or json.loads(result.stdout) != insights[12]:
+        failures.append(f"insight-archive get: {result.stderr[:200]!r}")
+    result = run("search", workspace_id, "コード 7 ")
+    if [json.loads(line)["id"] for line in result.stdout.splitlines()] != [insights[7]["id"]]:
+        failures.append(f"insight-archive search: {result.stdout[:200]!r}")
+    stats = json.loads(subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "workspace-stats"], cwd=project,
+                                      capture_output=True).stdout)
+    if stats["insights"]["archived"] != 20:
+        failures.append(f"workspace-stats: アーカイブの件数 {stats['insights']['archived']}")
+    for args in (("get", "../x", "INS-1"), ("get", workspace_id, "INS-missing"), ("bogus",)):
+        if run(*args).returncode == 0:
+            failures.append(f"insight-archive: 無効な引数を受け付けた: {args}")
+
+    # archive/ の外のファイルを指すインサイト ID（パストラバーサル）
+    pending = make_insights(1, start=100)[0]
+    insight_store.write_batch([pending], os.path.join(insights_dir, "pending"))
+    outside = f"../pending/{pending['id']}"
+    result = run("get", workspace_id, outside)
+    if result.returncode != 1 or result.stdout or insight_archive.get(insights_dir, outside) is not None:
+        failures.append(f"insight-archive get: archive/ の外のファイルを読んだ: {outside}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--insights", type=int, default=20000, help="アーカイブのインサイト数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-archive-", dir="/tmp")
+    failures = []
+    try:
+        measure(work_dir, args.insights, failures)
+        check_unpack(work_dir, failures)
+        check_recovery(work_dir, failures)
+        check_integration(work_dir, failures)
+        check_commands(work_dir, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+類似インサイトのグループ化のベンチマーク - MinHash 署名と LSH
+
+spec_hooks/insight_cluster.py で保留中のインサイトを類似グループにまとめる時間（署名の計算を含む
+初回と、保存した署名を使う2回目以降）を計測し、言い換えたインサイトのグループ化の精度を確認する。
+
+使用方法:
+  python3 benchmarks/insight_cluster_bench.py
+  python3 benchmarks/insight_cluster_bench.py --topics 2000 --variants 3
+
+検証内容:
+  - 同じ話題のインサイト（1〜2語を置き換えたもの）が同じグループになること（再現率）
+  - 異なる話題のインサイトが同じグループにならないこと
+  - 2回目以降は新しいインサイトの署名だけを計算すること、保留中でなくなった ID の署名が削除されること
+  - insight-cluster サブコマンドがグループを出力し、無効なワークスペース ID を拒否すること
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import project_workspace  # noqa: E402
+from spec_hooks import insight_cluster, insight_manifest, insight_store  # noqa: E402
+
+KANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+
+
+def make_vocabulary(rng: random.Random, size: int = 2000) -> list[str]:
+    return ["".join(rng.choice(KANA) for _ in range(rng.randint(3, 6))) for _ in range(size)]
+
+
+def topic_text(rng: random.Random, vocabulary: list[str]) -> str:
+    """話題ごとに異なる語の並び（助詞でつないだ20語）。"""
+    words = rng.sample(vocabulary, 20)
+    return "".join(word + rng.choice(("は", "を", "で", "の", "に", "と")) for word in words) + "する"
+
+
+def variant(rng: random.Random, text: str, vocabulary: list[str]) -> str:
+    """1〜2語を別の語に置き換える。"""
+    for _ in range(rng.randint(1, 2)):
+        words = [w for w in vocabulary if w in text]
+        text = text.replace(rng.choice(words), rng.choice(vocabulary), 1)
+    return text
+
+
+def make_pending(insights_dir: str, topics: int, variants: int, seed: int, start: int = 0) -> dict[str, int]:
+    """話題ごとに variants 件の言い換えを pending/ に保存し、ID → 話題番号を返す。"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(random.Random(0))
+    insights, truth = [], {}
+    for topic in range(start, start + topics):
+        base = topic_text(rng, vocabulary)
+        for v in range(variants):
+            insight_id = f"INS-20260101000000-{topic:05x}{v:03x}"
+            insights.append({"id": insight_id, "category": "pattern", "source": "bench",
+                             "content": base if v == 0 else variant(rng, base, vocabulary)})
+            truth[insight_id] = topic
+    for status in insight_manifest.STATUS_DIRS:
+        os.makedirs(os.path.join(insights_dir, status), exist_ok=True)
+    insight_store.write_batch(insights, os.path.join(insights_dir, "pending"))
+    return truth
+
+
+def run_cluster(insights_dir: str) -> tuple[list[list[str]], float]:
+    start = time.perf_counter()
+    pending = insight_manifest.load_pending(insights_dir)
+    signatures = insight_cluster.load_signatures(insights_dir, sorted(pending))
+    clusters = insight_cluster.cluster(signatures)
+    return clusters, (time.perf_counter() - start) * 1000
+
+
+def evaluate(label: str, clusters: list[list[str]], truth: dict[str, int], failures: list):
+    group_of = {insight_id: n for n, ids in enumerate(clusters) for insight_id in ids}
+    mixed = [ids for ids in clusters if len({truth[insight_id] for insight_id in ids}) > 1]
+    topics: dict[int, list[str]] = {}
+    for insight_id, topic in truth.items():
+        topics.setdefault(topic, []).append(insight_id)
+    together = sum(1 for ids in topics.values() if len({group_of.get(i, i) for i in ids}) == 1)
+    recall = together / len(topics)
+    print(f"  {label}: グループ {len(clusters)}、話題が1つのグループにまとまった割合 {recall:.1%}、"
+          f"異なる話題を含むグループ {len(mixed)}")
+    if recall < 0.95:
+        failures.append(f"{label}: 再現率 {recall:.1%}")
+    if mixed:
+        failures.append(f"{label}: 異なる話題を含むグループ {mixed[:2]}")
+
+
+def check_incremental(work_dir: str, topics: int, variants: int, failures: list):
+    insights_dir = os.path.join(work_dir, "insights")
+    truth = make_pending(insights_dir, topics, variants, seed=1)
+    print(f"保留中 {len(truth)} 件（{topics} 話題 × {variants} 件）:")
+    clusters, cold = run_cluster(insights_dir)
+    evaluate("初回", clusters, truth, failures)
+    _, warm = run_cluster(insights_dir)
+
+    # 新しいインサイトの追加と、レビュー済み（applied/ に移動）の削除
+    truth.update(make_pending(insights_dir, 10, variants, seed=2, start=topics))
+    moved = sorted(truth)[:variants]
+    for insight_id in moved:
+        os.rename(os.path.join(insights_dir, "pending", f"{insight_id}.json"),
+                  os.path.join(insights_dir, "applied", f"{insight_id}.json"))
+        del truth[insight_id]
+    calls = []
+    original = insight_cluster.signature
+    insight_cluster.signature = lambda content: calls.append(content) or original(content)
+    try:
+        clusters, incremental = run_cluster(insights_dir)
+    finally:
+        insight_cluster.signature = original
+    evaluate("追加と移動の後", clusters, truth, failures)
+    print(f"  時間: 初回 {cold:.0f}ms、2回目 {warm:.0f}ms、{10 * variants} 件の追加後 {incremental:.0f}ms")
+    if len(calls) != 10 * variants:
+        failures.append(f"incremental: 署名を {len(calls)} 件計算した（期待値 {10 * variants}）")
+    with open(os.path.join(insights_dir, insight_cluster.SIGNATURES_FILE), encoding="utf-8") as f:
+        stored = json.load(f)["signatures"]
+    if set(stored) != set(truth):
+        failures.append("incremental: 保存された署名が保留中のインサイトと一致しない")
+
+
+def check_subcommand(work_dir: str, failures: list):
+    project = os.path.join(work_dir, "project")
+    workspace_id, insights_dir = project_workspace(project)
+    make_pending(insights_dir, 5, 3, seed=3)
+    with open(os.path.join(insights_dir, "pending", "INS-20260101000000-broken.json"), "w", encoding="utf-8") as f:
+        f.write("{")
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-cluster", workspace_id],
+                            cwd=project, capture_output=True)
+    output = json.loads(result.stdout or b"{}")
+    clusters = output.get("clusters", [])
+    if (result.returncode != 0 or len(clusters) != 5 or any(c["size"] != 3 for c in clusters)
+            or output.get("unclustered") != 1 or clusters[0]["members"][0]["similarity"] != 1.0):
+        failures.append(f"insight-cluster: 出力が一致しない: {output} {result.stderr[:200]!r}")
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-cluster", "../x"],
+                            cwd=project, capture_output=True)
+    if result.returncode == 0:
+        failures.append("insight-cluster: 無効なワークスペース ID を受け付けた")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--topics", type=int, default=1000, help="話題の数")
+    parser.add_argument("--variants", type=int, default=3, help="話題ごとの言い換えの数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-cluster-", dir="/tmp")
+    failures = []
+    try:
+        check_incremental(work_dir, args.topics, args.variants, failures)
+        check_subcommand(work_dir, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+インサイトの重複排除の索引のベンチマーク - 索引の作成、検索、キャプチャ間の重複排除
+
+spec_hooks/insight_index.py の索引について、10万件の本体の作成時間、サイズ、読み込みと検索の
+時間を計測し、キャプチャ（insight_capture.save_insights_to_files とフック全体）で既存の
+インサイトと同じ内容が保存されないことを確認する。
+
+使用方法:
+  python3 benchmarks/insight_index_bench.py
+  python3 benchmarks/insight_index_bench.py --insights 200000 --processes 8
+
+検証内容:
+  - 検索結果が辞書による参照実装と一致すること（本体、ジャーナル、存在しないハッシュ、
+    ファイルが削除された ID）
+  - 2回目のキャプチャで同じ内容がすべて重複として除かれ、レート制限に数えられないこと、pending/ から applied/ や
+    archive/ に移動した後も重複として扱われること、削除した後は再び保存されること
+  - 同じ内容を出力する複数のフックを同時に実行しても、内容ごとに1件だけ保存されること
+  - ジャーナルが JOURNAL_LIMIT を超えると本体に統合されること、末尾の不完全なレコードと
+    壊れた本体が無視・作り直されること
+  - 作り直しが REBUILD_TIME_BUDGET で打ち切られた場合（complete: false）、次回以降に続きを読むこと
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import make_insights_dir  # noqa: E402
+from spec_hooks import insight_capture, insight_index  # noqa: E402
+from spec_hooks.insight_index import InsightIndex  # noqa: E402
+
+STATUSES = insight_index.STATUS_DIRS
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def random_hash(rng: random.Random) -> str:
+    return f"{rng.getrandbits(64):016x}"
+
+
+def random_id(rng: random.Random, n: int) -> str:
+    return f"INS-2026{n % 12 + 1:02d}{n % 28 + 1:02d}{n % 24:02d}{n % 60:02d}{n % 59:02d}-{rng.getrandbits(32):08x}"
+
+
+def write_insight(insights_dir: str, status: str, insight_id: str, content_hash: str, content: str = "x"):
+    with open(os.path.join(insights_dir, status, f"{insight_id}.json"), "w", encoding="utf-8") as f:
+        json.dump({"id": insight_id, "content": content, "contentHash": content_hash, "status": status}, f)
+
+
+def capture(insights_dir: str, text: str, limit: int = insight_capture.MAX_INSIGHTS_PER_CAPTURE) -> tuple[int, int]:
+    """(保存した数, 重複の数)。重複は抽出時に索引で除いたものと保存時に除いたものの合計。"""
+    config = insight_capture.Config("bench_00000000", os.path.join(insights_dir, "pending"), "bench-agent")
+    config.max_insights_per_capture = limit
+    extractor = insight_capture.InsightExtractor(config.agent_name, config)
+    extractor.feed(text)
+    saved, duplicates = insight_capture.save_insights_to_files(extractor.close(), config.pending_dir)
+    return saved, duplicates + extractor.duplicates
+
+
+def count_files(insights_dir: str) -> int:
+    return sum(len(os.listdir(os.path.join(insights_dir, status))) for status in STATUSES)
+
+
+def check_large(work_dir: str, count: int, rng: random.Random, failures: list):
+    """大きい本体の作成と検索（ファイルは一部のみ作成し、残りは削除された ID として扱う）。"""
+    insights_dir = make_insights_dir(os.path.join(work_dir, "large"))
+    entries = {}
+    for n in range(count):
+        entries[random_hash(rng)] = random_id(rng, n)
+    sample = rng.sample(sorted(entries), 2000)
+    expected = {}
+    for position, content_hash in enumerate(sample[:1000]):
+        status = STATUSES[position % len(STATUSES)]
+        write_insight(insights_dir, status, entries[content_hash], content_hash)
+        expected[content_hash] = (entries[content_hash], status)
+
+    index = InsightIndex(insights_dir)
+    records = {}
+    for content_hash, insight_id in entries.items():
+        key, stamp, random_part = insight_index.RECORD.unpack(insight_index.encode(content_hash, insight_id))
+        records[key] = (stamp, random_part)
+    _, build_ms = timed(lambda: index._write_index(records, complete=True))
+    index.close()
+    size = os.path.getsize(os.path.join(insights_dir, insight_index.INDEX_FILE))
+
+    session = InsightIndex.open(insights_dir)
+    session_index, open_ms = timed(session.__enter__)
+    missing = [random_hash(rng) for _ in range(1000)]
+    queries = sample + missing
+    results, lookup_ms = timed(lambda: [session_index.find(q) for q in queries])
+    for query, result in zip(queries, results):
+        if result != expected.get(query):
+            failures.append(f"large: {query} -> {result}（期待値 {expected.get(query)}）")
+            break
+    # 検索で読むレコードの数（補間探索の比較回数）
+    probes = []
+    original = session_index._record
+
+    def counting(position):
+        probes[-1] += 1
+        return original(position)
+
+    session_index._record = counting
+    for query in sample[:200]:
+        probes.append(0)
+        session_index._search(int(query, 16))
+    session_index._record = original
+    session.__exit__(None, None, None)
+
+    print(f"large: {count} 件、本体 {size / 1e6:.1f}MB、作成 {build_ms:.0f}ms、読み込み {open_ms:.1f}ms")
+    print(f"  検索 {lookup_ms * 1000 / len(queries):.1f}µs/回、読んだレコード 平均 {sum(probes) / len(probes):.1f} 最大 {max(probes)}")
+    if size > count * insight_index.RECORD.size + 200:
+        failures.append(f"large: 本体のサイズ {size} が想定より大きい")
+
+
+def check_capture(work_dir: str, failures: list):
+    insights_dir = make_insights_dir(os.path.join(work_dir, "capture"))
+    text = "\n".join(f"PATTERN: 共通のパターン {n} はサービス層でエラーを変換する" for n in range(20))
+    saved, duplicates = capture(insights_dir, text)
+    if (saved, duplicates) != (20, 0):
+        failures.append(f"capture: 初回 保存 {saved}、重複 {duplicates}（期待値 20、0）")
+    saved, duplicates = capture(insights_dir, text + "\nINSIGHT: 新しい発見は1件だけ保存される")
+    if (saved, duplicates) != (1, 20):
+        failures.append(f"capture: 2回目 保存 {saved}、重複 {duplicates}（期待値 1、20）")
+
+    # 既存のインサイトはレート制限に数えない（先頭から読み直すトランスクリプトでも新しいものを保存する）
+    saved, duplicates = capture(insights_dir, text + "\nLEARNED: 上限に達した後の新しい学びも保存される", limit=20)
+    if (saved, duplicates) != (1, 20):
+        failures.append(f"capture: レート制限 保存 {saved}、重複 {duplicates}（期待値 1、20）")
+
+    # 移動しても重複、削除すると再び保存
+    pending = sorted(os.listdir(os.path.join(insights_dir, "pending")))
+    for position, name in enumerate(pending[:10]):
+        target = ("applied", "rejected", "archive")[position % 3]
+        os.rename(os.path.join(insights_dir, "pending", name), os.path.join(insights_dir, target, name))
+    os.unlink(os.path.join(insights_dir, "pending", pending[15]))
+    saved, duplicates = capture(insights_dir, text)
+    if (saved, duplicates) != (1, 19) or count_files(insights_dir) != 22:
+        failures.append(f"capture: 移動・削除後 保存 {saved}、重複 {duplicates}（期待値 1、19）")
+
+    # マーカーの大文字小文字と空白の違いは同じ内容（contentHash と同じ正規化）
+    saved, duplicates = capture(insights_dir, "pattern:   共通のパターン   3 はサービス層でエラーを変換する  ")
+    if (saved, duplicates) != (0, 1):
+        failures.append(f"capture: 正規化後に同じ内容 保存 {saved}、重複 {duplicates}（期待値 0、1）")
+
+
+def check_concurrent(work_dir: str, processes: int, failures: list):
+    """同じ内容を出力する複数のフックを同時に実行する。"""
+    project = os.path.join(work_dir, "concurrent")
+    os.makedirs(project)
+    transcript = os.path.join(work_dir, "claude-concurrent.jsonl")
+    text = "\n".join(f"LEARNED: 並行キャプチャで共有される学び {n} の内容" for n in range(30))
+    with open(transcript, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"role": "assistant", "content": text}, ensure_ascii=False) + "\n")
+    payload = json.dumps({"agent_transcript_path": transcript, "stop_hook_active": False})
+    command = [sys.executable, "-I", "-S", os.path.join(HOOKS_DIR, "run_hook.py"), "insight-capture"]
+    env = dict(os.environ, CLAUDE_AGENT_NAME="bench")
+    started = [subprocess.Popen(command, cwd=project, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, env=env) for _ in range(processes)]
+    outputs = [process.communicate(payload.encode()) for process in started]
+    pending = [os.path.join(root, name) for root, _, names in os.walk(os.path.join(project, ".claude"))
+               if root.endswith(os.path.join("insights", "pending")) for name in names]
+    contents = set()
+    for path in pending:
+        with open(path, encoding="utf-8") as f:
+            contents.add(json.load(f)["content"])
+    print(f"concurrent: {processes} プロセス、保存 {len(pending)} 件（内容 {len(contents)} 種類）")
+    if len(pending) != 30 or len(contents) != 30:
+        errors = [err.decode(errors="replace")[:200] for _, err in outputs if err]
+        failures.append(f"concurrent: 保存 {len(pending)} 件（期待値 30）: {errors[:2]}")
+
+
+def check_journal(work_dir: str, rng: random.Random, failures: list):
+    insights_dir = make_insights_dir(os.path.join(work_dir, "journal"))
+    journal_limit = insight_index.JOURNAL_LIMIT
+    insight_index.JOURNAL_LIMIT = 50
+    expected = {}
+    try:
+        for batch in range(6):
+            with InsightIndex.open(insights_dir) as index:
+                for n in range(20):
+                    content_hash, insight_id = random_hash(rng), random_id(rng, batch * 20 + n)
+                    write_insight(insights_dir, "pending", insight_id, content_hash)
+                    index.add(content_hash, insight_id)
+                    expected[content_hash] = (insight_id, "pending")
+        journal = os.path.join(insights_dir, insight_index.JOURNAL_FILE)
+        journal_records = os.path.getsize(journal) // insight_index.RECORD.size
+        with InsightIndex.open(insights_dir) as index:
+            if index.count + journal_records != len(expected) or journal_records > 50:
+                failures.append(f"journal: 本体 {index.count} 件、ジャーナル {journal_records} 件（合計の期待値 {len(expected)}）")
+            missing = [q for q in expected if index.find(q) != expected[q]]
+            if missing:
+                failures.append(f"journal: 統合後に見つからない {len(missing)} 件")
+
+        # 追記の途中で中断した末尾の不完全なレコード
+        with open(journal, "ab") as f:
+            f.write(b"\x01" * 7)
+        with InsightIndex.open(insights_dir) as index:
+            if any(index.find(q) != expected[q] for q in expected):
+                failures.append("journal: 不完全なレコードの後で検索結果が変わる")
+
+        # 壊れた本体は作り直す（ファイルから）
+        index_file = os.path.join(insights_dir, insight_index.INDEX_FILE)
+        with open(index_file, "r+b") as f:
+            f.truncate(os.path.getsize(index_file) - 3)
+        with InsightIndex.open(insights_dir) as index:
+            if not index.header.get("complete") or any(index.find(q) != expected[q] for q in expected):
+                failures.append("journal: 壊れた本体が作り直されない")
+    finally:
+        insight_index.JOURNAL_LIMIT = journal_limit
+
+
+def check_rebuild(work_dir: str, count: int, rng: random.Random, failures: list):
+    insights_dir = make_insights_dir(os.path.join(work_dir, "rebuild"))
+    expected = {}
+    for n in range(count):
+        content_hash, insight_id = random_hash(rng), random_id(rng, n)
+        status = STATUSES[n % len(STATUSES)]
+        write_insight(insights_dir, status, insight_id, content_hash)
+        expected[content_hash] = (insight_id, status)
+    # 索引の導入前の形式外のファイル
+    write_insight(insights_dir, "pending", "legacy-id", random_hash(rng))
+
+    session = InsightIndex.open(insights_dir)
+    index, rebuild_ms = timed(session.__enter__)
+    complete = index.header.get("complete")
+    found = sum(1 for q in expected if index.find(q) == expected[q])
+    session.__exit__(None, None, None)
+    print(f"rebuild: {count} ファイル、{rebuild_ms:.0f}ms、complete={complete}、見つかった {found} 件")
+    if complete and found != count:
+        failures.append(f"rebuild: 作り直した索引で見つからない {count - found} 件")
+
+    # 時間予算 0 の打ち切りと続きの読み込み
+    os.unlink(os.path.join(insights_dir, insight_index.INDEX_FILE))
+    budget = insight_index.REBUILD_TIME_BUDGET
+    insight_index.REBUILD_TIME_BUDGET = 0
+    try:
+        with InsightIndex.open(insights_dir) as index:
+            if index.header.get("complete"):
+                failures.append("rebuild: 時間予算 0 で complete: true になる")
+    finally:
+        insight_index.REBUILD_TIME_BUDGET = budget
+    rounds = 0
+    while rounds < 100:
+        rounds += 1
+        with InsightIndex.open(insights_dir) as index:
+            if index.header.get("complete"):
+                found = sum(1 for q in expected if index.find(q) == expected[q])
+                break
+    if found != count:
+        failures.append(f"rebuild: 続きの読み込み後に見つからない {count - found} 件（{rounds} 回）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--insights", type=int, default=100000, help="大きい索引のインサイト数")
+    parser.add_argument("--rebuild-files", type=int, default=3000, help="作り直しで読むインサイトのファイル数")
+    parser.add_argument("--processes", type=int, default=6, help="同時に実行するフックの数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-index-", dir="/tmp")
+    failures = []
+    try:
+        check_large(work_dir, args.insights, rng, failures)
+        check_capture(work_dir, failures)
+        check_concurrent(work_dir, args.processes, failures)
+        check_journal(work_dir, rng, failures)
+        check_rebuild(work_dir, args.rebuild_files, rng, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+保留中のインサイトのマニフェストのベンチマーク - SessionStart の件数とプレビュー
+
+spec_hooks/insight_manifest.py のマニフェスト（insights/manifest.json）から保留中のインサイトの
+件数とプレビューを読む時間を、従来の方法（pending/ を列挙して件数を数え、最新のファイルを開く）と
+比較する。SessionStart（spec-context）フック全体の時間も計測する。
+
+使用方法:
+  python3 benchmarks/insight_manifest_bench.py
+  python3 benchmarks/insight_manifest_bench.py --insights 20000 --rounds 20
+
+検証内容:
+  - マニフェストの件数が各状態のディレクトリのファイル数と一致し、プレビューが従来の方法と一致すること
+  - mv による移動、手動の削除、キャプチャ後の追加がマニフェストに反映されること
+  - マニフェストがない、壊れている場合に作り直されること、破損したインサイトのファイルも件数に含まれること
+  - 更新時刻が新しい（RACY_INTERVAL 以内の）ディレクトリの変更を見逃さないこと
+  - insight-manifest サブコマンドが件数と保留中のインサイトの一覧を出力すること
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import make_insights, make_insights_dir, project_workspace  # noqa: E402
+from spec_hooks import insight_manifest, insight_store, spec_context  # noqa: E402
+
+STATUSES = insight_manifest.STATUS_DIRS
+
+
+def make_review_dir(path: str, pending: int) -> str:
+    """保留中のインサイト pending 件と、その1割の適用済みのインサイト。"""
+    return make_insights_dir(path, {"pending": make_insights(pending, "b"),
+                                    "applied": make_insights(pending // 10, "a", status="applied")})
+
+
+def age(path: str, seconds: float = 3600):
+    """ディレクトリの更新時刻を過去にする（RACY_INTERVAL 以内のディレクトリは記録されないため）。"""
+    for status in STATUSES:
+        directory = os.path.join(path, status)
+        if os.path.isdir(directory):
+            past = time.time() - seconds
+            os.utime(directory, (past, past))
+
+
+def legacy_summary(insights_dir: str) -> tuple[int, str]:
+    """従来の方法（workspace.count_pending_insights と read_pending_preview）。"""
+    pending_dir = os.path.join(insights_dir, "pending")
+    names = [name for name in os.listdir(pending_dir) if name.endswith(".json") and not name.startswith(".")]
+    lines = []
+    for i, name in enumerate(sorted(names, reverse=True)[:3], 1):
+        try:
+            with open(os.path.join(pending_dir, name), encoding="utf-8") as f:
+                ins = json.load(f)
+            content = ins.get("content", "")[:60]
+            if len(ins.get("content", "")) > 60:
+                content += "..."
+            lines.append(f"  {i}. [{ins.get('category', 'insight')}] {content}")
+        except (ValueError, OSError):
+            continue
+    return len(names), "\n".join(lines)
+
+
+def manifest_summary(insights_dir: str) -> tuple[int, str]:
+    manifest = insight_manifest.load(insights_dir)
+    return insight_manifest.counts(manifest)["pending"], spec_context.format_pending_preview(manifest)
+
+
+def directory_counts(insights_dir: str) -> dict:
+    return {status: len([name for name in os.listdir(os.path.join(insights_dir, status))
+                         if name.endswith(".json") and not name.startswith(".")]) for status in STATUSES}
+
+
+def check(label: str, insights_dir: str, failures: list):
+    manifest = insight_manifest.load(insights_dir)
+    expected = directory_counts(insights_dir)
+    if insight_manifest.counts(manifest) != expected:
+        failures.append(f"{label}: 件数 {insight_manifest.counts(manifest)}（期待値 {expected}）")
+    if manifest_summary(insights_dir) != legacy_summary(insights_dir):
+        failures.append(f"{label}: 件数とプレビューが従来の方法と一致しない")
+    pending = insight_manifest.load_pending(insights_dir)
+    names = sorted(os.listdir(os.path.join(insights_dir, "pending")))
+    if sorted(pending) != [name[:-5] for name in names]:
+        failures.append(f"{label}: 保留中の一覧 {len(pending)} 件（期待値 {len(names)}）")
+
+
+def measure(work_dir: str, count: int, rounds: int, failures: list):
+    insights_dir = make_review_dir(os.path.join(work_dir, "measure"), count)
+    age(insights_dir)
+    start = time.perf_counter()
+    insight_manifest.load(insights_dir)
+    build = (time.perf_counter() - start) * 1000
+    check("measure", insights_dir, failures)
+
+    results = {"legacy": [], "manifest": []}
+    for _ in range(rounds):
+        for label, summary in (("legacy", legacy_summary), ("manifest", manifest_summary)):
+            start = time.perf_counter()
+            summary(insights_dir)
+            results[label].append((time.perf_counter() - start) * 1000)
+    size = os.path.getsize(os.path.join(insights_dir, insight_manifest.MANIFEST_FILE))
+    start = time.perf_counter()
+    insight_manifest.load_pending(insights_dir)
+    listing = (time.perf_counter() - start) * 1000
+    print(f"保留中 {count} 件（manifest.json {size / 1024:.1f}KB、作成 {build:.0f}ms、"
+          f"一覧 {listing:.1f}ms）の件数とプレビュー（{rounds} 回）:")
+    for label, times in results.items():
+        print(f"  {label:9} p50 {statistics.median(times):7.2f}ms  max {max(times):7.2f}ms")
+
+
+def check_session_start(work_dir: str, count: int, rounds: int, failures: list):
+    project = os.path.join(work_dir, "project")
+    workspace_id, insights_dir = project_workspace(project)
+    make_review_dir(insights_dir, count)
+    age(insights_dir)
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "spec-context"], cwd=project,
+                                capture_output=True, timeout=60)
+        times.append((time.perf_counter() - start) * 1000)
+    output = result.stdout.decode(errors="replace")
+    print(f"SessionStart（保留中 {count} 件）: 初回 {times[0]:.0f}ms、p50 {statistics.median(times[1:] or times):.0f}ms")
+    legacy_count, legacy_preview = legacy_summary(insights_dir)
+    if f"{legacy_count} 件のインサイト" not in output or legacy_preview not in output:
+        failures.append("spec-context: 保留中のインサイトの件数またはプレビューが従来と一致しない")
+
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-manifest", workspace_id],
+                            cwd=project, capture_output=True)
+    listing = json.loads(result.stdout or b"{}")
+    if (listing.get("counts") != directory_counts(insights_dir) or len(listing.get("pending", [])) != count
+            or listing["pending"][0].get("id") != sorted(os.listdir(os.path.join(insights_dir, "pending")))[0][:-5]):
+        failures.append(f"insight-manifest: 出力が一致しない: {result.stderr[:200]!r}")
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-manifest", "../x"],
+                            cwd=project, capture_output=True)
+    if result.returncode == 0:
+        failures.append("insight-manifest: 無効なワークスペース ID を受け付けた")
+
+
+def check_self_heal(work_dir: str, failures: list):
+    insights_dir = make_review_dir(os.path.join(work_dir, "heal"), 50)
+    age(insights_dir)
+    check("作成", insights_dir, failures)
+    pending_dir = os.path.join(insights_dir, "pending")
+    names = sorted(os.listdir(pending_dir))
+
+    # /review-insights の mv（承認、却下）
+    os.rename(os.path.join(pending_dir, names[-1]), os.path.join(insights_dir, "applied", names[-1]))
+    os.rename(os.path.join(pending_dir, names[-2]), os.path.join(insights_dir, "rejected", names[-2]))
+    check("mv による移動", insights_dir, failures)
+    age(insights_dir)
+    insight_manifest.load(insights_dir)
+
+    # 手動の削除
+    os.unlink(os.path.join(pending_dir, names[0]))
+    check("削除", insights_dir, failures)
+    age(insights_dir)
+
+    # キャプチャ後の追加（マニフェストはキャプチャ側で更新される）
+    added = make_insights(3, "c", start=100)
+    insight_store.write_batch(added, pending_dir)
+    insight_manifest.record_saved(insights_dir, added)
+    check("キャプチャ後の追加", insights_dir, failures)
+
+    # 破損したインサイトのファイル（件数に含め、プレビューはスキップ）
+    with open(os.path.join(pending_dir, "INS-29991231235959-broken.json"), "w", encoding="utf-8") as f:
+        f.write('{"id": "INS-broken", "content": ')
+    check("破損したインサイト", insights_dir, failures)
+
+    # マニフェストの破損と削除
+    path = os.path.join(insights_dir, insight_manifest.MANIFEST_FILE)
+    for label, content in (("壊れたマニフェスト", b'{"version": 1, "dirs": '), ("古い版のマニフェスト", b'{"version": 0}')):
+        with open(path, "wb") as f:
+            f.write(content)
+        check(label, insights_dir, failures)
+    os.unlink(path)
+    check("マニフェストの削除", insights_dir, failures)
+
+
+def check_racy(work_dir: str, failures: list):
+    """列挙の直後に同じ更新時刻（タイムスタンプの粒度の範囲）でディレクトリが変わる場合。"""
+    insights_dir = make_review_dir(os.path.join(work_dir, "racy"), 10)
+    pending_dir = os.path.join(insights_dir, "pending")
+    stamp = time.time_ns()
+    os.utime(pending_dir, ns=(stamp, stamp))
+    insight_manifest.load(insights_dir)
+    name = sorted(os.listdir(pending_dir))[0]
+    os.rename(os.path.join(pending_dir, name), os.path.join(insights_dir, "archive", name))
+    for status in ("pending", "archive"):
+        os.utime(os.path.join(insights_dir, status), ns=(stamp, stamp))
+    check("更新時刻が同じ変更", insights_dir, failures)
+    recorded = insight_manifest.load(insights_dir)["dirs"]["pending"]["mtime_ns"]
+    if recorded is not None:
+        failures.append("racy: RACY_INTERVAL 以内の更新時刻が記録された")
+    if len(insight_manifest.load_pending(insights_dir)) != 9:
+        failures.append("racy: 保留中の一覧が移動を反映しない")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--insights", type=int, default=5000, help="保留中のインサイト数")
+    parser.add_argument("--rounds", type=int, default=10, help="計測回数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-manifest-", dir="/tmp")
+    failures = []
+    try:
+        measure(work_dir, args.insights, args.rounds, failures)
+        check_session_start(work_dir, args.insights, max(2, args.rounds // 2), failures)
+        check_self_heal(work_dir, failures)
+        check_racy(work_dir, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
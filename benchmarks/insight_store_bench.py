@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+インサイトの保存のベンチマーク - まとめた fsync とセグメントログ
+
+spec_hooks/insight_store.py の保存方法（files: 一時ファイルの fsync とディレクトリの fsync を
+まとめる、segment: セグメントログへの1回の追記）について、100件のキャプチャの保存時間を
+従来の方法（1件ずつ atomic_write_json で書き込み・fsync・リネーム）と比較する。
+
+使用方法:
+  python3 benchmarks/insight_store_bench.py
+  python3 benchmarks/insight_store_bench.py --rounds 20 --processes 8 --dir /path/on/disk
+
+検証内容:
+  - files: すべてのインサイトが元の内容で保存され、一時ファイルが残らないこと（一部の保存に
+    失敗した場合も、残りは保存される）
+  - segment: 同時に実行した複数のフック（SPEC_WORKFLOW_INSIGHT_STORAGE=segment）のインサイトが
+    圧縮後にすべて pending/ にあること、重複排除の索引が未展開のインサイトを重複として扱うこと
+  - 中断した追記（改行で終わらない行）の後の追記も読み取れること、圧縮が途中で中断した
+    （展開後に切り詰める前）場合に重複やレビュー済みのインサイトの復活がないこと
+  - SessionStart（spec-context）と insight-compact がセグメントログを展開すること
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import make_insights, make_insights_dir, project_workspace  # noqa: E402
+from spec_hooks import insight_store  # noqa: E402
+from spec_hooks.fsutil import atomic_write_json  # noqa: E402
+
+
+def pending_files(insights_dir: str) -> list[str]:
+    return sorted(os.listdir(os.path.join(insights_dir, "pending")))
+
+
+def legacy_save(insights: list[dict], pending_dir: str):
+    for insight in insights:
+        atomic_write_json(os.path.join(pending_dir, f"{insight['id']}.json"), insight)
+
+
+def measure(work_dir: str, rounds: int, count: int, failures: list):
+    results = {}
+    for label in ("legacy", "files", "segment"):
+        times = []
+        for round_index in range(rounds):
+            insights_dir = make_insights_dir(os.path.join(work_dir, f"measure-{label}-{round_index}"))
+            pending_dir = os.path.join(insights_dir, "pending")
+            insights = make_insights(count, f"{label}{round_index}")
+            start = time.perf_counter()
+            if label == "legacy":
+                legacy_save(insights, pending_dir)
+            elif label == "files":
+                saved = insight_store.write_batch(insights, pending_dir)
+            else:
+                insight_store.append_segment(insights_dir, insights)
+            times.append((time.perf_counter() - start) * 1000)
+            if label == "files":
+                names = pending_files(insights_dir)
+                if len(saved) != count or names != sorted(f"{i['id']}.json" for i in insights):
+                    failures.append(f"files: 保存されたファイルが一致しない（{len(names)} / {count}）")
+                for insight in insights[:5]:
+                    with open(os.path.join(pending_dir, f"{insight['id']}.json"), encoding="utf-8") as f:
+                        if json.load(f) != insight:
+                            failures.append(f"files: {insight['id']} の内容が一致しない")
+            if label == "segment" and len(insight_store.read_segment(insights_dir)) != count:
+                failures.append("segment: セグメントログのレコード数が一致しない")
+        results[label] = times
+    print(f"{count} 件のキャプチャの保存（{rounds} 回）:")
+    for label, times in results.items():
+        print(f"  {label:8} p50 {statistics.median(times):7.1f}ms  max {max(times):7.1f}ms")
+
+
+def check_partial_failure(work_dir: str, failures: list):
+    insights_dir = make_insights_dir(os.path.join(work_dir, "partial"))
+    insights = make_insights(10, "partial")
+    insights[3] = dict(insights[3], id="missing-dir/INS-x")
+    saved = insight_store.write_batch(insights, os.path.join(insights_dir, "pending"))
+    names = pending_files(insights_dir)
+    if len(saved) != 9 or len(names) != 9 or any(name.endswith(".tmp") for name in names):
+        failures.append(f"files: 一部の失敗後のファイルが想定と異なる: {names}")
+
+
+def run_capture(project: str, transcript: str, env: dict) -> subprocess.Popen:
+    payload = json.dumps({"agent_transcript_path": transcript, "stop_hook_active": False})
+    process = subprocess.Popen([sys.executable, "-I", "-S", RUN_HOOK, "insight-capture"], cwd=project,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    process.stdin.write(payload.encode())
+    process.stdin.close()
+    return process
+
+
+def project_insights_dir(project: str) -> str | None:
+    for root, _, _ in os.walk(os.path.join(project, ".claude")):
+        if root.endswith("insights"):
+            return root
+    return None
+
+
+def check_segment_hooks(work_dir: str, processes: int, failures: list):
+    project = os.path.join(work_dir, "segment-project")
+    os.makedirs(project)
+    env = dict(os.environ, SPEC_WORKFLOW_INSIGHT_STORAGE="segment", CLAUDE_AGENT_NAME="bench")
+    transcripts = []
+    for n in range(processes):
+        transcript = os.path.join(work_dir, f"claude-segment-{n}.jsonl")
+        text = "\n".join(f"LEARNED: プロセス {n} の学び {k} の内容" for k in range(20))
+        # 半分の行は全プロセスで共通（重複排除で1件だけ残る）
+        text += "\n" + "\n".join(f"PATTERN: 共通のパターン {k} の内容" for k in range(10))
+        with open(transcript, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"role": "assistant", "content": text}, ensure_ascii=False) + "\n")
+        transcripts.append(transcript)
+    started = [run_capture(project, transcript, env) for transcript in transcripts]
+    errors = [process.stderr.read().decode(errors="replace") for process in started]
+    for process in started:
+        process.wait()
+    insights_dir = project_insights_dir(project)
+    expected = processes * 20 + 10
+    logged = insight_store.read_segment(insights_dir) if insights_dir else []
+    if len(logged) != expected or pending_files(insights_dir):
+        failures.append(f"segment: ログ {len(logged)} 件（期待値 {expected}）、pending/ {len(pending_files(insights_dir))} 件:"
+                        f" {[e[:200] for e in errors if e][:2]}")
+
+    # 未展開のインサイトも重複として扱う
+    process = run_capture(project, transcripts[0], env)
+    output = json.loads(process.stdout.read() or b"{}")
+    process.wait()
+    if len(insight_store.read_segment(insights_dir)) != expected:
+        failures.append(f"segment: 未展開のインサイトと同じ内容が再び追記された: {output}")
+
+    # SessionStart で展開される
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "spec-context"], cwd=project,
+                            capture_output=True, env=env, timeout=30)
+    elapsed = (time.perf_counter() - start) * 1000
+    names = pending_files(insights_dir)
+    print(f"segment: {processes} プロセス、{expected} 件、SessionStart の展開 {elapsed:.0f}ms")
+    if len(names) != expected or os.path.getsize(os.path.join(insights_dir, insight_store.SEGMENT_FILE)):
+        failures.append(f"segment: SessionStart 後の pending/ {len(names)} 件（期待値 {expected}）")
+    if f"{expected} 件のインサイト" not in result.stdout.decode(errors="replace"):
+        failures.append("segment: SessionStart の保留中のインサイト数が一致しない")
+
+
+def check_recovery(work_dir: str, failures: list):
+    insights_dir = make_insights_dir(os.path.join(work_dir, "recovery"))
+    first, second = make_insights(5, "first"), make_insights(5, "second")
+    insight_store.append_segment(insights_dir, first)
+    # 中断した追記（改行で終わらない行）
+    with open(os.path.join(insights_dir, insight_store.SEGMENT_FILE), "ab") as f:
+        f.write(b'{"id": "INS-torn", "content": "tr')
+    insight_store.append_segment(insights_dir, second)
+    ids = [record["id"] for record in insight_store.read_segment(insights_dir)]
+    if ids != [i["id"] for i in first + second]:
+        failures.append(f"recovery: 中断した追記の後のレコードが読めない: {ids}")
+
+    # 圧縮の中断: 展開後、切り詰める前にクラッシュ。その間に1件をレビュー済み（applied/）に移動
+    insight_store.write_batch(first + second, os.path.join(insights_dir, "pending"))
+    moved = first[0]["id"] + ".json"
+    os.rename(os.path.join(insights_dir, "pending", moved), os.path.join(insights_dir, "applied", moved))
+    count = insight_store.compact(insights_dir)
+    names = pending_files(insights_dir)
+    if count != 0 or len(names) != 9 or moved in names:
+        failures.append(f"recovery: 中断した圧縮のやり直しで {count} 件を展開、pending/ {len(names)} 件")
+    if insight_store.read_segment(insights_dir):
+        failures.append("recovery: 圧縮後にセグメントログが空にならない")
+
+    # insight-compact サブコマンド
+    project = os.path.join(work_dir, "compact-project")
+    workspace_id, project_dir = project_workspace(project)
+    make_insights_dir(project_dir)
+    insight_store.append_segment(project_dir, second)
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-compact", workspace_id],
+                            cwd=project, capture_output=True)
+    if result.returncode != 0 or len(pending_files(project_dir)) != 5:
+        failures.append(f"insight-compact: pending/ {len(pending_files(project_dir))} 件: {result.stderr[:200]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", type=int, default=10, help="保存時間の計測回数")
+    parser.add_argument("--insights", type=int, default=100, help="1回のキャプチャのインサイト数")
+    parser.add_argument("--processes", type=int, default=6, help="同時に実行するフックの数")
+    parser.add_argument("--dir", default="/tmp", help="作業ディレクトリを作成する場所（fsync の計測対象のファイルシステム）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-store-", dir=args.dir)
+    failures = []
+    try:
+        measure(work_dir, args.rounds, args.insights, failures)
+        check_partial_failure(work_dir, failures)
+        check_segment_hooks(work_dir, args.processes, failures)
+        check_recovery(work_dir, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+インサイトの状態の一括変更のベンチマーク - insight-move と move_insight の比較
+
+レビューした多数のインサイトを applied/ に移動する時間を、workspace_utils.sh の move_insight を
+1件ずつ呼び出す方法と、spec_hooks/insight_transition.py（insight-move サブコマンド、シェルからは
+move_insights）で一括して移動する方法で比較する。
+
+使用方法:
+  python3 benchmarks/insight_transition_bench.py
+  python3 benchmarks/insight_transition_bench.py --insights 1000
+
+検証内容:
+  - すべてのインサイトが移動先にあり、ID ごとの結果が moved であること
+  - すでに移動先にある ID は unchanged、存在しない ID は error で、他の ID の移動は続くこと
+  - パストラバーサル（../、/ を含む ID、"." で始まる ID）、シンボリックリンク、移動先の同名ファイル、
+    無効なワークスペース ID・ターゲットステータスを拒否すること
+  - stdin から ID を渡せること
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+WORKSPACE_UTILS = os.path.join(HOOKS_DIR, "workspace_utils.sh")
+sys.path.insert(0, HOOKS_DIR)
+
+from hook_corpus import make_insights, make_insights_dir, project_workspace  # noqa: E402
+
+
+def make_project(work_dir: str, name: str, count: int) -> tuple[str, str, str, list[str]]:
+    project = os.path.join(work_dir, name)
+    workspace_id, insights_dir = project_workspace(project)
+    insights = make_insights(count)
+    make_insights_dir(insights_dir, {"pending": insights})
+    return project, workspace_id, insights_dir, [insight["id"] for insight in insights]
+
+
+def insight_move(project: str, args: list[str], stdin: bytes | None = None) -> tuple[int, dict]:
+    result = subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "insight-move", *args], cwd=project,
+                            input=stdin, capture_output=True)
+    return result.returncode, json.loads(result.stdout or b"{}")
+
+
+def names(insights_dir: str, status: str) -> list[str]:
+    return sorted(os.listdir(os.path.join(insights_dir, status)))
+
+
+def measure(work_dir: str, count: int, failures: list):
+    # move_insight を1件ずつ（/review-insights の判断ごとの移動と同じ）
+    project, workspace_id, insights_dir, ids = make_project(work_dir, "legacy", count)
+    script = "\n".join(f'move_insight "{insights_dir}/pending/{insight_id}.json" applied "{workspace_id}"'
+                       for insight_id in ids)
+    start = time.perf_counter()
+    # スクリプトは stdin で渡す（bash -c の引数は1個あたりの長さに上限がある）
+    subprocess.run(["bash"], input=f'source "{WORKSPACE_UTILS}"\n{script}\n'.encode(), cwd=project, check=True)
+    legacy = (time.perf_counter() - start) * 1000
+    if len(names(insights_dir, "applied")) != count:
+        failures.append("move_insight: 移動されたファイル数が一致しない")
+
+    project, workspace_id, insights_dir, ids = make_project(work_dir, "batch", count)
+    start = time.perf_counter()
+    code, report = insight_move(project, [workspace_id, "applied", "-"], "\n".join(ids).encode())
+    batch = (time.perf_counter() - start) * 1000
+    print(f"{count} 件の移動: move_insight {legacy:.0f}ms、insight-move {batch:.0f}ms")
+    if (code != 0 or report.get("moved") != count or names(insights_dir, "applied") != [f"{i}.json" for i in ids]
+            or any(r["result"] != "moved" or r["from"] != "pending" for r in report["results"])):
+        failures.append(f"insight-move: 一括移動の結果が一致しない: {report.get('moved')} / {count}")
+
+    # move_insights（シェルの関数）
+    subprocess.run(["bash", "-c", f'source "{WORKSPACE_UTILS}" && move_insights archive {ids[0]} {ids[1]}'],
+                   cwd=project, capture_output=True)
+    if f"{ids[0]}.json" not in names(insights_dir, "archive"):
+        failures.append("move_insights: シェルの関数から移動できない")
+
+
+def check_report(work_dir: str, failures: list):
+    project, workspace_id, insights_dir, ids = make_project(work_dir, "report", 5)
+    insight_move(project, [workspace_id, "rejected", ids[0]])
+    code, report = insight_move(project, [workspace_id, "rejected", ids[0], "INS-missing", ids[1], ids[1]])
+    results = {r["id"]: r["result"] for r in report.get("results", [])}
+    if code != 1 or results != {ids[0]: "unchanged", "INS-missing": "error", ids[1]: "moved"}:
+        failures.append(f"report: ID ごとの結果が一致しない: {code} {results}")
+
+    code, report = insight_move(project, [workspace_id, "archive", "-"], stdin=f"{ids[2]}\n\n{ids[3]}\n".encode())
+    if code != 0 or report.get("moved") != 2:
+        failures.append(f"stdin: ID を stdin から読めない: {report}")
+
+
+def check_security(work_dir: str, failures: list):
+    project, workspace_id, insights_dir, ids = make_project(work_dir, "security", 3)
+    outside = os.path.join(work_dir, "outside.json")
+    with open(outside, "w", encoding="utf-8") as f:
+        f.write("{}")
+    os.symlink(outside, os.path.join(insights_dir, "pending", "INS-link.json"))
+    # 移動先の同名ファイル
+    shutil.copy(os.path.join(insights_dir, "pending", f"{ids[0]}.json"), os.path.join(insights_dir, "applied"))
+
+    attacks = ["../../../../outside", "pending/../../x", "INS-a/b", ".hidden", "..", "INS-link", ids[0]]
+    code, report = insight_move(project, [workspace_id, "applied", *attacks])
+    moved = [r["id"] for r in report.get("results", []) if r["result"] == "moved"]
+    if code != 1 or moved or not os.path.exists(outside) or not os.path.exists(
+            os.path.join(insights_dir, "pending", f"{ids[0]}.json")):
+        failures.append(f"security: 拒否すべき ID が移動された: {moved}")
+
+    for args in (["../x", "applied", ids[1]], [workspace_id, "pending", ids[1]], [workspace_id, "../applied", ids[1]],
+                 [workspace_id]):
+        code, _ = insight_move(project, args)
+        if code == 0:
+            failures.append(f"security: 無効な引数を受け付けた: {args}")
+    if f"{ids[1]}.json" not in names(insights_dir, "pending"):
+        failures.append("security: 無効な引数で移動された")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--insights", type=int, default=300, help="移動するインサイト数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-insight-transition-", dir="/tmp")
+    failures = []
+    try:
+        measure(work_dir, args.insights, failures)
+        check_report(work_dir, failures)
+        check_security(work_dir, failures)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+改行位置の索引のベンチマーク - 行数の取得、行の取得、引用されたコードの確認
+
+spec_hooks/line_index.py の索引について、大きいファイルでの作成時間、キャッシュが有効な場合の
+行数の取得時間、任意の行の取得時間を、ファイル全体を読んで行を数える従来の方法と比較する。
+
+使用方法:
+  python3 benchmarks/line_index_bench.py
+  python3 benchmarks/line_index_bench.py --size-mb 200 --lines 2000
+
+検証内容:
+  - 行数と各行の内容が、テキストモードで開いて読んだ場合と一致すること（\\n、\\r\\n、\\r の混在、
+    改行で終わらない最終行、ブロックの境界で分かれた \\r\\n、不正な UTF-8。ブロックサイズを変えて確認）
+  - キャッシュしたファイルのサイズまたは更新時刻が変わった場合に作り直されること、更新直後の
+    ファイルはキャッシュに保存されないこと
+  - verify_references の引用の確認: 参照の行の前後 SNIPPET_WINDOW 行にある引用は有効、
+    離れた行の引用は snippet_not_found、省略記号を含む引用、短い引用は確認しないこと
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "hooks"))
+
+import verify_references  # noqa: E402
+from spec_hooks import line_index  # noqa: E402
+from spec_hooks.line_index import LineIndex, LineIndexCache  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def text_mode_lines(path: str) -> list[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return [line[:-1] if line.endswith("\n") else line for line in f]
+
+
+def random_content(rng: random.Random, lines: int) -> bytes:
+    parts = []
+    for n in range(lines):
+        body = rng.choice([b"", b"x", f"def f_{n}(a, b):".encode(), "日本語の行".encode("utf-8"), b"\xff\xfe bad"])
+        parts.append(body + rng.choice([b"\n", b"\r\n", b"\r"]))
+    data = b"".join(parts)
+    return data if rng.random() < 0.5 else data + b"trailing"
+
+
+def check_lines(path: str, failures: list, label: str):
+    expected = text_mode_lines(path)
+    index = LineIndex.build(path)
+    if index.line_count != len(expected):
+        failures.append(f"{label}: 行数 {index.line_count}（テキストモード {len(expected)}）")
+        return
+    if index.lines(1, len(expected)) != expected:
+        failures.append(f"{label}: 全行の内容がテキストモードと一致しない")
+        return
+    for first in range(1, len(expected) + 1):
+        last = min(len(expected), first + 3)
+        if index.lines(first, last) != expected[first - 1:last]:
+            failures.append(f"{label}: {first}-{last} 行目がテキストモードと一致しない")
+            return
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def age(path: str):
+    """更新時刻を RACY_INTERVAL より前にする（キャッシュに保存される状態）。"""
+    past = time.time() - line_index.RACY_INTERVAL - 10
+    os.utime(path, (past, past))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=100, help="大きいファイルのサイズ（MB）")
+    parser.add_argument("--lines", type=int, default=1000, help="取得する行の数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-line-index-", dir="/tmp")
+    failures = []
+    cwd = os.getcwd()
+    block_size = line_index.BLOCK_SIZE
+    try:
+        # 行の内容の一致（小さいブロックで境界のケースを増やす）
+        sample = os.path.join(work_dir, "sample.txt")
+        for size in (1, 2, 3, 7, 64, block_size):
+            line_index.BLOCK_SIZE = size
+            for case in range(20):
+                with open(sample, "wb") as f:
+                    f.write(random_content(rng, rng.randrange(0, 60)))
+                check_lines(sample, failures, f"block {size} case {case}")
+            with open(sample, "wb") as f:
+                f.write(b"a\r" * size + b"\nb\r")
+            check_lines(sample, failures, f"block {size} 境界の \\r\\n")
+        line_index.BLOCK_SIZE = block_size
+
+        # 大きいファイル
+        large = os.path.join(work_dir, "large.py")
+        with open(large, "w", encoding="utf-8") as f:
+            written = n = 0
+            while written < args.size_mb * MB:
+                line = f"    value_{n} = compute(value_{n - 1}, {n})  # 行 {n + 1}\n"
+                written += f.write(line)
+                n += 1
+        age(large)
+        cache_file = os.path.join(work_dir, "line-index.json")
+        cache = LineIndexCache(cache_file)
+        index, build_ms = timed(lambda: cache.get(large))
+        cache.save()
+        _, legacy_ms = timed(lambda: sum(1 for _ in open(large, encoding="utf-8", errors="replace")))
+        cached, cached_ms = timed(lambda: LineIndexCache(cache_file).get(large))
+        if cached is None or cached.line_count != n or index.line_count != n:
+            failures.append(f"large: 行数が一致しない（{cached and cached.line_count} / {n}）")
+        targets = [rng.randrange(1, n + 1) for _ in range(args.lines)]
+        fetched, fetch_ms = timed(lambda: [cached.lines(t, t)[0] for t in targets])
+        for target, line in zip(targets, fetched):
+            if not line.endswith(f"# 行 {target}"):
+                failures.append(f"large: {target} 行目の内容が一致しない: {line!r}")
+                break
+        print(f"large: {args.size_mb}MB、{n} 行、ブロック {len(index.cumulative) - 1}")
+        print(f"  行数: 作成 {build_ms:.0f}ms、キャッシュ {cached_ms:.2f}ms（テキストモードで数える {legacy_ms:.0f}ms）")
+        print(f"  行の取得: {fetch_ms * 1000 / len(targets):.0f}µs/行")
+
+        # キャッシュの無効化
+        with open(large, "a", encoding="utf-8") as f:
+            f.write("tail = 1\n")
+        age(large)
+        updated = LineIndexCache(cache_file).get(large)
+        if updated is None or updated.line_count != n + 1:
+            failures.append("cache: サイズの変わったファイルの索引が作り直されない")
+        os.utime(large, None)
+        fresh_cache = LineIndexCache(cache_file)
+        fresh_cache.get(large)
+        if fresh_cache.modified:
+            failures.append("cache: 更新直後のファイルがキャッシュに保存される")
+
+        # 引用されたコードの確認
+        project = os.path.join(work_dir, "project")
+        os.makedirs(os.path.join(project, "src"))
+        with open(os.path.join(project, "src", "auth.py"), "w", encoding="utf-8") as f:
+            f.write("import os\n\n" + "".join(f"# filler {i}\n" for i in range(30))
+                    + "def login(user, password):\n    token = issue_token(user)\n    return token\n")
+        os.chdir(project)
+        login_line = 33
+        cases = [
+            (f"`src/auth.py:{login_line}` の `def login(user, password):` で認証", True),
+            (f"src/auth.py:{login_line - 3} の `return token` を参照", True),
+            (f"src/auth.py:{login_line} で `token   =   issue_token(user)` を返す", True),
+            (f"src/auth.py:{login_line} の `def login(...):` を参照", True),
+            (f"src/auth.py:3 の `def login(user, password):` で認証", False),
+            (f"src/auth.py:{login_line} の `def logout(user):` で認証", False),
+            ("src/auth.py:3 の `os` を参照", True),
+            (f"src/auth.py:{login_line} と src/auth.py:1 の `import os` を参照", True),
+        ]
+        for text, expected in cases:
+            references = verify_references.extract_references(text)
+            results = [verify_references.validate_reference(ref) for ref in references]
+            if all(r["valid"] for r in results) != expected:
+                failures.append(f"snippet: {text!r} -> {[(r['line'], r['reason']) for r in results]}")
+            output = verify_references.verify(references)
+            if expected != ("decision" not in (output or {})):
+                failures.append(f"snippet: verify の結果が想定と異なる: {text!r} -> {json.dumps(output, ensure_ascii=False)}")
+    finally:
+        line_index.BLOCK_SIZE = block_size
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+ファイルパスの索引のベンチマーク - 索引の作成、読み込み、参照パスの検索
+
+spec_hooks/path_index.py の索引を合成したプロジェクト（多数のディレクトリに同じファイル名が
+繰り返し現れる）で作成し、作成時間、ファイルサイズ、読み込み時間（mmap）、1回の検索の時間を
+全パスの線形走査と比較する。大きいプロジェクトは os.scandir の走査、小さいプロジェクトは
+Git リポジトリ（git ls-files）で作成する。
+
+使用方法:
+  python3 benchmarks/path_index_bench.py
+  python3 benchmarks/path_index_bench.py --files 500000 --git-files 20000
+
+検証内容:
+  - 候補（candidates）が、全パスを同じ規則（完全一致またはパスの区切りでの末尾一致、階層が浅い順、
+    パスの昇順）で線形に走査した結果と一致すること（存在しないファイル、"./" 付き、".." を含む）
+  - lookup は候補が1つの場合だけそのファイルを返し、複数のファイルに一致する参照は None になること
+  - 同じファイル集合から作成した索引の本体が同じバイト列になること（作成順に依存しない）
+  - os.scandir の走査が SCAN_TIME_BUDGET で打ち切られ、途中までの索引（complete: false）になること
+  - Git リポジトリで git add（index の更新）後に作り直され、新しいファイルが見つかること
+  - ワークツリー（.git が "gitdir:" のファイル）のルートと Git ディレクトリを検出すること
+  - 保存した索引を読み込んだ場合も同じ結果になること、壊れた索引は作り直されること
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "hooks"))
+
+from spec_hooks import path_index  # noqa: E402
+
+NAMES = ["index.ts", "utils.py", "Button.tsx", "main.go", "lib.rs", "README.md", "config.json", "handler.py"]
+
+
+def create_tree(root: str, count: int, rng: random.Random) -> list[str]:
+    """count 個のファイルを作成し、ルートからの相対パスのリストを返す。"""
+    paths = []
+    for index in range(count):
+        depth = rng.randrange(1, 6)
+        directory = "/".join(f"d{rng.randrange(8)}" for _ in range(depth)) + f"/p{index % 997}"
+        name = rng.choice(NAMES) if rng.random() < 0.3 else f"file_{index}.py"
+        paths.append(f"{directory}/{name}")
+    paths = sorted(set(paths))
+    for directory in sorted({os.path.dirname(p) for p in paths}):
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+    for path in paths:
+        open(os.path.join(root, path), "wb").close()
+    return paths
+
+
+def linear_candidates(root: str, paths: list[str], reference_path: str) -> list[str]:
+    """全パスの線形走査（索引と同じ規則）。"""
+    reference = os.path.normpath(reference_path)
+    if os.path.isabs(reference) or reference.startswith(".."):
+        return []
+    matches = [p for p in paths if p == reference or p.endswith("/" + reference)]
+    return [os.path.join(root, path) for path in sorted(matches, key=lambda p: (p.count("/"), p))
+            if os.path.isfile(os.path.join(root, path))]
+
+
+def make_queries(paths: list[str], count: int, rng: random.Random) -> list[str]:
+    queries = ["index.ts", "Button.tsx", "missing.py", "./utils.py", "../utils.py", "d1/index.ts", "p3/README.md"]
+    while len(queries) < count:
+        parts = rng.choice(paths).split("/")
+        kind = rng.random()
+        if kind < 0.1:
+            queries.append("/".join(parts[:-1] + ["missing_" + parts[-1]]))
+        else:
+            queries.append("/".join(parts[-rng.randrange(1, len(parts) + 1):]))
+    return queries
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def body(data: bytes) -> bytes:
+    return data[data.index(b"\n") + 1:]
+
+
+def check_lookups(label: str, index, root: str, paths: list[str], queries: list[str], failures: list) -> int:
+    """候補と lookup の結果を線形走査と比較し、複数のファイルに一致したクエリの数を返す。"""
+    ambiguous = 0
+    for query in queries:
+        expected = linear_candidates(root, paths, query)
+        actual = index.candidates(query)
+        if actual != expected:
+            failures.append(f"{label}: {query!r} -> {actual[:3]!r}（期待値 {expected[:3]!r}）")
+            return ambiguous
+        unique = expected[0] if len(expected) == 1 else None
+        if index.lookup(query) != unique:
+            failures.append(f"{label}: lookup({query!r}) -> {index.lookup(query)!r}（期待値 {unique!r}、"
+                            f"候補 {len(expected)} 件）")
+            return ambiguous
+        ambiguous += len(expected) > 1
+    return ambiguous
+
+
+def git(cwd: str, *args: str):
+    subprocess.run(["git", "-C", cwd, *args], check=True, capture_output=True,
+                   env=dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+                            GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=500000, help="os.scandir で索引を作るプロジェクトのファイル数")
+    parser.add_argument("--git-files", type=int, default=20000, help="Git リポジトリのファイル数")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-path-index-", dir="/tmp")
+    failures = []
+    try:
+        # os.scandir で作成する大きいプロジェクト
+        project = os.path.join(work_dir, "scan")
+        paths = create_tree(project, args.files, rng)
+        index_file = os.path.join(work_dir, "scan-index.bin")
+        scan_time_budget = path_index.SCAN_TIME_BUDGET
+        path_index.SCAN_TIME_BUDGET = 3600
+        data, build_ms = timed(lambda: path_index.build(project))
+        with open(index_file, "wb") as f:
+            f.write(data)
+        index, load_ms = timed(lambda: path_index.open_index(index_file, project))
+        if index is None or index.header["source"] != "scan" or index.count != len(paths):
+            failures.append(f"scan: 索引のファイル数が一致しない（{index and index.count} / {len(paths)}）")
+        queries = make_queries(paths, args.queries, rng)
+        _, lookup_ms = timed(lambda: [index.lookup(q) for q in queries])
+        sample = queries[:50]
+        _, linear_ms = timed(lambda: [linear_candidates(project, paths, q) for q in sample])
+        if check_lookups("scan", index, project, paths, sample + queries[50:200], failures) == 0:
+            failures.append("scan: 複数のファイルに一致するクエリがない（曖昧な参照を確認できていない）")
+        print(f"scan: {len(paths)} ファイル、索引 {len(data) / 1e6:.1f}MB、作成 {build_ms:.0f}ms、読み込み {load_ms:.2f}ms")
+        print(f"  検索 {lookup_ms * 1000 / len(queries):.1f}µs/回（線形走査 {linear_ms / len(sample):.1f}ms/回）")
+
+        # 作成順に依存しない: 走査結果を逆順にしても本体が同じ
+        original = path_index._scan_files
+        path_index._scan_files = lambda root: (lambda files, complete: (files[::-1], complete))(*original(root))
+        try:
+            if body(path_index.build(project)) != body(data):
+                failures.append("scan: ファイルの順序によって索引の本体が変わる")
+        finally:
+            path_index._scan_files = original
+
+        # 時間予算を超えた走査は途中までの索引（complete: false）
+        path_index.SCAN_TIME_BUDGET = scan_time_budget
+        partial, partial_ms = timed(lambda: path_index._parse(path_index.build(project)))
+        print(f"  時間予算 {scan_time_budget:.1f}秒: {partial.count} ファイル、{partial_ms:.0f}ms、"
+              f"complete={partial.header['complete']}")
+        if partial.header["complete"] != (partial.count == len(paths)) or partial_ms > scan_time_budget * 1000 + 2000:
+            failures.append(f"scan: 時間予算での打ち切りが想定と異なる（{partial.count} ファイル、{partial_ms:.0f}ms）")
+        path_index.SCAN_TIME_BUDGET = 3600
+
+        # 壊れた索引は作り直す
+        with open(index_file, "r+b") as f:
+            f.truncate(len(data) // 2)
+        rebuilt = path_index.open_index(index_file, project)
+        if rebuilt is None or rebuilt.count != len(paths):
+            failures.append("scan: 壊れた索引が作り直されない")
+
+        # Git リポジトリ
+        repo = os.path.join(work_dir, "repo")
+        os.makedirs(repo)
+        git(repo, "init", "-q")
+        git_paths = create_tree(repo, args.git_files, rng)
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", "init")
+        git_index_file = os.path.join(work_dir, "git-index.bin")
+        index, git_build_ms = timed(lambda: path_index.open_index(git_index_file, os.path.join(repo, "d1")))
+        if index is None or index.header["source"] != "git" or index.root != repo:
+            failures.append(f"git: 索引のルートまたは作成方法が想定と異なる: {index and index.header}")
+        else:
+            check_lookups("git", index, repo, git_paths, make_queries(git_paths, 200, rng), failures)
+        print(f"git: {len(git_paths)} ファイル、作成 {git_build_ms:.0f}ms")
+
+        reloaded = path_index.open_index(git_index_file, repo)
+        if reloaded is None or reloaded.header["built_at"] != index.header["built_at"]:
+            failures.append("git: index が変わっていないのに作り直された")
+
+        os.makedirs(os.path.join(repo, "added"), exist_ok=True)
+        open(os.path.join(repo, "added", "NewFile.kt"), "wb").close()
+        git(repo, "add", "added/NewFile.kt")
+        updated = path_index.open_index(git_index_file, repo)
+        if updated is None or updated.lookup("NewFile.kt") != os.path.join(repo, "added", "NewFile.kt"):
+            failures.append("git: git add 後に索引が作り直されない")
+
+        # ワークツリー
+        worktree = os.path.join(work_dir, "worktree")
+        git(repo, "worktree", "add", "-q", worktree)
+        found = path_index.find_git_dir(os.path.join(worktree, "d0"))
+        if found is None or found[0] != worktree or not os.path.isfile(os.path.join(found[1], "HEAD")):
+            failures.append(f"worktree: ルートまたは Git ディレクトリの検出に失敗: {found}")
+        worktree_index = path_index.open_index(os.path.join(work_dir, "worktree-index.bin"), worktree)
+        if worktree_index is None or worktree_index.header["source"] != "git" or worktree_index.root != worktree:
+            failures.append("worktree: git ls-files で索引を作成できない")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
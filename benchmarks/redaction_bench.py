@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+監査ログのシークレットマスクのベンチマーク - 大きなネストした入力のスループット
+
+spec_hooks/audit_log.py の truncate_input（Redactor の事前フィルタ付きの逐次置換、ネストの再帰、
+サイズ予算、先頭 MAX_REDACTION_CHARS 文字の走査）と、従来の実装（SECRET_PATTERNS ごとに re.sub を繰り返し、
+トップレベルの文字列値のみ処理）を比較する。
+
+使用方法:
+  python3 benchmarks/redaction_bench.py
+  python3 benchmarks/redaction_bench.py --iterations 50
+
+従来の実装はネストした値をマスクしない（そのまま出力する）ため、edit-array と mcp-nested の
+legacy 列はマスクを行わない場合のコストであり、new 列がネストした値をマスクするコストになる。
+
+検証内容:
+  equivalence - 切り詰めが発生しない文字列で、Redactor.sub と従来の逐次置換の結果が一致すること
+                （単語を空白なしで連結した、一致が重なり合う文字列と OVERLAP_CASES を含む）
+  leaks       - ネストした入力のどの深さに置いたシークレットもサマリーに残らないこと
+  long        - 閉じ区切り（@、引用符）が切り詰め位置より後ろにある長いシークレットの先頭が、
+                read_hook_input と同じ打ち切りで読んだ入力のサマリーに残らないこと
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+HOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hooks")
+sys.path.insert(0, os.path.abspath(HOOKS_DIR))
+
+from spec_hooks import audit_log  # noqa: E402
+
+SECRETS = [
+    "sk-ant-" + "a1B2c3D4" * 4,
+    "sk-" + "Zy9Xw8Vu7" * 3,
+    "AKIA" + "ABCDEFGHIJKLMNOP",
+    "ghp_" + "x" * 36,
+    "glpat-" + "g" * 24,
+    "xoxb-" + "1234567890-abc",
+    "Bearer " + "t" * 32,
+    "--password=hunter2hunter2",
+    "GITHUB_TOKEN=" + "q" * 20,
+    "postgres://admin:supersecretpw@db:5432/app",
+    '"' + "f" * 64 + '"',
+]
+
+# 先のルールの一致範囲が後のルールの一致の先頭を含む入力（逐次置換では両方のルールが適用される）
+OVERLAP_CASES = [
+    ("GITHUB_TOKEN=x--password hunter2secret", "hunter2secret"),
+    ("OPENAI_API_KEY=abc-phunter2secret99", "hunter2secret99"),
+    ("Authorization: tok--password=hunter2secret", "hunter2secret"),
+    ("Bearer abcdefghij-phunter2secret.token", "hunter2secret"),
+    ("GITHUB_TOKEN=sk-" + "Zy9Xw8Vu7" * 3, "Zy9Xw8Vu7Zy9"),
+    ("'" + "f" * 64 + "'--password=hunter2hunter2", "hunter2hunter2"),
+]
+
+# 閉じ区切りが切り詰め位置（200 文字）より後ろにある長いシークレットと、残ってはならない先頭部分
+LONG_SECRET_CASES = [
+    ("psql postgres://admin:" + "p" * 400 + "@db/app", "p" * 32),
+    ("echo '" + "0123456789abcdef" * 37 + "' > key.txt", "0123456789abcdef" * 2),
+    ("run " + "x " * 40 + '"' + "ab" * 300 + '"', "abababababababab"),
+]
+
+WORDS = ["git", "status", "npm", "run", "build", "src/app.ts", "--flag", "echo", "-p", "value", "token", "sk-", "AKIA"]
+
+
+def legacy_redact(text):
+    """従来の実装: パターンごとに re.sub を繰り返す。"""
+    if not isinstance(text, str):
+        return text
+    for pattern, replacement in audit_log.SECRET_PATTERNS:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+def legacy_truncate_input(data, max_len=200):
+    """従来の実装: トップレベルの文字列値のみマスクし、マスク後に切り詰める。"""
+    if isinstance(data, dict):
+        result = {}
+        for k, v in data.items():
+            if k.lower() in audit_log.SENSITIVE_KEYS:
+                result[k] = '[REDACTED]'
+            elif isinstance(v, str):
+                redacted = legacy_redact(v)
+                result[k] = redacted[:max_len] + '...[truncated]' if len(redacted) > max_len else redacted
+            else:
+                result[k] = v
+        return result
+    if isinstance(data, str):
+        return legacy_redact(data)
+    return data
+
+
+def random_text(rng: random.Random, words: int, secret_rate: float) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(SECRETS) if rng.random() < secret_rate else rng.choice(WORDS))
+    return " ".join(parts)
+
+
+def nested_payload(rng: random.Random, depth: int, width: int) -> dict:
+    if depth == 0:
+        return {"value": random_text(rng, 20, 0.2), "count": rng.randrange(100)}
+    return {
+        "name": random_text(rng, 5, 0.1),
+        "children": [nested_payload(rng, depth - 1, width) for _ in range(width)],
+        "headers": {"Authorization": rng.choice(SECRETS[6:7]), "X-Trace": random_text(rng, 3, 0)},
+    }
+
+
+def make_cases(rng: random.Random) -> dict:
+    large = random_text(rng, 200_000, 0.05)
+    return {
+        "command": {"command": "git status --short && npm test"},
+        "command+secret": {"command": f"curl -H 'Authorization: {SECRETS[6]}' https://api.example.com"},
+        "write-64KB": {"file_path": "src/app.ts", "content": large[:64 * 1024]},
+        "write-5MB": {"file_path": "src/app.ts", "content": (large * 5)[:5 * 1024 * 1024]},
+        "edit-array": {"file_path": "a.py", "edits": [
+            {"old_string": random_text(rng, 50, 0.1), "new_string": random_text(rng, 50, 0.1)} for _ in range(200)]},
+        "mcp-nested": {"arguments": nested_payload(rng, 4, 4)},
+    }
+
+
+def per_call_us(func, data, iterations: int) -> float:
+    func(data)  # Redactor の構築と re のキャッシュを計測から除外
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(data)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def overlapping_text(rng: random.Random) -> str:
+    """シークレットと単語の断片を空白なしで連結した、一致が重なり合いやすい文字列。"""
+    parts = []
+    for _ in range(rng.randint(1, 6)):
+        part = rng.choice(SECRETS + WORDS + ["-p", "--password ", "=", ":", "x"])
+        if rng.random() < 0.3:
+            part = part[:rng.randint(1, len(part))]
+        parts.append(part)
+    return rng.choice(("", " ", "-")).join(parts)
+
+
+def check_equivalence(rng: random.Random, samples: int) -> int:
+    redactor = audit_log.get_redactor()
+    mismatches = 0
+    texts = [text for text, _ in OVERLAP_CASES]
+    texts += [random_text(rng, rng.randint(1, 12), 0.3) for _ in range(samples)]
+    texts += [overlapping_text(rng) for _ in range(samples)]
+    for text in texts:
+        if redactor.sub(text) != legacy_redact(text):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  不一致: {text!r}", file=sys.stderr)
+    return mismatches
+
+
+# マスク後に残ってはならない部分（接続文字列のホスト名等はマスク対象外）
+SECRET_FRAGMENTS = [secret[-12:] for secret in SECRETS if not secret.startswith("postgres://")] + ["supersecretpw"]
+
+
+def check_leaks(case: dict) -> list[str]:
+    summary = json.dumps(audit_log.truncate_input(case))
+    return [fragment for fragment in SECRET_FRAGMENTS if fragment in summary]
+
+
+def check_long_secrets() -> list[str]:
+    import io
+
+    from spec_hooks.hookinput import read_fields
+
+    leaked = []
+    for command, fragment in LONG_SECRET_CASES:
+        data = json.dumps({"tool_name": "Bash", "tool_input": {"command": command}}).encode()
+        fields = read_fields(io.BytesIO(data), audit_log.AUDIT_INPUT_KEYS, max_string=audit_log.MAX_REDACTION_CHARS + 1)
+        if fragment in json.dumps(audit_log.truncate_input(fields["tool_input"])):
+            leaked.append(command[:40])
+    return leaked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=5000, help="等価性検証の文字列数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = make_cases(rng)
+
+    print(f"{'case':<16} {'size':>9} {'legacy(us)':>12} {'new(us)':>10} {'speedup':>8} {'new MB/s':>9}")
+    for name, data in cases.items():
+        size = len(json.dumps(data))
+        iterations = args.iterations if size < 1024 * 1024 else max(1, args.iterations // 10)
+        t_legacy = per_call_us(legacy_truncate_input, data, iterations)
+        t_new = per_call_us(audit_log.truncate_input, data, iterations)
+        print(f"{name:<16} {size / 1024:>7.0f}KB {t_legacy:>12.1f} {t_new:>10.1f} {t_legacy / t_new:>7.1f}x "
+              f"{size / t_new:>9.1f}")
+
+    failures = []
+    mismatches = check_equivalence(rng, args.samples)
+    total = len(OVERLAP_CASES) + args.samples * 2
+    print(f"\nequivalence: {total} 件中 {mismatches} 件が不一致")
+    if mismatches:
+        failures.append(f"{mismatches} 件の文字列で従来の逐次置換と結果が異なる")
+    for text, secret in OVERLAP_CASES:
+        if secret in audit_log.redact_secrets_in_string(text):
+            failures.append(f"重なり合う一致: {text!r} の {secret} がマスクされない")
+    for name in ("edit-array", "mcp-nested"):
+        leaked = check_leaks(cases[name])
+        print(f"leaks ({name}): {len(leaked)}")
+        failures += [f"{name}: {secret} がサマリーに残っている" for secret in leaked]
+    leaked = check_long_secrets()
+    print(f"leaks (long): {len(leaked)}")
+    failures += [f"長いシークレット: {command!r}... の先頭がサマリーに残っている" for command in leaked]
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+参照検証のベンチマーク - 参照ごとの逐次検証とファイルごとの並行検証の比較
+
+verify_references.py の verify（参照をファイルごとにまとめ、一意なファイルごとにパスの解決と
+行数の取得を1回だけ、スレッドで並行して行う）と、従来の実装（参照ごとに resolve_file_path と
+テキストモードでの行数の取得を繰り返す）の時間を、参照数を変えて比較する。参照は合成した
+プロジェクト（多数のソースファイル、一部は src/ 配下で相対パスの解決を経由）に対するもので、
+同じファイルへの参照が繰り返し現れ、約1割は存在しないファイルまたは行を指す。
+
+使用方法:
+  python3 benchmarks/reference_validation_bench.py
+  python3 benchmarks/reference_validation_bench.py --refs 500,5000,20000 --files 3000
+
+検証内容:
+  - 時間予算内に終わった場合、各参照の検証結果（有効/無効と理由）が従来の実装と一致すること
+  - 行数の取得（バイト列の改行を数える）が、テキストモードで行を数えた場合と一致すること
+    （\\r\\n、\\r のみ、改行で終わらない最終行、チャンクの境界で分かれた \\r\\n、不正な UTF-8）
+  - MAX_REFERENCES_TO_CHECK 件の参照を含むトランスクリプトで、フック全体が timeout（5秒）内に終わること
+  - ファイル名だけの参照が複数のファイルに一致する場合、行番号で1つに絞り込めれば検証し、
+    絞り込めなければ有効とも無効とも数えずに未検証として報告すること
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+import verify_references  # noqa: E402
+from spec_hooks import line_index  # noqa: E402
+
+HOOK_TIMEOUT_MS = 5000
+
+LINE_COUNT_SAMPLES = [
+    b"", b"a", b"a\n", b"a\r\nb", b"a\rb\r", b"\r\n\r\n", b"\n\r", b"x\xff\xfe\n\r\ny",
+    "日本語\r\nテキスト".encode("utf-8"),
+]
+
+
+def legacy_line_count(filepath: str) -> int:
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return -1
+
+
+def legacy_verify(references: list[dict]) -> list[tuple]:
+    """従来の実装: 参照ごとにパスを解決し、ファイル全体をテキストとして読んで行数を数える。"""
+    results = []
+    for ref in references:
+        resolved = verify_references.resolve_file_path(ref['file'])
+        total_lines = legacy_line_count(resolved) if resolved is not None else -1
+        result = verify_references.reference_result(ref, resolved, total_lines)
+        results.append((result['file'], result['line'], result['valid'], result['reason']))
+    return results
+
+
+def current_results(references: list[dict]) -> list[tuple]:
+    resolved_paths, line_counts, _ = verify_references.check_files(
+        dict.fromkeys(ref['file'] for ref in references), time.monotonic() + 3600)
+    results = []
+    for ref in references:
+        resolved, _ = verify_references.choose_candidate(resolved_paths[ref['file']], ref['line'], line_counts)
+        result = verify_references.reference_result(
+            ref, resolved, line_counts[resolved] if resolved is not None else -1)
+        results.append((result['file'], result['line'], result['valid'], result['reason']))
+    return results
+
+
+def create_files(project: str, count: int, rng: random.Random) -> list[tuple[str, int]]:
+    """count 個のソースファイルを作成し、(参照に使うパス, 行数) のリストを返す。"""
+    files = []
+    for index in range(count):
+        directory = os.path.join("src", f"pkg_{index % 40:02d}")
+        os.makedirs(os.path.join(project, directory), exist_ok=True)
+        lines = rng.randrange(20, 1500)
+        path = os.path.join(directory, f"module_{index:04d}.py")
+        with open(os.path.join(project, path), "w", encoding="utf-8") as f:
+            f.writelines(f"def handler_{index}_{n}(request):  # 処理 {n}\n" for n in range(lines))
+        # 約3割は src/ を省略した形で参照（resolve_file_path の候補ディレクトリの探索を経由）
+        files.append((path[len("src/"):] if rng.random() < 0.3 else path, lines))
+    return files
+
+
+def make_references(files: list[tuple[str, int]], count: int, rng: random.Random) -> list[dict]:
+    references = []
+    seen = set()
+    # 参照は一部のファイルに集中する（同じファイルの別の行への参照が多い）
+    hot = files[:max(1, len(files) // 5)]
+    while len(references) < count:
+        path, lines = rng.choice(hot if rng.random() < 0.6 else files)
+        kind = rng.random()
+        if kind < 0.05:
+            path = path.replace("module_", "missing_")
+        line = rng.randrange(lines + 1, lines + 100) if 0.05 <= kind < 0.1 else rng.randrange(1, lines + 1)
+        if (path, line) in seen:
+            continue
+        seen.add((path, line))
+        references.append({"file": path, "line": line})
+    return references
+
+
+def check_ambiguous(work_dir: str, failures: list):
+    """同じファイル名のファイル（10行と100行）への参照が、行番号で絞り込めない場合に有効と数えないこと。"""
+    project = os.path.join(work_dir, "ambiguous")
+    for directory, lines in (("short", 10), ("long", 100)):
+        os.makedirs(os.path.join(project, "pkg", directory))
+        with open(os.path.join(project, "pkg", directory, "util.py"), "w", encoding="utf-8") as f:
+            f.writelines(f"def helper_{n}():  # {directory}\n" for n in range(lines))
+    with open(os.path.join(project, "unique.py"), "w", encoding="utf-8") as f:
+        f.write("x = 1\n" * 10)
+    previous = os.getcwd()
+    os.chdir(project)
+    verify_references._loaded.pop("path_index", None)
+    try:
+        cases = {
+            "util.py:5": ("ambiguous_path", False),      # 両方のファイルの範囲内
+            "util.py:50": (None, True),                  # long/util.py だけの範囲内
+            "util.py:500": ("line_exceeds_file_length（ファイルは 100 行）", False),
+        }
+        for text, (reason, valid) in cases.items():
+            result = verify_references.validate_reference(verify_references.extract_references(text)[0])
+            if result["reason"] != reason or result["valid"] != valid:
+                failures.append(f"曖昧な参照: {text} -> {result['valid']}, {result['reason']!r}（期待値 {valid}, {reason!r}）")
+        if verify_references.validate_reference({"file": "util.py", "line": 50}).get("resolved_path") != \
+                os.path.join(project, "pkg", "long", "util.py"):
+            failures.append("曖昧な参照: util.py:50 が long/util.py に解決されない")
+
+        references = verify_references.extract_references("\n".join(
+            f"- {text} を確認" for text in ("util.py:5", "util.py:50", "util.py:500", "unique.py:3", "unique.py:4",
+                                           "pkg/short/util.py:5")))
+        message = (verify_references.verify(references) or {}).get("systemMessage", "")
+        if "4/5 件の参照が有効" not in message or "1 件の参照は複数のファイルに一致するため未検証: util.py:5" not in message:
+            failures.append(f"曖昧な参照: verify のサマリーが想定と異なる: {message!r}")
+        message = (verify_references.verify(verify_references.extract_references("util.py:5")) or {}).get("systemMessage", "")
+        if "検証できませんでした" not in message:
+            failures.append(f"曖昧な参照だけの場合に有効と数えた: {message!r}")
+    finally:
+        os.chdir(previous)
+        verify_references._loaded.pop("path_index", None)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--refs", default="500,5000,20000", help="参照数（カンマ区切り）")
+    parser.add_argument("--files", type=int, default=2000, help="プロジェクトのソースファイル数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-reference-validation-", dir="/tmp")
+    project = os.path.join(work_dir, "project")
+    failures = []
+    cwd = os.getcwd()
+    try:
+        # 行数の取得
+        sample = os.path.join(work_dir, "sample.txt")
+        samples = LINE_COUNT_SAMPLES + [b"a\r" * (line_index.BLOCK_SIZE // 2) + b"\nb"]
+        for data in samples:
+            with open(sample, "wb") as f:
+                f.write(data)
+            if verify_references.get_file_line_count(sample) != legacy_line_count(sample):
+                failures.append(f"line count: {data[:20]!r} の行数がテキストモードと一致しない")
+
+        files = create_files(project, args.files, rng)
+        os.chdir(project)
+        print(f"project: {args.files} ファイル、CPU {os.cpu_count()}、workers {verify_references.VALIDATION_WORKERS}")
+        print(f"{'refs':>7} {'files':>7} {'legacy':>10} {'current':>10} {'speedup':>8}")
+        for count in (int(c) for c in args.refs.split(",")):
+            references = make_references(files, count, random.Random(args.seed + count))
+            unique = len({ref['file'] for ref in references})
+            expected, legacy_ms = timed(lambda: legacy_verify(references))
+            actual, current_ms = timed(lambda: current_results(references))
+            if actual != expected:
+                failures.append(f"{count} refs: 検証結果が従来の実装と一致しない")
+            _, verify_ms = timed(lambda: verify_references.verify(references))
+            print(f"{count:>7} {unique:>7} {legacy_ms:>8.0f}ms {current_ms:>8.0f}ms {legacy_ms / current_ms:>7.2f}x"
+                  f"  (verify {verify_ms:.0f}ms)")
+
+        # フック全体: MAX_REFERENCES_TO_CHECK 件の参照を含むトランスクリプト
+        references = make_references(files, verify_references.MAX_REFERENCES_TO_CHECK, random.Random(args.seed))
+        transcript = os.path.join(work_dir, "claude-transcript.jsonl")
+        with open(transcript, "w", encoding="utf-8") as f:
+            for start in range(0, len(references), 50):
+                text = "\n".join(f"- {ref['file']}:{ref['line']} を確認" for ref in references[start:start + 50])
+                f.write(json.dumps({"role": "assistant", "content": text}, ensure_ascii=False) + "\n")
+        payload = os.path.join(work_dir, "payload.json")
+        with open(payload, "w", encoding="utf-8") as f:
+            json.dump({"agent_transcript_path": transcript, "stop_hook_active": False}, f)
+        spawner = Spawner(dict(os.environ))
+        try:
+            command = f"{shlex.quote(sys.executable)} -I -S {shlex.quote(os.path.join(HOOKS_DIR, 'run_hook.py'))} verify-references"
+            result = spawner.run(command, payload, project, timeout=HOOK_TIMEOUT_MS / 1000)
+        finally:
+            spawner.close()
+        print(f"hook: {len(references)} refs {result['latency_ms']:.0f}ms {result['peak_rss'] / 1e6:.1f}MB")
+        if result["exit_code"] != 0 or result["latency_ms"] > HOOK_TIMEOUT_MS:
+            failures.append(f"hook: exit {result['exit_code']}、{result['latency_ms']:.0f}ms")
+
+        check_ambiguous(work_dir, failures)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
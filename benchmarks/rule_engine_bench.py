@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+ルールエンジンのベンチマーク - テーブルサイズに対する入力あたりのコスト
+
+hooks/rule_engine.py の RuleSet と、従来のフックと同じ「パターンごとに re.search する
+ループ」を、テーブルサイズを変えながら比較する。テーブルは実際のフックのパターン
+（DANGEROUS_PATTERNS、SECRET_PATTERNS 等）を起点に、同じ形のルールを合成して拡張する。
+
+使用方法:
+  python3 benchmarks/rule_engine_bench.py
+  python3 benchmarks/rule_engine_bench.py --sizes 10,100,1000 --iterations 200
+
+出力列:
+  naive     - re.search(pattern, text, flags) のループ（従来のフック、re のキャッシュ依存）
+  compiled  - 事前コンパイル済みパターンのループ
+  ruleset   - RuleSet.first_search（リテラル事前フィルタ + 遅延コンパイル）
+  build     - RuleSet の構築時間（リテラル抽出、コールドスタート時に1回）
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+HOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hooks")
+sys.path.insert(0, os.path.abspath(HOOKS_DIR))
+
+from rule_engine import RuleSet  # noqa: E402
+
+# 合成ルール用の語彙（実在のコマンド名やトークンプレフィックスに近い形）
+WORDS = [
+    "deploy", "rollout", "mount", "iptables", "kubectl", "helm", "terraform", "docker",
+    "podman", "ssh-keygen", "openssl", "gpg", "rsync", "scp", "nmap", "tcpdump",
+    "insmod", "modprobe", "sysctl", "setcap", "chattr", "shred", "wipefs", "parted",
+]
+
+# 入力コーパス（ほとんどのツール呼び出しは無害なコマンド）
+COMMANDS = [
+    "git status --short",
+    "ls -la src/components",
+    "npm test -- --watch=false",
+    "python3 -m pytest tests/unit -q",
+    "grep -rn 'TODO' src/ | head -20",
+    "cat package.json",
+    "git diff HEAD~1 -- src/server.ts",
+    "cargo build --release",
+    "go test ./... -run TestHandler",
+    "docker compose ps",
+]
+
+
+def load_base_patterns() -> list[str]:
+    """実際のフックからパターンテーブルを読み込む。"""
+    import importlib
+
+    safety = importlib.import_module("safety_check")
+    secrets = importlib.import_module("prevent_secret_leak")
+    return list(safety.DANGEROUS_PATTERNS) + [p for p, _ in secrets.SECRET_PATTERNS]
+
+
+def build_table(size: int, base: list[str], rng: random.Random) -> list[str]:
+    """実パターンを先頭に、同じ形の合成ルールで指定サイズまで拡張したテーブル。"""
+    table = list(base[:size])
+    while len(table) < size:
+        word = rng.choice(WORDS)
+        flag = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 6)))
+        shape = rng.randrange(3)
+        if shape == 0:
+            table.append(rf"{word}\s+--{flag}\b")
+        elif shape == 1:
+            table.append(rf"{word}\s+.*\|\s*{flag}")
+        else:
+            table.append(rf"{flag}_[0-9a-zA-Z]{{{rng.randint(20, 40)}}}")
+    return table
+
+
+def make_inputs(rng: random.Random) -> dict[str, list[str]]:
+    lines = []
+    for _ in range(1500):
+        lines.append(" ".join(rng.choice(WORDS + ["const", "return", "import", "="]) for _ in range(8)))
+    return {
+        "command": [c.lower() for c in COMMANDS],
+        "file-64KB": ["\n".join(lines)[:64 * 1024]],
+    }
+
+
+def per_input_us(func, inputs: list[str], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in inputs:
+            func(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(inputs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="10,25,50,100,200,400,800")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base = load_base_patterns()
+    inputs = make_inputs(rng)
+    flags = re.IGNORECASE
+
+    print(f"{'input':<10} {'rules':>6} {'naive(us)':>11} {'compiled(us)':>13} {'ruleset(us)':>12} {'speedup':>8} {'build(ms)':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        table = build_table(size, base, rng)
+
+        start = time.perf_counter()
+        rules = RuleSet(table, flags)
+        build_ms = (time.perf_counter() - start) * 1e3
+        compiled = [re.compile(p, flags) for p in table]
+
+        def naive(text):
+            for pattern in table:
+                if re.search(pattern, text, flags):
+                    return pattern
+            return None
+
+        def compiled_loop(text):
+            for regex in compiled:
+                if regex.search(text):
+                    return regex
+            return None
+
+        for name, texts in inputs.items():
+            iterations = args.iterations if name == "command" else max(1, args.iterations // 10)
+            # 判定結果が一致することを確認してから計測
+            for text in texts:
+                expected = naive(text)
+                got = rules.first_search(text)
+                assert (got.pattern if got else None) == expected, (size, text[:40])
+            t_naive = per_input_us(naive, texts, iterations)
+            t_compiled = per_input_us(compiled_loop, texts, iterations)
+            t_rules = per_input_us(rules.first_search, texts, iterations)
+            print(f"{name:<10} {size:>6} {t_naive:>11.1f} {t_compiled:>13.1f} {t_rules:>12.1f} "
+                  f"{t_naive / t_rules:>7.1f}x {build_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
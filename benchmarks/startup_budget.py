@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+フックのコールドスタート予算チェック - -X importtime による起動時間の上限検証
+
+hooks.json（およびエージェント frontmatter）から起動される Python フックを、実際と
+同じインタープリターフラグ（-I -S）で代表的な入力を与えて起動し、import の合計時間と
+プロセス全体の実行時間が benchmarks/startup_budget.json に記録した予算を超えていないか
+確認する。予算超過、禁止モジュールの読み込み、フラグの不一致があれば exit 1。
+
+使用方法:
+  python3 benchmarks/startup_budget.py               # 予算と比較（CI 用）
+  python3 benchmarks/startup_budget.py --runs 11     # 試行回数を増やす
+  python3 benchmarks/startup_budget.py --record      # 現在の計測値から予算を再記録
+
+計測値（各シナリオの中央値）:
+  import   - -X importtime の self 時間の合計（インタープリター初期化時の import を含む）
+  wall     - -X importtime なしでのプロセス起動から終了までの時間
+
+設計上の判断:
+- 常駐フックサーバーを使わない経路（プロセス内フォールバック）を計測する。
+  サーバーが停止している場合の最悪ケースがフックの timeout（5秒）に対する余裕を決めるため
+- 予算は「計測値 × HEADROOM」で記録する。低速な CI ランナーでの揺らぎは許容しつつ、
+  重いモジュールの import 追加のような桁の変わる回帰を検出する
+- forbidden は「その入力では読み込まれてはならないモジュール」。遅延 import が
+  トップレベル import に戻された場合に、時間の揺らぎに関係なく確実に検出する
+- すべてのシナリオを一時ディレクトリのプロジェクト（cwd の {project}）で実行する。
+  フックが作成する .claude/workspaces/ や .claude/run/ をこのリポジトリに残さないため
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+BUDGET_FILE = os.path.join(ROOT_DIR, "benchmarks", "startup_budget.json")
+
+# --record 時に計測値に掛ける係数
+HEADROOM = 4.0
+
+# 予算の下限（ミリ秒）- 極端に小さい予算によるタイマー精度由来の誤検出を防止
+MIN_BUDGET_MS = 20.0
+
+
+def interpreter_command(flags: list[str]) -> list[str]:
+    return [sys.executable] + flags
+
+
+def configured_commands() -> list[str]:
+    """hooks.json とエージェント frontmatter に記載された python3 コマンドを列挙。"""
+    commands = []
+    with open(os.path.join(HOOKS_DIR, "hooks.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    for entries in config.get("hooks", {}).values():
+        for entry in entries:
+            for hook in entry.get("hooks", []):
+                command = hook.get("command", "")
+                if command.startswith("python3"):
+                    commands.append(command)
+
+    agents_dir = os.path.join(ROOT_DIR, "agents")
+    for name in sorted(os.listdir(agents_dir)):
+        if not name.endswith(".md"):
+            continue
+        with open(os.path.join(agents_dir, name), encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("command:") and "python3" in line:
+                    commands.append(line.split(":", 1)[1].strip().strip('"'))
+    return commands
+
+
+def check_flags(flags: list[str]) -> list[str]:
+    """設定済みの全 Python フックが予算と同じフラグで起動されることを確認。"""
+    expected = " ".join(["python3"] + flags) + " "
+    return [
+        f"フラグ不一致: {command}（期待: {expected.strip()} ...）"
+        for command in configured_commands()
+        if not command.startswith(expected)
+    ]
+
+
+def prepare_fixtures(workdir: str) -> dict[str, str]:
+    """シナリオ入力の {transcript} や cwd の {project} 等に埋め込むファイルを作成。"""
+    # フックの作業ディレクトリ（トランスクリプトが参照するファイルを置く）
+    project = os.path.join(workdir, "project")
+    os.makedirs(os.path.join(project, "hooks"))
+    subprocess.run(["git", "init", "-q", project], check=True)
+    shutil.copy(os.path.join(HOOKS_DIR, "safety_check.py"), os.path.join(project, "hooks"))
+
+    transcript = os.path.join(workdir, "transcript.jsonl")
+    with open(transcript, "w", encoding="utf-8") as f:
+        for i in range(20):
+            f.write(json.dumps({
+                "role": "assistant",
+                "content": [{"type": "text", "text": f"hooks/safety_check.py:{i + 1} を確認しました。"}],
+            }) + "\n")
+    return {"transcript": transcript, "project": project}
+
+
+def render(template: str, fixtures: dict[str, str]) -> str:
+    for key, value in fixtures.items():
+        template = template.replace("{" + key + "}", value)
+    return template
+
+
+def render_input(scenario: dict, fixtures: dict[str, str]) -> bytes:
+    return render(json.dumps(scenario["input"]), fixtures).encode("utf-8")
+
+
+def run_once(argv: list[str], payload: bytes, env: dict, importtime: bool, cwd: str) -> tuple[float, dict[str, int]]:
+    """
+    フックを1回起動。
+
+    戻り値: (wall_ms, {モジュール名: self 時間[us]})
+    """
+    command = list(argv)
+    if importtime:
+        command[1:1] = ["-X", "importtime"]
+
+    start = time.perf_counter()
+    proc = subprocess.run(command, input=payload, capture_output=True, env=env, cwd=cwd)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} が exit {proc.returncode} で終了: {proc.stderr.decode(errors='replace')[-500:]}")
+
+    modules = {}
+    if importtime:
+        for line in proc.stderr.decode("utf-8", errors="replace").splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, _cumulative, name = line[len("import time:"):].split("|", 2)
+            if not self_us.strip().isdigit():
+                continue  # ヘッダー行
+            modules[name.strip()] = int(self_us)
+    return wall_ms, modules
+
+
+def measure(scenario: dict, flags: list[str], fixtures: dict[str, str], env: dict, runs: int) -> dict:
+    argv = interpreter_command(flags) + [os.path.join(HOOKS_DIR, scenario["script"])] + scenario.get("args", [])
+    payload = render_input(scenario, fixtures)
+    cwd = render(scenario.get("cwd", "{project}"), fixtures)
+
+    import_ms, wall_ms, loaded = [], [], set()
+    for _ in range(runs):
+        _, modules = run_once(argv, payload, env, importtime=True, cwd=cwd)
+        import_ms.append(sum(modules.values()) / 1000)
+        loaded.update(modules)
+        wall, _ = run_once(argv, payload, env, importtime=False, cwd=cwd)
+        wall_ms.append(wall)
+
+    return {
+        "import_ms": statistics.median(import_ms),
+        "wall_ms": statistics.median(wall_ms),
+        "forbidden_loaded": sorted(loaded & set(scenario.get("forbidden", []))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5, help="シナリオごとの試行回数（中央値を使用）")
+    parser.add_argument("--record", action="store_true", help="計測値から予算を再記録")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE, encoding="utf-8") as f:
+        budget = json.load(f)
+    flags = budget["interpreter_flags"]
+
+    failures = check_flags(flags)
+
+    # 常駐フックサーバーを経由させない（存在しないソケットパスを指定）
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp(prefix="claude-startup-", dir="/tmp")
+    env["SPEC_WORKFLOW_HOOK_SOCKET"] = os.path.join(workdir, "no-server.sock")
+
+    try:
+        fixtures = prepare_fixtures(workdir)
+        print(f"{'scenario':<44} {'import':>9} {'budget':>9} {'wall':>9} {'budget':>9}")
+        for scenario in budget["scenarios"]:
+            result = measure(scenario, flags, fixtures, env, args.runs)
+            name = scenario["name"]
+
+            if args.record:
+                scenario["import_budget_ms"] = round(max(result["import_ms"] * HEADROOM, MIN_BUDGET_MS), 1)
+                scenario["wall_budget_ms"] = round(max(result["wall_ms"] * HEADROOM, MIN_BUDGET_MS), 1)
+
+            print(
+                f"{name:<44} {result['import_ms']:>7.1f}ms {scenario['import_budget_ms']:>7.1f}ms"
+                f" {result['wall_ms']:>7.1f}ms {scenario['wall_budget_ms']:>7.1f}ms"
+            )
+
+            if result["import_ms"] > scenario["import_budget_ms"]:
+                failures.append(f"{name}: import {result['import_ms']:.1f}ms > 予算 {scenario['import_budget_ms']}ms")
+            if result["wall_ms"] > scenario["wall_budget_ms"]:
+                failures.append(f"{name}: wall {result['wall_ms']:.1f}ms > 予算 {scenario['wall_budget_ms']}ms")
+            if result["forbidden_loaded"]:
+                failures.append(f"{name}: 読み込まれてはならないモジュール: {', '.join(result['forbidden_loaded'])}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.record:
+        with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+            json.dump(budget, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\n予算を記録しました: {os.path.relpath(BUDGET_FILE, ROOT_DIR)}")
+
+    if failures:
+        print("\n予算チェック失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+SubagentStop ランナーのベンチマーク - 3つのフックの個別実行との比較
+
+従来の hooks.json の SubagentStop（subagent_summary.sh、insight_capture.sh、verify_references.py を
+順に起動）と、subagent_stop.sh（1プロセスでフック入力とトランスクリプトを1回だけ読む）を、
+サイズの異なるトランスクリプトで比較する。各方式は hook_spawner.py（hook_replay_bench.py と同じ）
+から起動し、SubagentStop 1回あたりの合計時間とピーク RSS の最大値を報告する。各ケースは新しい
+プロジェクトで実行するため、トランスクリプトの差分読み取りのキャッシュはない状態から始まる。
+
+使用方法:
+  python3 benchmarks/subagent_stop_bench.py
+  python3 benchmarks/subagent_stop_bench.py --sizes 1,10,50
+
+検証内容:
+  各ケースで、個別に実行した3つのフックの出力を subagent_stop.merge_results で合成した結果と
+  ランナーの出力が一致すること（decision/reason、continue、systemMessage）。参照検証の block、
+  stop_hook_active、不正な入力のケースを含む
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from hook_corpus import MB, create_project, write_transcript
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+from spec_hooks.subagent_stop import merge_results  # noqa: E402
+
+PYTHON = shlex.quote(sys.executable)
+SEPARATE = [
+    f"/bin/bash {shlex.quote(os.path.join(HOOKS_DIR, 'subagent_summary.sh'))}",
+    f"/bin/bash {shlex.quote(os.path.join(HOOKS_DIR, 'insight_capture.sh'))}",
+    f"{PYTHON} -I -S {shlex.quote(os.path.join(HOOKS_DIR, 'run_hook.py'))} verify-references",
+]
+RUNNER = f"/bin/bash {shlex.quote(os.path.join(HOOKS_DIR, 'subagent_stop.sh'))}"
+
+BLOCK_TRANSCRIPT = [
+    {"role": "assistant", "content": "src/module_01.py:3 と src/nowhere.py:10、lib/missing.ts:4 を確認しました。"},
+    {"role": "assistant", "content": [{"type": "text", "text": "INSIGHT: 存在しないファイルへの参照は検証で block される"}]},
+]
+
+
+def run_output(command: str, payload: str, cwd: str, env: dict) -> dict | None:
+    with open(payload, "rb") as stdin:
+        proc = subprocess.run(command, shell=True, stdin=stdin, capture_output=True, cwd=cwd, env=env, timeout=60)
+    if proc.returncode != 0:
+        raise RuntimeError(f"exit {proc.returncode}: {command}")
+    output = proc.stdout.decode("utf-8").strip()
+    return json.loads(output) if output else None
+
+
+def write_payload(path: str, transcript: str, stop_hook_active: bool = False):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"session_id": "bench-session", "hook_event_name": "SubagentStop",
+                   "agent_transcript_path": transcript, "stop_hook_active": stop_hook_active}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="1,10,50", help="トランスクリプトのサイズ（MB、カンマ区切り）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-subagent-stop-", dir="/tmp")
+    env = dict(os.environ, CLAUDE_AGENT_NAME="bench-agent")
+    spawner = Spawner(env)
+    failures = []
+    try:
+        cases = []
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            transcript = os.path.join(work_dir, f"transcript-{size_mb}.jsonl")
+            write_transcript(transcript, size_mb * MB, random.Random(args.seed))
+            cases.append((f"transcript-{size_mb}MB", transcript, False))
+        block = os.path.join(work_dir, "block.jsonl")
+        with open(block, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in BLOCK_TRANSCRIPT)
+        cases.append(("block", block, False))
+        cases.append(("stop-hook-active", block, True))
+
+        print(f"{'case':<18} {'separate':>10} {'rss':>9} {'runner':>10} {'rss':>9} {'speedup':>8}")
+        for name, transcript, stop_hook_active in cases:
+            payload = os.path.join(work_dir, f"payload-{name}.json")
+            write_payload(payload, transcript, stop_hook_active)
+            timings = {}
+            for method, commands in (("separate", SEPARATE), ("runner", [RUNNER])):
+                project = os.path.join(work_dir, f"project-{name}-{method}")
+                create_project(project)
+                results = [spawner.run(command, payload, project, timeout=60) for command in commands]
+                for result in results:
+                    if result["exit_code"] != 0:
+                        failures.append(f"{name} {method}: exit {result['exit_code']}")
+                timings[method] = (sum(r["latency_ms"] for r in results), max(r["peak_rss"] for r in results))
+
+            # 出力の一致（別のプロジェクトで実行し、同じキャッシュの状態から比較する）
+            expected_project = os.path.join(work_dir, f"project-{name}-expected")
+            actual_project = os.path.join(work_dir, f"project-{name}-actual")
+            create_project(expected_project)
+            create_project(actual_project)
+            expected = merge_results([run_output(command, payload, expected_project, env) for command in SEPARATE])
+            actual = run_output(RUNNER, payload, actual_project, env)
+            if actual != expected:
+                failures.append(f"{name}: ランナーの出力が個別実行の合成と一致しない\n"
+                                f"    expected: {expected}\n    actual:   {actual}")
+
+            (separate_ms, separate_rss), (runner_ms, runner_rss) = timings["separate"], timings["runner"]
+            print(f"{name:<18} {separate_ms:>8.0f}ms {separate_rss / 1e6:>7.1f}MB {runner_ms:>8.0f}ms "
+                  f"{runner_rss / 1e6:>7.1f}MB {separate_ms / runner_ms:>7.2f}x")
+
+        # 不正な入力: 個別実行と同じく summary と continue のみ
+        with open(os.path.join(work_dir, "invalid.json"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        project = os.path.join(work_dir, "project-invalid")
+        create_project(project)
+        actual = run_output(RUNNER, os.path.join(work_dir, "invalid.json"), project, env)
+        if actual is None or "decision" in actual or not actual.get("continue"):
+            failures.append(f"invalid: 不正な入力に対する出力が想定と異なる: {actual}")
+    finally:
+        spawner.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
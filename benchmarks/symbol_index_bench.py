@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+シンボルの索引のベンチマーク - シンボル名を添えた参照の検証
+
+spec_hooks/symbol_index.py の抽出結果を言語ごとの例で確認し、合成したプロジェクト（Python、
+TypeScript、Go、Rust のファイル）に対する「`func_12` in src/mod_3.py:120」形式の参照を
+verify_references.py のフックとして検証する。キャッシュのない状態（初回）とある状態（2回目）の
+フック全体の時間を報告する。
+
+使用方法:
+  python3 benchmarks/symbol_index_bench.py
+  python3 benchmarks/symbol_index_bench.py --refs 2000 --files 800
+
+検証内容:
+  - 各言語の例で、シンボルの名前、修飾名、開始行と終了行が期待値と一致すること
+  - 参照の前後のインラインコードが、シンボル名（`name` in file:line、file:line の `name`）と
+    引用（file:line で `code` を呼ぶ）に正しく分けられること
+  - 定義の範囲外の行への参照が symbol_mismatch、定義も使用箇所もないシンボルが symbol_not_found、
+    それ以外が有効になること（参照ごとに期待値と比較）
+  - フック全体が初回も timeout（5秒）内に終わり、無効な参照の数が期待値と一致すること
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+import verify_references  # noqa: E402
+from spec_hooks.symbol_index import extract_symbols  # noqa: E402
+
+HOOK_TIMEOUT_MS = 5000
+
+EXTRACTION_CASES = [
+    ("python", """import os
+X = 1
+
+@decorator
+def handle(a):
+    y = 2
+    return y
+
+class Server:
+    port = 80
+    def run(self):
+        def inner():
+            pass
+""", [("X", 2, 2), ("handle", 4, 7), ("Server", 9, 13), ("Server.port", 10, 10),
+      ("Server.run", 11, 13), ("Server.run.inner", 12, 13)]),
+    ("javascript", """import x from "y";
+export class Server {
+  private port: number;
+  constructor(port: number) {
+    this.port = port;
+  }
+  async handleRequest(req: Request, opts: {a: number}): Promise<Response> {
+    if (req) {
+      return "}";
+    }
+  }
+}
+export const handler = async (event) => {
+  return 1;
+};
+export function helper(a: string) { return `${a}}`; }
+describe("x", () => {
+  it("works", () => {});
+});
+""", [("Server", 2, 12), ("Server.constructor", 4, 6), ("Server.handleRequest", 7, 11),
+      ("handler", 13, 15), ("helper", 16, 16)]),
+    ("go", """package main
+
+type Server struct {
+	port int
+}
+
+func (s *Server) Handle(w http.ResponseWriter, r *http.Request) {
+	if r == nil {
+		return
+	}
+}
+
+var x = 5
+""", [("Server", 3, 5), ("Server.Handle", 7, 11), ("x", 13, 13)]),
+    ("rust", """pub struct Server {
+    port: u16,
+}
+
+impl Server {
+    fn handle<'a>(&self, req: &'a str) -> &'a str
+    where
+        Self: Sized,
+    {
+        let c = '}';
+        req
+    }
+}
+struct Unit;
+""", [("Server", 1, 3), ("Server", 5, 13), ("Server.handle", 6, 12), ("Unit", 14, 14)]),
+]
+
+CONTEXT_CASES = [
+    ("`handle_request` in server.py:120", {"symbol": "handle_request"}),
+    ("`Server.handle_request()` (`server.py:120`)", {"symbol": "Server.handle_request()"}),
+    ("server.py:120 の `handle_request` を参照", {"symbol": "handle_request"}),
+    ("server.py:120 で `handle_request(req)` を呼ぶ", {"snippet": "handle_request(req)"}),
+    ("server.py:120 で `handle_request_wrapper` を呼ぶ", {"snippet": "handle_request_wrapper"}),
+    ("`server.py` の server.py:120", {}),
+    ("`foo` を変更し server.py:120 も修正", {}),
+    ("`a_func` in a.py:1 と `b_func` in b.py:2", {"symbol": "a_func"}),
+]
+
+
+def function_source(language: str, name: str, body_lines: int) -> list[str]:
+    if language == "py":
+        return [f"def {name}(a, b):"] + [f"    x{j} = a + {j}" for j in range(body_lines)] + ["    return a", ""]
+    if language == "ts":
+        return ([f"export function {name}(a: number, b: number): number {{"]
+                + [f"  const x{j} = a + {j};" for j in range(body_lines)] + ["  return a;", "}", ""])
+    if language == "go":
+        return ([f"func {name}(a int, b int) int {{"] + [f"\tx{j} := a + {j}" for j in range(body_lines)]
+                + ["\treturn a", "}", ""])
+    return ([f"pub fn {name}(a: i32, b: i32) -> i32 {{"] + [f"    let x{j} = a + {j};" for j in range(body_lines)]
+            + ["    a", "}", ""])
+
+
+def create_project(project: str, count: int, rng: random.Random) -> list[tuple[str, str, int, int]]:
+    """ソースファイルを作成し、(参照に使うパス, 関数名, 開始行, 終了行) のリストを返す。"""
+    functions = []
+    for index in range(count):
+        language = ("py", "ts", "go", "rs")[index % 4]
+        path = f"src/mod_{index}.{language}"
+        lines = ["package main", ""] if language == "go" else []
+        for number in range(rng.randrange(10, 40)):
+            name = f"func_{index}_{number}" if language != "go" else f"Func{index}x{number}"
+            start = len(lines) + 1
+            source = function_source(language, name, rng.randrange(3, 30))
+            lines.extend(source)
+            functions.append((path, name, start, start + len(source) - 2))
+        os.makedirs(os.path.join(project, "src"), exist_ok=True)
+        with open(os.path.join(project, path), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    return functions
+
+
+def make_references(functions, count: int, rng: random.Random) -> list[tuple[str, str | None]]:
+    """(参照のテキスト, 期待する無効の理由の接頭辞または None) のリスト。"""
+    by_path = {}
+    for function in functions:
+        by_path.setdefault(function[0], []).append(function)
+    references = []
+    seen = set()
+    while len(references) < count:
+        path, name, start, end = rng.choice(functions)
+        kind = rng.random()
+        if kind < 0.1:
+            # 同じファイルの別の関数の行（定義の範囲外）
+            _, _, other_start, other_end = rng.choice([f for f in by_path[path] if f[1] != name])
+            line, expected = rng.randrange(other_start, other_end + 1), "symbol_mismatch"
+        elif kind < 0.15:
+            name, line, expected = f"missing_{len(references)}", rng.randrange(start, end + 1), "symbol_not_found"
+        else:
+            line, expected = rng.randrange(start, end + 1), None
+        if (path, line) in seen:
+            continue
+        seen.add((path, line))
+        references.append((f"- `{name}` in {path}:{line}", expected))
+    return references
+
+
+def run_hook(spawner: Spawner, work_dir: str, project: str, references) -> dict:
+    transcript = os.path.join(work_dir, "claude-transcript.jsonl")
+    with open(transcript, "w", encoding="utf-8") as f:
+        for start in range(0, len(references), 50):
+            text = "\n".join(text for text, _ in references[start:start + 50])
+            f.write(json.dumps({"role": "assistant", "content": text}, ensure_ascii=False) + "\n")
+    payload = os.path.join(work_dir, "payload.json")
+    with open(payload, "w", encoding="utf-8") as f:
+        json.dump({"agent_transcript_path": transcript, "stop_hook_active": False}, f)
+    command = f"{shlex.quote(sys.executable)} -I -S {shlex.quote(os.path.join(HOOKS_DIR, 'run_hook.py'))} verify-references"
+    return spawner.run(command, payload, project, timeout=HOOK_TIMEOUT_MS / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--refs", type=int, default=2000, help="参照数")
+    parser.add_argument("--files", type=int, default=800, help="プロジェクトのソースファイル数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    failures = []
+    for language, source, expected in EXTRACTION_CASES:
+        actual = [(qualname, start, end) for _, qualname, start, end in extract_symbols(language, source)]
+        if actual != expected:
+            failures.append(f"extract {language}: {actual}（期待値 {expected}）")
+    for text, expected in CONTEXT_CASES:
+        references = verify_references.extract_references(text)
+        actual = {key: value for key, value in references[0].items() if key in ("symbol", "snippet")}
+        if actual != expected:
+            failures.append(f"context: {text!r} -> {actual}（期待値 {expected}）")
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-symbol-index-", dir="/tmp")
+    project = os.path.join(work_dir, "project")
+    cwd = os.getcwd()
+    spawner = Spawner(dict(os.environ))
+    try:
+        functions = create_project(project, args.files, rng)
+        # 既存のコードベース（更新直後ではないファイル。キャッシュに保存される）
+        past = time.time() - 3600
+        for path in {function[0] for function in functions}:
+            os.utime(os.path.join(project, path), (past, past))
+        references = make_references(functions, args.refs, rng)
+        expected_invalid = sum(1 for _, expected in references if expected)
+
+        # フック全体（初回はキャッシュなし、2回目はキャッシュあり）
+        print(f"project: {args.files} ファイル、{len(functions)} 関数、参照 {len(references)}（無効 {expected_invalid}）")
+        for label in ("初回", "2回目"):
+            result = run_hook(spawner, work_dir, project, references)
+            print(f"hook {label}: {result['latency_ms']:.0f}ms {result['peak_rss'] / 1e6:.1f}MB")
+            if result["exit_code"] != 0 or result["latency_ms"] > HOOK_TIMEOUT_MS:
+                failures.append(f"hook {label}: exit {result['exit_code']}、{result['latency_ms']:.0f}ms")
+        cache_file = next((os.path.join(root, "symbol-index.json") for root, _, names in os.walk(project)
+                           if "symbol-index.json" in names), None)
+        if cache_file is None:
+            failures.append("hook: symbol-index.json が保存されていない")
+
+        # 参照ごとの期待値（このプロセスで検証、時間予算なし）
+        os.chdir(project)
+        verify_references.VALIDATION_TIME_BUDGET = 3600
+        for text, expected in references:
+            result = verify_references.validate_reference(verify_references.extract_references(text)[0])
+            reason = result["reason"] or ""
+            if (expected is None and not result["valid"]) or (expected and not reason.startswith(expected)):
+                failures.append(f"verify: {text!r} -> {reason or 'valid'}（期待値 {expected or 'valid'}）")
+                break
+        output = verify_references.verify([verify_references.extract_references(text)[0] for text, _ in references])
+        message = (output or {}).get("systemMessage") or (output or {}).get("reason", "")
+        found = re.search(r"\((\d+) 件が無効", message) or re.search(r"\((\d+)/\d+\)", message)
+        if not found or int(found.group(1)) != expected_invalid:
+            failures.append(f"verify: 無効な参照の数が期待値 {expected_invalid} と異なる: {message[:200]}")
+    finally:
+        os.chdir(cwd)
+        spawner.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
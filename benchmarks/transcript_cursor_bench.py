@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+トランスクリプトの差分読み取りのベンチマーク - SubagentStop ごとの抽出コスト
+
+spec_hooks/transcript.py の AssistantMessages について、全体の読み取り（cache_dir なし）と
+差分モード（読み取り位置と抽出済みのメッセージをキャッシュ）の時間を比較する。各ステップで
+差分モードの結果が全体の読み取りと一致することを確認する。
+
+使用方法:
+  python3 benchmarks/transcript_cursor_bench.py
+  python3 benchmarks/transcript_cursor_bench.py --size-mb 95 --append-kb 500
+
+計測・検証するステップ:
+  cold      - キャッシュなしの初回（全体を読み、キャッシュを作成）
+  noop      - 追記なし
+  append    - 追記した行のみ読む
+  partial   - 書き込み途中の最終行（改行なし）がある状態、その後に行を完成させた状態
+  truncate  - 行の途中で切り詰め（offset 0 から読み直す）
+  rewrite   - 同じファイルを同じサイズの別の内容で書き直し、末尾の変更（fingerprint で検出）
+  rotate    - リネームして同じパスに新しいファイルを作成（inode で検出）
+  crash     - キャッシュの内容への余分な追記（保存の途中でのクラッシュ）、欠損、破損
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from hook_corpus import MB, transcript_entry, write_transcript
+
+HOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hooks")
+sys.path.insert(0, os.path.abspath(HOOKS_DIR))
+
+from spec_hooks.transcript import AssistantMessages  # noqa: E402
+
+
+def append_lines(path: str, size: int, rng: random.Random, start: int) -> int:
+    written = 0
+    n = start
+    with open(path, "a", encoding="utf-8") as f:
+        while written < size:
+            line = json.dumps(transcript_entry(rng, n), ensure_ascii=False) + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            n += 1
+    return n
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=80, help="トランスクリプトのサイズ（MB）")
+    parser.add_argument("--append-kb", type=int, default=200, help="append ステップで追記するサイズ（KB）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="claude-transcript-cursor-", dir="/tmp")
+    transcript = os.path.join(work_dir, "session.jsonl")
+    cache_dir = os.path.join(work_dir, "transcript-cache")
+    failures = []
+
+    def step(name: str, note: str = ""):
+        expected, full_ms = timed(lambda: list(AssistantMessages(transcript)))
+        actual, ms = timed(lambda: list(AssistantMessages(transcript, cache_dir)))
+        size = os.path.getsize(transcript)
+        print(f"{name:<18} {size / MB:>8.1f}MB {full_ms:>10.1f}ms {ms:>10.1f}ms  {note}")
+        if actual != expected:
+            failures.append(f"{name}: 全体の読み取りと結果が一致しない")
+
+    try:
+        write_transcript(transcript, args.size_mb * MB, rng)
+        n = 1_000_000
+        print(f"{'step':<18} {'size':>10} {'full':>12} {'incremental':>12}")
+        step("cold")
+        step("noop")
+
+        n = append_lines(transcript, args.append_kb * 1000, rng, n)
+        step("append", f"+{args.append_kb}KB")
+
+        line = json.dumps(transcript_entry(rng, n), ensure_ascii=False) + "\n"
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(line[:len(line) // 2])
+        step("partial (open)")
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(line[len(line) // 2:])
+        step("partial (closed)")
+        with open(transcript, "a", encoding="utf-8") as f:
+            f.write(line.rstrip("\n"))
+        step("partial (no LF)", "完結した JSON で改行なし")
+        n = append_lines(transcript, 10_000, rng, n + 1)
+        step("partial (+lines)")
+
+        size = os.path.getsize(transcript)
+        os.truncate(transcript, size * 2 // 3 + 17)
+        step("truncate", "行の途中で切り詰め")
+        n = append_lines(transcript, args.append_kb * 1000, rng, n)
+        step("truncate (+lines)")
+
+        # 同じ inode に同じサイズの別の内容を書き直す（> によるリダイレクト等）
+        size = os.path.getsize(transcript)
+        write_transcript(transcript + ".new", size, random.Random(args.seed + 1))
+        with open(transcript + ".new", "rb") as src, open(transcript, "r+b") as dst:
+            dst.write(src.read(size))
+        os.unlink(transcript + ".new")
+        step("rewrite (same size)")
+        with open(transcript, "r+b") as f:
+            f.seek(-40, os.SEEK_END)
+            tail = f.read()
+            f.seek(-40, os.SEEK_END)
+            f.write(tail.replace(b"e", b"E"))
+        step("rewrite (tail)")
+
+        os.rename(transcript, transcript + ".1")
+        write_transcript(transcript, 2 * MB, rng)
+        step("rotate")
+
+        cache_files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".msgs")]
+        with open(cache_files[0], "ab") as f:
+            f.write(b"\n garbage from an interrupted save")
+        step("crash (extra)")
+        with open(cache_files[0], "r+b") as f:
+            f.truncate(os.path.getsize(cache_files[0]) // 2)
+        step("crash (short)")
+        # キャッシュの内容の破損: その回は途中で打ち切り（complete=False）、次回は先頭から読み直す
+        with open(cache_files[0], "r+b") as f:
+            f.seek(0)
+            f.write(b"x")
+        messages = AssistantMessages(transcript, cache_dir)
+        list(messages)
+        if messages.complete:
+            failures.append("crash (corrupt): 破損したキャッシュを検出していない")
+        step("crash (corrupt)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
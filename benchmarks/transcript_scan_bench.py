@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+トランスクリプトの走査のベンチマーク - 行ごとのデコードと mmap + 事前フィルタの比較
+
+spec_hooks/transcript.py の AssistantMessages（キャッシュなし）で、トランスクリプト全体から
+アシスタントメッセージを抽出する時間とピーク RSS を比較する。各方式は hook_spawner.py
+（hook_replay_bench.py と同じ）から別プロセスとして起動する。
+
+  line-by-line  - 全行を json.loads して role を確認（従来の実装）
+  mmap+json     - mmap で開き、"assistant" を含まない行はデコードしない（python3 -I -S、フックと同じ）
+  mmap+orjson   - 同上、デコードに orjson を使用（python3 -I。orjson がない環境では省略）
+
+使用方法:
+  python3 benchmarks/transcript_scan_bench.py
+  python3 benchmarks/transcript_scan_bench.py --size-mb 300 --ensure-ascii
+
+検証内容（プロセス内）:
+  各方式の結果が従来の実装と一致すること。合成したトランスクリプトに加え、事前フィルタと
+  orjson が扱いを変えうる行（role のエスケープ、孤立サロゲート、NaN、巨大な整数、
+  オブジェクト以外の行、改行で終わらない最終行）を含むトランスクリプトで確認する
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import sys
+import tempfile
+
+from hook_corpus import MB, transcript_entry, write_transcript
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+from spec_hooks import transcript  # noqa: E402
+
+EDGE_LINES = [
+    '{"role": "\\u0061ssistant", "content": "escaped role"}',
+    '{"role": "assistant", "content": "lone surrogate \\ud800"}',
+    '{"role": "assistant", "content": "nan", "score": NaN}',
+    '{"role": "assistant", "content": "big int", "n": 123456789012345678901234567890}',
+    '["assistant"]',
+    '"assistant"',
+    '{"role": "user", "content": "mentions \\"assistant\\" only"}',
+    '{"role": "assistant", "content": [{"type": "text", "text": "blocks"}, "plain", {"type": "tool_use"}]}',
+    '{"role": "assistant", "content": "broken',
+    '',
+]
+
+LEGACY = """
+import json, sys
+sys.path.insert(0, {hooks_dir!r})
+from spec_hooks import transcript
+transcript.may_be_assistant = lambda line: True
+transcript._loads = json.loads
+count = 0
+with open(sys.argv[1], "rb") as f:
+    for line in f:
+        count += bool(transcript.message_text(line))
+print(count)
+"""
+
+SCAN = """
+import sys
+sys.path.insert(0, {hooks_dir!r})
+from spec_hooks.transcript import AssistantMessages
+print(sum(1 for _ in AssistantMessages(sys.argv[1])))
+"""
+
+
+def legacy_messages(path: str) -> list[str]:
+    """従来の実装: 全行をデコードして role を確認。"""
+    messages = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or entry.get("role") != "assistant":
+                continue
+            content = entry.get("content", "")
+            if isinstance(content, str):
+                text = content
+            else:
+                parts = []
+                for block in content if isinstance(content, list) else []:
+                    if isinstance(block, dict) and block.get("type") == "text" and block.get("text", ""):
+                        parts.append(block["text"])
+                    elif isinstance(block, str) and block:
+                        parts.append(block)
+                text = "\n".join(parts)
+            if text:
+                messages.append(text)
+    return messages
+
+
+def decoders() -> dict:
+    result = {"json": json.loads}
+    try:
+        import orjson
+        result["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    return result
+
+
+def check_equivalence(path: str) -> list[str]:
+    failures = []
+    expected = legacy_messages(path)
+    for name, loads in decoders().items():
+        transcript._loads = loads
+        actual = list(transcript.AssistantMessages(path))
+        if actual != expected:
+            failures.append(f"{os.path.basename(path)}: mmap+{name} の結果が従来の実装と一致しない "
+                            f"({len(actual)} 件 / {len(expected)} 件)")
+    transcript._loads = None
+    return failures
+
+
+def write_edge_transcript(path: str, rng: random.Random):
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(200):
+            f.write(json.dumps(transcript_entry(rng, n), ensure_ascii=n % 2 == 0) + "\n")
+            f.write(EDGE_LINES[n % len(EDGE_LINES)] + "\n")
+        f.write('{"role": "assistant", "content": "no trailing newline"}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=100, help="トランスクリプトのサイズ（MB）")
+    parser.add_argument("--ensure-ascii", action="store_true", help="非 ASCII 文字を \\uXXXX で書き出す")
+    parser.add_argument("--runs", type=int, default=3, help="方式ごとの実行回数（中央値を報告）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-transcript-scan-", dir="/tmp")
+    spawner = Spawner(dict(os.environ))
+    failures = []
+    try:
+        edge = os.path.join(work_dir, "edge.jsonl")
+        write_edge_transcript(edge, random.Random(args.seed))
+        failures.extend(check_equivalence(edge))
+
+        path = os.path.join(work_dir, "session.jsonl")
+        rng = random.Random(args.seed)
+        if args.ensure_ascii:
+            with open(path, "w", encoding="ascii") as f:
+                n = 0
+                while f.tell() < args.size_mb * MB:
+                    f.write(json.dumps(transcript_entry(rng, n)) + "\n")
+                    n += 1
+        else:
+            write_transcript(path, args.size_mb * MB, rng)
+        failures.extend(check_equivalence(path))
+
+        python = shlex.quote(sys.executable)
+        commands = {
+            "line-by-line": f"{python} -I -S -c {shlex.quote(LEGACY.format(hooks_dir=HOOKS_DIR))}",
+            "mmap+json": f"{python} -I -S -c {shlex.quote(SCAN.format(hooks_dir=HOOKS_DIR))}",
+        }
+        if "orjson" in decoders():
+            commands["mmap+orjson"] = f"{python} -I -c {shlex.quote(SCAN.format(hooks_dir=HOOKS_DIR))}"
+
+        print(f"transcript: {os.path.getsize(path) / MB:.1f}MB"
+              f"（ensure_ascii={args.ensure_ascii}）、{len(legacy_messages(path))} 件のアシスタントメッセージ")
+        print(f"rss floor: {spawner.run('true', os.devnull, work_dir)['peak_rss'] / 1e6:.1f}MB")
+        print(f"{'method':<14} {'time':>10} {'peak RSS':>10} {'speedup':>8}")
+        baseline = None
+        for name, command in commands.items():
+            results = [spawner.run(f"{command} {shlex.quote(path)}", os.devnull, work_dir, timeout=300)
+                       for _ in range(args.runs)]
+            for result in results:
+                if result["exit_code"] != 0:
+                    failures.append(f"{name}: exit {result['exit_code']}")
+            latency = sorted(r["latency_ms"] for r in results)[len(results) // 2]
+            rss = max(r["peak_rss"] for r in results)
+            baseline = baseline or latency
+            print(f"{name:<14} {latency:>8.0f}ms {rss / 1e6:>8.1f}MB {baseline / latency:>7.2f}x")
+    finally:
+        spawner.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
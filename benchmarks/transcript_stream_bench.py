@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+トランスクリプトのストリーミング処理のベンチマーク - SubagentStop フックの時間とピークメモリ
+
+verify_references.py と insight_capture（run_hook.py insight-capture）を、サイズの異なる
+トランスクリプトに対して hook_spawner.py（hook_replay_bench.py と同じ）から起動し、
+時間とピーク RSS を計測する。各サイズで新しいプロジェクトを使うため、1回目はキャッシュなし
+（トランスクリプト全体を読む）、2回目は差分モードのキャッシュあり（追記なし）になる。
+フックは参照数（20,000）やインサイト数（100）の上限に達すると読み取りを止めるため、
+drain 行では AssistantMessages を insight_capture と同じ時間予算（2秒）で最後まで読む
+（exit 3 は時間予算に達したことを示す）。
+
+使用方法:
+  python3 benchmarks/transcript_stream_bench.py
+  python3 benchmarks/transcript_stream_bench.py --sizes 50,200,600
+  python3 benchmarks/transcript_stream_bench.py --compare-ref HEAD~1   # 指定した版のフックと比較
+
+検証内容（プロセス内）:
+  references - collect_references（メッセージごと）と、連結したテキストへの extract_references が一致すること
+  insights   - extract_insights_from_messages と、従来の実装（全メッセージを連結したテキストを処理）の
+               結果（カテゴリ、内容、ハッシュ）が一致すること。マーカーの後に長い内容が続く場合を含む
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from hook_corpus import MB, create_project, write_transcript
+from hook_replay_bench import Spawner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+sys.path.insert(0, HOOKS_DIR)
+
+import verify_references  # noqa: E402
+from spec_hooks import insight_capture  # noqa: E402
+
+WORDS = ["the", "handler", "src/app.py:12", "lib/util.ts:40", "\\", "value", "`code`", "  ", "x" * 40, "検証"]
+MARKERS = ["INSIGHT", "LEARNED", "DECISION", "pattern", "AntiPattern"]
+
+
+# =============================================================================
+# 検証（プロセス内）
+# =============================================================================
+
+def legacy_extract_insights(text: str, config) -> list[tuple]:
+    """従来の実装: 全メッセージを連結したテキストを処理（比較用にカテゴリ、内容、ハッシュのみ返す）。"""
+    text = re.sub(r'```[\s\S]*?```', '\n', text)
+    text = re.sub(r'`[^`\n]+`', '', text)
+    marker_re = re.compile(r'^[ \t]*(' + '|'.join(config.markers) + r'):[ \t]*(.*)$', re.IGNORECASE)
+    insights, seen = [], set()
+    marker, lines = None, []
+
+    def create():
+        content = ' '.join(lines)
+        content = re.sub(r'\\\s*', ' ', content)
+        content = re.sub(r'\s+', ' ', content).strip()
+        if len(content) < config.min_content_length:
+            return
+        if len(content) > config.max_insight_length:
+            content = content[:config.max_insight_length] + '... [truncated]'
+        content_hash = hashlib.sha256(content.lower().encode()).hexdigest()[:16]
+        if content_hash not in seen:
+            seen.add(content_hash)
+            insights.append((marker.lower(), content, content_hash))
+
+    for line in text.split('\n'):
+        if len(insights) >= config.max_insights_per_capture:
+            return insights
+        match = marker_re.match(line)
+        if match:
+            if marker and lines:
+                create()
+            marker = match.group(1).upper()
+            lines = [match.group(2).strip()] if match.group(2).strip() else []
+        elif marker and line.strip():
+            lines.append(line.strip())
+    if marker and lines and len(insights) < config.max_insights_per_capture:
+        create()
+    return insights
+
+
+def random_message(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 12)):
+        kind = rng.random()
+        if kind < 0.2:
+            lines.append(f"{rng.choice(['', '  '])}{rng.choice(MARKERS)}: " + " ".join(rng.choices(WORDS, k=rng.randint(0, 8))))
+        elif kind < 0.3:
+            lines.append("```\n" + " ".join(rng.choices(WORDS, k=5)) + "\nDECISION: in code block\n```")
+        elif kind < 0.35:
+            lines.append("")
+        else:
+            lines.append(" ".join(rng.choices(WORDS, k=rng.randint(1, 30))))
+    return "\n".join(lines)
+
+
+def check_equivalence(rng: random.Random, samples: int) -> list[str]:
+    failures = []
+    for i in range(samples):
+        messages = [random_message(rng) for _ in range(rng.randint(1, 20))]
+        if rng.random() < 0.2:
+            # マーカーの後にメッセージをまたいで長い内容が続く
+            messages.append("LEARNED: " + " ".join(rng.choices(WORDS, k=5000)))
+            messages.extend(" ".join(rng.choices(WORDS, k=3000)) for _ in range(3))
+        config = insight_capture.Config("bench_00000000", "/nonexistent")
+        config.max_insight_length = rng.choice([40, 200, 10000])
+        config.max_insights_per_capture = rng.choice([3, 100])
+
+        expected = legacy_extract_insights("\n".join(messages), config)
+        actual = [(i["category"], i["content"], i["contentHash"])
+                  for i in insight_capture.extract_insights_from_messages(iter(messages), "bench", config)]
+        if actual != expected:
+            failures.append(f"insights: サンプル {i} で従来の実装と一致しない")
+
+        if verify_references.collect_references(iter(messages)) != verify_references.extract_references("\n".join(messages)):
+            failures.append(f"references: サンプル {i} で連結したテキストの結果と一致しない")
+    return failures[:10]
+
+
+# =============================================================================
+# フックの実行
+# =============================================================================
+
+def hook_commands(hooks_dir: str) -> dict:
+    python = shlex.quote(sys.executable)
+    return {
+        "verify_references": f"{python} -I -S {shlex.quote(os.path.join(hooks_dir, 'run_hook.py'))} verify-references",
+        "insight_capture": f"{python} -I -S {shlex.quote(os.path.join(hooks_dir, 'run_hook.py'))} insight-capture",
+    }
+
+
+DRAIN = """
+import sys, time
+sys.path.insert(0, {hooks_dir!r})
+from spec_hooks.transcript import AssistantMessages
+messages = AssistantMessages({transcript!r}, deadline=time.monotonic() + 2.0)
+for _ in messages:
+    pass
+sys.exit(0 if messages.complete else 3)
+"""
+
+
+def extract_ref(ref: str, target: str):
+    os.makedirs(target)
+    archive = subprocess.run(["git", "-C", ROOT_DIR, "archive", ref, "hooks"], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+    return os.path.join(target, "hooks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="50,200", help="トランスクリプトのサイズ（MB、カンマ区切り）")
+    parser.add_argument("--samples", type=int, default=300, help="等価性検証のサンプル数")
+    parser.add_argument("--compare-ref", help="比較する git の版（例: HEAD~1）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with contextlib.redirect_stderr(io.StringIO()):  # レート制限の警告を抑制
+        failures = check_equivalence(rng, args.samples)
+    print(f"equivalence: {args.samples} サンプル、{len(failures)} 件の不一致")
+
+    work_dir = tempfile.mkdtemp(prefix="claude-transcript-stream-", dir="/tmp")
+    spawner = Spawner(dict(os.environ))
+    try:
+        versions = {"current": hook_commands(HOOKS_DIR)}
+        if args.compare_ref:
+            versions[args.compare_ref] = hook_commands(extract_ref(args.compare_ref, os.path.join(work_dir, "ref")))
+
+        print(f"rss floor: {spawner.run('true', os.devnull, work_dir)['peak_rss'] / 1e6:.1f}MB")
+        print(f"{'transcript':>10} {'version':<10} {'hook':<18} {'cold':>10} {'rss':>9} {'cached':>10} {'rss':>9}")
+        for size_mb in (int(s) for s in args.sizes.split(",")):
+            transcript = os.path.join(work_dir, f"transcript-{size_mb}.jsonl")
+            write_transcript(transcript, size_mb * MB, random.Random(args.seed))
+            payload = os.path.join(work_dir, f"payload-{size_mb}.json")
+            with open(payload, "w", encoding="utf-8") as f:
+                json.dump({"hook_event_name": "SubagentStop", "agent_transcript_path": transcript,
+                           "stop_hook_active": False}, f)
+
+            for version, commands in versions.items():
+                for hook, command in commands.items():
+                    project = os.path.join(work_dir, f"project-{size_mb}-{version.replace('/', '_')}-{hook}")
+                    create_project(project)
+                    cold = spawner.run(command, payload, project, timeout=120)
+                    cached = spawner.run(command, payload, project, timeout=120)
+                    for result in (cold, cached):
+                        if result["exit_code"] != 0:
+                            failures.append(f"{size_mb}MB {version} {hook}: exit {result['exit_code']}")
+                    print(f"{size_mb:>8}MB {version:<10} {hook:<18} {cold['latency_ms']:>8.0f}ms "
+                          f"{cold['peak_rss'] / 1e6:>7.1f}MB {cached['latency_ms']:>8.0f}ms {cached['peak_rss'] / 1e6:>7.1f}MB")
+            drain = DRAIN.format(hooks_dir=HOOKS_DIR, transcript=transcript)
+            result = spawner.run(f"{shlex.quote(sys.executable)} -I -S -c {shlex.quote(drain)}", os.devnull, work_dir,
+                                 timeout=120)
+            print(f"{size_mb:>8}MB {'current':<10} {'drain':<18} {result['latency_ms']:>8.0f}ms "
+                  f"{result['peak_rss'] / 1e6:>7.1f}MB  exit {result['exit_code']}")
+            os.unlink(transcript)
+    finally:
+        spawner.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+ワークスペース ID の解決のベンチマーク - .git/HEAD の直接読み取りとキャッシュ
+
+workspace_utils.sh の get_workspace_id と spec_hooks/workspace.py の get_workspace_id が、
+git を起動して求めていた従来の ID（_get_workspace_id_git）と同じ値を返すことを、さまざまな
+リポジトリの構成で確認し、1回あたりの時間を比較する。
+
+使用方法:
+  python3 benchmarks/workspace_id_bench.py
+  python3 benchmarks/workspace_id_bench.py --calls 500
+
+検証内容:
+  - ブランチ（/、空白以外の記号、日本語、50文字超）、未コミットのブランチ、デタッチ状態、
+    サニタイズ後に空になるブランチ、サブディレクトリ、ワークツリー、相対パスの gitdir ファイル、
+    シンボリックリンク経由の作業ディレクトリ、ベアリポジトリ、Git リポジトリ外、GIT_DIR の指定で、
+    シェル（キャッシュなし・あり）と Python の ID が従来の ID と一致すること
+  - ブランチの切り替えとデタッチでキャッシュが無効になり、シェルと Python がキャッシュを共有できること
+  - 壊れたキャッシュ（書き込み途中、不正な ID）を使わないこと
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+WORKSPACE_UTILS = os.path.join(HOOKS_DIR, "workspace_utils.sh")
+
+GIT_ENV = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+for _name in ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR", "GIT_CEILING_DIRECTORIES",
+              "GIT_DISCOVERY_ACROSS_FILESYSTEM"):
+    GIT_ENV.pop(_name, None)
+
+CACHE = os.path.join(".claude", "workspaces", ".workspace-id")
+
+
+def git(cwd: str, *args: str):
+    subprocess.run(["git", *args], cwd=cwd, env=GIT_ENV, check=True, capture_output=True)
+
+
+def shell(cwd: str, function: str, env: dict | None = None) -> str:
+    # cd で $PWD を設定する（シンボリックリンク経由のパスを論理パスのまま渡す）
+    result = subprocess.run(["bash", "-c", f'cd "$1" && source "{WORKSPACE_UTILS}" && {function}', "bash", cwd],
+                            env=env or GIT_ENV, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def python_id(cwd: str, env: dict | None = None) -> str:
+    result = subprocess.run(["bash", "-c", f'cd "$1" && exec "{sys.executable}" -I -S "{RUN_HOOK}" workspace-stats',
+                             "bash", cwd], env=env or GIT_ENV, capture_output=True, text=True)
+    return json.loads(result.stdout)["workspaceId"]
+
+
+def make_repo(path: str, branch: str = "main", commit: bool = True) -> str:
+    os.makedirs(path)
+    git(path, "init", "-q", "-b", branch)
+    if commit:
+        git(path, "commit", "-q", "--allow-empty", "-m", "init")
+    return path
+
+
+def make_scenarios(work_dir: str) -> list[tuple[str, str, dict | None]]:
+    """(名前, 作業ディレクトリ, 環境変数)"""
+    scenarios = []
+    main = make_repo(os.path.join(work_dir, "main"))
+    scenarios.append(("ブランチ", main, None))
+    os.makedirs(os.path.join(main, "src", "deep"))
+    scenarios.append(("サブディレクトリ", os.path.join(main, "src", "deep"), None))
+    scenarios.append(("GIT_DIR の指定", os.path.join(work_dir, "main"), dict(GIT_ENV, GIT_DIR=os.path.join(main, ".git"))))
+
+    for name, branch in (("記号を含むブランチ", "feature/auth+login@v2.x_y"), ("日本語を含むブランチ", "機能/ログイン-fix"),
+                         ("サニタイズ後に空のブランチ", "機能"), ("50文字超のブランチ", "feature/" + "x" * 60)):
+        scenarios.append((name, make_repo(os.path.join(work_dir, f"branch-{len(scenarios)}"), branch), None))
+    scenarios.append(("未コミットのブランチ", make_repo(os.path.join(work_dir, "unborn"), "develop", commit=False), None))
+
+    detached = make_repo(os.path.join(work_dir, "detached"))
+    git(detached, "checkout", "-q", "--detach")
+    scenarios.append(("デタッチ状態", detached, None))
+
+    worktree = os.path.join(work_dir, "worktree")
+    git(main, "worktree", "add", "-q", "-b", "wt/feature", worktree)
+    scenarios.append(("ワークツリー", worktree, None))
+
+    # サブモジュールと同じ相対パスの gitdir ファイル
+    separate = make_repo(os.path.join(work_dir, "separate", "checkout"), "topic")
+    shutil.move(os.path.join(separate, ".git"), os.path.join(work_dir, "separate", "modules-git"))
+    with open(os.path.join(separate, ".git"), "w", encoding="utf-8") as f:
+        f.write("gitdir: ../modules-git\n")
+    git(separate, "config", "core.worktree", separate)
+    scenarios.append(("相対パスの gitdir ファイル", separate, None))
+
+    link = os.path.join(work_dir, "link")
+    os.symlink(main, link)
+    scenarios.append(("シンボリックリンク経由", link, None))
+
+    bare = os.path.join(work_dir, "bare.git")
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", bare], env=GIT_ENV, check=True)
+    scenarios.append(("ベアリポジトリ", bare, None))
+
+    plain = os.path.join(work_dir, "plain", "dir")
+    os.makedirs(plain)
+    scenarios.append(("Git リポジトリ外", plain, None))
+    return scenarios
+
+
+def check_scenarios(scenarios: list, failures: list):
+    for name, cwd, env in scenarios:
+        expected = shell(cwd, "_get_workspace_id_git", env)
+        os.makedirs(os.path.join(cwd, ".claude", "workspaces"), exist_ok=True)
+        if os.path.exists(os.path.join(cwd, CACHE)):
+            os.unlink(os.path.join(cwd, CACHE))
+        results = {
+            "シェル": shell(cwd, "get_workspace_id", env),
+            "シェル（キャッシュ）": shell(cwd, "get_workspace_id", env),
+            "Python（シェルのキャッシュ）": python_id(cwd, env),
+        }
+        if os.path.exists(os.path.join(cwd, CACHE)):
+            os.unlink(os.path.join(cwd, CACHE))
+        results["Python"] = python_id(cwd, env)
+        results["シェル（Python のキャッシュ）"] = shell(cwd, "get_workspace_id", env)
+        mismatched = {key: value for key, value in results.items() if value != expected}
+        status = "OK" if not mismatched else "不一致"
+        print(f"  {name:<24} {expected:<60} {status}")
+        if mismatched or not expected:
+            failures.append(f"{name}: 期待値 {expected!r}、{mismatched}")
+
+
+def check_invalidation(work_dir: str, failures: list):
+    repo = make_repo(os.path.join(work_dir, "invalidation"))
+    os.makedirs(os.path.join(repo, ".claude", "workspaces"))
+    for step in ("main", "checkout -q -b other", "checkout -q --detach", "checkout -q main"):
+        if step != "main":
+            git(repo, *step.split())
+        expected = shell(repo, "_get_workspace_id_git")
+        for label, value in (("シェル", shell(repo, "get_workspace_id")), ("Python", python_id(repo))):
+            if value != expected:
+                failures.append(f"キャッシュの無効化（{step}）: {label} {value!r}、期待値 {expected!r}")
+
+    cache = os.path.join(repo, CACHE)
+    expected = shell(repo, "_get_workspace_id_git")
+    with open(cache, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    for label, content in (("書き込み途中", "\n".join(lines[:3]) + "\nmain_0000"),
+                           ("不正な ID", "\n".join(lines[:3]) + "\n../../x_00000000\n")):
+        for reader in ("シェル", "Python"):
+            with open(cache, "w", encoding="utf-8") as f:
+                f.write(content)
+            value = shell(repo, "get_workspace_id") if reader == "シェル" else python_id(repo)
+            if value != expected:
+                failures.append(f"壊れたキャッシュ（{label}）: {reader} {value!r}、期待値 {expected!r}")
+
+
+def measure(work_dir: str, calls: int):
+    repo = os.path.join(work_dir, "main")
+    loop = f"for i in $(seq {calls}); do id=$({{function}}); done"
+    print(f"\nget_workspace_id の時間（{calls} 回の平均）:")
+    for label, function in (("git を起動（従来）", "_get_workspace_id_git"),
+                            ("HEAD を直接読む（キャッシュなし）", f"rm -f {CACHE}; get_workspace_id"),
+                            ("HEAD を直接読む（キャッシュあり）", "get_workspace_id")):
+        start = time.perf_counter()
+        shell(repo, loop.replace("{function}", function))
+        print(f"  シェル  {label:<28} {(time.perf_counter() - start) * 1000 / calls:6.2f}ms")
+
+    sys.path.insert(0, HOOKS_DIR)
+    from spec_hooks import workspace
+
+    previous = os.getcwd()
+    os.chdir(repo)
+    os.environ["PWD"] = repo
+    try:
+        for label, env in (("git を起動（従来）", {"GIT_CEILING_DIRECTORIES": ""}), ("HEAD を直接読む", {})):
+            os.environ.update(env)
+            start = time.perf_counter()
+            for _ in range(calls):
+                workspace._git_state.clear()
+                workspace.get_workspace_id()
+            print(f"  Python  {label:<28} {(time.perf_counter() - start) * 1000 / calls:6.2f}ms")
+            for name in env:
+                del os.environ[name]
+    finally:
+        os.chdir(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=200, help="時間を計測する呼び出し回数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-workspace-id-", dir="/tmp")
+    failures = []
+    try:
+        print("ワークスペース ID（従来の ID と比較）:")
+        check_scenarios(make_scenarios(work_dir), failures)
+        check_invalidation(work_dir, failures)
+        measure(work_dir, args.calls)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+ワークスペース統計のベンチマーク - ディレクトリごとの集計のキャッシュ
+
+大量のローテーション済みログ、インサイト、バックアップを含むワークスペースで、workspace-stats の
+時間を従来の方法（os.walk と os.path.getsize による全走査、glob によるインサイト数）と
+spec_hooks/workspace_stats.py の差分更新（初回、キャッシュあり、一部のディレクトリの変更後）で比較する。
+
+使用方法:
+  python3 benchmarks/workspace_stats_bench.py
+  python3 benchmarks/workspace_stats_bench.py --files 100000
+
+検証内容:
+  - インサイト数、ログファイル数、合計サイズが全走査の結果と一致すること（キャッシュの有無によらず）
+  - カテゴリ別（logs、sessions、insights、backups、other）のファイル数とサイズが全走査と一致し、
+    合計が totalSize と等しいこと
+  - 追記されたログ、その場で書き換えたファイル、追加・削除・移動したファイルがキャッシュありでも
+    反映され、更新時刻が変わらないディレクトリは列挙し直さないこと
+  - 壊れたキャッシュを使わないこと、無効なワークスペース ID を拒否すること
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HOOKS_DIR = os.path.join(ROOT_DIR, "hooks")
+RUN_HOOK = os.path.join(HOOKS_DIR, "run_hook.py")
+sys.path.insert(0, HOOKS_DIR)
+
+from spec_hooks import workspace, workspace_stats  # noqa: E402
+
+CATEGORY_PREFIXES = (("sessions", "logs/sessions/"), ("logs", "logs/"), ("insights", "insights/"),
+                     ("backups", "backups/"))
+STATUSES = ("pending", "applied", "rejected", "archive")
+
+
+def write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def make_workspace(workspace_dir: str, files: int):
+    """ローテーション済みログ（.gz）が大半を占めるワークスペース。"""
+    payload = gzip.compress(b"2026-01-01 00:00:00 subagent log line\n" * 40)
+    for n in range(files * 6 // 10):
+        write(os.path.join(workspace_dir, "logs", "sessions", f"2026{n // 1000:04d}", f"session-{n:06d}.log.gz"),
+              payload)
+    for n in range(20):
+        write(os.path.join(workspace_dir, "logs", "sessions", f"active-{n:02d}.log"), b"active session\n" * 20)
+    write(os.path.join(workspace_dir, "logs", "subagent_activity.log"), b"activity\n" * 500)
+    for n in range(files * 4 // 10):
+        status = STATUSES[n % 7 % 4]
+        insight_id = f"INS-20260101000000-{n:08x}"
+        write(os.path.join(workspace_dir, "insights", status, f"{insight_id}.json"),
+              json.dumps({"id": insight_id, "content": "x" * (n % 200)}).encode())
+    write(os.path.join(workspace_dir, "insights", "content-index.log"), b"journal\n" * 10)
+    for n in range(5):
+        write(os.path.join(workspace_dir, "backups", f"progress-20260101_00000{n}.json"), b"{}" * 100)
+    write(os.path.join(workspace_dir, "claude-progress.json"), b'{"status": "in_progress"}')
+    write(os.path.join(workspace_dir, "transcript-cache", "abc.jsonl"), b"{}\n" * 50)
+    settle(workspace_dir)
+
+
+def settle(workspace_dir: str):
+    """すべてのファイルとディレクトリの更新時刻を過去にする（RACY_INTERVAL より前に書き込まれた状態）。"""
+    past = time.time() - 60
+    for root, dirs, files in os.walk(workspace_dir, topdown=False):
+        for name in files + dirs:
+            os.utime(os.path.join(root, name), (past, past))
+    os.utime(workspace_dir, (past, past))
+
+
+def legacy_stats(workspace_dir: str) -> dict:
+    """従来の workspace-stats（os.walk と os.path.getsize、glob によるインサイト数）。"""
+    import glob
+
+    counts = {status: len(glob.glob(os.path.join(glob.escape(workspace_dir), "insights", status, "*.json")))
+              for status in STATUSES}
+    total_size = 0
+    log_count = 0
+    for root, _dirs, files in os.walk(workspace_dir):
+        for f in files:
+            try:
+                total_size += os.path.getsize(os.path.join(root, f))
+                if f.endswith(".log") or f.endswith(".jsonl"):
+                    log_count += 1
+            except OSError:
+                pass
+    return {"counts": counts, "totalSize": total_size, "logFiles": log_count}
+
+
+def reference(workspace_dir: str) -> dict:
+    """全走査による期待値（統計のキャッシュファイルを除く）。"""
+    categories = {name: {"files": 0, "size": 0} for name in ("sessions", "logs", "insights", "backups", "other")}
+    log_count = 0
+    for root, _dirs, files in os.walk(workspace_dir):
+        rel_dir = os.path.relpath(root, workspace_dir)
+        for f in files:
+            if rel_dir == "." and f == "stats-cache.json":
+                continue
+            rel = f if rel_dir == "." else f"{rel_dir}/{f}"
+            category = next((name for name, prefix in CATEGORY_PREFIXES if rel.startswith(prefix)), "other")
+            categories[category]["files"] += 1
+            categories[category]["size"] += os.path.getsize(os.path.join(root, f))
+            log_count += f.endswith((".log", ".jsonl"))
+    import glob
+
+    counts = {status: len(glob.glob(os.path.join(glob.escape(workspace_dir), "insights", status, "*.json")))
+              for status in STATUSES}
+    return {"counts": counts, "categories": categories, "logFiles": log_count,
+            "totalSize": sum(c["size"] for c in categories.values())}
+
+
+class CountingTree(workspace_stats.WorkspaceTree):
+    listed = []
+
+    def _list(self, rel, path, mtime_ns):
+        CountingTree.listed.append(rel)
+        return super()._list(rel, path, mtime_ns)
+
+
+def stats(workspace_id: str) -> tuple[dict, list[str], float]:
+    CountingTree.listed = []
+    start = time.perf_counter()
+    result = workspace_stats.get_workspace_stats(workspace_id, by_category=True)
+    return result, CountingTree.listed, (time.perf_counter() - start) * 1000
+
+
+def compare(label: str, result: dict, expected: dict, failures: list):
+    insights = result["insights"]
+    counts = {"pending": insights["pending"], "applied": insights["applied"], "rejected": insights["rejected"],
+              "archive": insights["archived"]}
+    storage = result["storage"]
+    actual = {"counts": counts, "categories": storage["categories"], "logFiles": storage["logFiles"],
+              "totalSize": storage["totalSize"]}
+    for key in actual:
+        if actual[key] != expected[key]:
+            failures.append(f"{label}: {key} が全走査と一致しない: {actual[key]} != {expected[key]}")
+    if storage["insightsSize"] != storage["categories"]["insights"]["size"]:
+        failures.append(f"{label}: insightsSize がカテゴリの合計と一致しない")
+
+
+def measure(files: int, failures: list):
+    workspace_id = "bench_00000000"
+    workspace_dir = workspace.get_workspace_dir(workspace_id)
+    make_workspace(workspace_dir, files)
+    expected = reference(workspace_dir)
+
+    start = time.perf_counter()
+    legacy = legacy_stats(workspace_dir)
+    legacy_ms = (time.perf_counter() - start) * 1000
+    if legacy["totalSize"] != expected["totalSize"] or legacy["logFiles"] != expected["logFiles"]:
+        failures.append("従来の方法の結果が全走査と一致しない")
+
+    workspace_stats.WorkspaceTree = CountingTree
+    cold, cold_listed, cold_ms = stats(workspace_id)
+    compare("初回", cold, expected, failures)
+    warm, warm_listed, warm_ms = stats(workspace_id)
+    compare("キャッシュあり", warm, expected, failures)
+    if warm_listed != [""]:
+        failures.append(f"キャッシュあり: 更新時刻が変わらないディレクトリを列挙し直した: {warm_listed[:5]}")
+
+    # 追記、その場での書き換え、追加、削除、移動
+    with open(os.path.join(workspace_dir, "logs", "subagent_activity.log"), "ab") as f:
+        f.write(b"appended\n" * 100)
+    with open(os.path.join(workspace_dir, "claude-progress.json"), "wb") as f:
+        f.write(b'{"status": "completed", "note": "' + b"x" * 500 + b'"}')
+    write(os.path.join(workspace_dir, "logs", "sessions", "20260000", "session-new.log.gz"), b"gz" * 300)
+    pending = os.path.join(workspace_dir, "insights", "pending")
+    names = sorted(os.listdir(pending))
+    os.unlink(os.path.join(pending, names[0]))
+    os.rename(os.path.join(pending, names[1]), os.path.join(workspace_dir, "insights", "applied", names[1]))
+    expected = reference(workspace_dir)
+    changed, changed_listed, changed_ms = stats(workspace_id)
+    compare("変更後", changed, expected, failures)
+    expected_listed = {"", "logs/sessions/20260000", "insights/pending", "insights/applied"}
+    if set(changed_listed) != expected_listed:
+        failures.append(f"変更後: 列挙し直したディレクトリ {sorted(changed_listed)}（期待値 {sorted(expected_listed)}）")
+
+    total = sum(c["files"] for c in expected["categories"].values())
+    print(f"ファイル {total} 件、ディレクトリ {len(cold_listed)} 件、{expected['totalSize'] / 1024 / 1024:.1f}MB:")
+    print(f"  従来（全走査）            {legacy_ms:8.1f}ms")
+    print(f"  差分更新（初回）          {cold_ms:8.1f}ms")
+    print(f"  差分更新（キャッシュあり）{warm_ms:8.1f}ms")
+    print(f"  差分更新（4 ディレクトリの変更後）{changed_ms:8.1f}ms")
+    for name, category in changed["storage"]["categories"].items():
+        print(f"    {name:<9} {category['files']:7d} 件 {category['size'] / 1024:10.0f}KB")
+
+    # 壊れたキャッシュ
+    cache_file = workspace.get_stats_cache_file(workspace_id)
+    for content in (b"{", b'{"version": 1, "dirs": {"logs": {"dirs": ["../../.."], "files": 1, "size": 1, '
+                          b'"json": 0, "logs": 0, "live": [], "mtime_ns": 0}}}'):
+        write(cache_file, content)
+        result, _, _ = stats(workspace_id)
+        compare("壊れたキャッシュ", result, expected, failures)
+    workspace_stats.WorkspaceTree = CountingTree.__mro__[1]
+
+
+def check_command(project: str, failures: list):
+    def run(*args):
+        return subprocess.run([sys.executable, "-I", "-S", RUN_HOOK, "workspace-stats", *args], cwd=project,
+                              capture_output=True)
+
+    result = run("bench_00000000", "--by-category")
+    if result.returncode != 0 or "categories" not in json.loads(result.stdout)["storage"]:
+        failures.append(f"workspace-stats --by-category: {result.stderr[:200]!r}")
+    result = run("bench_00000000")
+    if result.returncode != 0 or "categories" in json.loads(result.stdout)["storage"]:
+        failures.append("workspace-stats: --by-category なしでカテゴリを出力した")
+    for workspace_id in ("../x", ".hidden"):
+        if run(workspace_id).returncode == 0:
+            failures.append(f"workspace-stats: 無効なワークスペース ID を受け付けた: {workspace_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=30000, help="ワークスペースのファイル数（ログとインサイト）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="claude-workspace-stats-", dir="/tmp")
+    failures = []
+    previous = os.getcwd()
+    try:
+        os.chdir(work_dir)
+        measure(args.files, failures)
+        check_command(work_dir, failures)
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print("\n失敗:", file=sys.stderr)
+        for failure in failures:
+            print(f"  - {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
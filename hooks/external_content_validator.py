@@ -21,12 +21,11 @@
 import sys
 import re
 import json
-import socket
-import ipaddress
-from urllib.parse import urlparse, parse_qs
 
-# stdin からツール入力を読み取り（Claude Code が JSON を渡す）
-input_data = sys.stdin.read().strip()
+from rule_engine import RuleSet
+
+# socket / ipaddress / urllib.parse は URL を検証する場合のみ関数内で import する
+# （URL を持たない WebSearch クエリでは読み込まない - 起動時間の削減）
 
 # --- 設定 ---
 
@@ -84,6 +83,11 @@ SUSPICIOUS_URL_PATTERNS = [
     r"\.\.\\",            # パストラバーサル（Windows）
 ]
 
+# パターンテーブルはリテラル事前フィルタ付きのルールセットとして一度だけ構築
+BLOCKED_HOST_RULES = RuleSet(BLOCKED_HOST_PATTERNS)
+SENSITIVE_PARAM_RULES = RuleSet(SENSITIVE_PARAM_PATTERNS)
+SUSPICIOUS_URL_RULES = RuleSet(SUSPICIOUS_URL_PATTERNS)
+
 
 def extract_url_from_input(tool_name: str, tool_input: dict) -> str:
     """WebFetch または WebSearch ツール入力から URL を抽出。"""
@@ -132,6 +136,8 @@ def check_domain_lists(url: str, allowed_domains: list[str], blocked_domains: li
     if not url:
         return True, ""
 
+    from urllib.parse import urlparse
+
     try:
         parsed = urlparse(url)
         host = (parsed.hostname or "").lower()
@@ -170,6 +176,9 @@ def normalize_ip_address(host: str) -> str | None:
     10進数（2130706433）、8進数（0177.0.0.1）、16進数（0x7f.0.0.1）形式に対応。
     ホストが IP アドレスでない場合は None を返す。
     """
+    import socket
+    import ipaddress
+
     try:
         # IP アドレスとして解決（10進数/8進数/16進数形式に対応し正規化）
         # socket.inet_aton は様々な IP 形式を処理して正規化
@@ -196,6 +205,8 @@ def is_private_or_reserved_ip(ip_str: str) -> tuple[bool, str]:
     IP アドレスがプライベート、予約済み、ループバック、またはリンクローカルかチェック。
     堅牢なチェックのため ipaddress モジュールを使用。
     """
+    import ipaddress
+
     try:
         ip = ipaddress.ip_address(ip_str)
 
@@ -244,26 +255,28 @@ def is_blocked_host(host: str) -> tuple[bool, str]:
             return True, reason
 
     # ドメインベースのブロックには正規表現パターンでチェック
-    for pattern in BLOCKED_HOST_PATTERNS:
-        if re.match(pattern, host_lower):
-            return True, f"内部/プライベートネットワークのホストをブロック: {host}"
-        # 正規化された IP もパターンに対してチェック
-        if normalized_ip and re.match(pattern, normalized_ip):
-            return True, f"内部/プライベートネットワークのホストをブロック: {host}（解決先: {normalized_ip}）"
+    # 正規化された IP もパターンに対してチェックし、テーブル順で先に一致した方を報告
+    host_rule = BLOCKED_HOST_RULES.first_match(host_lower)
+    ip_rule = BLOCKED_HOST_RULES.first_match(normalized_ip) if normalized_ip else None
+    if host_rule and (ip_rule is None or host_rule.index <= ip_rule.index):
+        return True, f"内部/プライベートネットワークのホストをブロック: {host}"
+    if ip_rule:
+        return True, f"内部/プライベートネットワークのホストをブロック: {host}（解決先: {normalized_ip}）"
 
     return False, ""
 
 
 def check_sensitive_params(url: str) -> tuple[bool, str]:
     """URL クエリパラメータに機密データが含まれていないかチェック。"""
+    from urllib.parse import urlparse, parse_qs
+
     try:
         parsed = urlparse(url)
         params = parse_qs(parsed.query)
 
         for param_name in params.keys():
-            for pattern in SENSITIVE_PARAM_PATTERNS:
-                if re.match(pattern, param_name):
-                    return True, f"URL に機密パラメータを検出: {param_name}"
+            if SENSITIVE_PARAM_RULES.first_match(param_name):
+                return True, f"URL に機密パラメータを検出: {param_name}"
     except Exception:
         pass
     return False, ""
@@ -271,10 +284,9 @@ def check_sensitive_params(url: str) -> tuple[bool, str]:
 
 def check_suspicious_patterns(url: str) -> tuple[bool, str]:
     """悪意のある意図を示す可能性のある疑わしいパターンをチェック。"""
-    url_lower = url.lower()
-    for pattern in SUSPICIOUS_URL_PATTERNS:
-        if re.search(pattern, url_lower):
-            return True, f"URL に疑わしいパターンを検出: {pattern}"
+    rule = SUSPICIOUS_URL_RULES.first_search(url.lower())
+    if rule:
+        return True, f"URL に疑わしいパターンを検出: {rule.pattern}"
     return False, ""
 
 
@@ -296,6 +308,8 @@ def validate_url(url: str) -> tuple[bool, str]:
         return False, reason
 
     # URL をパース
+    from urllib.parse import urlparse
+
     try:
         parsed = urlparse(url)
     except Exception as e:
@@ -321,72 +335,84 @@ def validate_url(url: str) -> tuple[bool, str]:
 
 # --- メインロジック ---
 
-try:
-    data = json.loads(input_data)
-    tool_name = data.get("tool_name", "")
-    tool_input = data.get("tool_input", {})
+def evaluate(input_data: str) -> dict | None:
+    """
+    フック入力 JSON を評価し、出力すべき decision を返す。
+    出力が不要な場合（許可）は None を返す。
 
-    # WebFetch と WebSearch ツールのみ処理
-    if tool_name not in ("WebFetch", "WebSearch"):
-        # 他のツールはそのまま通過
-        sys.exit(0)
+    stdin を読まず、プロセスを終了しないため、hook_server.py から
+    常駐プロセス内で繰り返し呼び出せる。
+    """
+    try:
+        data = json.loads(input_data.strip())
+        tool_name = data.get("tool_name", "")
+        tool_input = data.get("tool_input", {})
+
+        # WebFetch と WebSearch ツールのみ処理
+        if tool_name not in ("WebFetch", "WebSearch"):
+            # 他のツールはそのまま通過
+            return None
+
+        # 検証する URL を抽出
+        url = extract_url_from_input(tool_name, tool_input)
+
+        # ドメイン許可リスト/ブロックリストを抽出してチェック（WebSearch ツールパラメータ）
+        allowed_domains, blocked_domains = extract_domain_lists(tool_input)
+        if url and (allowed_domains or blocked_domains):
+            is_valid, error_reason = check_domain_lists(url, allowed_domains, blocked_domains)
+            if not is_valid:
+                return {
+                    "hookSpecificOutput": {
+                        "hookEventName": "PreToolUse",
+                        "permissionDecision": "deny",
+                        "permissionDecisionReason": f"外部コンテンツ検証に失敗: {error_reason}"
+                    }
+                }
 
-    # 検証する URL を抽出
-    url = extract_url_from_input(tool_name, tool_input)
+        # URL を検証（SSRF 防止、疑わしいパターン等）
+        is_valid, error_reason = validate_url(url)
 
-    # ドメイン許可リスト/ブロックリストを抽出してチェック（WebSearch ツールパラメータ）
-    allowed_domains, blocked_domains = extract_domain_lists(tool_input)
-    if url and (allowed_domains or blocked_domains):
-        is_valid, error_reason = check_domain_lists(url, allowed_domains, blocked_domains)
         if not is_valid:
-            output = {
+            # 詳細な理由とともにリクエストをブロック
+            return {
                 "hookSpecificOutput": {
                     "hookEventName": "PreToolUse",
                     "permissionDecision": "deny",
                     "permissionDecisionReason": f"外部コンテンツ検証に失敗: {error_reason}"
                 }
             }
-            print(json.dumps(output))
-            sys.exit(0)
 
-    # URL を検証（SSRF 防止、疑わしいパターン等）
-    is_valid, error_reason = validate_url(url)
+        # URL は有効 - リクエストを許可
+        # 許可の判定には出力不要
+        return None
 
-    if not is_valid:
-        # 詳細な理由とともにリクエストをブロック
-        output = {
+    except json.JSONDecodeError:
+        # フェイルセーフ: パースエラー時は拒否
+        return {
             "hookSpecificOutput": {
                 "hookEventName": "PreToolUse",
                 "permissionDecision": "deny",
-                "permissionDecisionReason": f"外部コンテンツ検証に失敗: {error_reason}"
+                "permissionDecisionReason": "外部コンテンツ検証に失敗: 無効な JSON 入力形式"
             }
         }
-        print(json.dumps(output))
-        sys.exit(0)
-
-    # URL は有効 - リクエストを許可
-    # 許可の判定には出力不要
-    sys.exit(0)
-
-except json.JSONDecodeError:
-    # フェイルセーフ: パースエラー時は拒否
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": "外部コンテンツ検証に失敗: 無効な JSON 入力形式"
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
-except Exception as e:
-    # フェイルセーフ: 予期しないエラー時は拒否
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": f"外部コンテンツ検証に失敗: {str(e)}"
+    except Exception as e:
+        # フェイルセーフ: 予期しないエラー時は拒否
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PreToolUse",
+                "permissionDecision": "deny",
+                "permissionDecisionReason": f"外部コンテンツ検証に失敗: {str(e)}"
+            }
         }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
+
+
+def main():
+    # stdin からツール入力を読み取り（Claude Code が JSON を渡す）
+    output = evaluate(sys.stdin.read())
+    if output is not None:
+        print(json.dumps(output))
+    sys.exit(0)  # JSON decision control で exit 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+フッククライアント - PreToolUse バリデーターの軽量エントリポイント
+常駐フックサーバー（hook_server.py）が起動していればフック入力を Unix ソケット経由で
+転送し、起動していなければ従来どおりプロセス内でバリデーターを実行する。
+
+使用方法（hooks.json から run_hook.py 経由で起動する）:
+  python3 -I -S run_hook.py hook-client safety_check
+  python3 -I -S run_hook.py hook-client prevent_secret_leak
+  python3 -I -S run_hook.py hook-client external_content_validator
+
+設計上の判断:
+- サーバーの有無はソケットファイルの存在で判定し、存在しない場合は socket を import しない
+- ソケットはプロジェクトディレクトリ（cwd）ごと。サーバーが作成したとおり現在のユーザーが所有し、
+  グループ・他者が書き込めないソケットの判定だけを信頼する（他のユーザーが作成したソケットの
+  "allow" でバリデーターをすり抜けさせない）
+- サーバーが応答しない・エラーを返す場合は必ずプロセス内実行にフォールバック
+  （バリデーターは副作用のない純粋関数のため、二重評価しても安全）
+- 出力はどちらの経路でも各バリデーターの evaluate() が返す dict の json.dumps であり、
+  バイト単位で同一の hookSpecificOutput を返す
+"""
+
+import os
+import stat
+import sys
+
+# サーバー経由で実行可能なバリデーター（hooks/ 内のモジュール名）
+VALIDATORS = ("safety_check", "prevent_secret_leak", "external_content_validator")
+
+# デフォルトのソケットパス（プロジェクトルートからの相対パス）
+# Unix ソケットのパス長制限（約108バイト）を避けるため相対パスを使用
+DEFAULT_SOCKET_PATH = os.path.join(".claude", "run", "hook-server.sock")
+
+# サーバー応答待ちのタイムアウト（秒）- フックの timeout（5秒）より十分短く
+SERVER_TIMEOUT = 2.0
+
+
+def socket_path() -> str:
+    """プロジェクトディレクトリ（cwd からの相対パス）のフックサーバーソケットパスを取得。"""
+    return os.environ.get("SPEC_WORKFLOW_HOOK_SOCKET") or DEFAULT_SOCKET_PATH
+
+
+def is_trusted_socket(path: str) -> bool:
+    """現在のユーザーが所有し、グループ・他者が書き込めないソケットか（hook_server の umask 077 と同じ）。"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def query_server(command: str, payload: bytes = b"") -> str | None:
+    """
+    フックサーバーにリクエストを送信。
+
+    戻り値: サーバーの応答本文（出力なしの場合は空文字列）、
+            サーバーが利用できない、またはソケットを信頼できない場合は None
+    """
+    path = socket_path()
+    if not is_trusted_socket(path):
+        return None
+
+    import socket
+
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(SERVER_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(command.encode("ascii") + b"\n" + payload)
+            sock.shutdown(socket.SHUT_WR)
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+
+    status, _, body = b"".join(chunks).partition(b"\n")
+    if status != b"OK":
+        return None
+    return body.decode("utf-8")
+
+
+def run_in_process(name: str, payload: bytes) -> str:
+    """サーバーなしでバリデーターを実行（従来の動作）。"""
+    import json
+
+    module = __import__(name)
+    output = module.evaluate(payload.decode("utf-8", errors="replace"))
+    return json.dumps(output) if output is not None else ""
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in VALIDATORS:
+        # フェイルセーフ: 設定ミスでも検証をすり抜けさせない
+        import json
+        print(json.dumps({
+            "hookSpecificOutput": {
+                "hookEventName": "PreToolUse",
+                "permissionDecision": "deny",
+                "permissionDecisionReason": f"フッククライアント: 不明なバリデーター: {' '.join(sys.argv[1:])}"
+            }
+        }))
+        sys.exit(0)
+
+    name = sys.argv[1]
+    # stdin からツール入力を読み取り（Claude Code が JSON を渡す）
+    payload = sys.stdin.buffer.read()
+
+    output = query_server(name, payload)
+    if output is None:
+        output = run_in_process(name, payload)
+
+    if output:
+        print(output)
+    sys.exit(0)  # JSON decision control で exit 0
+
+
+if __name__ == "__main__":
+    main()
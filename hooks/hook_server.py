@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+常駐フックサーバー - PreToolUse バリデーター用（オプション）
+safety_check / prevent_secret_leak / external_content_validator をパターンテーブルが
+コンパイル済みの状態で保持し、プロジェクトディレクトリごとの Unix ソケットで判定を返す。
+ツール呼び出しごとの Python 起動・import・正規表現コンパイルのコストを削減する。
+
+使用方法:
+  python3 hook_server.py start    # バックグラウンドで起動（既に起動中なら何もしない）
+  python3 hook_server.py stop     # 停止
+  python3 hook_server.py status   # 状態を表示（起動中 exit 0、停止中 exit 1）
+  python3 hook_server.py serve    # フォアグラウンドで実行（デバッグ用）
+
+プロトコル（1接続1リクエスト）:
+  リクエスト: "<コマンド>\\n<フック入力 JSON>"（クライアントが送信後に書き込み側をシャットダウン）
+  レスポンス: "OK\\n<出力>" または "ERR\\n<理由>"
+  コマンド: バリデーター名、ping、shutdown
+
+設計上の判断:
+- オプトイン: SPEC_WORKFLOW_HOOK_SERVER=1 のときのみ SessionStart で起動される。
+  サーバーがなくても hook_client.py がプロセス内実行にフォールバックする
+- バリデーターのソースが更新された場合は次のリクエストで再読み込み（プラグイン更新に追従）
+- バリデーターが例外を送出した場合は ERR を返し、クライアント側の従来経路に判断を委ねる
+- アイドル状態が続いたら自動終了（SessionEnd が実行されなかった場合の孤児プロセス防止）
+- ソケットとディレクトリは所有者のみアクセス可能（umask 077）
+"""
+
+import os
+import sys
+import json
+import time
+import socketserver
+import threading
+import importlib
+
+from hook_client import VALIDATORS, socket_path, query_server
+
+# 最後のリクエストからこの秒数が経過したら自動終了
+IDLE_TIMEOUT = int(os.environ.get("SPEC_WORKFLOW_HOOK_SERVER_IDLE", str(30 * 60)))
+
+# start 時にソケットの作成を待つ最大秒数
+START_WAIT_SECONDS = 2.0
+
+# 停止要求とアイドル時間を確認する間隔（秒）
+POLL_INTERVAL = 0.5
+
+
+# =============================================================================
+# バリデーターの保持
+# =============================================================================
+
+class ValidatorRegistry:
+    """バリデーターモジュールを読み込み済みで保持し、ソース更新時に再読み込みする。"""
+
+    def __init__(self, names):
+        self._lock = threading.Lock()
+        self._modules = {}
+        self._mtimes = {}
+        for name in names:
+            self._load(name)
+
+    def _load(self, name: str):
+        if name in self._modules:
+            module = importlib.reload(self._modules[name])
+        else:
+            module = importlib.import_module(name)
+        self._modules[name] = module
+        self._mtimes[name] = self._source_mtime(module)
+
+    @staticmethod
+    def _source_mtime(module) -> float:
+        try:
+            return os.stat(module.__file__).st_mtime
+        except OSError:
+            return 0.0
+
+    def get(self, name: str):
+        with self._lock:
+            module = self._modules[name]
+            if self._source_mtime(module) != self._mtimes[name]:
+                self._load(name)
+                module = self._modules[name]
+            return module
+
+
+# =============================================================================
+# サーバー
+# =============================================================================
+
+class HookRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = self.rfile.read()
+        command, _, payload = request.partition(b"\n")
+        command = command.decode("ascii", errors="replace")
+
+        if command == "ping":
+            self.wfile.write(b"OK\npong")
+            return
+
+        if command == "shutdown":
+            self.wfile.write(b"OK\n")
+            self.server.stop_event.set()
+            return
+
+        if command not in VALIDATORS:
+            self.wfile.write(f"ERR\n不明なコマンド: {command}".encode("utf-8"))
+            return
+
+        try:
+            module = self.server.registry.get(command)
+            output = module.evaluate(payload.decode("utf-8", errors="replace"))
+            body = json.dumps(output) if output is not None else ""
+        except Exception as e:
+            # 判断はクライアントのフォールバック経路に委ねる
+            self.wfile.write(f"ERR\n{type(e).__name__}: {e}".encode("utf-8"))
+            return
+
+        self.wfile.write(b"OK\n" + body.encode("utf-8"))
+
+
+class HookServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, registry: ValidatorRegistry):
+        super().__init__(path, HookRequestHandler)
+        self.registry = registry
+        self.stop_event = threading.Event()
+        self.last_activity = time.monotonic()
+        self.timeout = POLL_INTERVAL
+
+    def process_request(self, request, client_address):
+        self.last_activity = time.monotonic()
+        super().process_request(request, client_address)
+
+    def should_stop(self) -> bool:
+        if self.stop_event.is_set():
+            return True
+        return time.monotonic() - self.last_activity > IDLE_TIMEOUT
+
+
+def is_running() -> bool:
+    """ソケットに接続して応答があるかを確認。"""
+    return query_server("ping") == "pong"
+
+
+def serve():
+    import fcntl
+
+    path = socket_path()
+    os.umask(0o077)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # 同時に start された場合に備え、PID ファイルのロックで起動を直列化
+    pid_file = path + ".pid"
+    with open(pid_file, "a+", encoding="utf-8") as lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print(f"hook_server: 既に起動しています ({path})")
+            return 0
+
+        if is_running():
+            print(f"hook_server: 既に起動しています ({path})")
+            return 0
+
+        # 応答のない古いソケットを削除
+        if os.path.exists(path):
+            os.unlink(path)
+
+        registry = ValidatorRegistry(VALIDATORS)
+        server = HookServer(path, registry)
+        lock.truncate(0)
+        lock.write(str(os.getpid()))
+        lock.flush()
+
+        try:
+            while not server.should_stop():
+                server.handle_request()
+        finally:
+            server.server_close()
+            for leftover in (path, pid_file):
+                try:
+                    os.unlink(leftover)
+                except OSError:
+                    pass
+    return 0
+
+
+def start():
+    if is_running():
+        return 0
+
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + START_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        if is_running():
+            print(f"hook_server: 起動しました ({socket_path()})")
+            return 0
+        time.sleep(0.05)
+
+    print("hook_server: 起動を確認できませんでした", file=sys.stderr)
+    return 1
+
+
+def stop():
+    if query_server("shutdown") is None:
+        print("hook_server: 起動していません")
+        return 0
+    print("hook_server: 停止しました")
+    return 0
+
+
+def status():
+    if is_running():
+        print(f"hook_server: 起動中 ({socket_path()})")
+        return 0
+    print("hook_server: 停止中")
+    return 1
+
+
+def main():
+    commands = {"start": start, "stop": stop, "status": status, "serve": serve}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"使用方法: {os.path.basename(__file__)} {{start|stop|status|serve}}", file=sys.stderr)
+        return 2
+    return commands[sys.argv[1]]()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
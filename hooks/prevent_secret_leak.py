@@ -11,28 +11,8 @@ import sys
 import os
 import re
 import json
-import base64
-
-# stdin からツール入力を読み取り（Claude Code が JSON を渡す）
-input_data = sys.stdin.read().strip()
-
-try:
-    data = json.loads(input_data)
-    tool_input = data.get("tool_input", {})
-    # Write（content）と Edit（new_string）の両ツールに対応
-    content = tool_input.get("content", "") or tool_input.get("new_string", "")
-    file_path = tool_input.get("file_path", "")
-except json.JSONDecodeError:
-    # フェイルセーフ: パースエラー時は拒否（生の入力を処理しない）
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": "シークレット漏洩チェックに失敗: 無効な JSON 入力形式"
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
+
+from rule_engine import RuleSet
 
 # シークレットパターン（スタック非依存）
 SECRET_PATTERNS = [
@@ -163,6 +143,27 @@ ALLOWED_PATH_PATTERNS = [
     r"test_data",
 ]
 
+# パターンテーブルはリテラル事前フィルタ付きのルールセットとして一度だけ構築
+SECRET_RULES = RuleSet(SECRET_PATTERNS, re.IGNORECASE)
+ALLOWED_PATH_RULES = RuleSet(ALLOWED_PATH_PATTERNS, re.IGNORECASE)
+
+# Base64 デコード後にチェックする高価値パターン
+# 誤検知を減らすため特定の既知シークレット形式のみ
+BASE64_HIGH_VALUE_PATTERNS = [
+    (r"sk-ant-[a-zA-Z0-9_-]{20,}", "Anthropic API Key (Base64 エンコード)"),
+    (r"sk-[a-zA-Z0-9]{20,}", "OpenAI API Key (Base64 エンコード)"),
+    (r"AKIA[0-9A-Z]{16}", "AWS Access Key ID (Base64 エンコード)"),
+    (r"ghp_[0-9a-zA-Z]{36}", "GitHub Personal Access Token (Base64 エンコード)"),
+    (r"glpat-[0-9a-zA-Z_-]{20,}", "GitLab Personal Access Token (Base64 エンコード)"),
+    (r"-----BEGIN\s+(RSA|DSA|EC|OPENSSH|PGP)\s+PRIVATE\s+KEY-----", "秘密鍵 (Base64 エンコード)"),
+    (r"(postgres|mysql|mongodb)://[^:]+:[^@]+@", "データベース URL (Base64 エンコード)"),
+]
+BASE64_HIGH_VALUE_RULES = RuleSet(BASE64_HIGH_VALUE_PATTERNS, re.IGNORECASE)
+
+# 代入コンテキスト内の潜在的な Base64 文字列を検出するパターン
+# 誤検知を減らすため最小24文字（18バイトをエンコード）
+BASE64_CONTEXT_RE = re.compile(r'[=:]\s*["\']?([A-Za-z0-9+/]{24,}={0,3})["\']?')
+
 # ファイルをスキップすべきかチェック
 def should_skip_file(path: str) -> bool:
     if not path:
@@ -172,18 +173,11 @@ def should_skip_file(path: str) -> bool:
     if filename in ALLOWED_FILES:
         return True
     # パスパターンをチェック
-    for pattern in ALLOWED_PATH_PATTERNS:
-        if re.search(pattern, path, re.IGNORECASE):
-            return True
-    return False
+    return ALLOWED_PATH_RULES.first_search(path) is not None
 
 # コンテンツのシークレットをチェック
 def find_secrets(text: str) -> list[tuple[str, str]]:
-    found = []
-    for pattern, description in SECRET_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            found.append((pattern, description))
-    return found
+    return [(rule.pattern, rule.description) for rule in SECRET_RULES.all_search(text)]
 
 # Base64 エンコードされたシークレットの検出
 def find_base64_secrets(text: str) -> list[tuple[str, str]]:
@@ -203,33 +197,23 @@ def find_base64_secrets(text: str) -> list[tuple[str, str]]:
     """
     found = []
 
-    # 代入コンテキスト内の潜在的な Base64 文字列を検出するパターン
-    # 誤検知を減らすため最小24文字（18バイトをエンコード）
-    base64_context_pattern = r'[=:]\s*["\']?([A-Za-z0-9+/]{24,}={0,3})["\']?'
+    candidates = BASE64_CONTEXT_RE.findall(text)
+    if not candidates:
+        return found
 
-    candidates = re.findall(base64_context_pattern, text)
+    # 代入コンテキストの候補がある場合のみ import（大半の書き込みでは読み込まない）
+    import base64
 
     for candidate in candidates:
         try:
             # Base64 としてデコードを試行
             decoded = base64.b64decode(candidate, validate=True).decode('utf-8', errors='ignore')
 
-            # デコードされた内容をシークレットパターンに対してチェック
-            # 誤検知を減らすため特定の高価値パターンのみチェック
-            high_value_patterns = [
-                (r"sk-ant-[a-zA-Z0-9_-]{20,}", "Anthropic API Key (Base64 エンコード)"),
-                (r"sk-[a-zA-Z0-9]{20,}", "OpenAI API Key (Base64 エンコード)"),
-                (r"AKIA[0-9A-Z]{16}", "AWS Access Key ID (Base64 エンコード)"),
-                (r"ghp_[0-9a-zA-Z]{36}", "GitHub Personal Access Token (Base64 エンコード)"),
-                (r"glpat-[0-9a-zA-Z_-]{20,}", "GitLab Personal Access Token (Base64 エンコード)"),
-                (r"-----BEGIN\s+(RSA|DSA|EC|OPENSSH|PGP)\s+PRIVATE\s+KEY-----", "秘密鍵 (Base64 エンコード)"),
-                (r"(postgres|mysql|mongodb)://[^:]+:[^@]+@", "データベース URL (Base64 エンコード)"),
-            ]
-
-            for pattern, description in high_value_patterns:
-                if re.search(pattern, decoded, re.IGNORECASE):
-                    found.append((pattern, description))
-                    break  # 候補あたり1つの一致で十分
+            # デコードされた内容を高価値シークレットパターンに対してチェック
+            # 候補あたり1つの一致で十分
+            rule = BASE64_HIGH_VALUE_RULES.first_search(decoded)
+            if rule:
+                found.append((rule.pattern, rule.description))
         except Exception:
             # 有効な Base64 でないかデコードエラー - スキップ
             pass
@@ -237,43 +221,75 @@ def find_base64_secrets(text: str) -> list[tuple[str, str]]:
     return found
 
 # メインチェック - フェイルクローズド動作のため try/except でラップ
-try:
-    if should_skip_file(file_path):
-        # テンプレート/サンプルファイルはチェックせず許可
-        sys.exit(0)
-
-    # まず平文のシークレットをチェック
-    secrets_found = find_secrets(content)
-
-    # Base64 エンコードされたシークレットもチェック
-    base64_secrets = find_base64_secrets(content)
-    secrets_found.extend(base64_secrets)
-
-    if secrets_found:
-        descriptions = [s[1] for s in secrets_found]
-        # JSON decision control で操作を適切にブロック
-        output = {
+def evaluate(input_data: str) -> dict | None:
+    """
+    フック入力 JSON を評価し、出力すべき decision を返す。
+    出力が不要な場合（許可）は None を返す。
+
+    stdin を読まず、プロセスを終了しないため、hook_server.py から
+    常駐プロセス内で繰り返し呼び出せる。
+    """
+    try:
+        data = json.loads(input_data.strip())
+        tool_input = data.get("tool_input", {})
+        # Write（content）と Edit（new_string）の両ツールに対応
+        content = tool_input.get("content", "") or tool_input.get("new_string", "")
+        file_path = tool_input.get("file_path", "")
+    except json.JSONDecodeError:
+        # フェイルセーフ: パースエラー時は拒否（生の入力を処理しない）
+        return {
             "hookSpecificOutput": {
                 "hookEventName": "PreToolUse",
                 "permissionDecision": "deny",
-                "permissionDecisionReason": f"シークレットの可能性を検出: {', '.join(descriptions)}。環境変数またはシークレットマネージャーを使用してください。"
+                "permissionDecisionReason": "シークレット漏洩チェックに失敗: 無効な JSON 入力形式"
             }
         }
-        print(json.dumps(output))
-        sys.exit(0)  # JSON decision control で exit 0
-    else:
+
+    try:
+        if should_skip_file(file_path):
+            # テンプレート/サンプルファイルはチェックせず許可
+            return None
+
+        # まず平文のシークレットをチェック
+        secrets_found = find_secrets(content)
+
+        # Base64 エンコードされたシークレットもチェック
+        base64_secrets = find_base64_secrets(content)
+        secrets_found.extend(base64_secrets)
+
+        if secrets_found:
+            descriptions = [s[1] for s in secrets_found]
+            # JSON decision control で操作を適切にブロック
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"シークレットの可能性を検出: {', '.join(descriptions)}。環境変数またはシークレットマネージャーを使用してください。"
+                }
+            }
+
         # 操作の続行を許可
-        sys.exit(0)
-
-except Exception as e:
-    # フェイルセーフ: シークレット漏洩を防ぐため予期しないエラー時は拒否
-    # external_content_validator.py と一貫したフェイルクローズド動作を保証
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": f"シークレット漏洩チェックに失敗: {str(e)}"
+        return None
+
+    except Exception as e:
+        # フェイルセーフ: シークレット漏洩を防ぐため予期しないエラー時は拒否
+        # external_content_validator.py と一貫したフェイルクローズド動作を保証
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PreToolUse",
+                "permissionDecision": "deny",
+                "permissionDecisionReason": f"シークレット漏洩チェックに失敗: {str(e)}"
+            }
         }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
+
+
+def main():
+    # stdin からツール入力を読み取り（Claude Code が JSON を渡す）
+    output = evaluate(sys.stdin.read())
+    if output is not None:
+        print(json.dumps(output))
+    sys.exit(0)  # JSON decision control で exit 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+ルールエンジン - フックのパターンテーブル共通のマッチャー
+各パターンテーブルを一度だけ RuleSet に変換し、正規表現から抽出した必須リテラル
+（sudo、AKIA、ghp_ 等）による事前フィルタで、ほとんどの入力が正規表現の評価に
+到達しないようにする。
+
+使用例:
+    DANGEROUS_RULES = RuleSet(DANGEROUS_PATTERNS, re.IGNORECASE)
+    rule = DANGEROUS_RULES.first_search(cmd)
+    if rule:
+        return True, rule.pattern
+
+    SECRET_REDACTOR = Redactor(SECRET_PATTERNS)   # (pattern, replacement) のテーブル
+    masked = SECRET_REDACTOR.sub(text)
+
+マッチ結果の互換性:
+- first_search / first_match はテーブル順で最初に一致したルールを返す
+  （従来の「パターンごとに re.search するループ」と同じルールと説明を報告）
+- all_search は一致した全ルールをテーブル順で返す
+- 事前フィルタは「リテラルが入力に存在しなければ正規表現も一致し得ない」場合にのみ
+  ルールを除外するため、判定結果は従来のループと常に一致する
+
+設計上の判断:
+- 必須リテラルは sre_parse の構文木から抽出（連続する LITERAL、全分岐がリテラルを持つ
+  BRANCH、最小1回以上の繰り返し）。抽出できないルールは常に正規表現で評価する
+- IGNORECASE のルールは小文字化した入力と照合する。Python の re は 'ı'/'İ'≡'i'、
+  'ſ'≡'s'、'K'（ケルビン記号）≡'k' を同一視するため、非 ASCII 入力ではこれらを
+  事前に ASCII へ変換してから小文字化する（変換漏れによる検出漏れを防止）
+- 正規表現のコンパイルは最初に候補となった時点まで遅延（短命なフックプロセスでは
+  一致候補にならないルールのコンパイルコストを払わない）
+- Python の re はバックトラッキング型のため、全パターンを1つの選択（|）に結合しても
+  位置ごとに全分岐を試すだけで高速化しない。テーブル単位の結合はリテラル索引で行う
+- 置換（Redactor）もテーブル順の re.sub を事前フィルタで絞り込むだけで、選択には結合しない
+  （左端の一致を1回の走査で置換すると、重なり合う一致で従来の逐次置換と結果が異なる）
+"""
+
+import re
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - Python 3.10 以前
+    import sre_parse
+
+# re.IGNORECASE で ASCII 文字と同一視される非 ASCII 文字
+# （str.lower() では ASCII にならないもの、または複数文字になるもの）
+_CASEFOLD_FIXES = str.maketrans({
+    "İ": "i",  # İ（小文字化すると 'i̇' の2文字になる）
+    "ı": "i",  # ı
+    "ſ": "s",  # ſ
+    "K": "k",  # K（ケルビン記号）
+})
+
+
+def casefold_for_prefilter(text: str) -> str:
+    """IGNORECASE ルールの事前フィルタ用に入力を正規化。"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(_CASEFOLD_FIXES).lower()
+
+
+# =============================================================================
+# 必須リテラルの抽出
+# =============================================================================
+
+def _better(a: frozenset | None, b: frozenset | None) -> frozenset | None:
+    """2つの必須リテラル集合のうち選択性の高い方を返す。"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    key_a = (min(len(s) for s in a), -len(a))
+    key_b = (min(len(s) for s in b), -len(b))
+    return a if key_a >= key_b else b
+
+
+def _required_literals(items, ignorecase: bool) -> frozenset | None:
+    """
+    構文木のシーケンスから必須リテラル集合を抽出。
+
+    戻り値: 一致時に少なくとも1つが入力に必ず含まれる文字列の集合、
+            抽出できない場合は None
+    """
+    best = None
+    run = []
+
+    def flush():
+        nonlocal best, run
+        if run:
+            literal = "".join(run)
+            run = []
+            if ignorecase:
+                # 非 ASCII の大文字小文字同一視は複雑なため事前フィルタに使わない
+                if not literal.isascii():
+                    return
+                literal = literal.lower()
+            best = _better(best, frozenset([literal]))
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+
+        flush()
+
+        if op is sre_parse.SUBPATTERN:
+            _group, add_flags, del_flags, sub = av
+            # スコープ付きフラグで大文字小文字の扱いが変わる場合は抽出しない
+            if (add_flags | del_flags) & re.IGNORECASE:
+                continue
+            best = _better(best, _required_literals(sub, ignorecase))
+        elif op is sre_parse.BRANCH:
+            alternatives = []
+            for branch in av[1]:
+                required = _required_literals(branch, ignorecase)
+                if required is None:
+                    alternatives = None
+                    break
+                alternatives.extend(required)
+            if alternatives:
+                best = _better(best, frozenset(alternatives))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            min_count, _max_count, sub = av
+            if min_count >= 1:
+                best = _better(best, _required_literals(sub, ignorecase))
+
+    flush()
+    return best
+
+
+def extract_literals(pattern: str, flags: int = 0) -> tuple[frozenset | None, bool]:
+    """
+    パターンから必須リテラル集合と実効的な IGNORECASE 指定を取得。
+
+    戻り値: (literals, ignorecase)
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None, bool(flags & re.IGNORECASE)
+    ignorecase = bool(parsed.state.flags & re.IGNORECASE)
+    return _required_literals(parsed, ignorecase), ignorecase
+
+
+# =============================================================================
+# ルールセット
+# =============================================================================
+
+class Rule:
+    """パターンテーブルの1エントリ。"""
+
+    __slots__ = ("index", "pattern", "description", "flags", "literals", "ignorecase", "_regex")
+
+    def __init__(self, index: int, pattern: str, description: str, flags: int):
+        self.index = index
+        self.pattern = pattern
+        self.description = description
+        self.flags = flags
+        self.literals, self.ignorecase = extract_literals(pattern, flags)
+        self._regex = None
+
+    @property
+    def regex(self) -> re.Pattern:
+        if self._regex is None:
+            self._regex = re.compile(self.pattern, self.flags)
+        return self._regex
+
+    def __repr__(self):
+        return f"Rule({self.index}, {self.pattern!r})"
+
+
+class RuleSet:
+    """
+    パターンテーブルをリテラル事前フィルタ付きでまとめたマッチャー。
+
+    rules にはパターン文字列、または (pattern, description, ...) タプルのリストを渡す。
+    タプルの3番目以降の要素は無視される（呼び出し側は Rule.index で元のテーブルを参照できる）。
+    """
+
+    def __init__(self, rules, flags: int = 0):
+        self.rules = []
+        for index, entry in enumerate(rules):
+            if isinstance(entry, str):
+                pattern, description = entry, ""
+            else:
+                pattern, description = entry[0], entry[1]
+            self.rules.append(Rule(index, pattern, description, flags))
+
+        # リテラル索引: 各リテラルの存在チェックは入力ごとに1回だけ行う
+        self._always = []
+        self._by_literal = {}
+        for rule in self.rules:
+            if rule.literals is None:
+                self._always.append(rule.index)
+                continue
+            for literal in rule.literals:
+                self._by_literal.setdefault((rule.ignorecase, literal), []).append(rule.index)
+        self._needs_fold = any(ignorecase for ignorecase, _ in self._by_literal)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def candidates(self, text: str) -> list[Rule]:
+        """事前フィルタを通過したルール（テーブル順）。"""
+        folded = casefold_for_prefilter(text) if self._needs_fold else text
+        selected = set(self._always)
+        for (ignorecase, literal), indices in self._by_literal.items():
+            if literal in (folded if ignorecase else text):
+                selected.update(indices)
+        return [self.rules[i] for i in sorted(selected)]
+
+    def first_search(self, text: str) -> Rule | None:
+        """re.search でテーブル順に最初に一致したルール。"""
+        for rule in self.candidates(text):
+            if rule.regex.search(text):
+                return rule
+        return None
+
+    def first_match(self, text: str) -> Rule | None:
+        """re.match（先頭一致）でテーブル順に最初に一致したルール。"""
+        for rule in self.candidates(text):
+            if rule.regex.match(text):
+                return rule
+        return None
+
+    def all_search(self, text: str) -> list[Rule]:
+        """re.search で一致した全ルール（テーブル順）。"""
+        return [rule for rule in self.candidates(text) if rule.regex.search(text)]
+
+
+# =============================================================================
+# 置換（シークレットのマスク等）
+# =============================================================================
+
+class Redactor:
+    """
+    (pattern, replacement) のテーブルの全ルールをテーブル順に re.sub で適用する。
+
+    従来の「パターンごとに re.sub するループ」と結果は常に一致する（全ルールを1つの選択に
+    結合して左端の一致を置換する方法は、先のルールの一致範囲が後のルールの一致の先頭を
+    含む場合に後のルールを適用しないため、シークレットが残る）。
+
+    RuleSet のリテラル事前フィルタを通過したルールだけを適用し、候補がなければ走査しない。
+    置換で文字列が変わった場合は、置換文字列が後のルールのリテラルを含みうるため、
+    残りのルールを選び直す。
+    """
+
+    def __init__(self, rules, flags: int = 0):
+        self.rules = list(rules)
+        self.flags = flags
+        self.ruleset = RuleSet(self.rules, flags)
+
+    def sub(self, text: str) -> str:
+        """全ルールの一致箇所をテーブル順に置換した文字列。"""
+        candidates = self.ruleset.candidates(text)
+        position = 0
+        while position < len(candidates):
+            rule = candidates[position]
+            position += 1
+            replaced = rule.regex.sub(self.rules[rule.index][1], text)
+            if replaced != text:
+                text = replaced
+                candidates = [later for later in self.ruleset.candidates(text) if later.index > rule.index]
+                position = 0
+        return text
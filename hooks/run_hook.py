@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+シェルフックの共通エントリポイント
+
+使用方法:
+  python3 -I -S run_hook.py audit-log
+  python3 -I -S run_hook.py insight-capture
+  python3 -I -S run_hook.py pre-compact-save
+  python3 -I -S run_hook.py spec-context
+  python3 -I -S run_hook.py session-cleanup
+  python3 -I -S run_hook.py subagent-stop
+  python3 -I -S run_hook.py teammate-quality-gate
+  python3 -I -S run_hook.py workspace-stats [ワークスペース ID]
+  python3 -I -S run_hook.py hook-client <バリデーター名>
+  python3 -I -S run_hook.py verify-references
+  python3 -I -S run_hook.py security-audit-bash
+
+処理本体は spec_hooks パッケージと hooks/ 直下のスクリプトにある（spec_hooks/__init__.py を参照）。
+
+Python のフックはすべてこのファイルから起動する。-I（隔離モード）ではスクリプトの
+ディレクトリが sys.path に含まれないため、hooks/ を追加するのはここだけにし、各スクリプトは
+hooks/ が sys.path にある前提で import する（-I なしの python3 で単独実行する場合も同じ）。
+"""
+
+import os
+import sys
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+if HOOKS_DIR not in sys.path:
+    sys.path.insert(0, HOOKS_DIR)
+
+from spec_hooks.cli import main  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,8 +19,7 @@ import sys
 import re
 import json
 
-# stdin からツール入力を読み取り（Claude Code が JSON を渡す）
-input_data = sys.stdin.read().strip()
+from rule_engine import RuleSet
 
 def extract_command_from_input(tool_name: str, tool_input: dict) -> str:
     """
@@ -55,24 +54,6 @@ def extract_command_from_input(tool_name: str, tool_input: dict) -> str:
 
     return ""
 
-try:
-    data = json.loads(input_data)
-    tool_name = data.get("tool_name", "Bash")
-    tool_input = data.get("tool_input", {})
-    command = extract_command_from_input(tool_name, tool_input)
-    is_mcp_tool = tool_name.startswith("mcp__")
-except json.JSONDecodeError:
-    # フェイルセーフ: パースエラー時は拒否（生の入力を処理しない）
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": "安全性チェックに失敗: 無効な JSON 入力形式"
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
-
 # 環境変数のシークレットパターン - export によるシークレット漏洩を検出
 # より具体的なエラーメッセージを提供するため、危険なパターンの前にチェック
 #
@@ -252,6 +233,10 @@ DANGEROUS_PATTERNS = [
     r"ln\s+-sf\s+.*\s+\./[^&|;]+$",
 ]
 
+# パターンテーブルはリテラル事前フィルタ付きのルールセットとして一度だけ構築
+ENV_SECRET_RULES = RuleSet(ENV_SECRET_PATTERNS, re.IGNORECASE | re.MULTILINE)
+DANGEROUS_RULES = RuleSet(DANGEROUS_PATTERNS, re.IGNORECASE)
+
 # 変換可能なパターン - 修正によりより安全にできるコマンド
 # 形式: (pattern, transform_function_name, description)
 TRANSFORMABLE_PATTERNS = [
@@ -282,17 +267,16 @@ def check_env_secrets(cmd: str) -> tuple[bool, str]:
     コマンドが環境変数経由でシークレットをエクスポートするかチェック。
     戻り値: (is_secret_export, description)
     """
-    for pattern, description in ENV_SECRET_PATTERNS:
-        if re.search(pattern, cmd, re.IGNORECASE | re.MULTILINE):
-            return True, description
+    rule = ENV_SECRET_RULES.first_search(cmd)
+    if rule:
+        return True, rule.description
     return False, ""
 
 # コマンドをパターンに対してチェック
 def is_dangerous(cmd: str) -> tuple[bool, str]:
-    cmd_lower = cmd.lower()
-    for pattern in DANGEROUS_PATTERNS:
-        if re.search(pattern, cmd_lower, re.IGNORECASE):
-            return True, pattern
+    rule = DANGEROUS_RULES.first_search(cmd.lower())
+    if rule:
+        return True, rule.pattern
     return False, ""
 
 def check_transformable(cmd: str) -> tuple[bool, str, str]:
@@ -312,80 +296,106 @@ def check_transformable(cmd: str) -> tuple[bool, str, str]:
 # メインチェック - フェイルクローズド動作のため try/except でラップ
 # 予期しない例外（正規表現のバックトラッキング、メモリエラー等）が
 # 拒否となることを保証し、潜在的に危険なコマンドの実行を防止
-try:
-    # まず環境変数シークレットのエクスポートをチェック（より具体的なメッセージ）
-    is_env_secret, secret_desc = check_env_secrets(command)
-
-    if is_env_secret:
-        # 具体的なガイダンスとともにシークレットのエクスポートをブロック
-        tool_type = f"MCP ツール ({tool_name})" if is_mcp_tool else "Bash"
-        output = {
+def evaluate(input_data: str) -> dict | None:
+    """
+    フック入力 JSON を評価し、出力すべき decision を返す。
+    出力が不要な場合は None を返す。
+
+    stdin を読まず、プロセスを終了しないため、hook_server.py から
+    常駐プロセス内で繰り返し呼び出せる。
+    """
+    try:
+        data = json.loads(input_data.strip())
+        tool_name = data.get("tool_name", "Bash")
+        tool_input = data.get("tool_input", {})
+        command = extract_command_from_input(tool_name, tool_input)
+        is_mcp_tool = tool_name.startswith("mcp__")
+    except json.JSONDecodeError:
+        # フェイルセーフ: パースエラー時は拒否（生の入力を処理しない）
+        return {
             "hookSpecificOutput": {
                 "hookEventName": "PreToolUse",
                 "permissionDecision": "deny",
-                "permissionDecisionReason": f"{tool_type} コマンドをブロック: {secret_desc}。シェルコマンドでシークレットを直接エクスポートする代わりに .env ファイルまたはシークレットマネージャーを使用してください。"
+                "permissionDecisionReason": "安全性チェックに失敗: 無効な JSON 入力形式"
             }
         }
-        print(json.dumps(output))
-        sys.exit(0)
 
-    # 危険なパターンをチェック
-    dangerous, matched_pattern = is_dangerous(command)
+    try:
+        # まず環境変数シークレットのエクスポートをチェック（より具体的なメッセージ）
+        is_env_secret, secret_desc = check_env_secrets(command)
+
+        if is_env_secret:
+            # 具体的なガイダンスとともにシークレットのエクスポートをブロック
+            tool_type = f"MCP ツール ({tool_name})" if is_mcp_tool else "Bash"
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"{tool_type} コマンドをブロック: {secret_desc}。シェルコマンドでシークレットを直接エクスポートする代わりに .env ファイルまたはシークレットマネージャーを使用してください。"
+                }
+            }
+
+        # 危険なパターンをチェック
+        dangerous, matched_pattern = is_dangerous(command)
+
+        if dangerous:
+            # JSON decision control でコマンドを適切にブロック
+            tool_type = f"MCP ツール ({tool_name})" if is_mcp_tool else "Bash"
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": f"危険な {tool_type} コマンドをブロック（一致パターン: {matched_pattern}）"
+                }
+            }
 
-    if dangerous:
-        # JSON decision control でコマンドを適切にブロック
-        tool_type = f"MCP ツール ({tool_name})" if is_mcp_tool else "Bash"
-        output = {
+        # コマンドをより安全なバージョンに変換できるかチェック
+        # 注: 変換は Bash ツールにのみ適用（スキーマが既知）
+        # MCP ツールはスキーマが様々なため、危険なコマンドのブロックのみ
+        transformable, transformed_cmd, transform_desc = check_transformable(command)
+
+        if transformable and not is_mcp_tool:
+            # 入力変更でコマンドを変換（v2.0.10+ 機能）
+            # 監査証跡と透明性のため permissionDecisionReason を含める
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "allow",
+                    "permissionDecisionReason": f"安全性のため変換: {transform_desc}。元のコマンド: {command[:50]}{'...' if len(command) > 50 else ''}",
+                    "updatedInput": {
+                        "command": transformed_cmd
+                    }
+                }
+            }
+
+        # コマンドの変更なし続行を許可 - 監査の一貫性のため明示的な許可
+        return {
             "hookSpecificOutput": {
                 "hookEventName": "PreToolUse",
-                "permissionDecision": "deny",
-                "permissionDecisionReason": f"危険な {tool_type} コマンドをブロック（一致パターン: {matched_pattern}）"
+                "permissionDecision": "allow"
             }
         }
-        print(json.dumps(output))
-        sys.exit(0)  # JSON decision control で exit 0
-
-    # コマンドをより安全なバージョンに変換できるかチェック
-    # 注: 変換は Bash ツールにのみ適用（スキーマが既知）
-    # MCP ツールはスキーマが様々なため、危険なコマンドのブロックのみ
-    transformable, transformed_cmd, transform_desc = check_transformable(command)
 
-    if transformable and not is_mcp_tool:
-        # 入力変更でコマンドを変換（v2.0.10+ 機能）
-        # 監査証跡と透明性のため permissionDecisionReason を含める
-        output = {
+    except Exception as e:
+        # フェイルセーフ: 危険なコマンドの実行を防ぐため予期しないエラー時は拒否
+        # prevent_secret_leak.py および external_content_validator.py と一貫した
+        # フェイルクローズド動作を保証
+        return {
             "hookSpecificOutput": {
                 "hookEventName": "PreToolUse",
-                "permissionDecision": "allow",
-                "permissionDecisionReason": f"安全性のため変換: {transform_desc}。元のコマンド: {command[:50]}{'...' if len(command) > 50 else ''}",
-                "updatedInput": {
-                    "command": transformed_cmd
-                }
+                "permissionDecision": "deny",
+                "permissionDecisionReason": f"安全性チェックに失敗: {str(e)}"
             }
         }
+
+
+def main():
+    # stdin からツール入力を読み取り（Claude Code が JSON を渡す）
+    output = evaluate(sys.stdin.read())
+    if output is not None:
         print(json.dumps(output))
-        sys.exit(0)
+    sys.exit(0)  # JSON decision control で exit 0
 
-    # コマンドの変更なし続行を許可 - 監査の一貫性のため明示的な許可
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "allow"
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
-
-except Exception as e:
-    # フェイルセーフ: 危険なコマンドの実行を防ぐため予期しないエラー時は拒否
-    # prevent_secret_leak.py および external_content_validator.py と一貫した
-    # フェイルクローズド動作を保証
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
-            "permissionDecisionReason": f"安全性チェックに失敗: {str(e)}"
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
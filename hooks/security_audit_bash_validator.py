@@ -11,6 +11,8 @@ import json
 import sys
 import re
 
+from rule_engine import RuleSet
+
 
 # 許可された読み取り専用の監査コマンド
 ALLOWED_PATTERNS = [
@@ -103,6 +105,11 @@ BLOCKED_PATTERNS = [
 ]
 
 
+# パターンテーブルはリテラル事前フィルタ付きのルールセットとして一度だけ構築
+BLOCKED_RULES = RuleSet(BLOCKED_PATTERNS, re.IGNORECASE)
+ALLOWED_RULES = RuleSet(ALLOWED_PATTERNS, re.IGNORECASE)
+
+
 def validate_command(command: str) -> tuple[bool, str]:
     """
     コマンドがセキュリティ監査で許可されるかを検証。
@@ -113,14 +120,14 @@ def validate_command(command: str) -> tuple[bool, str]:
     command = command.strip()
 
     # まずブロックパターンをチェック
-    for pattern in BLOCKED_PATTERNS:
-        if re.search(pattern, command, re.IGNORECASE):
-            return False, f"ブロックパターンを検出: {pattern}"
+    rule = BLOCKED_RULES.first_search(command)
+    if rule:
+        return False, f"ブロックパターンを検出: {rule.pattern}"
 
     # コマンドが許可パターンに一致するかチェック
-    for pattern in ALLOWED_PATTERNS:
-        if re.match(pattern, command, re.IGNORECASE):
-            return True, f"許可: パターン {pattern} に一致"
+    rule = ALLOWED_RULES.first_match(command)
+    if rule:
+        return True, f"許可: パターン {rule.pattern} に一致"
 
     # デフォルト: 不明なコマンドをブロック
     return False, "セキュリティ監査モードの許可リストにないコマンド"
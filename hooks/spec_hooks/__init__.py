@@ -0,0 +1,27 @@
+"""
+spec_hooks - シェルフックの Python 実装
+
+シェルフック（audit_log.sh、insight_capture.sh 等）は run_hook.py のサブコマンドを
+呼び出すだけの1行のラッパーであり、処理本体はこのパッケージのモジュールにある。
+ヒアドキュメントや python3 -c で埋め込んでいた場合と異なり、モジュールは .pyc として
+キャッシュされ、共通処理（トランスクリプトパス検証、アトミックな JSON 書き込み、
+ワークスペース ID）は各フックで共有される。
+
+モジュール:
+  cli         - サブコマンドのディスパッチ（run_hook.py から呼び出される）
+  workspace   - ワークスペース ID とパス（workspace_utils.sh の Python 版）
+  fsutil      - アトミックな JSON/バイト列の書き込み、タイムアウト付きファイルロック、gzip 圧縮
+  path_index  - リポジトリのファイルパスの索引（verify_references.py の参照パスの解決）
+  line_index  - ファイルの改行位置の索引（verify_references.py の行数と引用の確認）
+  symbol_index - ソースファイルの関数・クラスの定義範囲の索引（verify_references.py のシンボル名の確認）
+  insight_index - インサイトの内容ハッシュの索引（insight_capture のセッションをまたいだ重複排除）
+  insight_manifest - 保留中のインサイトのマニフェスト（spec_context と /review-insights の件数・プレビュー）
+  insight_cluster - 保留中のインサイトの類似グループ（MinHash と LSH。/review-insights のグループ単位のレビュー）
+  insight_transition - インサイトの状態の一括変更（move_insight の一括版。ID ごとの結果を出力）
+  insight_archive - アーカイブしたインサイトのパック（圧縮した追記専用のセグメントとオフセットの索引）
+  transcript  - トランスクリプトパスの検証とアシスタント発話の抽出
+  subagent_stop - SubagentStop のランナー（subagent_summary、insight_capture、verify_references.py
+                をステージとして1プロセスで実行）
+  audit_log / insight_capture / pre_compact_save / spec_context /
+  session_cleanup / teammate_quality_gate / workspace_stats - 各フックの実装
+"""
@@ -0,0 +1,304 @@
+"""
+PostToolUse フック: ツール使用状況の監査ログ
+
+デバッグ、コンプライアンス、セッション分析のためにツール呼び出しを記録する。
+
+PostToolUse フックは stdin で以下の JSON を受け取る:
+- tool_name: 実行されたツールの名前
+- tool_input: ツールに渡されたパラメータ
+- tool_response: ツールからの結果（切り詰められる場合あり）
+- session_id: 現在のセッション識別子
+
+ログはワークスペースの logs/tool-audit-YYYY-MM-DD.jsonl に1行1エントリで追記する。
+監査ログがツール実行をブロックしてはならないため、常に正常終了する。
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from spec_hooks import workspace
+
+# ログローテーションの設定
+MAX_LOG_SIZE_BYTES = 10 * 1024 * 1024  # ログファイルあたり最大 10MB
+MAX_LOG_FILES = 7  # 7日分のログを保持
+
+CLEANUP_MARKER_NAME = ".last_audit_cleanup"
+
+# コマンド引数に含まれる可能性のあるシークレットのパターン
+SECRET_PATTERNS = [
+    # プロバイダー API キー（プレフィックス付き）
+    (r'sk-ant-[a-zA-Z0-9_-]{20,}', '[ANTHROPIC_KEY_REDACTED]'),
+    (r'sk-[a-zA-Z0-9]{20,}', '[OPENAI_KEY_REDACTED]'),
+    (r'AKIA[0-9A-Z]{16}', '[AWS_ACCESS_KEY_REDACTED]'),
+    (r'ghp_[a-zA-Z0-9]{36,}', '[GITHUB_TOKEN_REDACTED]'),
+    (r'gho_[a-zA-Z0-9]{36,}', '[GITHUB_OAUTH_REDACTED]'),
+    (r'glpat-[a-zA-Z0-9_-]{20,}', '[GITLAB_TOKEN_REDACTED]'),
+    (r'xox[baprs]-[a-zA-Z0-9-]{10,}', '[SLACK_TOKEN_REDACTED]'),
+    # Bearer/Authorization トークン
+    (r'Bearer\s+[a-zA-Z0-9._-]{20,}', 'Bearer [TOKEN_REDACTED]'),
+    (r'Authorization:\s*[^\s]{20,}', 'Authorization: [REDACTED]'),
+    # 引数内のパスワード/シークレットの汎用パターン
+    (r'(-[pP]|--password[=\s])[^\s]{8,}', r'\g<1>[PASSWORD_REDACTED]'),
+    (r'(ANTHROPIC_API_KEY|OPENAI_API_KEY|AWS_SECRET_ACCESS_KEY|GITHUB_TOKEN)=[^\s]{10,}', r'\g<1>=[REDACTED]'),
+    # パスワード付きデータベース接続文字列
+    (r'(postgres|mysql|mongodb)://[^:]+:[^@]{8,}@', r'\g<1>://[USER]:[PASSWORD_REDACTED]@'),
+    # シークレットの可能性がある汎用の高エントロピー文字列（64文字以上の16進数）
+    (r'["\'][a-fA-F0-9]{64,}["\']', '"[POSSIBLE_SECRET_REDACTED]"'),
+]
+
+# 名前から判断して機密性の高いフィールド
+SENSITIVE_KEYS = ('password', 'secret', 'token', 'key', 'credential', 'api_key')
+
+# tool_input_summary のサイズ予算
+MAX_VALUE_LENGTH = 200  # 文字列値あたりの最大文字数
+MAX_SUMMARY_CHARS = 16 * 1024  # サマリー全体の文字列値の合計
+MAX_DEPTH = 8  # ネストの深さ
+MAX_ITEMS = 50  # dict/list あたりの要素数
+
+# 文字列値ごとにマスクのために走査する最大文字数（read_hook_input もこの長さで打ち切る）。
+# 値全体をマスクしてから切り詰めるため、切り詰め位置をまたぐシークレットも検出できる
+MAX_REDACTION_CHARS = 16 * 1024
+
+TRUNCATED_SUFFIX = '...[truncated]'
+
+# 監査エントリに使用するフック入力のキー（tool_response は読み飛ばす）
+AUDIT_INPUT_KEYS = ('session_id', 'tool_name', 'tool_input')
+
+_redactor = None
+
+
+def get_redactor():
+    """SECRET_PATTERNS のパターンを表の順に逐次置換する Redactor（初回のみ構築）。"""
+    global _redactor
+    if _redactor is None:
+        from rule_engine import Redactor
+
+        _redactor = Redactor(SECRET_PATTERNS)
+    return _redactor
+
+
+def redact_secrets_in_string(text):
+    """文字列から既知のシークレットパターンをマスクする"""
+    if not isinstance(text, str):
+        return text
+    return get_redactor().sub(text)
+
+
+def redact_and_truncate(text: str, max_len: int) -> str:
+    """先頭 MAX_REDACTION_CHARS 文字全体をマスクしてから max_len 文字に切り詰める。"""
+    redacted = redact_secrets_in_string(text[:MAX_REDACTION_CHARS])
+    if len(redacted) > max_len or len(text) > MAX_REDACTION_CHARS:
+        return redacted[:max_len] + TRUNCATED_SUFFIX
+    return redacted
+
+
+class _Budget:
+    """サマリー全体で残りの文字数。"""
+
+    __slots__ = ('remaining',)
+
+    def __init__(self, chars: int):
+        self.remaining = chars
+
+
+def _summarize(value, max_len: int, budget: _Budget, depth: int):
+    if isinstance(value, str):
+        if budget.remaining <= 0:
+            return TRUNCATED_SUFFIX
+        result = redact_and_truncate(value, min(max_len, budget.remaining))
+        budget.remaining -= len(result)
+        return result
+    if isinstance(value, dict):
+        if depth >= MAX_DEPTH:
+            return '[nested]'
+        result = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= MAX_ITEMS or budget.remaining <= 0:
+                result['...'] = f'[{len(value) - i} more keys]'
+                break
+            # 名前から判断して機密性の高いフィールドをスキップ
+            if isinstance(k, str) and k.lower() in SENSITIVE_KEYS:
+                result[k] = '[REDACTED]'
+            else:
+                result[k] = _summarize(v, max_len, budget, depth + 1)
+        return result
+    if isinstance(value, (list, tuple)):
+        if depth >= MAX_DEPTH:
+            return '[nested]'
+        result = []
+        for i, item in enumerate(value):
+            if i >= MAX_ITEMS or budget.remaining <= 0:
+                result.append(f'[{len(value) - i} more items]')
+                break
+            result.append(_summarize(item, max_len, budget, depth + 1))
+        return result
+    return value
+
+
+def truncate_input(data, max_len=MAX_VALUE_LENGTH):
+    """
+    機密データを公開せずにログ用に入力を切り詰める。
+
+    ネストした dict/list（MCP ツールの引数、Edit の配列等）も再帰的にマスクする。
+    文字列値は max_len 文字、サマリー全体は MAX_SUMMARY_CHARS 文字、ネストは MAX_DEPTH 段、
+    要素数は MAX_ITEMS 個までに制限する。
+    """
+    return _summarize(data, max_len, _Budget(MAX_SUMMARY_CHARS), 0)
+
+
+def _age_days(path: str) -> int:
+    """find -mtime と同じ日数（切り捨て）での経過時間。"""
+    return int((time.time() - os.stat(path).st_mtime) // 86400)
+
+
+def get_log_dir() -> str:
+    try:
+        workspace_id = workspace.get_workspace_id()
+    except Exception:
+        workspace_id = ""
+    if workspace_id:
+        return workspace.get_logs_dir(workspace_id)
+    return os.path.join(".claude", "logs")
+
+
+# --- ログローテーション ---
+def rotate_log_if_needed(log_file: str, max_size: int):
+    """サイズ制限を超えた場合にログファイルをローテーション"""
+    try:
+        current_size = os.path.getsize(log_file)
+    except OSError:
+        return
+
+    if current_size > max_size:
+        rotated_file = f"{log_file}.{time.strftime('%H%M%S')}"
+
+        # 現在のログをローテーション
+        try:
+            os.rename(log_file, rotated_file)
+        except OSError:
+            return
+
+        # gzip が利用可能な場合はローテーションしたファイルをバックグラウンドで圧縮
+        import shutil
+        import subprocess
+
+        if shutil.which("gzip"):
+            try:
+                subprocess.Popen(
+                    ["gzip", rotated_file],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+            except OSError:
+                pass
+
+
+def cleanup_old_logs(log_dir: str):
+    """古い監査ログのクリーンアップ（MAX_LOG_FILES 日より古いもの）"""
+    for root, _dirs, files in os.walk(log_dir):
+        for name in files:
+            if not (name.startswith("tool-audit-") and ".jsonl" in name[len("tool-audit-"):]):
+                continue
+            path = os.path.join(root, name)
+            try:
+                if _age_days(path) > MAX_LOG_FILES:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+
+def read_hook_input() -> dict | None:
+    """
+    stdin のフック入力から監査エントリに必要なキーだけを読み取る（空または不正な入力は None）。
+
+    tool_response（ツールの出力全体）は読み飛ばして保持せず、tool_input の文字列は
+    マスクと切り詰めに必要な長さまでしか保持しない（数十 MB の入力でもメモリ使用量が一定）。
+    """
+    from spec_hooks.hookinput import HookInputError, read_fields
+
+    try:
+        return read_fields(sys.stdin.buffer, AUDIT_INPUT_KEYS, max_string=MAX_REDACTION_CHARS + 1)
+    except (HookInputError, OSError):
+        return None
+
+
+def build_audit_entry(data: dict) -> dict:
+    """監査エントリを作成（容量節約のため tool_response は除外）"""
+    return {
+        'timestamp': datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + 'Z',
+        'session_id': data.get('session_id', 'unknown'),
+        'tool_name': data.get('tool_name', 'unknown'),
+        'tool_input_summary': truncate_input(data.get('tool_input', {})),
+    }
+
+
+def cleanup_old_logs_if_due(log_dir: str):
+    """定期的なクリーンアップ（オーバーヘッドを避けるためマーカーが2日以上古い場合のみ実行）"""
+    cleanup_marker = os.path.join(log_dir, CLEANUP_MARKER_NAME)
+    try:
+        needs_cleanup = not os.path.isfile(cleanup_marker) or _age_days(cleanup_marker) > 1
+    except OSError:
+        needs_cleanup = True
+    if needs_cleanup:
+        cleanup_old_logs(log_dir)
+        try:
+            with open(cleanup_marker, "a"):
+                pass
+            os.utime(cleanup_marker)
+        except OSError:
+            pass
+
+
+def write_audit_log():
+    log_dir = get_log_dir()
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except OSError:
+        pass
+
+    # 日次ログの日付（ローカル時刻）
+    date = time.strftime('%Y-%m-%d')
+
+    if spool_enabled():
+        # スプールモード: ローテーションとクリーンアップはコミッターが行う
+        from spec_hooks import audit_spool
+
+        data = read_hook_input()
+        if data is None:
+            return
+        entry = build_audit_entry(data)
+        audit_spool.append_record(log_dir, date, json.dumps(entry))
+        audit_spool.ensure_committer(log_dir)
+        return
+
+    # 日付でローテーションするログファイル
+    log_file = os.path.join(log_dir, f"tool-audit-{date}.jsonl")
+
+    # 書き込み前に必要に応じてローテーション
+    rotate_log_if_needed(log_file, MAX_LOG_SIZE_BYTES)
+    cleanup_old_logs_if_due(log_dir)
+
+    # stdin から入力を読み取り（入力が空または不正な JSON の場合はログをスキップ）
+    data = read_hook_input()
+    if data is None:
+        return
+
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(build_audit_entry(data)) + "\n")
+
+
+def spool_enabled() -> bool:
+    """スプールモード（spec_hooks/audit_spool.py を参照）が有効か。"""
+    return os.environ.get("SPEC_WORKFLOW_AUDIT_SPOOL", "0") == "1"
+
+
+def main(argv: list[str]) -> int:
+    try:
+        write_audit_log()
+    except Exception:
+        pass
+
+    # 常に正常終了 - 監査ログがツール実行をブロックしてはならない
+    return 0
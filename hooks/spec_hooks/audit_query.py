@@ -0,0 +1,326 @@
+"""
+監査ログの検索（インデックス付き）
+
+使用方法:
+  python3 hooks/run_hook.py audit-query [--session ID] [--tool NAME] [--since 時刻] [--until 時刻]
+                                        [--grep 文字列] [--limit N] [--count]
+                                        [--workspace ID | --log-dir ディレクトリ] [--rebuild]
+
+ログディレクトリの監査ログ（tool-audit-YYYY-MM-DD.jsonl、ローテーション済みの
+tool-audit-YYYY-MM-DD.jsonl.HHMMSS と .gz）を SQLite のインデックス（.audit-index.sqlite）に
+登録し、条件に一致したエントリを元の JSONL 行のまま時刻順に出力する。
+
+時刻の指定:
+  ISO 形式の前方一致（2026-10-01、2026-10-01T09:30 等、UTC）または相対指定（30m、2h、7d）
+
+インデックスの更新:
+- 検索のたびに差分だけを登録する。ファイルごとに登録済みの位置（非圧縮でのバイト
+  オフセット）を保持し、追記された完全な行だけを読む。サイズと更新時刻が前回と同じ
+  ファイルは開かない
+- ファイルは先頭行で識別する。ローテーション（リネーム）や gzip 圧縮でファイル名が
+  変わっても登録済みのエントリを引き継ぎ、.gz は展開しながら登録済みの位置まで読み飛ばす
+- 圧縮中（非圧縮のファイルがまだ残っている）の .gz は読まない
+- 削除されたファイル（保持期間を過ぎたログ）のエントリはインデックスからも削除する
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+from spec_hooks import workspace
+
+INDEX_NAME = ".audit-index.sqlite"
+
+LOG_FILE_RE = re.compile(r"^tool-audit-\d{4}-\d{2}-\d{2}\.jsonl(\.\d+)?(\.gz)?$")
+
+RELATIVE_TIME_RE = re.compile(r"^(\d+)([smhd])$")
+RELATIVE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# 一度に登録するエントリ数（メモリ使用量の上限）
+INSERT_BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    head TEXT NOT NULL UNIQUE,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    file_id INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS records_session ON records (session_id, ts);
+CREATE INDEX IF NOT EXISTS records_tool ON records (tool_name, ts);
+CREATE INDEX IF NOT EXISTS records_file ON records (file_id);
+"""
+
+
+# =============================================================================
+# インデックスの更新
+# =============================================================================
+
+def open_log(path: str):
+    if path.endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_head(path: str) -> str | None:
+    """ファイルの識別子（非圧縮での先頭行のハッシュ）。先頭行が未完成なら None。"""
+    with open_log(path) as f:
+        line = f.readline()
+    if not line.endswith(b"\n"):
+        return None
+    return hashlib.sha1(line).hexdigest()
+
+
+def parse_record(line: bytes) -> tuple | None:
+    try:
+        text = line.decode("utf-8").rstrip("\n")
+        entry = json.loads(text)
+        return (
+            str(entry.get("timestamp", "")),
+            str(entry.get("session_id", "")),
+            str(entry.get("tool_name", "")),
+            text,
+        )
+    except (UnicodeDecodeError, ValueError, AttributeError):
+        return None  # 不正な行は登録しない（位置は進める）
+
+
+def read_records(path: str, progress: list[int], complete: bool):
+    """
+    progress[0] の位置以降のエントリを (ts, session_id, tool_name, line) で返すジェネレーター。
+
+    読み進めた完全な行の末尾位置を progress[0] に反映する。complete が False（追記中の
+    ファイル）のときは改行で終わらない末尾の行を読まない。
+    """
+    with open_log(path) as f:
+        f.seek(progress[0])
+        for line in f:
+            if not line.endswith(b"\n") and not complete:
+                break
+            progress[0] += len(line)
+            record = parse_record(line)
+            if record:
+                yield record
+
+
+class AuditIndex:
+    """ログディレクトリの監査ログのインデックス。"""
+
+    def __init__(self, log_dir: str):
+        import sqlite3
+
+        self.log_dir = log_dir
+        self.db = sqlite3.connect(os.path.join(log_dir, INDEX_NAME), timeout=30)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def rebuild(self):
+        with self.db:
+            self.db.execute("DELETE FROM records")
+            self.db.execute("DELETE FROM files")
+
+    def _log_files(self) -> list[str]:
+        try:
+            names = os.listdir(self.log_dir)
+        except OSError:
+            return []
+        names = [name for name in names if LOG_FILE_RE.match(name)]
+        # 圧縮中の .gz（非圧縮のファイルが残っている）は読まない
+        return sorted(name for name in names if not (name.endswith(".gz") and name[:-3] in names))
+
+    def _insert(self, file_id: int, records) -> int:
+        count = 0
+        batch = []
+        for record in records:
+            batch.append((file_id, *record))
+            if len(batch) >= INSERT_BATCH:
+                self.db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?)", batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+        return count
+
+    def _index_file(self, name: str, st: os.stat_result, entry: tuple | None, head: str) -> int:
+        """1ファイルの差分を登録し、登録したエントリ数を返す。"""
+        path = os.path.join(self.log_dir, name)
+        is_gzip = name.endswith(".gz")
+        if entry is None:
+            file_id = self.db.execute(
+                "INSERT INTO files (name, head, offset, size, mtime_ns) VALUES (?, ?, 0, 0, 0)", (name, head)
+            ).lastrowid
+            offset = 0
+        else:
+            file_id, offset = entry[0], entry[2]
+            if not is_gzip and st.st_size < offset:
+                # 同じ先頭行のまま縮んだ（切り詰められた）場合は登録し直す
+                self.db.execute("DELETE FROM records WHERE file_id = ?", (file_id,))
+                offset = 0
+
+        progress = [offset]
+        count = self._insert(file_id, read_records(path, progress, complete=is_gzip))
+        self.db.execute(
+            "UPDATE files SET name = ?, offset = ?, size = ?, mtime_ns = ? WHERE id = ?",
+            (name, progress[0], st.st_size, st.st_mtime_ns, file_id),
+        )
+        return count
+
+    def update(self) -> int:
+        """ログディレクトリの差分をインデックスに登録し、登録したエントリ数を返す。"""
+        added = 0
+        with self.db:
+            # 書き込みトランザクションを先に取得し、同時に実行された検索との二重登録を防ぐ
+            self.db.execute("BEGIN IMMEDIATE")
+            entries = {row[1]: row for row in self.db.execute(
+                "SELECT id, head, offset, name, size, mtime_ns FROM files")}
+            by_name = {row[3]: row for row in entries.values()}
+            seen = set()
+            incomplete = False
+
+            for name in self._log_files():
+                path = os.path.join(self.log_dir, name)
+                try:
+                    st = os.stat(path)
+                    known = by_name.get(name)
+                    if known and known[4] == st.st_size and known[5] == st.st_mtime_ns:
+                        seen.add(known[1])  # 前回から変更なし
+                        continue
+                    head = read_head(path)
+                    if head is None or head in seen:
+                        continue  # 先頭行が未完成、または同じ内容のファイルを登録済み
+                    seen.add(head)
+                    added += self._index_file(name, st, entries.get(head), head)
+                except (OSError, EOFError):
+                    # 読み取り中にローテーション・圧縮された場合は次回の更新で登録する
+                    incomplete = True
+
+            if not incomplete:
+                for head, row in entries.items():
+                    if head not in seen:
+                        self.db.execute("DELETE FROM records WHERE file_id = ?", (row[0],))
+                        self.db.execute("DELETE FROM files WHERE id = ?", (row[0],))
+        return added
+
+    def query(self, session: str | None = None, tool: str | None = None, since: str | None = None,
+              until: str | None = None, substring: str | None = None, limit: int | None = None):
+        """条件に一致したエントリの JSONL 行を時刻順に返す。"""
+        where, params = self._where(session, tool, since, until, substring)
+        sql = f"SELECT line FROM records{where} ORDER BY ts, rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for (line,) in self.db.execute(sql, params):
+            yield line
+
+    def count(self, session: str | None = None, tool: str | None = None, since: str | None = None,
+              until: str | None = None, substring: str | None = None) -> int:
+        where, params = self._where(session, tool, since, until, substring)
+        return self.db.execute(f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _where(session, tool, since, until, substring) -> tuple[str, list]:
+        clauses, params = [], []
+        if session:
+            clauses.append("session_id = ?")
+            params.append(session)
+        if tool:
+            clauses.append("tool_name = ?")
+            params.append(tool)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until:
+            # 前方一致の上限（2026-10-01 は 2026-10-01T23:59:59... まで含む）
+            clauses.append("ts < ?")
+            params.append(until + "\uffff")
+        if substring:
+            clauses.append("instr(line, ?) > 0")
+            params.append(substring)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def parse_time(value: str) -> str:
+    """時刻の指定をタイムスタンプ（UTC の ISO 形式）の比較用の文字列に変換。"""
+    match = RELATIVE_TIME_RE.match(value)
+    if match:
+        seconds = int(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(time.time() - seconds))
+    if not re.match(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}(:\d{2}(:\d{2}(\.\d+)?)?)?)?Z?$", value):
+        raise argparse.ArgumentTypeError(f"時刻の形式が不正です: {value}（例: 2026-10-01、2026-10-01T09:30、2h、7d）")
+    return value.replace(" ", "T").rstrip("Z")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="run_hook.py audit-query", description="監査ログの検索")
+    parser.add_argument("--session", help="セッション ID（完全一致）")
+    parser.add_argument("--tool", help="ツール名（完全一致、例: Bash）")
+    parser.add_argument("--since", type=parse_time, help="この時刻以降（ISO 形式の前方一致または 30m/2h/7d）")
+    parser.add_argument("--until", type=parse_time, help="この時刻まで（ISO 形式の前方一致、指定した単位の終わりまで含む）")
+    parser.add_argument("--grep", dest="substring", help="エントリの JSON に含まれる文字列（大文字・小文字を区別）")
+    parser.add_argument("--limit", type=int, help="出力する最大件数")
+    parser.add_argument("--count", action="store_true", help="件数のみ出力")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--workspace", help="ワークスペース ID（デフォルト: 現在のワークスペース）")
+    target.add_argument("--log-dir", help="ログディレクトリ")
+    parser.add_argument("--rebuild", action="store_true", help="インデックスを作り直す")
+    return parser
+
+
+def main(argv: list[str]) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.log_dir:
+        log_dir = args.log_dir
+    else:
+        workspace_id = args.workspace or workspace.get_workspace_id()
+        if not workspace.validate_workspace_id(workspace_id):
+            print(f"エラー: 無効なワークスペース ID: {workspace_id}", file=sys.stderr)
+            return 2
+        log_dir = workspace.get_logs_dir(workspace_id)
+    if not os.path.isdir(log_dir):
+        print(f"エラー: ログディレクトリが見つかりません: {log_dir}", file=sys.stderr)
+        return 1
+
+    index = AuditIndex(log_dir)
+    try:
+        if args.rebuild:
+            index.rebuild()
+        index.update()
+
+        filters = dict(session=args.session, tool=args.tool, since=args.since, until=args.until,
+                       substring=args.substring)
+        if args.count:
+            print(index.count(**filters))
+        else:
+            out = sys.stdout
+            for line in index.query(limit=args.limit, **filters):
+                out.write(line + "\n")
+    except BrokenPipeError:
+        # head 等にパイプした場合
+        sys.stderr.close()
+    finally:
+        index.close()
+    return 0
@@ -0,0 +1,287 @@
+"""
+監査ログのスプール（グループコミット）
+
+SPEC_WORKFLOW_AUDIT_SPOOL=1 のとき、audit_log フックは監査エントリを日次ログに直接
+書き込まず、ログディレクトリのスプールファイル（.audit-spool）に1回の追記で渡して
+すぐに終了する。バックグラウンドのコミッターがスプールをまとめて日次ログ
+（tool-audit-YYYY-MM-DD.jsonl）に書き込み、バッチごとに1回だけ fsync する。
+
+使用方法:
+  python3 -I -S hooks/run_hook.py audit-commit <ログディレクトリ>          # コミッター（フックが起動）
+  python3 -I -S hooks/run_hook.py audit-commit <ログディレクトリ> --once   # 未コミット分を書き込んで終了
+
+スプールの形式（1行1レコード）:
+  "<日次ログの日付 YYYY-MM-DD>\\t<監査エントリ JSON>\\n"
+
+設計上の判断:
+- 書き込み側は O_APPEND で1回の write のみ行う（fsync しない）。O_APPEND の write は
+  他の書き込みと混ざらないため、複数のフックが同時に発火してもレコードは欠落・混在しない
+- 書き込み側は write の間だけ共有ロック（flock LOCK_SH）を保持する。コミッターが
+  スプールを切り詰めるときは排他ロックを取り、書き込み途中のレコードを失わない
+- コミット済みの位置は .audit-spool.offset に保存する。日次ログの fsync 後に更新するため、
+  プロセスがクラッシュしても未コミットのレコードは失われない（重複はありうる）
+- コミッターはログディレクトリごとに1つ（.audit-committer.lock の排他ロック）。
+  フックはロックが空いている場合のみコミッターを起動する
+- コミッターはアイドル状態が続くと残りを書き込んで終了する。終了直前に追記された
+  レコードはスプールに残り、次のフック呼び出しで起動するコミッターか SessionEnd の
+  --once が書き込む
+- サイズ超過した日次ログのローテーションと gzip 圧縮、古いログの削除はコミッターが
+  プロセス内で行う（フックのクリティカルパスから外す）
+"""
+
+import os
+import sys
+import time
+
+from spec_hooks import audit_log
+
+SPOOL_NAME = ".audit-spool"
+OFFSET_NAME = ".audit-spool.offset"
+COMMITTER_LOCK_NAME = ".audit-committer.lock"
+
+# コミット済み部分がこのサイズを超えたらスプールを切り詰める
+SPOOL_COMPACT_BYTES = 1024 * 1024
+
+# 1回のバッチで読み取る最大バイト数（メモリ使用量の上限）
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+# バッチ間隔（ミリ秒）- この間に追記されたレコードを1回の書き込みと fsync にまとめる
+BATCH_INTERVAL_MS = int(os.environ.get("SPEC_WORKFLOW_AUDIT_BATCH_MS", "200"))
+
+# 最後のレコードからこの秒数が経過したらコミッターを終了
+IDLE_TIMEOUT = float(os.environ.get("SPEC_WORKFLOW_AUDIT_COMMITTER_IDLE", "30"))
+
+# 耐久性ポリシー: batch = バッチごとに日次ログを fsync、off = fsync しない（OS に任せる）
+FSYNC_POLICIES = ("batch", "off")
+
+
+def fsync_policy() -> str:
+    policy = os.environ.get("SPEC_WORKFLOW_AUDIT_FSYNC", "batch")
+    return policy if policy in FSYNC_POLICIES else "batch"
+
+
+# =============================================================================
+# 書き込み側（フック）
+# =============================================================================
+
+def append_record(log_dir: str, date: str, entry_json: str):
+    """監査エントリをスプールに1回の追記で渡す。"""
+    import fcntl
+
+    fd = os.open(os.path.join(log_dir, SPOOL_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        os.write(fd, f"{date}\t{entry_json}\n".encode("utf-8"))
+    finally:
+        os.close(fd)  # ロックも解放される
+
+
+def committer_running(log_dir: str) -> bool:
+    """コミッターがロックを保持しているか（ロックを取得できなければ実行中）。"""
+    import fcntl
+
+    try:
+        fd = os.open(os.path.join(log_dir, COMMITTER_LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def ensure_committer(log_dir: str):
+    """コミッターが実行中でなければバックグラウンドで起動（待たない）。"""
+    if committer_running(log_dir):
+        return
+    run_hook = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run_hook.py")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        # 新しいセッションで起動し、フックの終了やシグナルの影響を受けないようにする
+        os.posix_spawn(sys.executable, [sys.executable, "-I", "-S", run_hook, "audit-commit", log_dir], os.environ, file_actions=[
+            (os.POSIX_SPAWN_DUP2, devnull, 0),
+            (os.POSIX_SPAWN_DUP2, devnull, 1),
+            (os.POSIX_SPAWN_DUP2, devnull, 2),
+        ], setsid=True)
+    except OSError:
+        pass  # レコードはスプールに残り、次の起動または SessionEnd で書き込まれる
+    finally:
+        os.close(devnull)
+
+
+# =============================================================================
+# コミッター
+# =============================================================================
+
+class Committer:
+    """スプールのレコードを日次ログにまとめて書き込む。"""
+
+    def __init__(self, log_dir: str, policy: str = "batch"):
+        self.log_dir = log_dir
+        self.policy = policy
+        self.spool_path = os.path.join(log_dir, SPOOL_NAME)
+        self.offset_path = os.path.join(log_dir, OFFSET_NAME)
+        self.offset = self._load_offset()
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_path, "r", encoding="ascii") as f:
+                return max(int(f.read().strip() or 0), 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self, offset: int):
+        temp_path = self.offset_path + ".new"  # .tmp は SessionEnd のクリーンアップ対象のため使わない
+        with open(temp_path, "w", encoding="ascii") as f:
+            f.write(str(offset))
+        os.replace(temp_path, self.offset_path)
+        self.offset = offset
+
+    def _write_daily(self, lines: list[bytes]):
+        """日付ごとにまとめて日次ログに追記し、ファイルごとに1回 fsync。"""
+        by_date = {}
+        for line in lines:
+            date, sep, entry = line.partition(b"\t")
+            if not sep:
+                continue  # 不正な行（想定外）は捨てる
+            by_date.setdefault(date.decode("ascii", errors="replace"), []).append(entry)
+
+        for date, entries in by_date.items():
+            log_file = os.path.join(self.log_dir, f"tool-audit-{date}.jsonl")
+            rotate_log_if_needed(log_file, audit_log.MAX_LOG_SIZE_BYTES)
+            with open(log_file, "ab") as f:
+                f.write(b"".join(entries))
+                f.flush()
+                if self.policy == "batch":
+                    os.fsync(f.fileno())
+
+    def _read_from_offset(self, f) -> tuple[list[bytes], int]:
+        """offset 以降の完全な行と、その末尾の位置を返す。"""
+        f.seek(self.offset)
+        data = f.read(MAX_BATCH_BYTES)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return [], self.offset
+        data = data[:end + 1]
+        return data.splitlines(keepends=True), self.offset + len(data)
+
+    def commit_batch(self) -> int:
+        """未コミットのレコードを1バッチ書き込み、書き込んだレコード数を返す。"""
+        try:
+            f = open(self.spool_path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if self.offset > size:
+                # スプールが外部で削除・再作成された場合
+                self.offset = 0
+            if self.offset == size:
+                return 0
+            lines, new_offset = self._read_from_offset(f)
+            if lines:
+                self._write_daily(lines)
+                self._save_offset(new_offset)
+
+        if self.offset >= SPOOL_COMPACT_BYTES:
+            self.compact()
+        return len(lines)
+
+    def compact(self):
+        """全レコードをコミットしてからスプールを切り詰める（書き込み側を排他ロックで待たせる）。"""
+        import fcntl
+
+        fd = os.open(self.spool_path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "rb") as f:
+                while True:
+                    lines, new_offset = self._read_from_offset(f)
+                    if not lines:
+                        break
+                    self._write_daily(lines)
+                    self._save_offset(new_offset)
+            # 切り詰め前に 0 を保存する（この間に停止しても重複になるだけで欠落しない）
+            self._save_offset(0)
+            os.ftruncate(fd, 0)
+        finally:
+            os.close(fd)
+
+    def drain(self) -> int:
+        """スプールが空になるまでコミット。"""
+        total = 0
+        while True:
+            count = self.commit_batch()
+            if not count:
+                return total
+            total += count
+
+
+def rotate_log_if_needed(log_file: str, max_size: int):
+    """サイズ制限を超えた日次ログをローテーションしてプロセス内で gzip 圧縮。"""
+    from spec_hooks.fsutil import gzip_file
+
+    try:
+        if os.path.getsize(log_file) <= max_size:
+            return
+        rotated_file = f"{log_file}.{time.strftime('%H%M%S')}"
+        os.rename(log_file, rotated_file)
+        gzip_file(rotated_file)
+    except OSError:
+        pass
+
+
+def run_committer(log_dir: str, once: bool = False) -> int:
+    import fcntl
+
+    lock_fd = os.open(os.path.join(log_dir, COMMITTER_LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(lock_fd)
+        return 0  # 他のコミッターが実行中（そのコミッターが終了前にすべて書き込む）
+
+    try:
+        audit_log.cleanup_old_logs_if_due(log_dir)
+        committer = Committer(log_dir, fsync_policy())
+        if once:
+            committer.drain()
+            return 0
+
+        last_record = time.monotonic()
+        while True:
+            if committer.commit_batch():
+                last_record = time.monotonic()
+            elif time.monotonic() - last_record > IDLE_TIMEOUT:
+                committer.drain()
+                return 0
+            time.sleep(BATCH_INTERVAL_MS / 1000)
+    finally:
+        os.close(lock_fd)
+
+
+def is_log_dir(path: str) -> bool:
+    """コミッターの引数が .claude 配下のログディレクトリであることを確認。"""
+    resolved = os.path.realpath(path)
+    return os.path.isdir(resolved) and f"{os.sep}.claude{os.sep}" in resolved + os.sep and os.path.basename(resolved) == "logs"
+
+
+def flush(log_dir: str):
+    """未コミットのレコードがあれば書き込む（コミッターが実行中なら何もしない）。"""
+    try:
+        spool_size = os.path.getsize(os.path.join(log_dir, SPOOL_NAME))
+    except OSError:
+        return
+    if spool_size:
+        run_committer(log_dir, once=True)
+
+
+def main(argv: list[str]) -> int:
+    args = [arg for arg in argv if not arg.startswith("--")]
+    if len(args) != 1 or not is_log_dir(args[0]):
+        print("使用方法: run_hook.py audit-commit <.claude 配下の logs ディレクトリ> [--once]", file=sys.stderr)
+        return 2
+    return run_committer(args[0], once="--once" in argv)
@@ -0,0 +1,58 @@
+"""
+サブコマンドのディスパッチ
+
+使用方法:
+  python3 -I -S hooks/run_hook.py <サブコマンド> [引数...]
+
+各サブコマンドのモジュールは呼び出された時点で import する（他のフックのモジュールの
+読み込みコストを払わない）。spec_hooks のモジュールは main(argv) -> int を提供する。
+hooks/ 直下のスクリプト（SCRIPTS）は単独実行と同じく sys.argv を読む main() を呼び出す。
+"""
+
+import importlib
+import sys
+
+# サブコマンド名 → spec_hooks 内のモジュール名
+COMMANDS = {
+    "audit-log": "audit_log",
+    "audit-commit": "audit_spool",
+    "audit-query": "audit_query",
+    "insight-capture": "insight_capture",
+    "insight-compact": "insight_store",
+    "insight-manifest": "insight_manifest",
+    "insight-cluster": "insight_cluster",
+    "insight-move": "insight_transition",
+    "insight-archive": "insight_archive",
+    "pre-compact-save": "pre_compact_save",
+    "spec-context": "spec_context",
+    "subagent-stop": "subagent_stop",
+    "subagent-summary": "subagent_summary",
+    "session-cleanup": "session_cleanup",
+    "teammate-quality-gate": "teammate_quality_gate",
+    "workspace-stats": "workspace_stats",
+}
+
+# サブコマンド名 → hooks/ 直下のスクリプトのモジュール名
+SCRIPTS = {
+    "hook-client": "hook_client",
+    "verify-references": "verify_references",
+    "security-audit-bash": "security_audit_bash_validator",
+}
+
+
+def usage() -> str:
+    return "使用方法: run_hook.py {" + "|".join([*COMMANDS, *SCRIPTS]) + "} [引数...]"
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SCRIPTS:
+        module = importlib.import_module(SCRIPTS[argv[0]])
+        sys.argv = [module.__file__, *argv[1:]]
+        return module.main() or 0
+    if not argv or argv[0] not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(f"spec_hooks.{COMMANDS[argv[0]]}")
+    return module.main(argv[1:])
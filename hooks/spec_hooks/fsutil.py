@@ -0,0 +1,100 @@
+"""
+ファイル操作の共通処理
+
+- atomic_write_json / atomic_write_bytes: 同じディレクトリの一時ファイルに書き込み、fsync してから置換
+- file_lock: タイムアウト付きの排他ロック（flock）
+- gzip_file: gzip コマンドと同様にファイルを .gz に置き換え（更新時刻を保持）
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+
+
+# file_lock の再試行の間隔（秒）
+LOCK_POLL_INTERVAL = 0.005
+
+
+class LockTimeoutError(Exception):
+    """ロック取得がタイムアウトした場合に発生。"""
+
+
+def atomic_write_json(path: str, data, indent: int | None = 2):
+    """
+    JSON をアトミックに書き込む。
+
+    一時ファイル（.tmp）に書き込んで fsync し、os.replace で置換するため、読み取り側が
+    書き込み途中のファイルを見ることはない。失敗時は一時ファイルを削除して例外を再送出。
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # json.dump は Python 実装のエンコーダーで少しずつ書き込むため、C 実装を使う json.dumps で変換する
+            f.write(json.dumps(data, indent=indent, ensure_ascii=False))
+            f.flush()
+            os.fsync(f.fileno())  # リネーム前にデータがディスクに書き込まれることを保証
+        os.replace(temp_path, path)  # os.rename より移植性が高い
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """バイト列をアトミックに書き込む（atomic_write_json と同じ手順）。"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(lock_path: str, timeout: float):
+    """
+    lock_path に対する排他ロックを取得する。
+
+    timeout 秒以内に取得できない場合は LockTimeoutError を送出。ロックは with ブロックを
+    抜けてファイルがクローズされたときに解放される。SIGALRM はメインスレッドでしか使えないため
+    （SubagentStop のランナーはステージをスレッドで実行する）、ノンブロッキングの flock を
+    LOCK_POLL_INTERVAL ごとに再試行する。
+    """
+    import fcntl
+    import time
+
+    deadline = time.monotonic() + timeout
+    with open(lock_path, "w") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise LockTimeoutError("ロック取得がタイムアウトしました") from None
+                time.sleep(LOCK_POLL_INTERVAL)
+        yield lock_file
+
+
+def gzip_file(path: str):
+    """path を path.gz に圧縮して元のファイルを削除（gzip -f 相当、更新時刻を保持）。"""
+    import gzip
+    import shutil
+
+    stat = os.stat(path)
+    target = path + ".gz"
+    with open(path, "rb") as src, open(target, "wb") as raw:
+        with gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=raw, mtime=int(stat.st_mtime)) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.utime(target, (stat.st_atime, stat.st_mtime))
+    os.unlink(path)
@@ -0,0 +1,246 @@
+"""
+フック入力の部分的な読み取り（ストリーミング）
+
+PostToolUse の入力には tool_response（ツールの出力全体、数十 MB になりうる）が含まれるが、
+監査ログ等に必要なのは tool_name、session_id、tool_input 等の一部のキーだけである。
+read_fields は入力をチャンクごとに読みながらトップレベルのキーを走査し、指定したキーの値
+だけを Python の値に変換する。それ以外の値は文字列とネストを追跡して読み飛ばし、保持しない。
+
+使用例:
+    data = read_fields(sys.stdin.buffer, ("session_id", "tool_name", "tool_input"), max_string=1024)
+
+メモリ使用量:
+- 読み取りバッファは CHUNK_SIZE 単位で、消費済みの部分は次の読み取りで破棄する
+- 抽出する値の文字列は max_string 文字で打ち切る（Write の content 等）
+- 読み飛ばす値は構造（文字列、括弧の対応）のみ検査する。json.loads と異なり、
+  読み飛ばした値の中の不正な数値等はエラーにならない
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+# 抽出する文字列を打ち切るまでに集める生バイト数（1文字あたりの最大: サロゲートペアの \uXXXX\uXXXX）
+_MAX_RAW_BYTES_PER_CHAR = 12
+
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+# 文字列の本体（閉じ引用符の手前まで。末尾の未完成のエスケープは含まない）
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\(?:u[0-9a-fA-F]{4}|[^u])[^"\\]*)*', re.DOTALL)
+# コンテナを読み飛ばすときの文字列・括弧以外の部分
+_STRUCTURE_FREE = re.compile(rb'[^"\[\]{}]*')
+_NUMBER = re.compile(rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+_NUMBER_CHARS = re.compile(rb"[0-9+\-.eE]*")
+# 打ち切り位置で分断されたエスケープ（直前の \\\\ の組は完全なエスケープとして残す）
+_PARTIAL_ESCAPE = re.compile(rb"(?<!\\)((?:\\\\)*)\\(?:u[0-9a-fA-F]{0,3})?$")
+_LITERALS = {b"t": (b"true", True), b"f": (b"false", False), b"n": (b"null", None)}
+
+
+class HookInputError(ValueError):
+    """フック入力が JSON オブジェクトとして読み取れない場合に発生。"""
+
+
+class _Reader:
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = b""
+        self.pos = 0
+
+    def fill(self) -> bool:
+        """次のチャンクを読み込む（消費済みの部分は破棄）。EOF なら False。"""
+        chunk = self.stream.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> int:
+        """空白を読み飛ばして次のバイトを返す（消費しない）。"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise HookInputError("入力が途中で終了しています")
+
+    def ensure(self, size: int):
+        while len(self.buf) - self.pos < size:
+            if not self.fill():
+                raise HookInputError("入力が途中で終了しています")
+
+    def expect(self, char: bytes):
+        if self.peek() != char[0]:
+            raise HookInputError(f"{char.decode()} が必要です（位置 {self.pos}）")
+        self.pos += 1
+
+    # --- 文字列 ---
+
+    def string(self, limit: int | None = None, collect: bool = True) -> str | None:
+        """文字列を読む。limit 文字を超える部分は読み飛ばす。collect=False なら値を返さない。"""
+        self.expect(b'"')
+        parts = []
+        remaining = limit * _MAX_RAW_BYTES_PER_CHAR if limit is not None else -1
+        truncated = False
+        while True:
+            end = _STRING_BODY.match(self.buf, self.pos).end()
+            if collect and not truncated:
+                if remaining < 0:
+                    parts.append(self.buf[self.pos:end])
+                else:
+                    piece = self.buf[self.pos:min(end, self.pos + remaining)]
+                    parts.append(piece)
+                    remaining -= len(piece)
+                    truncated = remaining <= 0
+            self.pos = end
+            if end < len(self.buf) and self.buf[end] == 0x22:  # '"'
+                self.pos += 1
+                break
+            if end < len(self.buf) - 5:
+                # 後続が十分にあるのに本体が途切れた（不正なエスケープ）
+                raise HookInputError(f"不正なエスケープ（位置 {end}）")
+            # バッファの終端（エスケープの途中を含む）
+            if not self.fill():
+                raise HookInputError("文字列が閉じられていません")
+        if not collect:
+            return None
+
+        raw = b"".join(parts)
+        if truncated:
+            partial = _PARTIAL_ESCAPE.search(raw)
+            if partial:
+                raw = raw[:partial.start() + len(partial.group(1))]
+            # 打ち切り位置で分断された UTF-8 のマルチバイト文字を除く
+            try:
+                raw.decode("utf-8")
+            except UnicodeDecodeError as e:
+                if e.start >= len(raw) - 3:
+                    raw = raw[:e.start]
+        try:
+            value = json.loads(b'"' + raw + b'"')
+        except ValueError as e:
+            raise HookInputError(f"不正な文字列: {e}") from None
+        return value[:limit] if limit is not None else value
+
+    # --- 値 ---
+
+    def scalar(self):
+        char = self.peek()
+        literal = _LITERALS.get(bytes([char]))
+        if literal:
+            token, value = literal
+            self.ensure(len(token))
+            if self.buf[self.pos:self.pos + len(token)] != token:
+                raise HookInputError(f"不正なリテラル（位置 {self.pos}）")
+            self.pos += len(token)
+            return value
+        # 数値がチャンクの境界で分断されないよう、数値に使われる文字の連続を読み切る
+        while _NUMBER_CHARS.match(self.buf, self.pos).end() == len(self.buf) and self.fill():
+            pass
+        match = _NUMBER.match(self.buf, self.pos)
+        if not match or match.end() == self.pos:
+            raise HookInputError(f"不正な値（位置 {self.pos}）")
+        self.pos = match.end()
+        return json.loads(match.group())
+
+    def value(self, max_string: int | None):
+        """値を Python の値に変換する（文字列は max_string 文字で打ち切り）。"""
+        char = self.peek()
+        if char == 0x22:  # '"'
+            return self.string(max_string)
+        if char == 0x7B:  # '{'
+            self.pos += 1
+            result = {}
+            if self.peek() == 0x7D:
+                self.pos += 1
+                return result
+            while True:
+                key = self.string()
+                self.expect(b":")
+                result[key] = self.value(max_string)
+                if not self.separator(0x7D):
+                    return result
+        if char == 0x5B:  # '['
+            self.pos += 1
+            result = []
+            if self.peek() == 0x5D:
+                self.pos += 1
+                return result
+            while True:
+                result.append(self.value(max_string))
+                if not self.separator(0x5D):
+                    return result
+        return self.scalar()
+
+    def separator(self, close: int) -> bool:
+        """',' なら True、閉じ括弧なら False を返す。"""
+        char = self.peek()
+        self.pos += 1
+        if char == 0x2C:  # ','
+            return True
+        if char == close:
+            return False
+        raise HookInputError(f"',' または閉じ括弧が必要です（位置 {self.pos - 1}）")
+
+    def skip(self):
+        """値を読み飛ばす（保持しない）。"""
+        char = self.peek()
+        if char == 0x22:
+            self.string(collect=False)
+            return
+        if char not in (0x7B, 0x5B):
+            self.scalar()
+            return
+        depth = 0
+        while True:
+            self.pos = _STRUCTURE_FREE.match(self.buf, self.pos).end()
+            if self.pos == len(self.buf):
+                if not self.fill():
+                    raise HookInputError("括弧が閉じられていません")
+                continue
+            char = self.buf[self.pos]
+            if char == 0x22:
+                self.string(collect=False)
+                continue
+            self.pos += 1
+            depth += 1 if char in (0x7B, 0x5B) else -1
+            if depth == 0:
+                return
+
+    def finish(self):
+        """残りの入力が空白のみであることを確認（読み取り側を待たせないよう最後まで読む）。"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                raise HookInputError(f"JSON の後に余分なデータがあります（位置 {self.pos}）")
+            self.buf, self.pos = b"", 0
+            if not self.fill():
+                return
+
+
+def read_fields(stream, keys, max_string: int | None = None) -> dict:
+    """
+    JSON オブジェクトの入力から、トップレベルの keys の値だけを読み取る。
+
+    stream はバイナリのファイルオブジェクト（sys.stdin.buffer 等）。入力は最後まで読む。
+    存在しないキーは結果に含まれない。同じキーが複数回現れた場合は json.loads と同じく最後の値。
+    入力が空、または JSON オブジェクトでない場合は HookInputError を送出。
+    """
+    keys = frozenset(keys)
+    reader = _Reader(stream)
+    reader.expect(b"{")
+    result = {}
+    if reader.peek() == 0x7D:
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.string()
+            reader.expect(b":")
+            if key in keys:
+                result[key] = reader.value(max_string)
+            else:
+                reader.skip()
+            if not reader.separator(0x7D):
+                break
+    reader.finish()
+    return result
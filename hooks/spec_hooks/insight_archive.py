@@ -0,0 +1,425 @@
+"""
+アーカイブしたインサイトのパック（圧縮した追記専用のセグメントファイル）
+
+archive_processed_insights は applied/ と rejected/ のインサイトを archive/ に移動し、archive/ には
+1インサイト1ファイルが蓄積する。数か月使うワークスペースでは数万の inode になり、archive/ を
+列挙する処理（統計、索引の作成）が遅くなる。このモジュールは archive/ のインサイトを
+archive/packs/ のセグメントファイルにまとめ、個別のファイルを削除する。
+
+使用方法:
+  python3 -I -S hooks/run_hook.py insight-archive pack [ワークスペース ID]            # archive/*.json をパック
+  python3 -I -S hooks/run_hook.py insight-archive get <ワークスペース ID> <ID>        # 1件を JSON で出力
+  python3 -I -S hooks/run_hook.py insight-archive search <ワークスペース ID> <文字列>  # 内容を含むものを1行1件で出力
+  python3 -I -S hooks/run_hook.py insight-archive unpack <ワークスペース ID> [--dest ディレクトリ] [ID...]
+                                                       # 個別のファイルに展開（既定は archive/、ID 省略時は全件）
+
+ファイル（insights/archive/packs/）:
+  seg-NNNNNN.pack  フレームを追記したもの。フレームは FRAME ヘッダー（マジック、圧縮後の長さ、CRC32、
+                   件数）と、インサイトの JSON を1行1件にまとめて zlib で圧縮したもの（最大 BLOCK_BYTES）
+  seg-NNNNNN.idx   オフセットの索引。「ID <TAB> フレームの位置 <TAB> フレームの長さ」を1行1件
+  pack.lock        パックのロック
+
+設計上の判断:
+- 追記専用: フレームは書き込んだ後に変更しない。読み取りはロック不要で、索引の行のうちフレームが
+  セグメントの末尾を超えるもの（書き込み途中）と、改行で終わらない行は無視する
+- パックの順序: フレームの追記と fsync → 索引の追記と fsync → 個別のファイルの削除とディレクトリの fsync。
+  途中でクラッシュした場合、次のパックが索引にないフレームを索引に追加し（末尾の不完全なフレームは
+  切り詰める）、既にパックされた ID の個別のファイルは削除するだけにする
+- ランダムアクセス: 索引で ID のフレームを探し、1フレーム（最大 BLOCK_BYTES）だけを展開する
+- ストリーミング: search と iter_archived は個別のファイルとフレームを1つずつ読み、全体を
+  メモリに展開しない
+- 展開: パックから削除はしない（追記専用）。展開したファイルが archive/ に残っている間は
+  同じ ID が両方にあり、次のパックで個別のファイルが削除される（内容が変更されていれば新しい
+  フレームとして追記し、索引の後の行が優先される）
+- パックされたインサイトは insight-move で別の状態に移動できない（archive は最終の状態）
+
+archive_processed_insights は SPEC_WORKFLOW_ARCHIVE_PACK=1 の場合に移動の後でパックする。
+"""
+
+import json
+import os
+import struct
+import sys
+import zlib
+
+from spec_hooks import workspace
+from spec_hooks.insight_transition import validate_insight_id
+
+PACKS_DIR = "packs"
+LOCK_FILE = "pack.lock"
+
+FRAME = struct.Struct(">4sIII")
+FRAME_MAGIC = b"IPK1"
+
+# 1フレームの圧縮前の最大サイズ（ランダムアクセスで展開する量）
+BLOCK_BYTES = 64 * 1024
+
+# セグメントファイルの最大サイズ（超えたら次のセグメントに追記する）
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+LOCK_TIMEOUT = 5.0
+
+# 展開でまとめて書き込む（fsync をまとめる）件数
+UNPACK_BATCH = 500
+
+
+def packs_dir(insights_dir: str) -> str:
+    return os.path.join(insights_dir, "archive", PACKS_DIR)
+
+
+def pack_enabled() -> bool:
+    return os.environ.get("SPEC_WORKFLOW_ARCHIVE_PACK", "0") == "1"
+
+
+# =============================================================================
+# 読み取り
+# =============================================================================
+
+def _segments(directory: str) -> list[str]:
+    """セグメントの名前（拡張子なし、番号の昇順）。"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[:-5] for name in names if name.startswith("seg-") and name.endswith(".pack"))
+
+
+def load_index(insights_dir: str) -> dict[str, tuple[str, int, int]]:
+    """パックされたインサイトの索引（ID → (セグメント, フレームの位置, フレームの長さ)）。"""
+    directory = packs_dir(insights_dir)
+    index = {}
+    for segment in _segments(directory):
+        index.update(_read_segment_index(directory, segment))
+    return index
+
+
+def _read_segment_index(directory: str, segment: str) -> dict[str, tuple[str, int, int]]:
+    try:
+        size = os.path.getsize(os.path.join(directory, f"{segment}.pack"))
+        with open(os.path.join(directory, f"{segment}.idx"), "rb") as f:
+            data = f.read()
+    except OSError:
+        return {}
+    entries = {}
+    # 改行で終わらない最後の行は追記の途中
+    for line in data[:data.rfind(b"\n") + 1].split(b"\n"):
+        parts = line.split(b"\t")
+        if len(parts) != 3:
+            continue
+        try:
+            offset, length = int(parts[1]), int(parts[2])
+        except ValueError:
+            continue
+        if offset + length <= size:
+            entries[parts[0].decode("utf-8", "replace")] = (segment, offset, length)
+    return entries
+
+
+def _read_frame(path: str, offset: int, length: int) -> list[dict] | None:
+    """フレームのインサイト（壊れている場合は None）。"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+    except OSError:
+        return None
+    return _decode_frame(data)
+
+
+def _decode_frame(data: bytes) -> list[dict] | None:
+    if len(data) < FRAME.size:
+        return None
+    magic, size, crc, count = FRAME.unpack_from(data)
+    payload = data[FRAME.size:FRAME.size + size]
+    if magic != FRAME_MAGIC or len(payload) != size or zlib.crc32(payload) != crc:
+        return None
+    try:
+        lines = zlib.decompress(payload).split(b"\n")
+        records = [json.loads(line) for line in lines if line]
+    except (zlib.error, ValueError):
+        return None
+    return records if len(records) == count else None
+
+
+def get(insights_dir: str, insight_id: str, index: dict | None = None) -> dict | None:
+    """アーカイブしたインサイト（個別のファイル、なければパックから。無効な ID は None）。"""
+    if not validate_insight_id(insight_id):
+        return None
+    path = os.path.join(insights_dir, "archive", f"{insight_id}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return get_packed(insights_dir, insight_id, index if index is not None else load_index(insights_dir))
+
+
+def get_packed(insights_dir: str, insight_id: str, index: dict) -> dict | None:
+    """パックされたインサイト（索引で ID のフレームを探し、そのフレームだけを展開する）。"""
+    entry = index.get(insight_id)
+    if entry is None:
+        return None
+    segment, offset, length = entry
+    for record in _read_frame(os.path.join(packs_dir(insights_dir), f"{segment}.pack"), offset, length) or ():
+        if record.get("id") == insight_id:
+            return record
+    return None
+
+
+def iter_packed(insights_dir: str):
+    """パックされたすべてのインサイト（フレームを1つずつ展開する。同じ ID が複数ある場合は索引の最後のもの）。"""
+    directory = packs_dir(insights_dir)
+    index = load_index(insights_dir)
+    for segment in _segments(directory):
+        frames = sorted({(offset, length) for seg, offset, length in index.values() if seg == segment})
+        for offset, length in frames:
+            for record in _read_frame(os.path.join(directory, f"{segment}.pack"), offset, length) or ():
+                if index.get(record.get("id")) == (segment, offset, length):
+                    yield record
+
+
+def iter_archived(insights_dir: str):
+    """アーカイブしたすべてのインサイト（個別のファイル、次にパックの順。同じ ID は個別のファイルを優先）。"""
+    archive_dir = os.path.join(insights_dir, "archive")
+    seen = set()
+    try:
+        names = sorted(name for name in os.listdir(archive_dir) if name.endswith(".json") and not name.startswith("."))
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            with open(os.path.join(archive_dir, name), encoding="utf-8") as f:
+                insight = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(insight, dict):
+            seen.add(name[:-5])
+            yield insight
+    for record in iter_packed(insights_dir):
+        if record.get("id") not in seen:
+            yield record
+
+
+def packed_ids(insights_dir: str) -> set[str]:
+    """パックされたインサイトの ID（パックがなければ空。ディレクトリの確認だけで済む）。"""
+    if not os.path.isdir(packs_dir(insights_dir)):
+        return set()
+    return set(load_index(insights_dir))
+
+
+# =============================================================================
+# パック
+# =============================================================================
+
+def pack(insights_dir: str) -> int:
+    """archive/*.json をパックして個別のファイルを削除し、パックした件数を返す。"""
+    from spec_hooks.fsutil import file_lock
+    from spec_hooks.insight_store import fsync_directory
+
+    archive_dir = os.path.join(insights_dir, "archive")
+    directory = packs_dir(insights_dir)
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(os.path.join(directory, LOCK_FILE), LOCK_TIMEOUT):
+        segment = _recover(directory)
+        index = load_index(insights_dir)
+        names = sorted(name for name in os.listdir(archive_dir)
+                       if name.endswith(".json") and not name.startswith(".")
+                       and os.path.isfile(os.path.join(archive_dir, name)))
+
+        packed = []
+        block, block_size = [], 0
+        for name in names:
+            insight_id = name[:-5]
+            try:
+                with open(os.path.join(archive_dir, name), encoding="utf-8") as f:
+                    insight = json.load(f)
+            except (OSError, ValueError):
+                continue  # 破損ファイルは個別のファイルのまま残す
+            if not isinstance(insight, dict) or insight.get("id", insight_id) != insight_id:
+                continue
+            if insight_id in index and get_packed(insights_dir, insight_id, index) == insight:
+                packed.append(name)  # パック済み（前回の中断、または展開したファイル）
+                continue
+            line = json.dumps(dict(insight, id=insight_id), ensure_ascii=False).encode("utf-8")
+            if block and block_size + len(line) > BLOCK_BYTES:
+                segment = _append_frame(directory, segment, block)
+                packed += [f"{record_id}.json" for record_id, _ in block]
+                block, block_size = [], 0
+            block.append((insight_id, line))
+            block_size += len(line) + 1
+        if block:
+            segment = _append_frame(directory, segment, block)
+            packed += [f"{record_id}.json" for record_id, _ in block]
+
+        for name in packed:
+            try:
+                os.unlink(os.path.join(archive_dir, name))
+            except OSError:
+                pass
+        if packed:
+            fsync_directory(archive_dir)
+    return len(packed)
+
+
+def _append_frame(directory: str, segment: str, block: list[tuple[str, bytes]]) -> str:
+    """フレームをセグメントに追記し（満杯なら次のセグメント）、索引に追記する。追記したセグメントを返す。"""
+    payload = zlib.compress(b"\n".join(line for _, line in block) + b"\n", 6)
+    frame = FRAME.pack(FRAME_MAGIC, len(payload), zlib.crc32(payload), len(block)) + payload
+    path = os.path.join(directory, f"{segment}.pack")
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size and size + len(frame) > SEGMENT_MAX_BYTES:
+        segment = f"seg-{int(segment[4:]) + 1:06d}"
+        path, size = os.path.join(directory, f"{segment}.pack"), 0
+
+    _append(path, frame)
+    _append(os.path.join(directory, f"{segment}.idx"),
+            b"".join(f"{insight_id}\t{size}\t{len(frame)}\n".encode("utf-8") for insight_id, _ in block))
+    return segment
+
+
+def _append(path: str, data: bytes):
+    from spec_hooks.insight_store import _write_all
+
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        _write_all(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _recover(directory: str) -> str:
+    """
+    最後のセグメントの索引にないフレームを索引に追加し、末尾の不完全なフレームを切り詰める
+    （パックの中断からの回復）。追記先のセグメントを返す。
+    """
+    segments = _segments(directory)
+    if not segments:
+        return "seg-000001"
+    segment = segments[-1]
+    path = os.path.join(directory, f"{segment}.pack")
+    indexed = _read_segment_index(directory, segment)
+    position = max((offset + length for _, offset, length in indexed.values()), default=0)
+    size = os.path.getsize(path)
+    if position == size:
+        return segment
+
+    recovered = []
+    with open(path, "rb") as f:
+        while position < size:
+            f.seek(position)
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                break
+            length = FRAME.size + FRAME.unpack(header)[1]
+            f.seek(position)
+            records = _decode_frame(f.read(length))
+            if records is None:
+                break
+            recovered += [f"{record['id']}\t{position}\t{length}\n".encode("utf-8") for record in records]
+            position += length
+    idx_path = os.path.join(directory, f"{segment}.idx")
+    _truncate_partial_line(idx_path)
+    if recovered:
+        _append(idx_path, b"".join(recovered))
+    if position < size:
+        with open(path, "r+b") as f:
+            f.truncate(position)
+            os.fsync(f.fileno())
+    return segment
+
+
+def _truncate_partial_line(path: str):
+    """索引の末尾の改行で終わらない行（追記の途中）を切り詰める。"""
+    try:
+        with open(path, "r+b") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+                os.fsync(f.fileno())
+    except OSError:
+        pass
+
+
+# =============================================================================
+# 展開
+# =============================================================================
+
+def unpack(insights_dir: str, dest: str, insight_ids: list[str] | None = None) -> int:
+    """パックされたインサイトを dest に個別のファイルとして書き込み（既存のファイルは上書きしない）、件数を返す。"""
+    from spec_hooks.insight_store import write_batch
+
+    os.makedirs(dest, exist_ok=True)
+    if insight_ids is None:
+        records = iter_packed(insights_dir)
+    else:
+        index = load_index(insights_dir)
+        records = (get_packed(insights_dir, insight_id, index) for insight_id in insight_ids)
+    count = 0
+    batch = []
+    for record in records:
+        if (record and isinstance(record.get("id"), str) and validate_insight_id(record["id"])
+                and not os.path.exists(os.path.join(dest, f"{record['id']}.json"))):
+            batch.append(record)
+        if len(batch) >= UNPACK_BATCH:
+            count += len(write_batch(batch, dest))
+            batch = []
+    return count + len(write_batch(batch, dest))
+
+
+def main(argv: list[str]) -> int:
+    actions = ("pack", "get", "search", "unpack")
+    if not argv or argv[0] not in actions:
+        print(f"使用方法: insight-archive <{'|'.join(actions)}> [ワークスペース ID] ...", file=sys.stderr)
+        return 1
+    action, args = argv[0], argv[1:]
+    workspace_id = args[0] if args else workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        print("エラー: 無効なワークスペース ID", file=sys.stderr)
+        return 1
+    insights_dir = workspace.get_insights_dir(workspace_id)
+    args = args[1:]
+
+    if action == "pack":
+        if not os.path.isdir(os.path.join(insights_dir, "archive")):
+            return 0
+        count = pack(insights_dir)
+        if count:
+            print(f"アーカイブのインサイト {count} 件をパックしました")
+        return 0
+    if action == "get":
+        if len(args) != 1:
+            print("使用方法: insight-archive get <ワークスペース ID> <ID>", file=sys.stderr)
+            return 1
+        if not validate_insight_id(args[0]):
+            print(f"エラー: 無効なインサイト ID: {args[0]}", file=sys.stderr)
+            return 1
+        insight = get(insights_dir, args[0])
+        if insight is None:
+            print(f"エラー: アーカイブにインサイトが見つかりません: {args[0]}", file=sys.stderr)
+            return 1
+        print(json.dumps(insight, ensure_ascii=False, indent=2))
+        return 0
+    if action == "search":
+        if len(args) != 1:
+            print("使用方法: insight-archive search <ワークスペース ID> <文字列>", file=sys.stderr)
+            return 1
+        needle = args[0].lower()
+        for insight in iter_archived(insights_dir):
+            if needle in str(insight.get("content", "")).lower():
+                print(json.dumps(insight, ensure_ascii=False))
+        return 0
+
+    dest = os.path.join(insights_dir, "archive")
+    if args[:1] == ["--dest"]:
+        if len(args) < 2:
+            print("使用方法: insight-archive unpack <ワークスペース ID> [--dest ディレクトリ] [ID...]", file=sys.stderr)
+            return 1
+        dest, args = args[1], args[2:]
+    count = unpack(insights_dir, dest, args or None)
+    print(f"{count} 件のインサイトを {dest} に展開しました")
+    return 0
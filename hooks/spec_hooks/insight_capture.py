@@ -0,0 +1,402 @@
+"""
+インサイトキャプチャフック: サブエージェント出力からインサイトを抽出・保存
+
+SubagentStop 時に実行され、マーク付きインサイトをキャプチャする。
+フォルダベースアーキテクチャ（ファイルロック不要）。入力形式とディレクトリ構成は
+insight_capture.sh のヘッダーコメントを参照。
+
+主要な設計原則:
+- 各インサイトは個別ファイル（ロック不要）
+- ファイル作成は本質的にアトミック
+- キャプチャとレビューの並行実行が競合なし
+- セッションをまたいだ重複は insight_index の内容ハッシュの索引で除く（ロックは索引の更新のみ）
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from spec_hooks import workspace
+from spec_hooks.transcript import AssistantMessages, validate_transcript_path
+
+# 設定
+MAX_INSIGHT_LENGTH = 10000
+# トランスクリプトの読み取りの時間予算（秒）。hooks.json では SubagentStop の subagent_stop.sh（timeout 5秒）の
+# InsightStage として実行され、この予算は subagent_stop.py の TRANSCRIPT_TIME_BUDGET（サマリー、参照の検証と
+# 共有する1回の走査）と同じ。残りの時間でインサイトの保存と参照の検証を終える
+TRANSCRIPT_TIME_BUDGET = 2.0
+MAX_INSIGHTS_PER_CAPTURE = 100  # レート制限: キャプチャあたりの最大インサイト数
+
+INSIGHT_SUBDIRS = ("pending", "applied", "rejected", "archive")
+
+
+# =============================================================================
+# 設定
+# =============================================================================
+
+class Config:
+    def __init__(self, workspace_id: str, pending_dir: str, agent_name: str = 'unknown'):
+        self.workspace_id = workspace_id
+        self.pending_dir = pending_dir
+        self.transcript_cache_dir = workspace.get_transcript_cache_dir(workspace_id)
+        self.agent_name = agent_name
+        self.max_insight_length = MAX_INSIGHT_LENGTH
+        self.transcript_time_budget = TRANSCRIPT_TIME_BUDGET
+        self.max_insights_per_capture = MAX_INSIGHTS_PER_CAPTURE
+        self.markers = ['INSIGHT', 'LEARNED', 'DECISION', 'PATTERN', 'ANTIPATTERN']
+        self.min_content_length = 11
+
+
+# =============================================================================
+# インサイト抽出（ステートマシン）
+# =============================================================================
+
+# コードブロックとインラインコード（インサイトの抽出前に除去）
+CODE_BLOCK_RE = re.compile(r'```[\s\S]*?```')
+INLINE_CODE_RE = re.compile(r'`[^`\n]+`')
+
+
+def extract_insights(text: str, agent_name: str, config: Config) -> list[dict]:
+    """ステートマシンアプローチとコードブロックフィルタリングでインサイトを抽出。"""
+    if not text:
+        return []
+    return extract_insights_from_messages([text], agent_name, config)
+
+
+def extract_insights_from_messages(messages, agent_name: str, config: Config) -> list[dict]:
+    """
+    メッセージ（テキストのイテラブル）を1件ずつ処理してインサイトを抽出。
+
+    結果はメッセージを "\n" で連結したテキストに extract_insights を適用した場合と同じ
+    （ただしコードブロックはメッセージ内で閉じる）。マーカーの後続行はメッセージをまたいで
+    インサイトの内容に追加されるが、保持するのは切り詰め後の内容が確定するまで。
+    """
+    extractor = InsightExtractor(agent_name, config)
+    for text in messages:
+        extractor.feed(text)
+        if extractor.done:
+            break
+    return extractor.close()
+
+
+class InsightExtractor:
+    """
+    メッセージを1件ずつ受け取ってインサイトを抽出するステートマシン。
+
+    feed でメッセージを渡し、close で最後のインサイトを確定して結果を返す。レート制限
+    （max_insights_per_capture）に達すると done が True になり、以降の feed は何もしない。
+
+    既存のインサイト（insight_index の索引にあるもの）と同じ内容のものは結果に含めず、
+    duplicates に数える。レート制限は新しいインサイトだけを数える（トランスクリプトを
+    先頭から読み直すメインセッションでも、既存の分で上限に達して新しいインサイトを
+    保存できなくなることがない）。索引はロックなしで読み、保存時にロックを取得して判定し直す。
+    """
+
+    def __init__(self, agent_name: str, config: Config):
+        self.agent_name = agent_name
+        self.config = config
+        # マーカー正規表現を構築
+        self.marker_re = re.compile(
+            r'^[ \t]*(' + '|'.join(config.markers) + r'):[ \t]*(.*)$',
+            re.IGNORECASE
+        )
+        self.insights = []
+        self.seen_hashes = set()
+        self.timestamp = datetime.now().isoformat()
+        self.current_marker = None
+        self.current_content = _ContentLines(config.max_insight_length)
+        self.done = False
+        self.duplicates = 0
+        self._index = None
+        self._index_opened = False
+
+    def feed(self, text: str):
+        if self.done:
+            return
+
+        # 前処理: コードブロックとインラインコードを除去
+        text_filtered = CODE_BLOCK_RE.sub('\n', text)
+        text_filtered = INLINE_CODE_RE.sub('', text_filtered)
+
+        for line in text_filtered.split('\n'):
+            # レート制限: 最大インサイト数に達した場合は処理を停止
+            if len(self.insights) >= self.config.max_insights_per_capture:
+                sys.stderr.write(
+                    f"insight_capture: レート制限に到達 ({self.config.max_insights_per_capture} インサイト)\n"
+                )
+                self.done = True
+                return
+
+            match = self.marker_re.match(line)
+
+            if match:
+                # 前のインサイトを保存
+                self._flush()
+
+                # 新しいインサイトを開始
+                self.current_marker = match.group(1).upper()
+                self.current_content = _ContentLines(self.config.max_insight_length)
+                self.current_content.append(match.group(2).strip())
+
+            elif self.current_marker:
+                self.current_content.append(line.strip())
+
+    def close(self) -> list[dict]:
+        # 最後のインサイトを忘れずに（レート制限内であれば）
+        if not self.done and len(self.insights) < self.config.max_insights_per_capture:
+            self._flush()
+        self.done = True
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        return self.insights
+
+    def _flush(self):
+        if self.current_marker and self.current_content.lines:
+            insight = create_insight(
+                self.current_marker, self.current_content.lines, self.timestamp,
+                self.agent_name, self.config, self.seen_hashes
+            )
+            if insight and self._exists(insight['contentHash']):
+                self.duplicates += 1
+            elif insight:
+                self.insights.append(insight)
+
+    def _exists(self, content_hash: str) -> bool:
+        """同じ内容の既存のインサイトがあるか（索引は最初のインサイトで開く）。"""
+        if not self._index_opened:
+            self._index_opened = True
+            from spec_hooks.insight_index import InsightIndex
+
+            try:
+                self._index = InsightIndex.snapshot(os.path.dirname(self.config.pending_dir))
+            except OSError:
+                pass  # 保存時の判定のみ
+        return self._index is not None and self._index.find(content_hash) is not None
+
+
+def normalize_content(content_lines: list[str]) -> str:
+    content = ' '.join(content_lines)
+    content = re.sub(r'\\\s*', ' ', content)
+    return re.sub(r'\s+', ' ', content).strip()
+
+
+class _ContentLines:
+    """
+    インサイトの内容の行（空行を除く）。
+
+    create_insight は正規化後の内容を max_length 文字で切り詰めるため、正規化後の先頭
+    max_length + 2 文字が確定した時点でそれだけを残し、以降の行は保持しない（マーカーの後に
+    長いメッセージが続いてもメモリ使用量が増えない）。正規化は局所的（空白の連続と '\\' の置換）
+    なので、後続の行によって確定済みの先頭部分は変わらない。
+    """
+
+    def __init__(self, max_length: int):
+        self.lines = []
+        self.max_length = max_length
+        self.size = 0
+        self.next_check = max_length + 4
+        self.full = False
+
+    def append(self, line: str):
+        if not line or self.full:
+            return
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if self.size < self.next_check:
+            return
+        normalized = normalize_content(self.lines)
+        if len(normalized) > self.max_length + 3:
+            # 末尾の1文字は後続の行との連結で変わりうるため、その手前までを残す
+            self.lines = [normalized[:self.max_length + 2]]
+            self.full = True
+        else:
+            self.next_check = self.size * 2
+
+
+def create_insight(
+    marker: str,
+    content_lines: list[str],
+    timestamp: str,
+    agent_name: str,
+    config: Config,
+    seen_hashes: set
+) -> dict | None:
+    """検証と重複排除を行いインサイトオブジェクトを作成。"""
+    content = normalize_content(content_lines)
+
+    if len(content) < config.min_content_length:
+        return None
+
+    if len(content) > config.max_insight_length:
+        content = content[:config.max_insight_length] + '... [truncated]'
+
+    # 重複排除
+    content_hash = hashlib.sha256(content.lower().encode()).hexdigest()[:16]
+    if content_hash in seen_hashes:
+        return None
+    seen_hashes.add(content_hash)
+
+    # ユニーク ID を生成（uuid4().hex[:8] と同じランダムな16進8文字。uuid は platform の import が重いため使わない）
+    insight_id = f"INS-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.urandom(4).hex()}"
+
+    return {
+        "id": insight_id,
+        "timestamp": timestamp,
+        "category": marker.lower(),
+        "content": content,
+        "source": agent_name,
+        "status": "pending",
+        "contentHash": content_hash,
+        "workspaceId": config.workspace_id
+    }
+
+
+# =============================================================================
+# ファイル操作（ロック不要！）
+# =============================================================================
+
+def save_insights_to_files(insights: list[dict], pending_dir: str) -> tuple[int, int]:
+    """
+    インサイトを保存し、(保存した数, 既存と重複した数) を返す。
+
+    保存は insight_store.save_insights が行う（既定では1回のキャプチャのファイルの fsync と
+    ディレクトリの fsync をまとめる。SPEC_WORKFLOW_INSIGHT_STORAGE=segment ではセグメントログに追記）。
+    ロックが不要な理由:
+    1. 各ファイルがユニークな名前を持つ（タイムスタンプ + ランダムな16進8文字）
+    2. 一時ファイルに書き込んでからリネーム（POSIX ではアトミック）
+
+    既存のインサイト（pending/、applied/、rejected/、archive/ のいずれか）と内容が同じものは
+    insight_index の索引で判定して保存しない。索引のロックは重複の判定と登録の間だけ保持する
+    （同時に終了したサブエージェントが同じ内容を保存しない）。索引を使えない場合は重複を
+    確認せずに保存する。保存後に保留中のインサイトのマニフェストを更新する。
+    """
+    if not insights:
+        return 0, 0
+
+    from spec_hooks.fsutil import LockTimeoutError
+    from spec_hooks.insight_index import InsightIndex
+    from spec_hooks.insight_store import save_insights
+
+    saved = None
+    duplicates = 0
+    try:
+        with InsightIndex.open(os.path.dirname(pending_dir)) as index:
+            new = [insight for insight in insights if index.find(insight['contentHash']) is None]
+            duplicates = len(insights) - len(new)
+            saved = save_insights(new, pending_dir)
+            for insight in saved:
+                index.add(insight['contentHash'], insight['id'])
+    except (OSError, LockTimeoutError) as e:
+        sys.stderr.write(f"insight_capture: 重複の索引を使用できません（重複を確認せずに保存）: {e}\n")
+
+    if saved is None:
+        saved, duplicates = save_insights(insights, pending_dir), 0
+    if saved:
+        from spec_hooks.insight_manifest import record_saved
+
+        record_saved(os.path.dirname(pending_dir), saved)
+    return len(saved), duplicates
+
+
+# =============================================================================
+# メイン
+# =============================================================================
+
+def capture(hook_input: str, config: Config) -> dict:
+    """フック入力を処理し、出力する JSON オブジェクトを返す。"""
+    # フック入力をパース
+    try:
+        metadata = json.loads(hook_input)
+    except json.JSONDecodeError:
+        return {"continue": True}
+
+    # 無限ループ防止
+    if metadata.get('stop_hook_active', False):
+        return {"continue": True}
+
+    # トランスクリプトパスを取得・検証
+    # agent_transcript_path（サブエージェント自身のトランスクリプト）を transcript_path（メインセッション）より優先
+    transcript_path = metadata.get('agent_transcript_path', '') or metadata.get('transcript_path', '')
+    if not transcript_path:
+        return {"continue": True}
+
+    is_valid, error_msg, resolved_path = validate_transcript_path(transcript_path)
+    if not is_valid:
+        sys.stderr.write(f"insight_capture: 無効なパス - {error_msg}\n")
+        return {"continue": True}
+
+    # 解決済みパスを使用してメッセージを読みながらインサイトを抽出（TOCTOU 攻撃を防止）
+    messages = AssistantMessages(
+        resolved_path, config.transcript_cache_dir, deadline=time.monotonic() + config.transcript_time_budget)
+    extractor = InsightExtractor(config.agent_name, config)
+    for text in messages:
+        extractor.feed(text)
+        if extractor.done:
+            break
+    return save_and_report(extractor, messages, config)
+
+
+def save_and_report(extractor: InsightExtractor, messages: AssistantMessages, config: Config) -> dict:
+    """抽出したインサイトを保存し、出力する JSON オブジェクトを返す（messages は読み終えたもの）。"""
+    # 各インサイトを個別ファイルとして保存（ロック不要！）
+    count, duplicates = save_insights_to_files(extractor.close(), config.pending_dir)
+    duplicates += extractor.duplicates
+
+    messages_note = ""
+    if not messages.complete:
+        # 時間予算に達した: 読み取り位置は保存済みのため、次回の SubagentStop で続きから読む
+        messages_note = (
+            f"トランスクリプトの読み取りが時間制限（{config.transcript_time_budget:.0f}秒）に達したため、"
+            f"{messages.bytes_read / (1024 * 1024):.1f}MB / {messages.size / (1024 * 1024):.1f}MB まで処理しました。"
+            "残りは次回のサブエージェント完了時に処理されます。"
+        )
+        sys.stderr.write(f"insight_capture: {messages_note}\n")
+
+    duplicates_note = f"（{duplicates} 件は既存のインサイトと同じ内容のため保存しませんでした）" if duplicates else ""
+    if count > 0:
+        return {
+            "continue": True,
+            "systemMessage": f"{count} 件のインサイトをキャプチャしました{duplicates_note}。評価するには /spec-workflow-toolkit:review-insights を実行してください。"
+            + (f" {messages_note}" if messages_note else "")
+        }
+    if messages_note:
+        return {"continue": True, "systemMessage": messages_note}
+    return {"continue": True}
+
+
+def load_config(workspace_id: str) -> Config:
+    """ワークスペースのインサイトディレクトリを作成し、設定を返す。"""
+    insights_base = workspace.get_insights_dir(workspace_id)
+    for subdir in INSIGHT_SUBDIRS:
+        os.makedirs(os.path.join(insights_base, subdir), exist_ok=True)
+
+    return Config(
+        workspace_id,
+        os.path.join(insights_base, "pending"),
+        os.environ.get("CLAUDE_AGENT_NAME") or "unknown",
+    )
+
+
+def main(argv: list[str]) -> int:
+    try:
+        # フック入力を読み取り（JSON メタデータ、サブエージェント出力ではない）
+        hook_input = sys.stdin.read()
+        if not hook_input.rstrip("\n"):
+            print(json.dumps({"continue": True}))
+            return 0
+
+        # ワークスペース固有のパスを取得し、ディレクトリの存在を確認
+        config = load_config(workspace.get_workspace_id())
+        result = capture(hook_input, config)
+    except Exception as e:
+        sys.stderr.write(f"insight_capture 致命的エラー: {e}\n")
+        result = {"continue": True}
+
+    # 結果を出力
+    print(json.dumps(result))
+    return 0
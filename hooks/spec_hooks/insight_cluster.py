@@ -0,0 +1,199 @@
+"""
+保留中のインサイトの類似グループ（MinHash と LSH）
+
+insight_capture の重複排除は内容の完全一致（contentHash）だけを扱うため、並行したサブエージェントが
+出力した「1〜2語だけ異なる」インサイトはそれぞれ pending/ に残る。/review-insights はこのモジュールで
+保留中のインサイトを類似グループにまとめ、グループ単位で承認・却下できるようにする。
+
+使用方法:
+  python3 -I -S hooks/run_hook.py insight-cluster [ワークスペース ID]   # 類似グループを JSON で出力
+
+方法:
+- 署名: 内容（小文字化し空白をまとめたもの）の文字3-gram の集合の MinHash（NUM_PERM 個の32ビット値。
+  one permutation hashing で各 shingle のハッシュは1回だけ計算する）。日本語と英語のどちらも
+  単語分割なしで扱える。2つの署名の一致する位置の割合が Jaccard 係数の推定値
+- LSH: 署名を BANDS 個のバンド（ROWS 個ずつ）に分け、いずれかのバンドが一致するものを候補とする
+  （全ペアの比較をしない）。候補は推定類似度が SIMILARITY_THRESHOLD 以上の場合だけ同じグループにする
+  （Union-Find。バンドの一致だけではグループにしない）
+- 署名は insights/signatures.json に保存し、次回は署名のない（新しい）インサイトのファイルだけを開く。
+  保留中でなくなった ID の署名は削除する。インサイトのファイルは作成後に変更されないため、
+  ID が同じなら署名も同じ
+"""
+
+import base64
+import hashlib
+import json
+import os
+import struct
+import sys
+
+from spec_hooks import insight_manifest, workspace
+
+SIGNATURES_FILE = "signatures.json"
+SIGNATURES_VERSION = 1
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# 同じグループにする推定類似度（文字3-gram の Jaccard 係数）の下限
+SIMILARITY_THRESHOLD = 0.7
+
+SHINGLE_SIZE = 3
+
+_SIGNATURE = struct.Struct(f">{NUM_PERM}I")
+
+# 空のビンを埋める値に加える定数（距離ごとに異なる値にする。回転による densification）
+_DENSIFY_OFFSET = 0x9E3779B1
+
+
+def shingles(content: str) -> set[str]:
+    text = " ".join(content.lower().split())
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(content: str) -> tuple[int, ...]:
+    """
+    内容の MinHash 署名（NUM_PERM 個の32ビット値）。
+
+    NUM_PERM 個のハッシュ関数の代わりに、各 shingle のハッシュを1回だけ計算して NUM_PERM 個のビンに
+    振り分け、ビンごとの最小値を取る（one permutation hashing。計算量は shingle 数に比例）。
+    shingle のないビンは右隣の空でないビンの値で埋める（回転による densification）。
+    """
+    bins: list[int | None] = [None] * NUM_PERM
+    for shingle in shingles(content):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        index, value = h % NUM_PERM, h // NUM_PERM
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+    values = []
+    for index in range(NUM_PERM):
+        distance = 0
+        while bins[(index + distance) % NUM_PERM] is None:
+            distance += 1
+        values.append((bins[(index + distance) % NUM_PERM] + distance * _DENSIFY_OFFSET) & 0xFFFFFFFF)
+    return tuple(values)
+
+
+def similarity(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+    """2つの署名から推定した Jaccard 係数。"""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+def load_signatures(insights_dir: str, pending_ids: list[str], save: bool = True) -> dict[str, tuple[int, ...]]:
+    """保留中のインサイトの署名（保存済みの署名を使い、ない ID だけファイルを読んで計算する）。"""
+    path = os.path.join(insights_dir, SIGNATURES_FILE)
+    stored = _read_signatures(path)
+    signatures = {}
+    changed = len(stored) != len(pending_ids)
+    for insight_id in pending_ids:
+        encoded = stored.get(insight_id)
+        if isinstance(encoded, str):
+            try:
+                signatures[insight_id] = _SIGNATURE.unpack(base64.b64decode(encoded))
+                continue
+            except (ValueError, struct.error):
+                pass
+        content = _read_content(os.path.join(insights_dir, "pending", f"{insight_id}.json"))
+        if content is None:
+            continue  # 破損ファイルはグループにしない
+        signatures[insight_id] = signature(content)
+        changed = True
+
+    if changed and save:
+        data = {
+            "version": SIGNATURES_VERSION,
+            "signatures": {insight_id: base64.b64encode(_SIGNATURE.pack(*values)).decode("ascii")
+                           for insight_id, values in signatures.items()},
+        }
+        try:
+            from spec_hooks.fsutil import atomic_write_json
+
+            atomic_write_json(path, data, indent=None)
+        except OSError:
+            pass  # 次回も計算し直す
+    return signatures
+
+
+def _read_signatures(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (not isinstance(data, dict) or data.get("version") != SIGNATURES_VERSION
+            or not isinstance(data.get("signatures"), dict)):
+        return {}
+    return data["signatures"]
+
+
+def _read_content(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            insight = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(insight, dict) or not isinstance(insight.get("content"), str):
+        return None
+    return insight["content"]
+
+
+def cluster(signatures: dict[str, tuple[int, ...]]) -> list[list[str]]:
+    """類似グループ（2件以上。各グループは ID の昇順、グループは件数の降順）。"""
+    parent = {insight_id: insight_id for insight_id in signatures}
+
+    def find(insight_id: str) -> str:
+        while parent[insight_id] != insight_id:
+            parent[insight_id] = parent[parent[insight_id]]
+            insight_id = parent[insight_id]
+        return insight_id
+
+    for band in range(BANDS):
+        buckets: dict[tuple[int, ...], list[str]] = {}
+        start = band * ROWS
+        for insight_id in sorted(signatures):
+            buckets.setdefault(signatures[insight_id][start:start + ROWS], []).append(insight_id)
+        for members in buckets.values():
+            # バケット内は先頭との類似度だけを確認する（他のバンドのバケットで補われる）
+            anchor = members[0]
+            for other in members[1:]:
+                if find(anchor) != find(other) and \
+                        similarity(signatures[anchor], signatures[other]) >= SIMILARITY_THRESHOLD:
+                    parent[find(other)] = find(anchor)
+
+    groups: dict[str, list[str]] = {}
+    for insight_id in sorted(signatures):
+        groups.setdefault(find(insight_id), []).append(insight_id)
+    return sorted((ids for ids in groups.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+
+
+def main(argv: list[str]) -> int:
+    workspace_id = argv[0] if argv else workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        print("エラー: 無効なワークスペース ID", file=sys.stderr)
+        return 1
+    insights_dir = workspace.get_insights_dir(workspace_id)
+    save = os.path.isdir(insights_dir)
+    pending = insight_manifest.load_pending(insights_dir, save=save)
+    signatures = load_signatures(insights_dir, sorted(pending), save=save)
+    clusters = []
+    for ids in cluster(signatures):
+        # 代表は最も古いインサイト（ID の昇順の先頭）
+        representative = ids[0]
+        clusters.append({
+            "representative": representative,
+            "size": len(ids),
+            "members": [dict(pending[insight_id], id=insight_id,
+                             similarity=round(similarity(signatures[representative], signatures[insight_id]), 2))
+                        for insight_id in ids],
+        })
+    print(json.dumps({
+        "workspaceId": workspace_id,
+        "pending": len(pending),
+        "clusters": clusters,
+        "unclustered": len(pending) - sum(c["size"] for c in clusters),
+    }, ensure_ascii=False, indent=2))
+    return 0
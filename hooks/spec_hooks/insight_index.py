@@ -0,0 +1,370 @@
+"""
+インサイトの内容ハッシュの索引（セッションをまたいだ重複排除）
+
+insight_capture は同じキャプチャ内の重複を seen_hashes で除くが、複数のサブエージェントや
+セッションが同じ内容を出力すると pending/ に同じインサイトが繰り返し保存される。この索引は
+pending/、applied/、rejected/、archive/ のすべてのインサイトの contentHash → インサイト ID を
+保持し、ディレクトリを列挙せずに重複を判定する。
+
+ファイル（insights/ 直下）:
+  content-index.bin   本体。JSON のヘッダー行の後に RECORD（20バイト）を contentHash の昇順に並べたもの
+  content-index.log   ジャーナル。本体の作成後に追加されたレコードを追記する（JOURNAL_LIMIT 件で本体に統合）
+  content-index.lock  更新のロック
+
+  - 検索: contentHash（SHA-256 の先頭64ビット）は一様に分布するため、本体の位置をハッシュの値から
+    補間して求める（期待値で数回の比較、10万件でも本体の読み取りはレコード数件分）
+  - 大きさ: 1件20バイト（10万件で約2MB）。本体は mmap で開き、全体を読み込まない
+  - 状態: 索引はハッシュと ID だけを持ち、状態（pending/applied/...）は見つかった ID のファイルが
+    どのディレクトリ（またはセグメントログ）にあるかで決める。review-insights の mv や
+    archive_processed_insights による移動では索引を更新する必要がない。どのディレクトリにもない
+    （削除された）場合は重複としない
+  - 更新: ジャーナルへの追記（O_APPEND と fsync）と、本体の置き換え（アトミックな書き込み）のみ。
+    追記の途中で中断した末尾の不完全なレコードは読み取り時に無視する
+  - 作成: 本体がない、または壊れている場合は 4つのディレクトリのインサイトを読んで作り直す
+    （REBUILD_TIME_BUDGET で打ち切った場合は complete: false とし、次回に続きを読む）
+
+ID が INS-{14桁の日時}-{16進8文字} の形式でないインサイトは索引に含めない（重複として検出されない）。
+
+使用例:
+    with InsightIndex.open(insights_dir) as index:
+        existing = index.find(insight["contentHash"])   # (ID, 状態) または None
+        if existing is None:
+            ...  # インサイトを保存
+            index.add(insight["contentHash"], insight["id"])
+
+    # 抽出中にロックを保持せずに既存のインサイトを除く場合
+    index = InsightIndex.snapshot(insights_dir)
+    try:
+        known = index.find(insight["contentHash"]) is not None
+    finally:
+        index.close()
+"""
+
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import time
+
+from spec_hooks.fsutil import atomic_write_bytes, file_lock
+
+INDEX_FILE = "content-index.bin"
+JOURNAL_FILE = "content-index.log"
+LOCK_FILE = "content-index.lock"
+
+INDEX_VERSION = 1
+
+# ジャーナルのレコード数がこれを超えたら本体に統合する
+JOURNAL_LIMIT = 4096
+
+# 索引を作り直す際にインサイトのファイルを読む時間の上限（秒）。超えた分は次回に続きを読む
+REBUILD_TIME_BUDGET = 0.5
+
+# ロックの待ち時間の上限（秒）
+LOCK_TIMEOUT = 1.0
+
+# 状態のディレクトリ（見つかった ID のファイルを探す順）
+STATUS_DIRS = ("pending", "applied", "rejected", "archive")
+
+# contentHash（16進16文字 = 64ビット）、ID の日時（14桁の整数）、ID のランダム部分（32ビット）
+RECORD = struct.Struct(">QQI")
+
+_ID_PATTERN = re.compile(r"INS-(\d{14})-([0-9a-f]{8})")
+_HASH_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+
+def encode(content_hash: str, insight_id: str) -> bytes | None:
+    """(contentHash, ID) のレコード（形式が異なる場合は None）。"""
+    match = _ID_PATTERN.fullmatch(insight_id)
+    if not match or not _HASH_PATTERN.fullmatch(content_hash):
+        return None
+    return RECORD.pack(int(content_hash, 16), int(match.group(1)), int(match.group(2), 16))
+
+
+def decode_id(stamp: int, random_part: int) -> str:
+    return f"INS-{stamp:014d}-{random_part:08x}"
+
+
+class InsightIndex:
+    """
+    開いた索引（ロックを保持する）。
+
+    find と add は同じ with ブロックの中で使う。add したレコードは find の結果に含まれ、
+    with ブロックを抜けるときにジャーナルに追記される（ジャーナルが JOURNAL_LIMIT を
+    超えた場合は本体に統合する）。
+    """
+
+    def __init__(self, insights_dir: str):
+        self.insights_dir = insights_dir
+        self.index_file = os.path.join(insights_dir, INDEX_FILE)
+        self.journal_file = os.path.join(insights_dir, JOURNAL_FILE)
+        self.header = {}
+        self.count = 0
+        self._data = None
+        self._body = 0
+        # ジャーナルと add したレコード: contentHash（整数）→ (日時, ランダム部分)
+        self.recent = {}
+        self.journal_count = 0
+        self.added = []
+        self._segment_ids = None
+        self._packed_ids = None
+
+    @classmethod
+    def open(cls, insights_dir: str, lock_timeout: float = LOCK_TIMEOUT) -> "_Session":
+        """ロックを取得して索引を開く（with で使う。ロックを取得できない場合は LockTimeoutError）。"""
+        return _Session(cls(insights_dir), lock_timeout)
+
+    @classmethod
+    def snapshot(cls, insights_dir: str) -> "InsightIndex":
+        """
+        ロックを取得せずに索引を開く（find のみに使い、close で閉じる）。
+
+        本体はアトミックに置き換えられ、ジャーナルの不完全な末尾のレコードは無視するため、
+        ロックなしでも読み取れる。本体がない、または未完成でも作り直さない（見つからなかった
+        インサイトは保存時に open で判定し直す）。
+        """
+        index = cls(insights_dir)
+        index._load_journal()
+        index._map_index()
+        return index
+
+    # ------------------------------------------------------------------
+    # 読み込み
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        self._load_journal()
+        if not self._map_index() or not self.header.get("complete"):
+            self._rebuild()
+
+    def _load_journal(self):
+        self.recent = {}
+        try:
+            with open(self.journal_file, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        # 追記が途中で中断した末尾の不完全なレコードは無視する
+        usable = len(data) - len(data) % RECORD.size
+        for key, stamp, random_part in RECORD.iter_unpack(data[:usable]):
+            self.recent[key] = (stamp, random_part)
+        self.journal_count = usable // RECORD.size
+
+    def _map_index(self) -> bool:
+        """本体を mmap で開く（ない、または壊れている場合は False）。"""
+        self._close_map()
+        try:
+            with open(self.index_file, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if not size:
+                    return False
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            end = data.find(b"\n", 0, 4096)
+            header = json.loads(data[:end]) if end >= 0 else None
+            count = header.get("count") if isinstance(header, dict) else None
+            if (header.get("version") != INDEX_VERSION or not isinstance(count, int)
+                    or size - end - 1 != count * RECORD.size):
+                raise ValueError("壊れた索引")
+        except (ValueError, AttributeError):
+            data.close()
+            return False
+        self._data, self._body, self.header, self.count = data, end + 1, header, count
+        return True
+
+    def _close_map(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self.header, self.count = {}, 0
+
+    # ------------------------------------------------------------------
+    # 検索
+    # ------------------------------------------------------------------
+
+    def _record(self, position: int) -> tuple[int, int, int]:
+        return RECORD.unpack_from(self._data, self._body + position * RECORD.size)
+
+    def _search(self, key: int) -> tuple[int, int] | None:
+        """本体の補間探索（ハッシュが一様に分布するため期待値で O(1) 回の比較）。"""
+        low, high = 0, self.count - 1
+        while low <= high:
+            low_key = self._record(low)[0]
+            high_key = self._record(high)[0]
+            if key < low_key or key > high_key:
+                return None
+            if high_key == low_key:
+                position = low
+            else:
+                position = low + (key - low_key) * (high - low) // (high_key - low_key)
+            found, stamp, random_part = self._record(position)
+            if found == key:
+                return stamp, random_part
+            if found < key:
+                low = position + 1
+            else:
+                high = position - 1
+        return None
+
+    def _locate(self, insight_id: str) -> str | None:
+        """ID のファイルがある状態のディレクトリ名（どこにもない場合は None）。"""
+        for status in STATUS_DIRS:
+            if os.path.isfile(os.path.join(self.insights_dir, status, f"{insight_id}.json")):
+                return status
+        # セグメントログ（insight_store）に追記され、まだ pending/ に展開されていないもの
+        if self._segment_ids is None:
+            from spec_hooks.insight_store import segment_ids
+
+            self._segment_ids = segment_ids(self.insights_dir)
+        if insight_id in self._segment_ids:
+            return "pending"
+        # アーカイブのパック（insight_archive）にまとめられ、個別のファイルが削除されたもの
+        if self._packed_ids is None:
+            from spec_hooks.insight_archive import packed_ids
+
+            self._packed_ids = packed_ids(self.insights_dir)
+        return "archive" if insight_id in self._packed_ids else None
+
+    def find(self, content_hash: str) -> tuple[str, str] | None:
+        """同じ contentHash の既存のインサイトの (ID, 状態)。ない、またはファイルが削除された場合は None。"""
+        if not _HASH_PATTERN.fullmatch(content_hash):
+            return None
+        key = int(content_hash, 16)
+        entry = self.recent.get(key)
+        if entry is None and self._data is not None:
+            entry = self._search(key)
+        if entry is None:
+            return None
+        insight_id = decode_id(*entry)
+        status = self._locate(insight_id)
+        return (insight_id, status) if status else None
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+
+    def add(self, content_hash: str, insight_id: str):
+        """保存したインサイトを登録する（形式の異なる ID は無視）。"""
+        record = encode(content_hash, insight_id)
+        if record is None:
+            return
+        key, stamp, random_part = RECORD.unpack(record)
+        self.recent[key] = (stamp, random_part)
+        self.added.append(record)
+
+    def _flush(self):
+        """add したレコードをジャーナルに追記し、必要なら本体に統合する。"""
+        if self.added:
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, b"".join(self.added))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.journal_count += len(self.added)
+            self.added = []
+        if self.journal_count > JOURNAL_LIMIT:
+            self._write_index(self._entries(), complete=bool(self.header.get("complete")))
+
+    def _entries(self) -> dict[int, tuple[int, int]]:
+        """本体とジャーナルのすべてのレコード（ジャーナルが優先）。"""
+        entries = {}
+        if self._data is not None:
+            body = self._data[self._body:self._body + self.count * RECORD.size]
+            entries = {key: (stamp, random_part) for key, stamp, random_part in RECORD.iter_unpack(body)}
+        entries.update(self.recent)
+        return entries
+
+    def _write_index(self, entries: dict[int, tuple[int, int]], complete: bool):
+        """本体を置き換えてジャーナルを空にする（置き換え後に中断しても統合済みのレコードが重なるだけ）。"""
+        header = {"version": INDEX_VERSION, "count": len(entries), "complete": complete,
+                  "built_at": time.time()}
+        body = b"".join(RECORD.pack(key, *entries[key]) for key in sorted(entries))
+        atomic_write_bytes(self.index_file, json.dumps(header).encode() + b"\n" + body)
+        with open(self.journal_file, "wb"):
+            pass
+        self.journal_count = 0
+        self._map_index()
+
+    def _rebuild(self):
+        """
+        インサイトのファイルから本体を作り直す（既に索引にある ID のファイルは読まない）。
+
+        REBUILD_TIME_BUDGET を超えた場合は読んだ分までで complete: false として保存する。
+        """
+        entries = self._entries()
+        known = set(entries.values())
+        deadline = time.monotonic() + REBUILD_TIME_BUDGET
+        complete = True
+        for status in STATUS_DIRS:
+            try:
+                with os.scandir(os.path.join(self.insights_dir, status)) as it:
+                    names = sorted(entry.name for entry in it if entry.name.endswith(".json"))
+            except OSError:
+                continue
+            for name in names:
+                match = _ID_PATTERN.fullmatch(name[:-5])
+                if not match or (int(match.group(1)), int(match.group(2), 16)) in known:
+                    continue
+                if time.monotonic() > deadline:
+                    complete = False
+                    break
+                try:
+                    with open(os.path.join(self.insights_dir, status, name), encoding="utf-8") as f:
+                        content_hash = json.load(f).get("contentHash", "")
+                except (OSError, ValueError, AttributeError):
+                    continue
+                record = encode(content_hash, name[:-5]) if isinstance(content_hash, str) else None
+                if record is not None:
+                    key, stamp, random_part = RECORD.unpack(record)
+                    # 同じ内容が複数ある場合（索引の導入前の重複）は最初に見つかったもの
+                    entries.setdefault(key, (stamp, random_part))
+                    known.add((stamp, random_part))
+            if not complete:
+                break
+        if complete:
+            # セグメントログ（insight_store）の未展開のインサイトと、アーカイブのパック（insight_archive）の
+            # インサイト
+            from spec_hooks.insight_archive import iter_packed
+            from spec_hooks.insight_store import read_segment
+
+            for insight in itertools.chain(read_segment(self.insights_dir), iter_packed(self.insights_dir)):
+                content_hash = insight.get("contentHash")
+                record = encode(content_hash, insight["id"]) if isinstance(content_hash, str) else None
+                if record is not None:
+                    key, stamp, random_part = RECORD.unpack(record)
+                    entries.setdefault(key, (stamp, random_part))
+        self._write_index(entries, complete)
+        self.recent = {}
+
+    def close(self):
+        self._close_map()
+
+
+class _Session:
+    """InsightIndex.open の戻り値（ロックの取得と解放、索引の読み込みとジャーナルへの追記）。"""
+
+    def __init__(self, index: InsightIndex, lock_timeout: float):
+        self.index = index
+        self.lock = file_lock(os.path.join(index.insights_dir, LOCK_FILE), lock_timeout)
+
+    def __enter__(self) -> InsightIndex:
+        self.lock.__enter__()
+        try:
+            self.index._load()
+        except BaseException:
+            self.index.close()
+            self.lock.__exit__(None, None, None)
+            raise
+        return self.index
+
+    def __exit__(self, *exc_info):
+        try:
+            self.index._flush()
+        finally:
+            self.index.close()
+            self.lock.__exit__(None, None, None)
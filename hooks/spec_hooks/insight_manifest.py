@@ -0,0 +1,234 @@
+"""
+保留中のインサイトのマニフェスト
+
+SessionStart（spec_context）は保留中のインサイトの数と最新のプレビューを表示し、/review-insights は
+保留中のインサイトの一覧から始める。どちらも pending/ を列挙して各ファイルを開く代わりに
+マニフェストを読む:
+
+  insights/manifest.json          状態ごとの数と最新 LATEST_KEEP 件の保留中インサイトの要約
+                                  （保留中のインサイトの数によらず一定のサイズ。SessionStart が読む）
+  insights/manifest-pending.json  保留中のすべてのインサイトの要約（/review-insights が読む）
+
+要約は ID、カテゴリ、ソース、日時、プレビュー（先頭 PREVIEW_LENGTH 文字）。
+
+使用方法:
+  python3 -I -S hooks/run_hook.py insight-manifest [ワークスペース ID]   # 件数と保留中の一覧を JSON で出力
+
+形式:
+  manifest.json:
+    {"version": 1,
+     "dirs": {"pending": {"mtime_ns": ..., "count": 3}, "applied": {...}, ...},
+     "latest": {"INS-...": {"category": ..., "source": ..., "timestamp": ..., "preview": ...}, ...}}
+  manifest-pending.json:
+    {"version": 1, "mtime_ns": ..., "pending": {"INS-...": {...}, ...}}
+
+整合性（自己修復）:
+- 読み取り時に状態のディレクトリを stat し、更新時刻が記録と異なるディレクトリだけを列挙し直す。
+  要約は記録にない ID のファイルだけを開いて作る。review-insights の mv による移動や手動の削除も、
+  ディレクトリの更新時刻の変化で検出される（移動する側はマニフェストを更新しない）
+- 記録する更新時刻は列挙の前に stat した値。列挙中の変更は次回の読み取りで列挙し直される。
+  更新時刻が RACY_INTERVAL 以内のディレクトリは記録しない（同じタイムスタンプの間の変更を
+  見逃さないため。Git の racy clean と同じ考え方）
+- 書き込みはアトミック（atomic_write_json）。ロックは使わず、同時に書き込んだ場合は後の書き込みが
+  残るが、古い内容には古い更新時刻が記録されているため次回の読み取りで列挙し直される
+- マニフェストがない、または壊れている場合は列挙して作り直す。破損したインサイトのファイルは
+  件数に含め、要約のプレビューを None にする
+"""
+
+import json
+import os
+import sys
+import time
+
+from spec_hooks import workspace
+
+MANIFEST_FILE = "manifest.json"
+PENDING_FILE = "manifest-pending.json"
+MANIFEST_VERSION = 1
+
+STATUS_DIRS = ("pending", "applied", "rejected", "archive")
+
+# manifest.json に要約を保持する最新の保留中インサイトの数（SessionStart のプレビューは3件）
+LATEST_KEEP = 10
+
+# プレビューの長さ（文字数。SessionStart の表示と同じ）
+PREVIEW_LENGTH = 60
+
+# 更新時刻がこの秒数以内のディレクトリは記録しない（次回の読み取りで列挙し直す）
+RACY_INTERVAL = 2.0
+
+
+def summarize(insight: dict) -> dict:
+    """インサイトの要約（マニフェストのエントリ）。"""
+    content = insight.get("content", "")
+    if not isinstance(content, str):
+        content = ""
+    preview = content[:PREVIEW_LENGTH] + ("..." if len(content) > PREVIEW_LENGTH else "")
+    return {
+        "category": insight.get("category", "insight"),
+        "source": insight.get("source", "unknown"),
+        "timestamp": insight.get("timestamp", ""),
+        "preview": preview,
+    }
+
+
+def load(insights_dir: str, new_insights: list[dict] | None = None, save: bool = True) -> dict:
+    """
+    manifest.json を読み、ディレクトリと異なる部分を修復して返す（変更があれば保存する）。
+
+    new_insights は保存したばかりのインサイト（pending/ のファイルを開かずに要約を作る）。
+    """
+    path = os.path.join(insights_dir, MANIFEST_FILE)
+    manifest = _read_json(path, ("dirs", "latest")) or {"version": MANIFEST_VERSION, "dirs": {}, "latest": {}}
+    known = {insight["id"]: insight for insight in new_insights or () if isinstance(insight.get("id"), str)}
+    changed = False
+
+    for status in STATUS_DIRS:
+        directory = os.path.join(insights_dir, status)
+        mtime_ns = _mtime_ns(directory)
+        recorded = manifest["dirs"].get(status)
+        if (isinstance(recorded, dict) and mtime_ns is not None and recorded.get("mtime_ns") == mtime_ns
+                and isinstance(recorded.get("count"), int)):
+            continue
+
+        # 列挙し直す（記録する更新時刻は列挙の前の値）
+        names = _insight_names(directory) if mtime_ns is not None else []
+        count = len(names)
+        if status == "pending":
+            latest = sorted(names, reverse=True)[:LATEST_KEEP]
+            manifest["latest"] = _summaries(directory, latest, manifest["latest"], known)
+        elif status == "archive":
+            # パック（insight_archive）にまとめたインサイト。パックすると archive/ の更新時刻も変わる
+            from spec_hooks.insight_archive import packed_ids
+
+            count = len(packed_ids(insights_dir) | {name[:-5] for name in names})
+        manifest["dirs"][status] = {"mtime_ns": _settled(mtime_ns), "count": count}
+        changed = True
+
+    if changed and save:
+        _save(path, manifest)
+    return manifest
+
+
+def load_pending(insights_dir: str, save: bool = True) -> dict:
+    """保留中のすべてのインサイトの要約（ID → 要約）。manifest-pending.json を修復して返す。"""
+    path = os.path.join(insights_dir, PENDING_FILE)
+    data = _read_json(path, ("pending",)) or {"version": MANIFEST_VERSION, "mtime_ns": None, "pending": {}}
+    directory = os.path.join(insights_dir, "pending")
+    mtime_ns = _mtime_ns(directory)
+    if mtime_ns is not None and data.get("mtime_ns") == mtime_ns:
+        return data["pending"]
+
+    names = _insight_names(directory) if mtime_ns is not None else []
+    data["pending"] = _summaries(directory, names, data["pending"], {})
+    data["mtime_ns"] = _settled(mtime_ns)
+    if save:
+        _save(path, data)
+    return data["pending"]
+
+
+def record_saved(insights_dir: str, saved: list[dict]):
+    """pending/ に保存したインサイトを manifest.json に反映する（失敗は次回の読み取りで修復される）。"""
+    try:
+        load(insights_dir, new_insights=saved)
+    except Exception as e:
+        sys.stderr.write(f"insight_manifest: マニフェストの更新に失敗: {e}\n")
+
+
+def counts(manifest: dict) -> dict:
+    """状態ごとのインサイト数。"""
+    return {status: manifest["dirs"].get(status, {}).get("count", 0) for status in STATUS_DIRS}
+
+
+def latest_pending(manifest: dict) -> list[tuple[str, dict]]:
+    """最新の保留中インサイトの (ID, 要約)（ID にタイムスタンプを含むため ID の降順 = 新しい順）。"""
+    return sorted(manifest["latest"].items(), reverse=True)
+
+
+def _insight_names(directory: str) -> list[str]:
+    """ディレクトリのインサイトのファイル名（.json、隠しファイルを除く）。"""
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.name for entry in entries
+                    if entry.name.endswith(".json") and not entry.name.startswith(".")
+                    and entry.is_file(follow_symlinks=False)]
+    except OSError:
+        return []
+
+
+def _summaries(directory: str, names: list[str], previous: dict, known: dict) -> dict:
+    """ファイル名から要約を作る（記録にある ID は再利用し、ID の昇順）。"""
+    summaries = {}
+    for name in sorted(names):
+        insight_id = name[:-5]
+        entry = previous.get(insight_id)
+        if insight_id in known:
+            entry = summarize(known[insight_id])
+        elif not isinstance(entry, dict) or entry.get("preview") is None:
+            entry = _read_summary(os.path.join(directory, name))
+        summaries[insight_id] = entry
+    return summaries
+
+
+def _read_summary(path: str) -> dict:
+    """インサイトのファイルを読んで要約を作る。破損ファイルはプレビューが None。"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            insight = json.load(f)
+    except (OSError, ValueError):
+        insight = None
+    if not isinstance(insight, dict):
+        return {"category": None, "source": None, "timestamp": None, "preview": None}
+    return summarize(insight)
+
+
+def _mtime_ns(directory: str) -> int | None:
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _settled(mtime_ns: int | None) -> int | None:
+    """記録する更新時刻（RACY_INTERVAL 以内なら None = 次回も列挙し直す）。"""
+    if mtime_ns is None or time.time_ns() - mtime_ns <= RACY_INTERVAL * 1e9:
+        return None
+    return mtime_ns
+
+
+def _read_json(path: str, keys: tuple[str, ...]) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION
+            or not all(isinstance(data.get(key), dict) for key in keys)):
+        return None
+    return data
+
+
+def _save(path: str, data: dict):
+    try:
+        from spec_hooks.fsutil import atomic_write_json
+
+        atomic_write_json(path, data, indent=None)
+    except OSError:
+        pass  # 次回の読み取りで再び修復する
+
+
+def main(argv: list[str]) -> int:
+    workspace_id = argv[0] if argv else workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        print("エラー: 無効なワークスペース ID", file=sys.stderr)
+        return 1
+    insights_dir = workspace.get_insights_dir(workspace_id)
+    save = os.path.isdir(insights_dir)
+    manifest = load(insights_dir, save=save)
+    pending = load_pending(insights_dir, save=save)
+    print(json.dumps({
+        "workspaceId": workspace_id,
+        "counts": dict(counts(manifest), pending=len(pending)),
+        "pending": [dict(entry, id=insight_id) for insight_id, entry in sorted(pending.items())],
+    }, ensure_ascii=False, indent=2))
+    return 0
@@ -0,0 +1,263 @@
+"""
+インサイトの保存（pending/ への書き込み）
+
+insight_capture はキャプチャしたインサイトをこのモジュールで保存する。保存方法は
+SPEC_WORKFLOW_INSIGHT_STORAGE で選ぶ:
+
+  files（既定）  pending/{ID}.json を個別ファイルとしてまとめて書き込む。すべての一時ファイルに
+                 書き込んでから fsync し、リネームした後にディレクトリを1回だけ fsync する
+                 （キャプチャあたり最大100回の「書き込み・fsync・リネーム」を1回のバッチにする）
+  segment        insights/pending.log（セグメントログ）に1回の追記と1回の fsync で書き込む。
+                 ログのレコードは圧縮（compact）で pending/{ID}.json に展開する
+
+使用方法:
+  python3 -I -S hooks/run_hook.py insight-compact [ワークスペース ID]   # セグメントログを pending/ に展開
+
+セグメントログの形式: インサイトの JSON を1行1レコード。追記は "\\n" で始める（前回の追記が途中で
+中断して改行で終わっていない場合も、不完全な行は単独の行になり、読み取り時に無視される）。
+
+設計上の判断（insight_capture.sh のヘッダーコメントの保証を保つ）:
+- files: 各ファイルは fsync 済みの一時ファイルのリネームで現れるため、読み取り側が書き込み途中の
+  インサイトを見ることはない。ファイル名は ID ごとにユニークでロックは不要
+- segment: 追記は O_APPEND の1回の write で、他の追記と混ざらない。追記の間は共有ロック
+  （flock LOCK_SH）を保持し、圧縮は排他ロックを取ってから展開と切り詰めを行う
+- 圧縮は「展開したファイルの fsync とディレクトリの fsync」の後にログを切り詰める。途中で
+  クラッシュした場合は次の圧縮で同じレコードを再び展開するが、いずれかの状態のディレクトリに
+  同じ ID のファイルがあるもの（展開済み、レビュー済み）は書き込まない
+- 圧縮はログが SEGMENT_COMPACT_BYTES を超えたキャプチャ、SessionStart（spec_context）、
+  /review-insights の開始時（insight-compact）に行う。ロックを取得できない場合は次の機会に回す
+"""
+
+import json
+import os
+import sys
+
+from spec_hooks import workspace
+
+STORAGE_MODES = ("files", "segment")
+
+SEGMENT_FILE = "pending.log"
+
+# セグメントログがこのサイズを超えたらキャプチャの後に圧縮する
+SEGMENT_COMPACT_BYTES = 1024 * 1024
+
+# 状態のディレクトリ（圧縮で同じ ID のファイルを探す）
+STATUS_DIRS = ("pending", "applied", "rejected", "archive")
+
+
+def storage_mode() -> str:
+    mode = os.environ.get("SPEC_WORKFLOW_INSIGHT_STORAGE", "files")
+    return mode if mode in STORAGE_MODES else "files"
+
+
+def save_insights(insights: list[dict], pending_dir: str) -> list[dict]:
+    """インサイトを保存し、保存できたものを返す（個別の失敗は stderr に書いて続ける）。"""
+    if not insights:
+        return []
+    if storage_mode() == "segment":
+        insights_dir = os.path.dirname(pending_dir)
+        try:
+            size = append_segment(insights_dir, insights)
+        except OSError as e:
+            sys.stderr.write(f"insight_capture: セグメントログへの追記に失敗（個別ファイルで保存）: {e}\n")
+        else:
+            if size > SEGMENT_COMPACT_BYTES:
+                compact(insights_dir, wait=False)
+            return insights
+    return write_batch(insights, pending_dir)
+
+
+# =============================================================================
+# まとめた個別ファイルの書き込み
+# =============================================================================
+
+def write_batch(insights: list[dict], pending_dir: str) -> list[dict]:
+    """
+    各インサイトを pending/{ID}.json に書き込む（fsync とディレクトリの fsync をまとめる）。
+
+    1. すべてのインサイトを一時ファイル（.tmp）に書き込む
+    2. 各一時ファイルを fsync する（ジャーナルのコミットは最初の fsync にまとまる）
+    3. 一時ファイルをリネームし、最後にディレクトリを1回 fsync する（リネームの永続化）
+    """
+    import tempfile
+
+    pending = []
+    saved = []
+    try:
+        for insight in insights:
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=pending_dir, suffix=".tmp")
+                try:
+                    _write_all(fd, json.dumps(insight, indent=2, ensure_ascii=False).encode("utf-8"))
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except OSError as e:
+                sys.stderr.write(f"insight_capture: {insight['id']} の保存に失敗: {e}\n")
+                _unlink(temp_path)
+                continue
+            pending.append([insight, fd, temp_path])
+
+        for entry in pending:
+            insight, fd, temp_path = entry
+            try:
+                os.fsync(fd)
+                os.replace(temp_path, os.path.join(pending_dir, f"{insight['id']}.json"))
+                entry[2] = None
+                saved.append(insight)
+            except OSError as e:
+                sys.stderr.write(f"insight_capture: {insight['id']} の保存に失敗: {e}\n")
+        if saved:
+            fsync_directory(pending_dir)
+    finally:
+        for _, fd, temp_path in pending:
+            os.close(fd)
+            _unlink(temp_path)
+    return saved
+
+
+def fsync_directory(directory: str):
+    """ディレクトリのエントリ（リネーム）を永続化する（サポートされない環境では何もしない）。"""
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _unlink(path: str | None):
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+# =============================================================================
+# セグメントログ
+# =============================================================================
+
+def append_segment(insights_dir: str, insights: list[dict]) -> int:
+    """インサイトをセグメントログに1回の追記で書き込み（fsync する）、追記後のログのサイズを返す。"""
+    import fcntl
+
+    data = "\n" + "".join(json.dumps(insight, ensure_ascii=False) + "\n" for insight in insights)
+    fd = os.open(os.path.join(insights_dir, SEGMENT_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        os.write(fd, data.encode("utf-8"))
+        os.fsync(fd)
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)  # ロックも解放される
+
+
+def read_segment(insights_dir: str) -> list[dict]:
+    """セグメントログのレコード（不完全な行、壊れた行は除く）。"""
+    try:
+        with open(os.path.join(insights_dir, SEGMENT_FILE), "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    return _parse_records(data)
+
+
+def _parse_records(data: bytes) -> list[dict]:
+    records = []
+    # 改行で終わらない最後の行は追記の途中
+    for line in data[:data.rfind(b"\n") + 1].split(b"\n"):
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and isinstance(record.get("id"), str):
+            records.append(record)
+    return records
+
+
+def segment_ids(insights_dir: str) -> set[str]:
+    """セグメントログにある（pending/ に未展開の）インサイトの ID。"""
+    return {record["id"] for record in read_segment(insights_dir)}
+
+
+def compact(insights_dir: str, wait: bool = True) -> int:
+    """
+    セグメントログのレコードを pending/{ID}.json に展開してログを空にし、展開した数を返す。
+
+    wait=False の場合、追記中または他の圧縮中でロックを取得できなければ何もしない。
+    """
+    import fcntl
+
+    path = os.path.join(insights_dir, SEGMENT_FILE)
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return 0
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except OSError:
+            return 0
+        size = os.fstat(fd).st_size
+        if not size:
+            return 0
+        records = _parse_records(os.pread(fd, size, 0))
+        pending_dir = os.path.join(insights_dir, "pending")
+        new = []
+        # アーカイブのパック（insight_archive）にまとめられたものも既存として扱う
+        from spec_hooks.insight_archive import packed_ids
+
+        seen = packed_ids(insights_dir)
+        for record in records:
+            insight_id = record["id"]
+            if insight_id in seen or not _valid_id(insight_id) or _exists(insights_dir, insight_id):
+                continue
+            seen.add(insight_id)
+            new.append(record)
+        os.makedirs(pending_dir, exist_ok=True)
+        saved = write_batch(new, pending_dir)
+        if saved:
+            from spec_hooks.insight_manifest import record_saved
+
+            record_saved(insights_dir, saved)
+        if len(saved) != len(new):
+            # 展開できなかったレコードが残るためログを切り詰めない（次の圧縮で再試行）
+            return len(saved)
+        os.ftruncate(fd, 0)
+        os.fsync(fd)
+        return len(saved)
+    finally:
+        os.close(fd)
+
+
+def _valid_id(insight_id: str) -> bool:
+    return bool(insight_id) and "/" not in insight_id and "\0" not in insight_id and not insight_id.startswith(".")
+
+
+def _exists(insights_dir: str, insight_id: str) -> bool:
+    return any(os.path.isfile(os.path.join(insights_dir, status, f"{insight_id}.json")) for status in STATUS_DIRS)
+
+
+def main(argv: list[str]) -> int:
+    workspace_id = argv[0] if argv else workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        print("エラー: 無効なワークスペース ID", file=sys.stderr)
+        return 1
+    count = compact(workspace.get_insights_dir(workspace_id))
+    if count:
+        print(f"セグメントログの {count} 件のインサイトを pending/ に展開しました")
+    return 0
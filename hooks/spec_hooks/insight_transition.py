@@ -0,0 +1,137 @@
+"""
+インサイトの状態の一括変更（workspace_utils.sh の move_insight の一括版）
+
+move_insight は1回の呼び出しで1ファイルを移動し、そのたびに realpath と mv のプロセスを起動する。
+このモジュールは複数のインサイト ID を1プロセスで検証して移動し、影響を受けたディレクトリを
+それぞれ1回だけ fsync して、ID ごとの結果を JSON で出力する。
+
+使用方法:
+  python3 -I -S hooks/run_hook.py insight-move <ワークスペース ID> <applied|rejected|archive> <ID>...
+  ... | python3 -I -S hooks/run_hook.py insight-move <ワークスペース ID> <状態> -    # ID を stdin から1行ずつ
+
+出力:
+  {"workspaceId": ..., "target": "applied", "moved": 2, "failed": 1,
+   "results": [{"id": "INS-...", "result": "moved", "from": "pending"}, ...]}
+
+  result は moved（移動した）、unchanged（すでに移動先にある）、error（error に理由）のいずれか。
+  1件でも error があれば終了コード 1。
+
+セキュリティ（move_insight と同じ保証）:
+- ワークスペース ID と各インサイト ID を検証する（英数字と ._- のみ、".." を含まない、"." で始まらない）
+- 移動元は insights/{pending,applied,rejected,archive}/{ID}.json のいずれかで、実パスが
+  */insights/{状態}/{ID}.json の通常のファイルであることを確認する（シンボリックリンクは移動しない）
+- 移動先に同じ ID のファイルがある場合は上書きしない
+"""
+
+import json
+import os
+import sys
+
+from spec_hooks import workspace
+
+TARGET_STATES = ("applied", "rejected", "archive")
+
+# 移動元を探す状態のディレクトリ（この順に探す）
+SOURCE_STATES = ("pending", "applied", "rejected", "archive")
+
+
+def validate_insight_id(insight_id: str) -> bool:
+    return workspace.validate_workspace_id(insight_id) and not insight_id.startswith(".")
+
+
+def move_insights(insights_dir: str, insight_ids: list[str], target: str) -> list[dict]:
+    """インサイトを target の状態に移動し、ID ごとの結果を返す（影響を受けたディレクトリは1回ずつ fsync する）。"""
+    from spec_hooks.insight_store import fsync_directory
+
+    if target not in TARGET_STATES:
+        raise ValueError(f"無効なターゲットステータス: {target}")
+    real_dirs = {state: os.path.realpath(os.path.join(insights_dir, state)) for state in SOURCE_STATES}
+    target_dir = os.path.join(insights_dir, target)
+    os.makedirs(target_dir, exist_ok=True)
+
+    results = []
+    touched = set()
+    seen = set()
+    for insight_id in insight_ids:
+        if insight_id in seen:
+            continue
+        seen.add(insight_id)
+        result = {"id": insight_id}
+        results.append(result)
+        if not validate_insight_id(insight_id):
+            result.update(result="error", error="無効なインサイト ID")
+            continue
+        name = f"{insight_id}.json"
+        source = _find_source(insights_dir, name, real_dirs)
+        if source is None:
+            result.update(result="error", error="インサイトファイルが見つかりません")
+            continue
+        state, path = source
+        result["from"] = state
+        if state == target:
+            result["result"] = "unchanged"
+            continue
+        destination = os.path.join(target_dir, name)
+        if os.path.lexists(destination):
+            result.update(result="error", error="移動先に同じ ID のファイルがあります")
+            continue
+        try:
+            os.rename(path, destination)
+        except OSError as e:
+            result.update(result="error", error=f"移動に失敗: {e}")
+            continue
+        result["result"] = "moved"
+        touched.update((os.path.dirname(path), target_dir))
+
+    for directory in sorted(touched):
+        fsync_directory(directory)
+    return results
+
+
+def _find_source(insights_dir: str, name: str, real_dirs: dict) -> tuple[str, str] | None:
+    """
+    ID のファイルがある状態とパス。
+
+    move_insight と同様に実パスを確認する: 実パスが */insights/{状態}/{ID}.json であり、
+    ファイル自体はシンボリックリンクでない通常のファイルであること。
+    """
+    for state in SOURCE_STATES:
+        path = os.path.join(insights_dir, state, name)
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+        resolved = os.path.realpath(path)
+        if (resolved != os.path.join(real_dirs[state], name)
+                or not real_dirs[state].endswith(os.sep + os.path.join("insights", state))):
+            continue
+        return state, resolved
+    return None
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) < 2:
+        print("使用方法: insight-move <ワークスペース ID> <applied|rejected|archive> <ID>... | -", file=sys.stderr)
+        return 1
+    workspace_id, target, insight_ids = argv[0], argv[1], argv[2:]
+    if not workspace.validate_workspace_id(workspace_id):
+        print("エラー: 無効なワークスペース ID", file=sys.stderr)
+        return 1
+    if target not in TARGET_STATES:
+        print(f"エラー: 無効なターゲットステータス: {target}", file=sys.stderr)
+        return 1
+    if insight_ids == ["-"]:
+        insight_ids = [line.strip() for line in sys.stdin if line.strip()]
+
+    insights_dir = workspace.get_insights_dir(workspace_id)
+    if not os.path.isdir(insights_dir):
+        print(f"エラー: インサイトディレクトリが見つかりません: {insights_dir}", file=sys.stderr)
+        return 1
+    results = move_insights(insights_dir, insight_ids, target)
+    failed = sum(1 for result in results if result["result"] == "error")
+    print(json.dumps({
+        "workspaceId": workspace_id,
+        "target": target,
+        "moved": sum(1 for result in results if result["result"] == "moved"),
+        "failed": failed,
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+    return 1 if failed else 0
@@ -0,0 +1,175 @@
+"""
+ファイルの改行位置の索引
+
+verify_references.py は参照の行番号をファイルの行数と比較し、参照の横に引用されたコードが
+その行の近くにあるかを確認する。行数を数えるためにファイル全体を読み直さないよう、ファイルを
+BLOCK_SIZE のブロックに分け、各ブロックの先頭までの行末の数（累積）を記録した索引を作る。
+
+  - 行数: 索引の末尾の値（と、改行で終わらない最終行）。キャッシュが有効ならファイルを読まない
+  - 行 n の取得: 累積値の二分探索で行 n の先頭を含むブロックを求め、そのブロックから読む
+    （読み取りはファイルのサイズによらず、必要な行を含むブロックだけ）
+
+行末はテキストモードで開いた場合と同じ（\\n、\\r\\n、\\r）。索引はファイルを mmap で1回走査して
+作成し（ブロックごとの改行の数え上げは bytes.count のため C の速度）、LineIndexCache が
+ワークスペースの line-index.json に (パス, サイズ, 更新時刻) をキーとして保存する。
+
+使用例:
+    cache = LineIndexCache(workspace.get_line_index_file(workspace_id))
+    index = cache.get("/path/to/file.py")
+    if index is not None and index.line_count >= 42:
+        text = index.lines(40, 44)
+    cache.save()
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import time
+
+# 索引のブロックサイズ（バイト）。行の取得で読むのは必要な行を含むブロック（と前後1バイト）
+BLOCK_SIZE = 64 * 1024
+
+# キャッシュに保持する最大ファイル数（超えた場合は最も長く使われていないものから削除）
+MAX_CACHED_FILES = 20000
+
+# 更新時刻がこの秒数以内のファイルはキャッシュに保存しない（同じタイムスタンプの間に同じサイズで
+# 書き換えられた場合に古い索引を使わないため。Git の racy clean と同じ考え方）
+RACY_INTERVAL = 2.0
+
+_TERMINATOR = re.compile(rb"\r\n|\r|\n")
+
+
+class LineIndex:
+    """
+    1つのファイルの改行位置の索引。
+
+    cumulative[b] はブロック b の先頭より前にある行末の数（\\r\\n がブロックの境界で分かれた場合は
+    \\r の位置で数える）。cumulative[-1] はファイル全体の行末の数。
+    """
+
+    def __init__(self, path: str, size: int, mtime_ns: int, cumulative: list[int], line_count: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.cumulative = cumulative
+        self.line_count = line_count
+
+    @classmethod
+    def build(cls, path: str, st: os.stat_result | None = None) -> "LineIndex":
+        """ファイルを1回走査して索引を作成（OSError はそのまま送出）。"""
+        with open(path, "rb") as f:
+            st = st or os.fstat(f.fileno())
+            cumulative = [0]
+            last = b""
+            if st.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    size = len(data)
+                    count = 0
+                    for start in range(0, size, BLOCK_SIZE):
+                        block = data[start:start + BLOCK_SIZE]
+                        count += block.count(b"\n") + block.count(b"\r") - block.count(b"\r\n")
+                        # ブロックの境界で分かれた \r\n（\r の側で数えた）
+                        if last == b"\r" and block[:1] == b"\n":
+                            count -= 1
+                        last = block[-1:]
+                        cumulative.append(count)
+            else:
+                size = 0
+        line_count = cumulative[-1]
+        # 改行で終わらない最終行
+        if last and last not in (b"\n", b"\r"):
+            line_count += 1
+        return cls(path, size, st.st_mtime_ns, cumulative, line_count)
+
+    def lines(self, first: int, last: int) -> list[str]:
+        """first 行目から last 行目まで（1始まり、両端を含む。ファイルの範囲に切り詰める）の各行。"""
+        first = max(1, first)
+        last = min(last, self.line_count)
+        if first > last:
+            return []
+
+        # 行 n の先頭は n - 1 番目の行末の直後。行末 k は cumulative[b] < k <= cumulative[b + 1] の
+        # ブロック b にある
+        start_block = bisect.bisect_left(self.cumulative, first - 1) - 1 if first > 1 else 0
+        end_block = bisect.bisect_left(self.cumulative, last) - 1
+        start = start_block * BLOCK_SIZE
+        # 直前の1バイト（境界で分かれた \r\n の判定）と直後の1バイト（最後の \r\n）も読む
+        read_start = max(0, start - 1)
+        with open(self.path, "rb") as f:
+            data = os.pread(f.fileno(), (end_block + 1) * BLOCK_SIZE + 1 - read_start, read_start)
+        if start:
+            data = data[2:] if data[:2] == b"\r\n" else data[1:]
+
+        skip = first - 1 - self.cumulative[start_block]
+        parts = _TERMINATOR.split(data, maxsplit=skip + last - first + 1)
+        return [part.decode("utf-8", errors="replace") for part in parts[skip:skip + last - first + 1]]
+
+    def to_json(self) -> dict:
+        return {"size": self.size, "mtime_ns": self.mtime_ns, "cumulative": self.cumulative,
+                "lines": self.line_count}
+
+    @classmethod
+    def from_json(cls, path: str, data: dict) -> "LineIndex":
+        return cls(path, data["size"], data["mtime_ns"], data["cumulative"], data["lines"])
+
+
+class LineIndexCache:
+    """
+    ファイルパス → LineIndex のキャッシュ（cache_file が None の場合はメモリ上のみ）。
+
+    get はスレッドから並行して呼べる（辞書の参照と代入のみ）。save は変更があった場合だけ
+    アトミックに書き込む（複数のフックが同時に保存した場合は後の書き込みが残る）。
+    """
+
+    def __init__(self, cache_file: str | None):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.modified = False
+        if cache_file:
+            try:
+                with open(cache_file, encoding="utf-8") as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    self.entries = entries
+            except (OSError, ValueError):
+                pass
+
+    def get(self, path: str) -> LineIndex | None:
+        """path の索引（キャッシュが古い場合は作成し直す。読み取りエラーは None）。"""
+        try:
+            st = os.stat(path)
+            entry = self.entries.get(path)
+            if (isinstance(entry, dict) and entry.get("size") == st.st_size
+                    and entry.get("mtime_ns") == st.st_mtime_ns):
+                try:
+                    index = LineIndex.from_json(path, entry)
+                    # 最近使ったものを末尾へ（削除は先頭から）
+                    self.entries[path] = self.entries.pop(path, entry)
+                    return index
+                except (KeyError, TypeError):
+                    pass
+            index = LineIndex.build(path, st)
+        except OSError:
+            return None
+        if time.time_ns() - index.mtime_ns > RACY_INTERVAL * 1e9:
+            self.entries.pop(path, None)
+            self.entries[path] = index.to_json()
+            self.modified = True
+        return index
+
+    def save(self):
+        """変更があればキャッシュファイルに書き込む（失敗は無視）。"""
+        if not self.cache_file or not self.modified:
+            return
+        for path in list(self.entries)[:max(0, len(self.entries) - MAX_CACHED_FILES)]:
+            del self.entries[path]
+        try:
+            from spec_hooks.fsutil import atomic_write_json
+
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            atomic_write_json(self.cache_file, self.entries, indent=None)
+            self.modified = False
+        except OSError:
+            pass
@@ -0,0 +1,274 @@
+"""
+リポジトリのファイルパスの索引
+
+verify_references.py の resolve_file_path は、参照のパス（`Button.tsx`、`components/Button.tsx` 等）が
+カレントディレクトリと src/、lib/、app/ の直下で見つからない場合にこの索引を使う。索引はリポジトリの
+全ファイルを (ファイル名, 親ディレクトリを逆順に並べたもの) の順に並べたもので、参照のパスで終わる
+ファイル（パスの区切りの位置で一致するもの）は連続した範囲になり、二分探索で取り出せる。
+
+使用例:
+    index = open_index(workspace.get_path_index_file(workspace_id))
+    resolved = index.lookup("components/Button.tsx") if index else None
+    candidates = index.candidates("Button.tsx") if index else []
+
+索引の作成:
+  - Git リポジトリ: git ls-files（追跡中のファイルと、無視されていない未追跡のファイル）。
+    Git ディレクトリの index の更新時刻とサイズが変わったら作り直す
+  - それ以外: カレントディレクトリからの os.scandir による1回の走査（隠しディレクトリと
+    node_modules を除く。SCAN_TIME_BUDGET 秒で打ち切る）。SCAN_MAX_AGE 秒を過ぎたら作り直す
+
+ファイル形式（ワークスペースの path-index.bin。読み取りは mmap で、ファイル全体を読み込まない）:
+  1行目       ヘッダー（JSON: version、byteorder、root、source、git_index、built_at、complete、count）
+  詰め物      8バイト境界まで
+  オフセット   count + 1 個の uint64（各エントリの本体内の開始位置、ネイティブのバイト順）
+  本体        "<ファイル名>\\t<逆順の親ディレクトリ>\\t<相対パス>\\n" をバイト列の昇順に並べたもの
+              （a/b/c.py は "c.py\\tb/a/\\ta/b/c.py\\n"。参照 b/c.py はキー "c.py\\tb/" で始まる範囲）
+
+候補が複数ある場合、lookup はどれも選ばずに None を返す（`utils.py` のようなありふれたファイル名の参照を
+別のファイルに解決しない）。candidates はすべての候補を返し、呼び出し元が行番号等で絞り込む。
+"""
+
+import json
+import mmap
+import os
+import sys
+import time
+
+INDEX_VERSION = 1
+
+# os.scandir で作成した索引の有効期間（秒）。Git の index のような変更の目印がないため
+SCAN_MAX_AGE = 300
+
+# 索引に含める最大ファイル数（これを超える部分は索引に含めない）
+MAX_INDEXED_FILES = 2_000_000
+
+# os.scandir による走査の時間予算（秒）。超えた場合はそれまでに見つけたファイルで索引を作る
+SCAN_TIME_BUDGET = 1.0
+
+# os.scandir の走査で除外するディレクトリ（"." で始まるディレクトリも除外）
+SCAN_SKIP_DIRS = frozenset({"node_modules"})
+
+_ITEM_SIZE = 8
+
+
+def find_git_dir(start: str) -> tuple[str, str] | None:
+    """
+    start から親ディレクトリをたどって (作業ツリーのルート, Git ディレクトリ) を返す（リポジトリ外は None）。
+
+    ワークツリーとサブモジュールの .git ファイル（"gitdir: <パス>"）に対応する。
+    """
+    path = os.path.abspath(start)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git, encoding="utf-8") as f:
+                    content = f.read(4096).strip()
+            except (OSError, UnicodeDecodeError):
+                return None
+            if not content.startswith("gitdir:"):
+                return None
+            return path, os.path.normpath(os.path.join(path, content[len("gitdir:"):].strip()))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _git_index_signature(git_dir: str) -> list | None:
+    try:
+        st = os.stat(os.path.join(git_dir, "index"))
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class PathIndex:
+    """読み込み済みの索引。lookup で参照のパスを解決する。"""
+
+    def __init__(self, header: dict, data, offsets_start: int):
+        self.header = header
+        self.root = header["root"]
+        self.count = header["count"]
+        self.data = data
+        body_start = offsets_start + (self.count + 1) * _ITEM_SIZE
+        self.offsets = memoryview(data)[offsets_start:body_start].cast("Q")
+        self.body = memoryview(data)[body_start:]
+        if len(self.offsets) != self.count + 1 or self.offsets[self.count] != len(self.body):
+            raise ValueError("索引のサイズが一致しません")
+
+    def _entry(self, position: int) -> bytes:
+        return self.body[self.offsets[position]:self.offsets[position + 1]].tobytes()
+
+    def _bisect(self, key: bytes, after_prefix: bool) -> int:
+        """key 以上（after_prefix が True の場合は key で始まるエントリより後）の最初の位置。"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            if entry < key or (after_prefix and entry.startswith(key)):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def paths(self, reference: str) -> list[str]:
+        """
+        reference と一致する、またはパスの区切りの位置で末尾が一致するパス（ルートからの相対パス）を、
+        階層が浅いもの、同じ深さならパスの昇順で返す。
+        """
+        parts = reference.encode("utf-8", "surrogateescape").split(b"/")
+        key = parts[-1] + b"\t" + b"".join(part + b"/" for part in reversed(parts[:-1]))
+        candidates = []
+        for position in range(self._bisect(key, False), self._bisect(key, True)):
+            path = self._entry(position).rsplit(b"\t", 1)[1][:-1]
+            candidates.append((path.count(b"/"), path))
+        candidates.sort()
+        return [path.decode("utf-8", "surrogateescape") for _, path in candidates]
+
+    def candidates(self, reference_path: str, limit: int | None = None) -> list[str]:
+        """
+        参照のパスと一致する、またはパスの区切りの位置で末尾が一致するファイルの絶対パス
+        （paths と同じ順序で最大 limit 個。索引の作成後に削除されたファイルは含まない）。
+        """
+        reference = os.path.normpath(reference_path)
+        if os.path.isabs(reference) or reference.startswith("..") or "\t" in reference or "\n" in reference:
+            return []
+        found = []
+        for path in self.paths(reference):
+            resolved = os.path.join(self.root, path)
+            if os.path.isfile(resolved):
+                found.append(resolved)
+                if len(found) == limit:
+                    break
+        return found
+
+    def lookup(self, reference_path: str) -> str | None:
+        """
+        参照のパスに一致するファイルが1つだけの場合はその絶対パス（見つからない、または複数ある場合は None）。
+        """
+        candidates = self.candidates(reference_path, limit=2)
+        return candidates[0] if len(candidates) == 1 else None
+
+
+# =============================================================================
+# 作成と読み込み
+# =============================================================================
+
+def _git_files(root: str) -> list[bytes] | None:
+    from spec_hooks.workspace import git_output
+
+    returncode, stdout = git_output("-C", root, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+    if returncode != 0:
+        return None
+    return [path for path in stdout.split(b"\0") if path]
+
+
+def _scan_files(root: str) -> tuple[list[bytes], bool]:
+    """root 配下のファイルの相対パスと、時間予算内にすべて走査できたか。"""
+    files = []
+    stack = [b""]
+    root_bytes = os.fsencode(root)
+    deadline = time.monotonic() + SCAN_TIME_BUDGET
+    while stack and len(files) < MAX_INDEXED_FILES:
+        if time.monotonic() > deadline:
+            return files, False
+        relative = stack.pop()
+        try:
+            with os.scandir(os.path.join(root_bytes, relative) if relative else root_bytes) as entries:
+                for entry in entries:
+                    path = relative + b"/" + entry.name if relative else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith(b".") and os.fsdecode(entry.name) not in SCAN_SKIP_DIRS:
+                            stack.append(path)
+                    elif entry.is_file():
+                        files.append(path)
+        except OSError:
+            continue
+    return files, not stack
+
+
+def build(cwd: str) -> bytes:
+    """cwd を含むリポジトリ（Git リポジトリ外は cwd 配下）の索引のバイト列を作成。"""
+    git = find_git_dir(cwd)
+    files = _git_files(git[0]) if git else None
+    if files is not None:
+        header = {"root": git[0], "source": "git", "git_index": _git_index_signature(git[1]),
+                  "complete": len(files) <= MAX_INDEXED_FILES}
+    else:
+        files, complete = _scan_files(cwd)
+        header = {"root": cwd, "source": "scan", "git_index": None, "complete": complete}
+
+    entries = set()
+    for path in files[:MAX_INDEXED_FILES]:
+        if path and b"\t" not in path and b"\n" not in path:
+            parts = path.split(b"/")
+            entries.add(parts[-1] + b"\t" + b"".join(part + b"/" for part in reversed(parts[:-1]))
+                        + b"\t" + path + b"\n")
+    entries = sorted(entries)
+
+    from array import array
+
+    offsets = array("Q", [0])
+    position = 0
+    for entry in entries:
+        position += len(entry)
+        offsets.append(position)
+
+    header.update({"version": INDEX_VERSION, "byteorder": sys.byteorder,
+                   "built_at": time.time(), "count": len(entries)})
+    header_line = json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"
+    padding = b" " * (-len(header_line) % _ITEM_SIZE)
+    return header_line + padding + offsets.tobytes() + b"".join(entries)
+
+
+def _parse(data) -> PathIndex:
+    end = data.find(b"\n")
+    if end < 0:
+        raise ValueError("ヘッダーがありません")
+    header = json.loads(bytes(data[:end]))
+    if not isinstance(header, dict):
+        raise ValueError("不正なヘッダー")
+    offsets_start = end + 1 + (-(end + 1) % _ITEM_SIZE)
+    return PathIndex(header, data, offsets_start)
+
+
+def _is_fresh(header: dict, cwd: str) -> bool:
+    if header.get("version") != INDEX_VERSION or header.get("byteorder") != sys.byteorder:
+        return False
+    git = find_git_dir(cwd)
+    if header.get("source") == "git":
+        return git is not None and header.get("root") == git[0] and header.get("git_index") == _git_index_signature(git[1])
+    return git is None and header.get("root") == cwd and time.time() - header.get("built_at", 0) < SCAN_MAX_AGE
+
+
+def open_index(index_file: str, cwd: str | None = None) -> PathIndex | None:
+    """
+    索引を読み込む（存在しない、または古い場合は作成して index_file に保存）。
+
+    保存できない場合もメモリ上の索引を返す。作成できない場合は None。
+    """
+    cwd = cwd or os.getcwd()
+    try:
+        with open(index_file, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = _parse(data)
+        if _is_fresh(index.header, cwd):
+            return index
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        data = build(cwd)
+    except OSError:
+        return None
+    try:
+        from spec_hooks.fsutil import atomic_write_bytes
+
+        os.makedirs(os.path.dirname(index_file) or ".", exist_ok=True)
+        atomic_write_bytes(index_file, data)
+    except OSError:
+        pass
+    return _parse(data)
@@ -0,0 +1,152 @@
+"""
+PreCompact フック: コンパクション前に重要なコンテキストを保存
+
+コンテキストがコンパクションされる前に進捗状態が保持されることを保証する。
+ワークスペース分離された進捗ファイルをサポート。
+"""
+
+import glob
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+from spec_hooks import workspace
+from spec_hooks.fsutil import LockTimeoutError, atomic_write_json, file_lock
+
+# ロック取得のタイムアウト（秒）
+LOCK_TIMEOUT = 5
+
+# 保持するバックアップ数
+MAX_BACKUPS = 5
+
+# 保持するコンパクションイベント数
+MAX_COMPACTION_HISTORY = 10
+
+COMPACTION_WARNING = (
+    "コンテキストがコンパクションされました。サブエージェントの結果や中間的な発見が失われている可能性があります。"
+    "必要に応じて重要なファイルを再読み込みし、重要な分析を再実行してください。"
+)
+
+
+def parse_hook_input(raw: str) -> tuple[str, str]:
+    """フック入力から (trigger, custom_instructions) を取得。"""
+    try:
+        data = json.loads(raw)
+        trigger = str(data.get('trigger', 'unknown')).rstrip("\n")
+    except Exception:
+        return "unknown", ""
+    try:
+        custom = str(data.get('custom_instructions', '')).rstrip("\n")
+    except Exception:
+        custom = ""
+    return trigger, custom
+
+
+def backup_progress_file(progress_file: str):
+    """コンパクション前に進捗ファイルのバックアップを作成し、最新の5つのみ保持。"""
+    backup_dir = os.path.join(os.path.dirname(progress_file), "backups")
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        shutil.copyfile(progress_file, os.path.join(backup_dir, f"progress-{datetime.now():%Y%m%d_%H%M%S}.json"))
+    except OSError:
+        pass
+
+    backups = []
+    for path in glob.glob(os.path.join(glob.escape(backup_dir), "progress-*.json")):
+        try:
+            backups.append((os.path.getmtime(path), path))
+        except OSError:
+            pass
+    backups.sort(reverse=True)
+    for _mtime, path in backups[MAX_BACKUPS:]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def record_compaction(progress_file: str, trigger: str, custom: str, workspace_id: str):
+    """タイムアウト付きファイルロックの下でコンパクションイベントを進捗ファイルに記録。"""
+    try:
+        with file_lock(progress_file + '.lock', LOCK_TIMEOUT):
+            with open(progress_file, "r", encoding='utf-8') as f:
+                data = json.load(f)
+
+            # コンパクションイベントを履歴に追加（より詳細なコンテキスト付き）
+            if "compactionHistory" not in data:
+                data["compactionHistory"] = []
+
+            # コンパクション前の現在の状態スナップショットをキャプチャ
+            current_task = data.get("currentTask", "unknown")
+            resumption_ctx = data.get("resumptionContext", {})
+
+            data["compactionHistory"].append({
+                "timestamp": datetime.now().isoformat(),
+                "trigger": trigger,
+                "customInstructions": custom if custom else None,
+                "workspaceId": workspace_id if workspace_id else None,
+                "stateSnapshot": {
+                    "currentTask": current_task,
+                    "position": resumption_ctx.get("position", "unknown"),
+                    "nextAction": resumption_ctx.get("nextAction", "unknown")
+                }
+            })
+
+            # 最新の10件のコンパクションイベントのみ保持
+            data["compactionHistory"] = data["compactionHistory"][-MAX_COMPACTION_HISTORY:]
+
+            # 最終コンパクションのタイムスタンプを更新
+            data["lastCompaction"] = datetime.now().isoformat()
+
+            # 再開コンテキストにコンパクション警告を追加
+            if "resumptionContext" not in data:
+                data["resumptionContext"] = {}
+            data["resumptionContext"]["lastCompactionWarning"] = COMPACTION_WARNING
+
+            atomic_write_json(progress_file, data)
+    except LockTimeoutError:
+        print(f"警告: {LOCK_TIMEOUT}秒以内にロックを取得できませんでした。進捗の更新をスキップします", file=sys.stderr)
+    except Exception as e:
+        # エラー時にコンパクションをブロックしない
+        print(f"警告: 進捗ファイルを更新できませんでした: {e}", file=sys.stderr)
+
+
+def build_summary(trigger: str, workspace_id: str, progress_file: str) -> str:
+    return f"""## コンパクション前の状態を保存しました
+
+**トリガー**: {trigger}
+**ワークスペース ID**: {workspace_id or "(未設定)"}
+**進捗ファイル**: {progress_file or "(検出されませんでした)"}
+
+コンパクション後の注意:
+- 進捗ファイルを読み取ってコンテキストを復元してください
+- ワークスペース: `.claude/workspaces/{workspace_id}/`
+- `feature-list.json` で現在のタスクを確認してください
+- ドキュメントに記載された位置から続行してください"""
+
+
+def main(argv: list[str]) -> int:
+    trigger, custom = parse_hook_input(sys.stdin.read())
+
+    # 進捗ファイルの場所を決定（ワークスペース分離）
+    workspace_id = workspace.get_workspace_id()
+
+    # 多層防御: 使用前にワークスペース ID を検証
+    if not workspace.validate_workspace_id(workspace_id):
+        print("警告: 無効なワークスペース ID です。進捗の保存をスキップします", file=sys.stderr)
+        return 0
+
+    progress_file = workspace.get_progress_file(workspace_id)
+    if not os.path.isfile(progress_file):
+        progress_file = ""
+
+    # 進捗ファイルが存在する場合、バックアップを作成しコンパクションのタイムスタンプを追加
+    if progress_file:
+        backup_progress_file(progress_file)
+        record_compaction(progress_file, trigger, custom, workspace_id)
+
+    # JSON の systemMessage として出力（PreCompact では stdout はユーザーに表示されない）
+    print(json.dumps({'systemMessage': build_summary(trigger, workspace_id, progress_file)}))
+    return 0
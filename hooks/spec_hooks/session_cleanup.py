@@ -0,0 +1,234 @@
+"""
+SessionEnd フック: Claude Code セッション終了時にリソースをクリーンアップ
+
+セッション終了時（ユーザー終了、タイムアウト等）に実行される。
+
+責務:
+- ディスク肥大化を防ぐための古いログファイルのローテーション
+- セッション中に作成された一時ファイルのクリーンアップ
+- 古いワークスペースデータのアーカイブ（30日以上経過したもの）
+
+クリーンアップはベストエフォートで、常に正常終了する。
+"""
+
+import json
+import os
+import shutil
+import stat
+import sys
+import time
+
+from spec_hooks import workspace
+from spec_hooks.fsutil import gzip_file
+from spec_hooks.transcript import prune_cache
+
+HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 設定
+LOG_RETENTION_DAYS = 30
+MAX_LOG_SIZE_MB = 10
+ACTIVITY_LOG_KEEP_LINES = 1000
+WORKSPACE_BASE = workspace.WORKSPACES_DIR
+ARCHIVE_MARKER = os.path.join(WORKSPACE_BASE, ".last_archive_check")
+
+
+def _age_days(path: str) -> int:
+    """find -mtime と同じ日数（切り捨て）での経過時間。"""
+    return int((time.time() - os.stat(path).st_mtime) // 86400)
+
+
+def _walk_files(directory: str):
+    """directory 配下の (ファイル名, パス) を再帰的に列挙（find 相当）。"""
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            yield name, os.path.join(root, name)
+
+
+def stop_hook_server():
+    """常駐フックサーバーを停止（起動している場合のみ）。"""
+    socket_path = os.environ.get("SPEC_WORKFLOW_HOOK_SOCKET") or os.path.join(".claude", "run", "hook-server.sock")
+    try:
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            return
+    except OSError:
+        return
+    import subprocess
+
+    try:
+        subprocess.run(
+            [sys.executable, os.path.join(HOOKS_DIR, "hook_server.py"), "stop"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        pass
+
+
+# --- ログローテーション ---
+# サイズ制限超過または保持期間を超えたログをローテーション
+
+def rotate_logs(workspace_id: str):
+    log_dir = workspace.get_logs_dir(workspace_id)
+    if not os.path.isdir(log_dir):
+        return
+
+    sessions_dir = os.path.join(log_dir, "sessions")
+
+    # 古いセッションログを検索して圧縮
+    for name, path in list(_walk_files(sessions_dir)):
+        if not name.endswith(".log"):
+            continue
+        try:
+            if _age_days(path) > LOG_RETENTION_DAYS and os.path.isfile(path) and not os.path.isfile(path + ".gz"):
+                gzip_file(path)
+        except OSError:
+            pass
+
+    # 非常に古い圧縮済みログを削除（保持期間の2倍）
+    for name, path in _walk_files(sessions_dir):
+        if not name.endswith(".log.gz"):
+            continue
+        try:
+            if _age_days(path) > LOG_RETENTION_DAYS * 2:
+                os.unlink(path)
+        except OSError:
+            pass
+
+    # メインのアクティビティログが大きすぎる場合はローテーション
+    activity_log = os.path.join(log_dir, "subagent_activity.log")
+    try:
+        # du -k と同じくディスク使用量（KB）で判定
+        size_kb = os.stat(activity_log).st_blocks * 512 // 1024
+    except OSError:
+        return
+
+    if size_kb > MAX_LOG_SIZE_MB * 1024:
+        # 最後の1000行を保持し、残りをアーカイブ
+        import collections
+
+        archived = f"{activity_log}.{time.strftime('%Y%m%d_%H%M%S')}"
+        try:
+            with open(activity_log, "rb") as src:
+                tail = collections.deque(src, maxlen=ACTIVITY_LOG_KEEP_LINES)
+            with open(activity_log + ".tmp", "wb") as dst:
+                dst.writelines(tail)
+            os.rename(activity_log, archived)
+            os.rename(activity_log + ".tmp", activity_log)
+            gzip_file(archived)
+        except OSError:
+            pass
+
+
+# --- 監査ログのスプール ---
+
+def flush_audit_spool(workspace_id: str):
+    """監査ログのスプールに残った未コミットのレコードを日次ログに書き込む。"""
+    from spec_hooks import audit_spool
+
+    for log_dir in (workspace.get_logs_dir(workspace_id), os.path.join(".claude", "logs")):
+        audit_spool.flush(log_dir)
+
+
+# --- 一時ファイルのクリーンアップ ---
+# セッション中に作成された一時ファイルを削除
+
+def cleanup_temp_files(workspace_id: str):
+    workspace_dir = workspace.get_workspace_dir(workspace_id)
+    if not os.path.isdir(workspace_dir):
+        return
+
+    # .tmp ファイルを削除
+    for name, path in list(_walk_files(workspace_dir)):
+        if name.endswith(".tmp"):
+            try:
+                if stat.S_ISREG(os.lstat(path).st_mode):
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    # 空のディレクトリを下位から削除（メインのワークスペースディレクトリは除く）
+    for root, dirs, _files in os.walk(workspace_dir, topdown=False):
+        for name in dirs:
+            try:
+                os.rmdir(os.path.join(root, name))
+            except OSError:
+                pass  # 空でない、またはシンボリックリンク
+
+
+# --- トランスクリプトのキャッシュ ---
+# 削除されたトランスクリプトや保持期間を超えたトランスクリプトの読み取り位置と抽出済みの内容を削除
+
+def prune_transcript_cache(workspace_id: str):
+    prune_cache(workspace.get_transcript_cache_dir(workspace_id), LOG_RETENTION_DAYS)
+
+
+# --- 古いワークスペースのアーカイブ ---
+# 長期間更新されていないワークスペースをアーカイブ
+
+def read_progress_status(progress_file: str) -> str:
+    try:
+        with open(progress_file, 'r') as f:
+            data = json.load(f)
+        return str(data.get('status', ''))
+    except Exception:
+        return ""
+
+
+def archive_stale_workspaces():
+    if not os.path.isdir(WORKSPACE_BASE):
+        return
+
+    archive_dir = os.path.join(WORKSPACE_BASE, ".archive")
+
+    # LOG_RETENTION_DAYS 日間更新されていないワークスペースを検索
+    for workspace_name in sorted(os.listdir(WORKSPACE_BASE)):
+        workspace_dir = os.path.join(WORKSPACE_BASE, workspace_name)
+        # 隠しディレクトリ（.archive 等）はスキップ
+        if workspace_name.startswith(".") or not os.path.isdir(workspace_dir):
+            continue
+
+        progress_file = os.path.join(workspace_dir, "claude-progress.json")
+        try:
+            if not os.path.isfile(progress_file) or _age_days(progress_file) <= LOG_RETENTION_DAYS:
+                continue
+        except OSError:
+            continue
+
+        # 完了済みのワークスペースのみアーカイブ
+        if read_progress_status(progress_file) == "completed":
+            try:
+                os.makedirs(archive_dir, exist_ok=True)
+                shutil.move(workspace_dir, os.path.join(archive_dir, f"{workspace_name}_{time.strftime('%Y%m%d')}"))
+            except OSError:
+                pass
+
+
+def main(argv: list[str]) -> int:
+    stop_hook_server()
+
+    # 現在のワークスペースのクリーンアップを実行
+    try:
+        workspace_id = workspace.get_workspace_id()
+        flush_audit_spool(workspace_id)
+        rotate_logs(workspace_id)
+        prune_transcript_cache(workspace_id)
+        cleanup_temp_files(workspace_id)
+    except Exception:
+        pass
+
+    # 古いワークスペースのアーカイブ（定期的に実行、毎セッションではない）
+    # マーカーファイルが1日以上古い場合のみ実行
+    try:
+        needs_archive = not os.path.isfile(ARCHIVE_MARKER) or _age_days(ARCHIVE_MARKER) > 0
+    except OSError:
+        needs_archive = True
+    if needs_archive:
+        try:
+            archive_stale_workspaces()
+            with open(ARCHIVE_MARKER, "a"):
+                pass
+            os.utime(ARCHIVE_MARKER)
+        except OSError:
+            pass
+
+    # 正常終了（クリーンアップはベストエフォート）
+    return 0
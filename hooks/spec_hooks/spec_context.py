@@ -0,0 +1,222 @@
+"""
+SessionStart フック: プラグインコンテキストの注入、進捗ファイルの検出、再開可能なワークフローのサポート
+
+セッション開始時に一度実行され、ユーザーのプロジェクトにプラグインコンテキストを提供する。
+出力は Markdown テキスト（stdout）。
+"""
+
+import json
+import os
+import sys
+
+from spec_hooks import insight_manifest, workspace
+
+HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_hook_server():
+    """
+    常駐フックサーバー（オプトイン）を起動。
+
+    PreToolUse バリデーターをロード済みで保持し、ツール呼び出しごとの Python 起動コストを削減。
+    """
+    if os.environ.get("SPEC_WORKFLOW_HOOK_SERVER", "0") != "1":
+        return
+    import subprocess
+
+    try:
+        subprocess.run(
+            [sys.executable, os.path.join(HOOKS_DIR, "hook_server.py"), "start"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        pass
+
+
+def read_resumption_info(progress_file: str) -> str:
+    """進捗ファイルから再開コンテキストを抽出。"""
+    lines = []
+    try:
+        with open(progress_file, 'r') as f:
+            data = json.load(f)
+        ctx = data.get('resumptionContext', {})
+        status = data.get('status', 'unknown')
+        current = data.get('currentTask', 'None')
+        position = ctx.get('position', 'Not specified')
+        next_action = ctx.get('nextAction', 'Not specified')
+        blockers = ctx.get('blockers', [])
+        workspace_id = data.get('workspaceId', 'Not set')
+
+        lines.append(f'ワークスペース: {workspace_id}')
+        lines.append(f'ステータス: {status}')
+        lines.append(f'現在のタスク: {current}')
+        lines.append(f'位置: {position}')
+        lines.append(f'次のアクション: {next_action}')
+        if blockers:
+            lines.append(f"ブロッカー: {', '.join(blockers)}")
+    except Exception as e:
+        lines.append(f'進捗の読み取りエラー: {e}')
+    return '\n'.join(lines).rstrip('\n')
+
+
+def read_feature_progress(feature_file: str) -> str:
+    """フィーチャーファイルからフィーチャー進捗を抽出。"""
+    lines = []
+    try:
+        with open(feature_file, 'r') as f:
+            data = json.load(f)
+        total = data.get('totalFeatures', len(data.get('features', [])))
+        features = data.get('features', [])
+
+        # ステータスごとにカウント
+        pending = sum(1 for f in features if f.get('status') == 'pending')
+        in_progress = sum(1 for f in features if f.get('status') == 'in_progress')
+        done = sum(1 for f in features if f.get('status') == 'completed')
+
+        lines.append(f'合計: {total} | 完了: {done} | 進行中: {in_progress} | 未着手: {pending}')
+
+        # 現在進行中のフィーチャーを表示
+        current = [f for f in features if f.get('status') == 'in_progress']
+        if current:
+            lines.append(f"現在: {current[0].get('name', 'Unknown')}")
+    except Exception as e:
+        lines.append(f'エラー: {e}')
+    return '\n'.join(lines).rstrip('\n')
+
+
+def list_available_workspaces(limit: int = 10) -> list[str]:
+    """利用可能なワークスペース（隠しエントリを除く、名前順の先頭 limit 件）。"""
+    try:
+        names = [name for name in os.listdir(workspace.WORKSPACES_DIR) if not name.startswith('.')]
+    except OSError:
+        return []
+    return sorted(names)[:limit]
+
+
+def format_pending_preview(manifest: dict, limit: int = 3) -> str:
+    """最新の保留中インサイトのプレビュー（マニフェストから。ID にタイムスタンプを含むため ID の降順）。"""
+    lines = []
+    for i, (_, entry) in enumerate(insight_manifest.latest_pending(manifest)[:limit], 1):
+        if entry.get('preview') is None:
+            continue  # 破損ファイルをスキップ
+        lines.append(f"  {i}. [{entry.get('category', 'insight')}] {entry['preview']}")
+    return '\n'.join(lines).rstrip('\n')
+
+
+def build_context() -> list[str]:
+    # --- ワークスペース検出 ---
+    workspace_id = workspace.get_workspace_id()
+    progress_file = workspace.get_progress_file(workspace_id)
+    feature_file = workspace.get_feature_file(workspace_id)
+
+    # 存在しないファイルはクリア
+    if not os.path.isfile(progress_file):
+        progress_file = ""
+    if not os.path.isfile(feature_file):
+        feature_file = ""
+
+    resumption_info = read_resumption_info(progress_file) if progress_file else ""
+    feature_progress = read_feature_progress(feature_file) if feature_file else ""
+    available_workspaces = list_available_workspaces()
+
+    # --- ロールの決定（初期化 vs コーディング） ---
+    current_role = "CODING" if progress_file else "INITIALIZER"
+
+    # --- コンテキスト出力（最小限） ---
+    out = ["## Spec-Workflow Toolkit - セッション初期化完了", ""]
+
+    # --- ワークスペース情報 ---
+    out += ["### 現在のワークスペース", "", f"**ワークスペース ID**: `{workspace_id}`"]
+    in_repo, current_branch = workspace.git_branch_state()
+    if current_branch:
+        out.append(f"**ブランチ**: `{current_branch}`")
+    elif in_repo:
+        # Git リポジトリは存在するが HEAD がデタッチ状態
+        out += [
+            "**ブランチ**: `detached HEAD`",
+            "",
+            "> **注意**: detached HEAD 状態です。適切なワークスペース分離のためにブランチをチェックアウトすることを検討してください。",
+        ]
+    else:
+        # Git リポジトリではない
+        out += [
+            "**Git**: 未初期化",
+            "",
+            "> **注意**: これは Git リポジトリではありません。進捗追跡はディレクトリベースのワークスペース ID を使用します。完全な機能サポートのために `git init` の実行を検討してください。",
+        ]
+    out += [f"**作業ディレクトリ**: `{workspace.logical_cwd()}`", ""]
+
+    # --- ロール別バナー（最小限） ---
+    if current_role == "CODING":
+        out.append("**ロール**: CODING（進捗ファイルを検出）")
+    else:
+        out.append("**ロール**: INITIALIZER（進捗ファイルなし）")
+    out.append("")
+
+    # 注: オーケストレーターの詳細ルール、コンテキスト管理、コマンドリスト、スキルは
+    # CLAUDE.md で利用可能。利用可能なコマンドを確認するには `/help` を使用。
+
+    # --- 再開コンテキストの出力（利用可能な場合） ---
+    if progress_file:
+        out += [
+            "",
+            "### 再開可能な作業を検出",
+            "",
+            f"**ワークスペース ID**: `{workspace_id}`",
+            f"**進捗ファイル**: `{progress_file}`",
+        ]
+        if feature_file:
+            out.append(f"**フィーチャーファイル**: `{feature_file}`")
+        out.append("")
+        if resumption_info:
+            out += ["**再開コンテキスト:**", "```", resumption_info, "```"]
+        if feature_progress:
+            out += ["", "**フィーチャー進捗:**", "```", feature_progress, "```"]
+        out += ["", "再開するには: 進捗ファイルを読み取り、ドキュメントに記載された位置から続行してください。", ""]
+
+    # --- 複数ワークスペースがある場合の表示 ---
+    if len(available_workspaces) > 1:
+        out += [
+            "",
+            "### 利用可能なワークスペース",
+            "",
+            "複数のワークスペースが検出されました。詳細を確認するには `/resume list` を使用してください。",
+            "",
+            "```",
+            *available_workspaces,
+            "```",
+            "",
+        ]
+
+    # --- 保留中のインサイトを確認 ---
+    # マニフェスト（insights/manifest.json）から数とプレビューを読む。セグメントログ
+    # （SPEC_WORKFLOW_INSIGHT_STORAGE=segment）のインサイトは pending/ に展開してから数える
+    if workspace.validate_workspace_id(workspace_id):
+        from spec_hooks.insight_store import compact
+
+        insights_dir = workspace.get_insights_dir(workspace_id)
+        compact(insights_dir, wait=False)
+        manifest = insight_manifest.load(insights_dir, save=os.path.isdir(insights_dir))
+        pending_count = insight_manifest.counts(manifest)["pending"]
+        if pending_count > 0:
+            out += [
+                "",
+                "### 保留中のインサイト",
+                "",
+                f"前回のセッションでキャプチャされた **{pending_count} 件のインサイト** がレビュー待ちです。",
+                "",
+                "評価して適用するには `/review-insights` を実行してください。",
+                "",
+            ]
+            # 最初の数件のインサイトのプレビューを表示
+            preview = format_pending_preview(manifest)
+            if preview:
+                out += ["**最近のインサイト:**", preview, ""]
+
+    return out
+
+
+def main(argv: list[str]) -> int:
+    start_hook_server()
+    sys.stdout.write("\n".join(build_context()) + "\n")
+    return 0
@@ -0,0 +1,289 @@
+"""
+SubagentStop フック: サブエージェント完了時の解析を1つのプロセスで実行
+
+完了ログとサマリー（subagent_summary）、インサイトキャプチャ（insight_capture）、参照検証
+（verify_references.py）を順に別プロセスで起動すると、後の2つがそれぞれトランスクリプトのパスを
+検証し、同じトランスクリプトを開いてパースする。このランナーはフック入力を1回だけ読み取り、
+トランスクリプトを1回だけ走査して、各メッセージをステージに渡す。
+
+ステージ（STAGES の順に出力を合成する）:
+  SummaryStage    - 完了ログの記録とサマリー（トランスクリプト不要。走査と並行してスレッドで実行）
+  InsightStage    - インサイトの抽出（走査中）と pending/ への保存（走査後）
+  ReferenceStage  - 参照の収集（走査中）と検証（走査後）
+
+走査後の処理（インサイトの保存、参照の検証）は互いに状態を共有しないため、スレッドで並行して
+実行する（どちらもファイル I/O が中心で、待ち時間の間は GIL を解放する）。走査はすべての
+ステージが上限に達した時点で打ち切る。
+
+出力の合成（各ステージを単独のフックとして実行した場合の判定を維持する）:
+  - decision/reason: ReferenceStage の block（無効な参照がしきい値を超えた、または例外）
+  - continue: いずれかのステージが false なら false
+  - systemMessage: 各ステージのメッセージをステージの順に空行で区切って連結
+
+エラー処理も単独実行時と同じ: ReferenceStage の例外は block（フェイルクローズド）、
+InsightStage と SummaryStage の例外は stderr に記録して続行。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from spec_hooks import workspace
+from spec_hooks.hookinput import HookInputError, read_fields
+from spec_hooks.transcript import AssistantMessages, validate_transcript_path
+
+INPUT_KEYS = ("session_id", "stop_hook_active", "agent_transcript_path", "transcript_path")
+
+# フック入力の文字列の最大長（トランスクリプトのパスと session_id のみ読むため十分な長さ）
+MAX_INPUT_STRING = 4096
+
+# トランスクリプトの走査の時間予算（秒）。hooks.json の timeout（5秒）内にインサイトの保存と
+# 参照の検証を終える（単独実行時の insight_capture と同じ）
+TRANSCRIPT_TIME_BUDGET = 2.0
+
+
+class Stage:
+    """
+    ステージの基底クラス。
+
+    start で準備（ディレクトリの作成等）を行う。uses_transcript が True のステージは feed で
+    メッセージを1件ずつ受け取り、done が True になると以降のメッセージを受け取らない。finish は
+    走査後に呼ばれ、出力する JSON オブジェクト（部分）を返す。いずれかで例外が発生した場合は
+    error_result の結果を出力する。
+    """
+
+    name = ""
+    uses_transcript = False
+    done = False
+
+    def __init__(self, hook_input: dict, workspace_id: str):
+        self.hook_input = hook_input
+        self.workspace_id = workspace_id
+
+    def start(self):
+        pass
+
+    def feed(self, text: str):
+        pass
+
+    def finish(self, messages: AssistantMessages | None) -> dict | None:
+        return None
+
+    def error_result(self, error: Exception) -> dict | None:
+        sys.stderr.write(f"{self.name} 致命的エラー: {error}\n")
+        return None
+
+
+class SummaryStage(Stage):
+    name = "subagent_summary"
+
+    def finish(self, messages):
+        from spec_hooks import subagent_summary
+
+        agent_name = os.environ.get("CLAUDE_AGENT_NAME") or "unknown"
+        session_id = self.hook_input.get("session_id")
+        try:
+            subagent_summary.write_logs(
+                subagent_summary.build_log_entry(
+                    agent_name, os.environ.get("CLAUDE_AGENT_ID", ""),
+                    session_id if isinstance(session_id, str) else "", self.workspace_id),
+                self.workspace_id,
+            )
+        except Exception:
+            # ログの失敗でサマリーの出力を妨げない
+            pass
+        return {"systemMessage": subagent_summary.build_summary(agent_name)}
+
+
+class InsightStage(Stage):
+    name = "insight_capture"
+    uses_transcript = True
+
+    def start(self):
+        from spec_hooks import insight_capture
+
+        self.config = insight_capture.load_config(self.workspace_id)
+        self.config.transcript_time_budget = TRANSCRIPT_TIME_BUDGET
+        self.extractor = insight_capture.InsightExtractor(self.config.agent_name, self.config)
+
+    @property
+    def done(self) -> bool:
+        return self.extractor.done
+
+    def feed(self, text):
+        self.extractor.feed(text)
+
+    def finish(self, messages):
+        from spec_hooks import insight_capture
+
+        if messages is None:
+            return {"continue": True}
+        return insight_capture.save_and_report(self.extractor, messages, self.config)
+
+    def error_result(self, error):
+        super().error_result(error)
+        return {"continue": True}
+
+
+class ReferenceStage(Stage):
+    name = "verify_references"
+    uses_transcript = True
+
+    def start(self):
+        import verify_references
+
+        self.collector = verify_references.ReferenceCollector()
+
+    @property
+    def done(self) -> bool:
+        return self.collector.done
+
+    def feed(self, text):
+        self.collector.add(text)
+
+    def finish(self, messages):
+        import verify_references
+
+        if messages is None:
+            return None
+        return verify_references.verify(self.collector.references,
+                                        verify_references.partial_note(messages, TRANSCRIPT_TIME_BUDGET))
+
+    def error_result(self, error):
+        import verify_references
+
+        super().error_result(error)
+        return verify_references.error_result(error)
+
+
+STAGES = (SummaryStage, InsightStage, ReferenceStage)
+
+
+def read_hook_input() -> dict:
+    """stdin のフック入力から必要なキーだけを読み取る（空または不正な入力は空の辞書）。"""
+    try:
+        return read_fields(sys.stdin.buffer, INPUT_KEYS, max_string=MAX_INPUT_STRING)
+    except (HookInputError, OSError):
+        return {}
+
+
+def resolve_transcript(hook_input: dict) -> str:
+    """検証済みのトランスクリプトの解決済みパス（解析しない場合は空文字列）。"""
+    # 無限ループ防止
+    if hook_input.get("stop_hook_active", False):
+        return ""
+
+    # agent_transcript_path（サブエージェント自身のトランスクリプト）を transcript_path（メインセッション）より優先
+    transcript_path = hook_input.get("agent_transcript_path") or hook_input.get("transcript_path") or ""
+    if not isinstance(transcript_path, str) or not transcript_path:
+        return ""
+
+    is_valid, error_msg, resolved_path = validate_transcript_path(transcript_path)
+    if not is_valid:
+        sys.stderr.write(f"subagent_stop: 無効なパス - {error_msg}\n")
+        return ""
+    return resolved_path
+
+
+class _Runner:
+    """ステージの生成、走査、並行実行と結果の収集。"""
+
+    def __init__(self, stage_classes, hook_input: dict, workspace_id: str):
+        self.stages = []
+        self.results = {}
+        for index, stage_class in enumerate(stage_classes):
+            stage = stage_class(hook_input, workspace_id)
+            try:
+                stage.start()
+            except Exception as e:
+                self.results[index] = stage.error_result(e)
+                continue
+            self.stages.append((index, stage))
+
+    def finish_in_thread(self, index: int, stage: Stage, messages) -> threading.Thread:
+        thread = threading.Thread(target=self.finish, args=(index, stage, messages), daemon=True)
+        thread.start()
+        return thread
+
+    def finish(self, index: int, stage: Stage, messages):
+        try:
+            self.results[index] = stage.finish(messages)
+        except Exception as e:
+            self.results[index] = stage.error_result(e)
+
+    def run(self, resolved_path: str, cache_dir: str | None):
+        threads = [self.finish_in_thread(index, stage, None)
+                   for index, stage in self.stages if not stage.uses_transcript]
+        analyzers = [(index, stage) for index, stage in self.stages if stage.uses_transcript]
+
+        messages = None
+        if analyzers and resolved_path:
+            messages = AssistantMessages(
+                resolved_path, cache_dir, deadline=time.monotonic() + TRANSCRIPT_TIME_BUDGET)
+            active = list(analyzers)
+            try:
+                for text in messages:
+                    for entry in list(active):
+                        index, stage = entry
+                        try:
+                            stage.feed(text)
+                        except Exception as e:
+                            self.results[index] = stage.error_result(e)
+                            active.remove(entry)
+                            continue
+                        if stage.done:
+                            active.remove(entry)
+                    if not active:
+                        break
+            except Exception as e:
+                # トランスクリプトの読み取りに失敗: 残りのステージはそれぞれの例外時の出力
+                for index, stage in active:
+                    self.results[index] = stage.error_result(e)
+                active = []
+            analyzers = [entry for entry in analyzers if entry[0] not in self.results]
+
+        threads += [self.finish_in_thread(index, stage, messages) for index, stage in analyzers]
+        for thread in threads:
+            thread.join()
+
+
+def merge_results(results: list[dict | None]) -> dict:
+    """ステージの出力を1つの JSON オブジェクトに合成。"""
+    output = {}
+    messages = []
+    for result in results:
+        if not result:
+            continue
+        if "continue" in result:
+            output["continue"] = output.get("continue", True) and bool(result["continue"])
+        if result.get("decision") == "block" and "decision" not in output:
+            output["decision"] = "block"
+            output["reason"] = result.get("reason", "")
+        if result.get("systemMessage"):
+            messages.append(result["systemMessage"])
+    if messages:
+        output["systemMessage"] = "\n\n".join(messages)
+    return output
+
+
+def main(argv: list[str]) -> int:
+    hook_input = read_hook_input()
+    try:
+        workspace_id = workspace.get_workspace_id()
+        cache_dir = (workspace.get_transcript_cache_dir(workspace_id)
+                     if workspace.validate_workspace_id(workspace_id) else None)
+
+        runner = _Runner(STAGES, hook_input, workspace_id)
+        runner.run(resolve_transcript(hook_input), cache_dir)
+        result = merge_results([runner.results.get(index) for index in range(len(STAGES))])
+    except Exception as e:
+        # ランナー自体の失敗: 参照を検証なしで通過させない（verify_references.py と同じくフェイルクローズド）
+        sys.stderr.write(f"subagent_stop 致命的エラー: {e}\n")
+        result = {"continue": True}
+        if not hook_input.get("stop_hook_active", False):
+            result = ReferenceStage(hook_input, "").error_result(e)
+
+    print(json.dumps(result))
+    return 0
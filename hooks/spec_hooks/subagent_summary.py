@@ -0,0 +1,88 @@
+"""
+SubagentStop フック: サブエージェントの完了をログに記録しサマリーを出力
+
+サブエージェントが作業を完了した時に実行される。
+マルチプロジェクト開発をサポートするため、ログはワークスペースごとに分離される。
+
+フック入力（stdin）からは session_id のみを読み取る。
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+from spec_hooks import workspace
+
+AGENT_STATUS = "completed"
+
+
+def read_session_id() -> str:
+    """stdin のフック入力から session_id を取得（空または不正な入力は空文字列）。"""
+    from spec_hooks.hookinput import HookInputError, read_fields
+
+    try:
+        data = read_fields(sys.stdin.buffer, ("session_id",), max_string=256)
+    except (HookInputError, OSError):
+        return ""
+    session_id = data.get("session_id")
+    return session_id if isinstance(session_id, str) else ""
+
+
+def generate_session_id() -> str:
+    """workspace_utils.sh の generate_session_id と同じ形式（YYYYmmdd_HHMMSS_xxxx）。"""
+    return f"{datetime.now():%Y%m%d_%H%M%S}_{os.urandom(2).hex()}"
+
+
+def build_log_entry(agent_name: str, agent_id: str, session_id: str, workspace_id: str) -> str:
+    entry = f"[{datetime.now():%Y-%m-%d %H:%M:%S}] エージェント: {agent_name} | ステータス: {AGENT_STATUS}"
+    if agent_id:
+        entry += f" | ID: {agent_id}"
+    if session_id:
+        entry += f" | セッション: {session_id}"
+    if workspace_id:
+        entry += f" | ワークスペース: {workspace_id}"
+    return entry
+
+
+def build_summary(agent_name: str) -> str:
+    return (
+        "---\n"
+        f"**サブエージェント完了:** `{agent_name}` (ステータス: {AGENT_STATUS})\n"
+        "\n"
+        "上記の出力を確認し、次の判断をしてください:\n"
+        "- 承認して次のフェーズに進む\n"
+        "- 明確化や変更を依頼する\n"
+        "- 別のエージェントにフォローアップを委任する\n"
+        "---"
+    )
+
+
+def write_logs(log_entry: str, workspace_id: str):
+    logs_dir = workspace.get_logs_dir(workspace_id)
+    sessions_dir = os.path.join(logs_dir, "sessions")
+    os.makedirs(sessions_dir, exist_ok=True)
+
+    # アクティビティログと、セッション固有のログの両方に追記
+    session_log = (os.environ.get("CLAUDE_SESSION_ID") or generate_session_id()) + ".log"
+    for path in (os.path.join(logs_dir, "subagent_activity.log"), os.path.join(sessions_dir, session_log)):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(log_entry + "\n")
+
+
+def main(argv: list[str]) -> int:
+    # 環境変数からエージェント情報を取得（Claude Code が設定）
+    agent_name = os.environ.get("CLAUDE_AGENT_NAME") or "unknown"
+    agent_id = os.environ.get("CLAUDE_AGENT_ID", "")
+
+    try:
+        session_id = read_session_id()
+        workspace_id = workspace.get_workspace_id()
+        write_logs(build_log_entry(agent_name, agent_id, session_id, workspace_id), workspace_id)
+    except Exception:
+        # ログの失敗でサマリーの出力を妨げない
+        pass
+
+    # JSON の systemMessage として出力（SubagentStop では stdout はユーザーに表示されない）
+    print(json.dumps({"systemMessage": build_summary(agent_name)}))
+    return 0
@@ -0,0 +1,293 @@
+"""
+ファイルごとのシンボル（定義）の索引
+
+verify_references.py は「`handle_request` in server.py:120」のようにシンボル名を添えた参照について、
+行がそのシンボルの定義の範囲内にあるかを確認する。このモジュールはファイルから定義の
+(名前, 修飾名, 開始行, 終了行) を抽出し、内容のハッシュをキーとしてワークスペースに保存する。
+
+抽出:
+  - Python: ast（関数、クラス、モジュールとクラスの直下の代入。デコレータを含む範囲）
+  - TypeScript/JavaScript、Go、Rust: 行頭の定義の正規表現と、続く { } の対応（文字列と
+    コメントは読み飛ばす）。{ より前に ;（JavaScript と Go は改行も）がある定義は1行
+  - 修飾名はクラス、impl、Go のレシーバー型を含む（Server.handle_request）
+
+キャッシュ（ワークスペースの symbol-index.json）:
+  files    パス → [サイズ, 更新時刻, 内容のハッシュ]（サイズと更新時刻が同じならファイルを読まない）
+  symbols  内容のハッシュ → シンボルのリスト（抽出できない場合は null）
+
+使用例:
+    cache = SymbolIndexCache(workspace.get_symbol_index_file(workspace_id))
+    symbols = cache.get("/path/to/server.py")
+    spans = find_spans(symbols, "Server.handle_request") if symbols is not None else []
+    cache.save()
+"""
+
+import bisect
+import json
+import os
+import re
+import time
+
+# シンボルを抽出する最大ファイルサイズ（バイト）
+MAX_FILE_SIZE = 2 * 1024 * 1024
+
+# キャッシュに保持する最大ファイル数（超えた場合は最も長く使われていないものから削除）
+MAX_CACHED_FILES = 20000
+
+# 更新時刻がこの秒数以内のファイルは パス → ハッシュ を保存しない（line_index と同じ）
+RACY_INTERVAL = 2.0
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".ts": "javascript", ".tsx": "javascript", ".mts": "javascript", ".cts": "javascript",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".go": "go",
+    ".rs": "rust",
+}
+
+# 定義の正規表現（name: シンボル名、owner: Go のレシーバー型、container: 修飾名の親になる定義、
+# member: コンテナの範囲内にある場合だけ定義とみなす）
+_DEFINITIONS = {
+    "javascript": [
+        re.compile(
+            r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:declare[ \t]+)?(?:abstract[ \t]+)?(?:async[ \t]+)?"
+            r"(?:function[ \t]*\*?[ \t]*|(?P<container>class)[ \t]+|interface[ \t]+|enum[ \t]+|type[ \t]+)"
+            r"(?P<name>[A-Za-z_$][\w$]*)", re.M),
+        # モジュールの直下の変数（インデントされたものは関数内のローカル変数）
+        re.compile(r"^(?:export[ \t]+)?(?:const|let|var)[ \t]+(?P<name>[A-Za-z_$][\w$]*)", re.M),
+        # クラスのメソッド（インデントされた name(...) ... { の行。クラスの範囲内のものだけ）
+        re.compile(
+            r"^[ \t]+(?P<member>)(?:(?:public|private|protected|static|readonly|override|async|get|set)[ \t]+)*\*?"
+            r"(?P<name>(?!(?:if|for|while|switch|catch|return|function|with|else|do|try)\b)[A-Za-z_$][\w$]*)"
+            r"[ \t]*(?:<[^>\n]*>)?[ \t]*\([^\n]*\{[ \t]*$", re.M),
+    ],
+    "go": [
+        re.compile(r"^func[ \t]+(?:\([ \t]*(?:\w+[ \t]+)?\*?(?P<owner>\w+)[^)]*\)[ \t]*)?(?P<name>\w+)", re.M),
+        re.compile(r"^(?:type|var|const)[ \t]+(?P<name>\w+)", re.M),
+        # type ( ... ) のグループ内の型
+        re.compile(r"^[ \t]+(?P<name>[A-Z]\w*)[ \t]+(?:struct|interface)[ \t]*\{", re.M),
+    ],
+    "rust": [
+        re.compile(
+            r"^[ \t]*(?:pub(?:\([^)\n]*\))?[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?(?:const[ \t]+)?(?:unsafe[ \t]+)?"
+            r"(?:extern[ \t]+\"[^\"\n]*\"[ \t]+)?"
+            r"(?:fn|struct|enum|union|(?P<container>trait|mod)|type|const|static|macro_rules!)[ \t]+(?P<name>\w+)", re.M),
+        re.compile(
+            r"^[ \t]*(?P<container>impl)(?:[ \t]*<[^{\n]*?>)?[ \t]+(?:[\w:<>, &']+[ \t]+for[ \t]+)?&?(?:\w+::)*(?P<name>\w+)",
+            re.M),
+    ],
+}
+
+# { } ( ) ;。括弧を含みうる文字列とコメントは1つのトークンとして読み飛ばす
+_TOKENS = {
+    "javascript": re.compile(
+        r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`|[{}();]", re.S),
+    "go": re.compile(r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|`[^`]*`|'(?:\\.|[^'\\\n])+'|[{}();]", re.S),
+    "rust": re.compile(
+        r"//[^\n]*|/\*.*?\*/|b?r(#*)\".*?\"\1|b?\"(?:\\.|[^\"\\])*\"|b?'(?:\\.|[^'\\\n])'|[{}();]", re.S),
+}
+
+
+def language_of(path: str) -> str | None:
+    """path の言語（シンボルを抽出できない拡張子は None）。"""
+    return LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+def extract_symbols(language: str, text: str) -> list[list] | None:
+    """
+    text から [名前, 修飾名, 開始行, 終了行] のリストを抽出（構文エラー等で抽出できない場合は None）。
+    """
+    if language == "python":
+        return _python_symbols(text)
+    return _brace_symbols(language, text)
+
+
+def _python_symbols(text: str) -> list[list] | None:
+    import ast
+
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+    symbols = []
+
+    def visit(node, prefix: str, in_scope: bool):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = prefix + child.name
+                start = min([child.lineno] + [decorator.lineno for decorator in child.decorator_list])
+                symbols.append([child.name, qualname, start, child.end_lineno])
+                # 関数の本体の代入はローカル変数のため含めない
+                visit(child, qualname + ".", isinstance(child, ast.ClassDef))
+            elif in_scope and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append([target.id, prefix + target.id, child.lineno, child.end_lineno])
+            elif not isinstance(child, (ast.expr, ast.Assign, ast.AnnAssign)):
+                visit(child, prefix, in_scope)
+
+    try:
+        visit(tree, "", True)
+    except RecursionError:
+        return None
+    return symbols
+
+
+def _brace_symbols(language: str, text: str) -> list[list]:
+    # 文字列とコメントの外にある括弧の位置と、対応する閉じ括弧
+    tokens = []
+    closing = {}
+    stack = []
+    for match in _TOKENS[language].finditer(text):
+        token = match.group()
+        if len(token) != 1:
+            continue
+        position = match.start()
+        tokens.append((position, token))
+        if token in "{(":
+            stack.append(position)
+        elif token in "})" and stack:
+            closing[stack.pop()] = position
+    token_positions = [position for position, _ in tokens]
+    newlines = [match.start() for match in re.finditer("\n", text)]
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_right(newlines, offset - 1) + 1
+
+    found = {}
+    for pattern in _DEFINITIONS[language]:
+        for match in pattern.finditer(text):
+            start = match.start("name")
+            if start in found:
+                continue
+            # 定義の後の最初の { または ;（( ) の中は読み飛ばす。JavaScript と Go は改行も文の終わり）
+            end = scan_from = match.end("name")
+            body_end = None
+            position = bisect.bisect_left(token_positions, end)
+            while position < len(tokens):
+                offset, token = tokens[position]
+                if token == "(":
+                    close = closing.get(offset)
+                    if close is None:
+                        break
+                    scan_from = close + 1
+                    position = bisect.bisect_right(token_positions, close)
+                    continue
+                if language != "rust" and text.find("\n", scan_from, offset) >= 0:
+                    break
+                if token == "{":
+                    body_end = closing.get(offset)
+                elif token == ";":
+                    body_end = offset
+                break
+            groups = match.groupdict()
+            found[start] = [match.group("name"), groups.get("owner"), groups.get("container") is not None,
+                            groups.get("member") is not None,
+                            line_of(match.start()), line_of(body_end) if body_end is not None else line_of(end)]
+
+    # 修飾名: 範囲を含む最も内側のコンテナ（クラス、impl、trait、mod）、または Go のレシーバー型
+    definitions = sorted(found.values(), key=lambda d: (d[4], -d[5]))
+    containers = []
+    symbols = []
+    for name, owner, is_container, is_member, start_line, end_line in definitions:
+        while containers and containers[-1][2] < start_line:
+            containers.pop()
+        if is_member and not containers:
+            continue
+        if owner:
+            qualname = f"{owner}.{name}"
+        elif containers:
+            qualname = f"{containers[-1][0]}.{name}"
+        else:
+            qualname = name
+        symbols.append([name, qualname, start_line, end_line])
+        if is_container and end_line > start_line:
+            containers.append((qualname, start_line, end_line))
+    return symbols
+
+
+def find_spans(symbols: list[list], name: str) -> list[tuple[int, int]]:
+    """
+    name（Server.handle_request、Server::new、handle_request() 等）と一致するシンボルの (開始行, 終了行)。
+
+    修飾された名前は修飾名の末尾が一致するもの、単純な名前は名前が一致するもの。
+    """
+    dotted = name.removesuffix("()").replace("::", ".")
+    last = dotted.rsplit(".", 1)[-1]
+    return [(start, end) for symbol_name, qualname, start, end in symbols
+            if symbol_name == last and ("." + qualname).endswith("." + dotted)]
+
+
+class SymbolIndexCache:
+    """
+    ファイルパス → シンボルのリストのキャッシュ（cache_file が None の場合はメモリ上のみ）。
+
+    get はスレッドから並行して呼べる（辞書の参照と代入のみ）。save は変更があった場合だけ
+    アトミックに書き込む（複数のフックが同時に保存した場合は後の書き込みが残る）。
+    """
+
+    def __init__(self, cache_file: str | None):
+        self.cache_file = cache_file
+        self.files = {}
+        self.symbols = {}
+        self.modified = False
+        if cache_file:
+            try:
+                with open(cache_file, encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data.get("files"), dict) and isinstance(data.get("symbols"), dict):
+                    self.files = data["files"]
+                    self.symbols = data["symbols"]
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    def get(self, path: str) -> list[list] | None:
+        """path のシンボル（対応していない言語、読み取りエラー、構文エラーは None）。"""
+        language = language_of(path)
+        if language is None:
+            return None
+        try:
+            st = os.stat(path)
+            if st.st_size > MAX_FILE_SIZE:
+                return None
+            entry = self.files.get(path)
+            if (isinstance(entry, list) and len(entry) == 3 and entry[0] == st.st_size
+                    and entry[1] == st.st_mtime_ns and entry[2] in self.symbols):
+                # 最近使ったものを末尾へ（削除は先頭から）
+                self.files[path] = self.files.pop(path, entry)
+                return self.symbols[entry[2]]
+            with open(path, "rb") as f:
+                data = f.read(MAX_FILE_SIZE + 1)
+        except OSError:
+            return None
+
+        import hashlib
+
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest not in self.symbols:
+            self.symbols[digest] = extract_symbols(language, data.decode("utf-8", errors="replace"))
+            self.modified = True
+        if time.time_ns() - st.st_mtime_ns > RACY_INTERVAL * 1e9:
+            self.files.pop(path, None)
+            self.files[path] = [st.st_size, st.st_mtime_ns, digest]
+            self.modified = True
+        return self.symbols[digest]
+
+    def save(self):
+        """変更があればキャッシュファイルに書き込む（失敗は無視）。参照されないハッシュは削除する。"""
+        if not self.cache_file or not self.modified:
+            return
+        for path in list(self.files)[:max(0, len(self.files) - MAX_CACHED_FILES)]:
+            del self.files[path]
+        used = {entry[2] for entry in self.files.values() if isinstance(entry, list) and len(entry) == 3}
+        symbols = {digest: value for digest, value in self.symbols.items() if digest in used}
+        try:
+            from spec_hooks.fsutil import atomic_write_json
+
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            atomic_write_json(self.cache_file, {"files": self.files, "symbols": symbols}, indent=None)
+            self.modified = False
+        except OSError:
+            pass
@@ -0,0 +1,413 @@
+"""
+トランスクリプト（JSONL）の共通処理
+
+insight_capture と verify_references.py で共有する:
+- validate_transcript_path: transcript_path のセキュリティ検証
+- AssistantMessages: アシスタントメッセージのテキストを1件ずつ返すイテレータ（読み取り位置を
+  ワークスペースに保存し、前回以降に追記された行だけを読む差分モード、時間予算あり）
+- prune_cache: 差分モードのキャッシュの削除
+
+トランスクリプト全体やメッセージ全体を連結した文字列は作らない。メモリ使用量はトランスクリプトの
+サイズによらず、最も長い1行（1メッセージ）程度に収まる。
+
+行の大半はツール結果とユーザーの発話のため、トランスクリプトは mmap で開き、"assistant" を含まない行は
+バイト列の検索だけで読み飛ばす（JSON としてデコードしない）。orjson を import できる場合は
+デコードに使用する（フックは `python3 -S` で実行されるため、通常は標準ライブラリの json）。
+"""
+
+import json
+import mmap
+import os
+import time
+
+# 期待される Claude ディレクトリパターン
+VALID_TRANSCRIPT_PATTERNS = ("/.claude/", "/claude-code/", "/tmp/claude")
+
+
+def validate_transcript_path(path: str) -> tuple[bool, str, str]:
+    """
+    transcript_path のセキュリティ検証。
+
+    戻り値: (is_valid, error_message, resolved_path)
+    resolved_path は TOCTOU 攻撃を防ぐために読み取り時に使用する。
+    """
+    if not path:
+        return False, "パスが空です", ""
+
+    expanded = os.path.expanduser(path)
+
+    try:
+        resolved = os.path.realpath(expanded)
+    except (OSError, ValueError) as e:
+        return False, f"パスの解決に失敗: {e}", ""
+
+    # 元の入力でパストラバーサルをチェック
+    if ".." in path:
+        return False, "パストラバーサルを検出", ""
+
+    # セキュリティ: 有効なパターンに一致しないパスは存在に関わらず常に拒否
+    path_lower = resolved.lower()
+    if not any(pattern in path_lower for pattern in VALID_TRANSCRIPT_PATTERNS):
+        return False, "期待される Claude ディレクトリに含まれていないパス", ""
+
+    # TOCTOU を防ぐために解決済みパスを返す
+    return True, "", resolved
+
+
+# アシスタントメッセージの行に必ず含まれるバイト列（role の値）
+_ROLE_VALUE = b'"assistant"'
+# "assistant" の英字は \u0061 〜 \u0074 のエスケープでも書ける（標準的な JSON の出力では使われないが、
+# 含む行は事前フィルタで除外せずにデコードする）
+_ESCAPED_LETTERS = (b"\\u006", b"\\u007")
+
+# mmap で読み終えた範囲のページを解放する間隔（ピーク RSS をトランスクリプトのサイズによらず抑える）
+_RELEASE_BYTES = 1024 * 1024
+
+_loads = None
+
+
+def _decode(line: bytes):
+    """JSON の1行をデコード（orjson があれば使用し、orjson が受け付けない入力は json で再試行）。"""
+    global _loads
+    if _loads is None:
+        try:
+            from orjson import loads as _loads
+        except ImportError:
+            _loads = json.loads
+    try:
+        return _loads(line)
+    except ValueError:
+        # orjson は孤立サロゲート、NaN、64ビットを超える整数等を受け付けない
+        if _loads is json.loads:
+            raise
+        return json.loads(line)
+
+
+def may_be_assistant(line) -> bool:
+    """行がアシスタントメッセージでありうるか（False ならデコードせずに読み飛ばせる）。"""
+    return _ROLE_VALUE in line or any(escaped in line for escaped in _ESCAPED_LETTERS)
+
+
+def message_text(line: bytes) -> str:
+    """
+    JSONL の1行がアシスタントメッセージならテキストを返す（それ以外、不正な行は空文字列）。
+
+    複数のテキストブロックは "\n" で連結する。
+    """
+    if not may_be_assistant(line):
+        return ""
+    try:
+        entry = _decode(line)
+    except ValueError:
+        return ""
+    if not isinstance(entry, dict) or entry.get("role") != "assistant":
+        return ""
+
+    content = entry.get("content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    if isinstance(content, list):
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "text":
+                text = block.get("text", "")
+                if text:
+                    parts.append(text)
+            elif isinstance(block, str) and block:
+                parts.append(block)
+    return "\n".join(parts)
+
+
+class AssistantMessages:
+    """
+    トランスクリプトのアシスタントメッセージのテキストを1件ずつ返すイテレータ。
+
+    使用例:
+        messages = AssistantMessages(resolved_path, cache_dir, deadline=time.monotonic() + 2.0)
+        for text in messages:
+            ...
+        if not messages.complete:
+            ...  # 時間予算に達した（messages.bytes_read / messages.size まで処理）
+
+    引数:
+        resolved_path: 検証済みの解決済み絶対パス（validate_transcript_path から）
+        cache_dir: 読み取り位置と抽出済みのメッセージを保存するディレクトリ（ワークスペースの
+            transcript-cache/）。指定した場合、前回までに読んだ部分はキャッシュから返し、
+            トランスクリプトは追記された行だけを読む
+        deadline: time.monotonic() の値。超えた時点で読み取りを打ち切る（キャッシュからの
+            読み取りは打ち切らない）。差分モードでは読んだ位置までを保存するため、次回は続きから読む
+
+    返すテキストを "\n" で連結したものは、トランスクリプト全体を読んだ場合のアシスタント発話の
+    内容と同じ。途中で反復を止めた場合（break）も、それまでに読んだ位置は保存される。
+    """
+
+    def __init__(self, resolved_path: str, cache_dir: str | None = None, deadline: float | None = None):
+        self.resolved_path = resolved_path
+        self.cache_dir = cache_dir
+        self.deadline = deadline
+        self.complete = True
+        self.bytes_read = 0
+        self.size = 0
+
+    def __iter__(self):
+        try:
+            f = open(self.resolved_path, "rb")
+        except OSError:
+            return
+        with f:
+            self.size = os.fstat(f.fileno()).st_size
+            cache = _Cache.open(self.resolved_path, self.cache_dir, f) if self.cache_dir else None
+            if cache is None:
+                yield from self._read(f, None)
+                return
+            with cache:
+                try:
+                    yield from cache.messages()
+                except _CacheCorrupted:
+                    self.complete = False
+                    return
+                f.seek(cache.offset)
+                yield from self._read(f, cache)
+
+    def _read(self, f, cache):
+        """f の現在位置から末尾（開いた時点のサイズ、または deadline）まで読む。"""
+        offset = f.tell()
+        for line, next_offset in _lines(f, offset, self.size):
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.complete = False
+                break
+            text = message_text(line) if line is not None else ""
+            # 改行で終わらない最終行は書き込み途中の可能性があるため、キャッシュせず読み取り位置も進めない
+            if next_offset is not None:
+                offset = next_offset
+                if cache is not None:
+                    cache.append(text, offset)
+            self.bytes_read = offset
+            if text:
+                yield text
+        self.bytes_read = offset
+
+
+def _lines(f, offset: int, size: int):
+    """
+    f の offset から size までの行を (行のバイト列, 次の行の位置) で返す。
+
+    アシスタントメッセージでありえない行（may_be_assistant が False）は行のバイト列を作らずに None を返す。
+    改行で終わらない最終行の次の行の位置は None。
+
+    mmap を使用する（mmap できないファイルは行ごとに読む）。トランスクリプトは追記のみのため、
+    読み取り中に size 未満へ切り詰められることは想定しない。
+    """
+    if offset >= size:
+        return
+    try:
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            yield (line if may_be_assistant(line) else None), (offset if line.endswith(b"\n") else None)
+        return
+
+    release = hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+    if release and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    released = offset - offset % mmap.PAGESIZE
+    with mm:
+        pos = offset
+        while pos < size:
+            newline = mm.find(b"\n", pos)
+            end = newline + 1 if newline >= 0 else size
+            if (mm.find(_ROLE_VALUE, pos, end) >= 0
+                    or any(mm.find(escaped, pos, end) >= 0 for escaped in _ESCAPED_LETTERS)):
+                yield mm[pos:end], (end if newline >= 0 else None)
+            elif newline >= 0:
+                yield None, end
+            pos = end
+            if release and pos - released >= _RELEASE_BYTES:
+                # 読み終えたページをプロセスから外す（ファイルのページキャッシュは残る）
+                boundary = pos - pos % mmap.PAGESIZE
+                mm.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                released = boundary
+
+
+# =============================================================================
+# 差分読み取り（読み取り位置のキャッシュ）
+# =============================================================================
+#
+# トランスクリプトごとに cache_dir に以下を保存する（<key> は解決済みパスの SHA-1 の先頭16文字）:
+#   <key>.json  - 読み取り位置（offset）、ファイルの識別（dev、ino）、offset 直前と先頭の
+#                 バイト列のハッシュ（fingerprint）、<key>.msgs の有効な長さ（content_size）
+#   <key>.msgs  - offset までのアシスタントメッセージのテキスト（1件ごとに "<バイト数>\n" + UTF-8）
+#   <key>.lock  - 同じトランスクリプトを読むフック（verify_references、insight_capture）の排他
+#
+# 次の場合は offset 0 から読み直す（結果は常に全体を読んだ場合と同じ）:
+#   - dev/ino が異なる（ローテーション、別ファイルへの置き換え）
+#   - ファイルサイズが offset 未満（切り詰め）
+#   - fingerprint が一致しない（同じファイルへの書き直し）
+#   - <key>.msgs が content_size より短い（保存の途中でクラッシュした）
+
+# ロックを待つ最大秒数（先に実行中のフックの読み取りが長い場合は、キャッシュを使わずに読む）
+CACHE_LOCK_TIMEOUT = 1
+
+# fingerprint に使用する offset 直前と先頭のバイト数
+FINGERPRINT_BYTES = 64
+
+
+def _fingerprint(f, offset: int) -> str:
+    import hashlib
+
+    f.seek(0)
+    head = f.read(min(offset, FINGERPRINT_BYTES))
+    f.seek(max(0, offset - FINGERPRINT_BYTES))
+    tail = f.read(offset - f.tell())
+    return hashlib.sha1(head + b"\0" + tail).hexdigest()
+
+
+def _load_cursor(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cursor = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cursor if isinstance(cursor, dict) else {}
+
+
+def _resume_offset(f, cursor: dict, resolved_path: str) -> tuple[int, int]:
+    """保存された読み取り位置が有効なら (offset, content_size)、無効なら (0, 0)。"""
+    st = os.fstat(f.fileno())
+    try:
+        offset = int(cursor["offset"])
+        content_size = int(cursor["content_size"])
+        if (cursor["path"] != resolved_path or cursor["dev"] != st.st_dev or cursor["ino"] != st.st_ino
+                or not 0 <= offset <= st.st_size or content_size < 0
+                or cursor["fingerprint"] != _fingerprint(f, offset)):
+            return 0, 0
+    except (KeyError, TypeError, ValueError):
+        return 0, 0
+    return offset, content_size
+
+
+class _CacheCorrupted(Exception):
+    pass
+
+
+class _Cache:
+    """
+    ロック取得済みのキャッシュ。messages() でキャッシュ済みのメッセージを返し、append で追記する。
+
+    with ブロックを抜けるとき（反復の途中で止めた場合を含む）に読み取り位置を保存してロックを解放する。
+    """
+
+    def __init__(self, base: str, lock, resolved_path: str, f):
+        self.base = base
+        self.lock = lock
+        self.resolved_path = resolved_path
+        self.transcript = f
+        self.offset, self.content_size = _resume_offset(f, _load_cursor(base + ".json"), resolved_path)
+        self.file = open(base + ".msgs", "a+b")
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() < self.content_size:
+            self.offset, self.content_size = 0, 0
+        # 前回の保存が途中で終わった場合の余分な追記を除く
+        self.file.truncate(self.content_size)
+        self.valid = True
+
+    @classmethod
+    def open(cls, resolved_path: str, cache_dir: str, f):
+        """ロックを取得してキャッシュを開く（ロックを取得できない、書き込めない場合は None）。"""
+        # 差分モードでのみ使用するモジュール（verify_references の起動コストを増やさない）
+        import hashlib
+
+        from spec_hooks.fsutil import LockTimeoutError, file_lock
+
+        key = hashlib.sha1(resolved_path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        base = os.path.join(cache_dir, key)
+        lock = file_lock(base + ".lock", CACHE_LOCK_TIMEOUT)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            lock.__enter__()
+        except (OSError, LockTimeoutError):
+            return None
+        try:
+            return cls(base, lock, resolved_path, f)
+        except OSError:
+            lock.__exit__(None, None, None)
+            return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        from spec_hooks.fsutil import atomic_write_json
+
+        try:
+            if self.valid:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                st = os.fstat(self.transcript.fileno())
+                atomic_write_json(self.base + ".json", {
+                    "path": self.resolved_path,
+                    "dev": st.st_dev,
+                    "ino": st.st_ino,
+                    "offset": self.offset,
+                    "fingerprint": _fingerprint(self.transcript, self.offset),
+                    "content_size": self.content_size,
+                }, indent=None)
+            else:
+                os.unlink(self.base + ".json")
+        except OSError:
+            pass
+        finally:
+            self.file.close()
+            self.lock.__exit__(None, None, None)
+
+    def messages(self):
+        self.file.seek(0)
+        position = 0
+        while position < self.content_size:
+            header = self.file.readline(24)
+            try:
+                length = int(header)
+            except ValueError:
+                length = -1
+            data = self.file.read(length) if length >= 0 else b""
+            position += len(header) + len(data)
+            if length < 0 or len(data) != length or position > self.content_size:
+                # キャッシュの破損: 保存せずに破棄し、次回は先頭から読み直す
+                self.valid = False
+                raise _CacheCorrupted()
+            yield data.decode("utf-8", "surrogatepass")
+        self.file.seek(0, os.SEEK_END)
+
+    def append(self, text: str, offset: int):
+        if text:
+            data = text.encode("utf-8", "surrogatepass")
+            record = b"%d\n" % len(data) + data
+            self.file.write(record)
+            self.content_size += len(record)
+        self.offset = offset
+
+
+def prune_cache(cache_dir: str, max_age_days: int):
+    """対象のトランスクリプトが存在しない、または max_age_days 日以上読み取られていないキャッシュを削除。"""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    now = time.time()
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        base = os.path.join(cache_dir, name[:-len(".json")])
+        try:
+            stale = now - os.stat(base + ".json").st_mtime > max_age_days * 86400
+        except OSError:
+            continue
+        if not stale and os.path.exists(_load_cursor(base + ".json").get("path") or ""):
+            continue
+        for suffix in (".json", ".msgs", ".lock"):
+            try:
+                os.unlink(base + suffix)
+            except OSError:
+                pass
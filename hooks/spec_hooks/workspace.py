@@ -0,0 +1,366 @@
+"""
+ワークスペース ID とパス管理（workspace_utils.sh の Python 版）
+
+ID の形式と値は workspace_utils.sh の get_workspace_id と同一:
+  {branch}_{path-hash}
+  - branch: git branch --show-current を '/' と ' ' を '-' に置換し、英数字・'.'・'_'・'-'
+    以外を除去して50文字に切り詰めたもの。デタッチ状態は detached-<短縮ハッシュ>、
+    Git リポジトリ外は no-git
+  - path-hash: `pwd` の出力（末尾改行を含む）の MD5 の先頭8文字
+
+ブランチは git を起動せずに .git/HEAD を直接読んで求める（ワークツリーとサブモジュールの
+"gitdir:" ファイルに対応）。git の探索と結果が異なりうる構成（GIT_DIR 等の環境変数、ベアリポジトリ、
+ファイルシステムの境界、所有者の異なるリポジトリ、reftable 等）では従来どおり git を実行する。
+求めた ID は ID_CACHE_FILE にキャッシュする（workspace_utils.sh と共有。デタッチ状態の短縮ハッシュと
+シェルの MD5 の計算を省く）。
+"""
+
+import os
+import re
+import stat
+
+try:
+    # hashlib は OpenSSL バインディング（_hashlib）の読み込みに数ミリ秒かかるため、組み込みの実装を優先
+    from _md5 import md5
+except ImportError:
+    from hashlib import md5
+
+WORKSPACES_DIR = os.path.join(".claude", "workspaces")
+
+# ワークスペース ID のキャッシュ（4行: pwd、HEAD のパス、HEAD の1行目、ID。Git リポジトリ外は HEAD の2行が空）。
+# HEAD の内容が同じなら ID も同じ（ブランチの切り替えやデタッチで HEAD が書き換わる）
+ID_CACHE_FILE = os.path.join(WORKSPACES_DIR, ".workspace-id")
+
+# git の探索（.git の位置）に影響する環境変数。設定されている場合は git を実行する
+_GIT_DISCOVERY_ENV = ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR", "GIT_CEILING_DIRECTORIES",
+                      "GIT_DISCOVERY_ACROSS_FILESYSTEM")
+
+_DETACHED_HEAD = re.compile(r"[0-9a-f]{40}(?:[0-9a-f]{24})?")
+
+# ワークスペース ID に使用できる文字
+_UNSAFE_BRANCH_CHARS = re.compile(r"[^a-zA-Z0-9._-]")
+
+_git_state = {}
+
+
+def logical_cwd() -> str:
+    """シェルの `pwd` と同じ論理パス（$PWD がカレントディレクトリを指す場合はそれを使用）。"""
+    cwd = os.getcwd()
+    pwd = os.environ.get("PWD", "")
+    if pwd and os.path.isabs(pwd) and pwd != cwd:
+        parts = pwd.split("/")
+        if "." not in parts and ".." not in parts:
+            try:
+                if os.path.samestat(os.stat(pwd), os.stat(cwd)):
+                    return pwd
+            except OSError:
+                pass
+    return cwd
+
+
+def _git(*args: str) -> tuple[int, str]:
+    """git を実行して (終了コード, 末尾改行を除いた stdout) を返す。"""
+    returncode, stdout = git_output(*args)
+    return returncode, stdout.decode("utf-8", errors="replace").rstrip("\n")
+
+
+def git_output(*args: str) -> tuple[int, bytes]:
+    """
+    git を実行して (終了コード, stdout のバイト列) を返す。
+
+    subprocess は import だけで数ミリ秒かかる（threading、selectors 等を読み込む）ため、
+    フックの起動経路では os.posix_spawnp で直接起動する。
+    """
+    read_fd, write_fd = os.pipe()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        pid = os.posix_spawnp("git", ["git", *args], os.environ, file_actions=[
+            (os.POSIX_SPAWN_DUP2, devnull, 0),
+            (os.POSIX_SPAWN_DUP2, write_fd, 1),
+            (os.POSIX_SPAWN_DUP2, devnull, 2),
+        ])
+    except OSError:
+        os.close(read_fd)
+        return 127, ""
+    finally:
+        os.close(write_fd)
+        os.close(devnull)
+
+    chunks = []
+    with open(read_fd, "rb") as stdout:
+        for chunk in iter(lambda: stdout.read(65536), b""):
+            chunks.append(chunk)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status), b"".join(chunks)
+
+
+def find_git_head(start: str) -> str | None:
+    """
+    start から上位のディレクトリへ .git を探し、HEAD ファイルのパスを返す（Git リポジトリ外は空文字列）。
+
+    .git がファイルの場合（ワークツリー、サブモジュール）は "gitdir: <パス>" の指すディレクトリの HEAD。
+    git の探索と結果が異なりうる場合は None（呼び出し側で git を実行する）。
+    """
+    if any(name in os.environ for name in _GIT_DISCOVERY_ENV):
+        return None
+    try:
+        device = os.stat(start).st_dev
+    except OSError:
+        return None
+    directory = start
+    while True:
+        dot_git = os.path.join(directory, ".git")
+        try:
+            st = os.stat(dot_git)
+        except OSError:
+            st = None
+        if st is not None:
+            return _head_path(directory, dot_git, st)
+        if os.path.exists(os.path.join(directory, "HEAD")):
+            return None  # ベアリポジトリ、または .git の内部
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return ""
+        try:
+            # git は既定でファイルシステムの境界を越えて探索しない
+            if os.stat(parent).st_dev != device:
+                return None
+        except OSError:
+            return None
+        directory = parent
+
+
+def _head_path(worktree: str, dot_git: str, st: os.stat_result) -> str | None:
+    if stat.S_ISDIR(st.st_mode):
+        git_dir = dot_git
+    else:
+        try:
+            with open(dot_git, encoding="utf-8", errors="surrogateescape") as f:
+                line = f.readline().rstrip()
+        except OSError:
+            return None
+        if not line.startswith("gitdir: "):
+            return None
+        git_dir = os.path.join(worktree, line[len("gitdir: "):])
+    head = os.path.join(git_dir, "HEAD")
+    try:
+        # 所有者の異なるリポジトリは git が safe.directory の設定に従って拒否する
+        uid = os.geteuid()
+        if os.stat(worktree).st_uid != uid or os.stat(git_dir).st_uid != uid:
+            return None
+        if not stat.S_ISREG(os.lstat(head).st_mode):
+            return None
+    except OSError:
+        return None
+    return head
+
+
+def read_head(head: str) -> str | None:
+    """HEAD ファイルの1行目（末尾の改行を除く）。"""
+    try:
+        with open(head, "rb") as f:
+            return f.readline(1024).rstrip(b"\n").decode("utf-8", errors="surrogateescape")
+    except OSError:
+        return None
+
+
+def parse_head(line: str) -> tuple[str, str] | None:
+    """
+    HEAD の1行目を ("branch", ブランチ名) または ("detached", コミットハッシュ) に変換する。
+
+    refs/heads/ 以外を指すシンボリック参照や reftable の HEAD（refs/heads/.invalid）は None。
+    """
+    if line.startswith("ref:"):
+        target = line[4:].strip()
+        if target.startswith("refs/heads/") and target != "refs/heads/.invalid":
+            return "branch", target[len("refs/heads/"):]
+        return None
+    if _DETACHED_HEAD.fullmatch(line):
+        return "detached", line
+    return None
+
+
+def _git_head() -> tuple[str, str, tuple[str, str] | None] | None:
+    """(HEAD のパス, HEAD の1行目, parse_head の結果)。Git リポジトリ外は ("", "", None)、不明な構成は None。"""
+    if "head" not in _git_state:
+        state = None
+        head = find_git_head(os.getcwd())
+        if head == "":
+            state = ("", "", None)
+        elif head is not None:
+            line = read_head(head)
+            parsed = parse_head(line) if line is not None else None
+            if parsed is not None:
+                state = (head, line, parsed)
+        _git_state["head"] = state
+    return _git_state["head"]
+
+
+def git_branch_state() -> tuple[bool, str]:
+    """
+    Git の状態を取得。
+
+    戻り値: (Git リポジトリ内か, 現在のブランチ名（デタッチ状態は空文字列）)
+    """
+    if "branch" not in _git_state:
+        head = _git_head()
+        if head is not None:
+            _, _, parsed = head
+            _git_state["branch"] = (parsed is not None, parsed[1] if parsed and parsed[0] == "branch" else "")
+        else:
+            # リポジトリ外では git branch が失敗するため、rev-parse --git-dir を別途実行しない
+            returncode, branch = _git("branch", "--show-current")
+            _git_state["branch"] = (returncode == 0, branch if returncode == 0 else "")
+    return _git_state["branch"]
+
+
+def sanitize_branch(branch: str) -> str:
+    branch = branch.replace("/", "-").replace(" ", "-")
+    return _UNSAFE_BRANCH_CHARS.sub("", branch)
+
+
+def path_hash(path: str) -> str:
+    """`pwd | md5sum` の先頭8文字。"""
+    return md5((path + "\n").encode("utf-8", errors="surrogateescape")).hexdigest()[:8]
+
+
+def get_workspace_id() -> str:
+    cwd = logical_cwd()
+    head = _git_head()
+    key = [cwd, head[0], head[1]] if head is not None and "\n" not in cwd else None
+    if key is not None:
+        cached = _read_id_cache(key)
+        if cached:
+            return cached
+
+    in_repo, branch = git_branch_state()
+    if in_repo:
+        branch = sanitize_branch(branch)
+        if not branch:
+            returncode, short = _git("rev-parse", "--short", "HEAD")
+            branch = "detached-" + (short if returncode == 0 and short else "unknown")
+        branch = branch[:50]
+    else:
+        branch = "no-git"
+    workspace_id = f"{branch}_{path_hash(cwd)}"
+    if key is not None:
+        _write_id_cache(key, workspace_id)
+    return workspace_id
+
+
+def _read_id_cache(key: list[str]) -> str | None:
+    try:
+        with open(ID_CACHE_FILE, encoding="utf-8", errors="surrogateescape", newline="") as f:
+            lines = f.read(4096).split("\n")
+    except OSError:
+        return None
+    # 4行すべてが改行で終わっていること（書き込み途中のファイルを使わない）
+    if len(lines) < 5 or lines[:3] != key:
+        return None
+    workspace_id = lines[3]
+    if not workspace_id or _UNSAFE_BRANCH_CHARS.search(workspace_id):
+        return None
+    return workspace_id
+
+
+def _write_id_cache(key: list[str], workspace_id: str):
+    """キャッシュを更新する（.claude/workspaces/ がない場合は作成しない）。"""
+    if not os.path.isdir(WORKSPACES_DIR):
+        return
+    tmp = f"{ID_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+            f.write("".join(f"{line}\n" for line in (*key, workspace_id)))
+        os.replace(tmp, ID_CACHE_FILE)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def validate_workspace_id(workspace_id: str) -> bool:
+    """パストラバーサルとインジェクションを防ぐためのワークスペース ID 検証。"""
+    if not workspace_id:
+        return False
+    if _UNSAFE_BRANCH_CHARS.search(workspace_id):
+        return False
+    if ".." in workspace_id:
+        return False
+    if workspace_id.startswith((".", "-")):
+        return False
+    if len(workspace_id) > 100:
+        return False
+
+    # 解決済みパスがベースディレクトリ配下に留まることを検証（シンボリックリンクによるエスケープ防止）
+    workspace_dir = get_workspace_dir(workspace_id)
+    if os.path.exists(workspace_dir):
+        resolved = os.path.realpath(workspace_dir)
+        base = os.path.realpath(WORKSPACES_DIR)
+        if not resolved.startswith(base + os.sep):
+            return False
+    return True
+
+
+# =============================================================================
+# パス
+# =============================================================================
+
+def get_workspace_dir(workspace_id: str) -> str:
+    return os.path.join(WORKSPACES_DIR, workspace_id)
+
+
+def get_progress_file(workspace_id: str) -> str:
+    return os.path.join(get_workspace_dir(workspace_id), "claude-progress.json")
+
+
+def get_feature_file(workspace_id: str) -> str:
+    return os.path.join(get_workspace_dir(workspace_id), "feature-list.json")
+
+
+def get_logs_dir(workspace_id: str) -> str:
+    return os.path.join(get_workspace_dir(workspace_id), "logs")
+
+
+def get_insights_dir(workspace_id: str) -> str:
+    return os.path.join(get_workspace_dir(workspace_id), "insights")
+
+
+def get_pending_insights_dir(workspace_id: str) -> str:
+    return os.path.join(get_insights_dir(workspace_id), "pending")
+
+
+def get_transcript_cache_dir(workspace_id: str) -> str:
+    """トランスクリプトの読み取り位置と抽出済みのメッセージ（transcript.AssistantMessages の差分モード）。"""
+    return os.path.join(get_workspace_dir(workspace_id), "transcript-cache")
+
+
+def get_path_index_file(workspace_id: str) -> str:
+    """リポジトリのファイルパスの索引（path_index、参照の解決に使用）。"""
+    return os.path.join(get_workspace_dir(workspace_id), "path-index.bin")
+
+
+def get_line_index_file(workspace_id: str) -> str:
+    """ファイルの改行位置の索引のキャッシュ（line_index、参照の行数と引用の確認に使用）。"""
+    return os.path.join(get_workspace_dir(workspace_id), "line-index.json")
+
+
+def get_symbol_index_file(workspace_id: str) -> str:
+    """ファイルごとのシンボルの索引のキャッシュ（symbol_index、シンボル名を添えた参照の確認に使用）。"""
+    return os.path.join(get_workspace_dir(workspace_id), "symbol-index.json")
+
+
+def get_stats_cache_file(workspace_id: str) -> str:
+    """ディレクトリごとのストレージの集計のキャッシュ（workspace_stats の差分更新に使用）。"""
+    return os.path.join(get_workspace_dir(workspace_id), "stats-cache.json")
+
+
+def count_pending_insights(workspace_id: str) -> int:
+    """pending/ 内の .json ファイル数（無効な ID は 0）。"""
+    if not validate_workspace_id(workspace_id):
+        return 0
+    try:
+        with os.scandir(get_pending_insights_dir(workspace_id)) as entries:
+            return sum(1 for entry in entries if entry.name.endswith(".json") and entry.is_file(follow_symlinks=False))
+    except OSError:
+        return 0
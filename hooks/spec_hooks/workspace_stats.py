@@ -0,0 +1,270 @@
+"""
+ワークスペース統計（workspace_utils.sh の get_workspace_stats）
+
+使用方法:
+  python3 -I -S hooks/run_hook.py workspace-stats [ワークスペース ID] [--by-category]
+
+ディレクトリ別のインサイト数、ログ等を含む JSON を出力する。
+フォルダベース: pending/, applied/, rejected/, archive/ ディレクトリのファイル数をカウント。
+--by-category を指定すると、ストレージをカテゴリ（logs、sessions、insights、backups、other）別の
+ファイル数とサイズに分けて storage.categories に出力する（容量の見積もり用）。
+
+差分更新:
+- ワークスペースを os.scandir で走査し、ディレクトリごとの集計を stats-cache.json にキャッシュする。
+  更新時刻が記録と同じディレクトリは列挙せず、サブディレクトリの一覧と集計を再利用する
+  （ファイルの追加・削除・置き換えはディレクトリの更新時刻を変える）
+- 書き込み後に内容が変わらないファイル（IMMUTABLE_DIRS のインサイトとバックアップ、.gz に圧縮した
+  ログ）はサイズも集計に含めてキャッシュする。それ以外（追記されるログ、その場で書き換えられる
+  進捗ファイル等）は名前だけをキャッシュし、毎回 stat する
+- 更新時刻が RACY_INTERVAL 以内のディレクトリとファイルは記録しない（insight_manifest と同じ）
+- ワークスペースの直下は毎回列挙する（索引やキャッシュの置き換えで頻繁に更新時刻が変わるため）
+"""
+
+import json
+import os
+import sys
+import time
+
+from spec_hooks import workspace
+
+CACHE_VERSION = 1
+
+# 書き込み後に内容が変わらないファイルのディレクトリ（ワークスペースからの相対パス）
+IMMUTABLE_DIRS = frozenset({
+    "insights/pending", "insights/applied", "insights/rejected", "insights/archive", "backups",
+})
+
+# ストレージのカテゴリ（ワークスペースからの相対パスの接頭辞。先に一致したもの）
+CATEGORIES = (
+    ("sessions", "logs/sessions"),
+    ("logs", "logs"),
+    ("insights", "insights"),
+    ("backups", "backups"),
+)
+
+# 更新時刻がこの秒数以内のディレクトリとファイルはキャッシュに記録しない
+RACY_INTERVAL = 2.0
+
+
+def count_json_files(directory: str) -> int:
+    """ディレクトリ内の .json ファイル数をカウント（隠しファイルを除く）。"""
+    try:
+        with os.scandir(directory) as entries:
+            return sum(1 for entry in entries if _is_json(entry.name) and not entry.is_dir())
+    except OSError:
+        return 0
+
+
+def count_archived(insights_dir: str) -> int:
+    """アーカイブのインサイト数（個別のファイルと、insight_archive のパックにまとめたもの）。"""
+    return _count_archived(insights_dir, None)
+
+
+def get_workspace_stats(workspace_id: str, by_category: bool = False) -> dict:
+    workspace_dir = workspace.get_workspace_dir(workspace_id)
+    insights_dir = workspace.get_insights_dir(workspace_id)
+    tree = WorkspaceTree(workspace_dir, workspace.get_stats_cache_file(workspace_id))
+    if os.path.isdir(workspace_dir):
+        tree.scan()
+        tree.save()
+
+    # 各ディレクトリのインサイト数をカウント（フォルダベースアーキテクチャ）
+    pending_count = tree.json_count("insights/pending")
+    applied_count = tree.json_count("insights/applied")
+    rejected_count = tree.json_count("insights/rejected")
+    archived_count = _count_archived(insights_dir, tree.json_count("insights/archive"))
+
+    categories = tree.categories()
+    stats = {
+        'workspaceId': workspace_id,
+        'exists': os.path.isdir(workspace_dir),
+        'insights': {
+            'pending': pending_count,
+            'applied': applied_count,
+            'rejected': rejected_count,
+            'archived': archived_count,
+            'total': pending_count + applied_count + rejected_count + archived_count
+        },
+        'storage': {
+            'insightsSize': categories['insights']['size'],
+            'logFiles': tree.log_files,
+            'totalSize': sum(category['size'] for category in categories.values())
+        }
+    }
+    if by_category:
+        stats['storage']['categories'] = categories
+    return stats
+
+
+class WorkspaceTree:
+    """ワークスペースのディレクトリごとの集計（stats-cache.json で差分更新する）。"""
+
+    def __init__(self, workspace_dir: str, cache_file: str):
+        self.workspace_dir = workspace_dir
+        self.cache_file = cache_file
+        self.cache = self._load()
+        self.entries = {}   # 相対パス → キャッシュのエントリ（今回の走査）
+        self.sizes = {}     # 相対パス → ファイルの合計サイズ（毎回 stat するファイルを含む）
+        self.log_files = 0
+        self.changed = False
+
+    def scan(self):
+        self._scan_dir("", self.workspace_dir)
+        if set(self.cache) != set(self.entries):
+            self.changed = True
+
+    def json_count(self, rel: str) -> int:
+        entry = self.entries.get(rel)
+        return entry["json"] if entry else 0
+
+    def categories(self) -> dict:
+        totals = {name: {"files": 0, "size": 0} for name, _ in CATEGORIES}
+        totals["other"] = {"files": 0, "size": 0}
+        for rel, entry in self.entries.items():
+            total = totals[_category(rel)]
+            total["files"] += entry["files"] + len(entry["live"])
+            total["size"] += self.sizes[rel]
+        return totals
+
+    def save(self):
+        if not self.changed:
+            return
+        try:
+            from spec_hooks.fsutil import atomic_write_json
+
+            atomic_write_json(self.cache_file, {"version": CACHE_VERSION, "dirs": self.entries}, indent=None)
+        except OSError:
+            pass  # 次回は変更のあったディレクトリを列挙し直す
+
+    def _scan_dir(self, rel: str, path: str):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        entry = self.cache.get(rel)
+        if rel and isinstance(entry, dict) and entry.get("mtime_ns") == mtime_ns:
+            entry = self._refresh(rel, path, entry)
+        else:
+            entry = self._list(rel, path, mtime_ns)
+            if rel:
+                self.changed = True
+        self.entries[rel] = entry
+        for name in entry["dirs"]:
+            self._scan_dir(f"{rel}/{name}" if rel else name, os.path.join(path, name))
+
+    def _list(self, rel: str, path: str, mtime_ns: int) -> dict:
+        """ディレクトリを列挙して集計する。"""
+        immutable = rel in IMMUTABLE_DIRS
+        settled = time.time_ns() - RACY_INTERVAL * 1e9
+        entry = {"mtime_ns": _settled(mtime_ns), "dirs": [], "files": 0, "size": 0, "json": 0, "logs": 0,
+                 "live": []}
+        live_size = 0
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    try:
+                        # os.walk と同様に、シンボリックリンクのディレクトリはたどらず、ファイルとして数えない
+                        if item.is_dir():
+                            if not item.is_symlink():
+                                entry["dirs"].append(item.name)
+                            continue
+                        st = item.stat()
+                    except OSError:
+                        continue
+                    if not rel and item.name == os.path.basename(self.cache_file):
+                        continue
+                    entry["json"] += _is_json(item.name)
+                    entry["logs"] += item.name.endswith((".log", ".jsonl"))
+                    if (immutable or item.name.endswith(".gz")) and st.st_mtime_ns < settled:
+                        entry["files"] += 1
+                        entry["size"] += st.st_size
+                    else:
+                        entry["live"].append(item.name)
+                        live_size += st.st_size
+        except OSError:
+            pass
+        entry["dirs"].sort()
+        self.sizes[rel] = entry["size"] + live_size
+        self.log_files += entry["logs"]
+        return entry
+
+    def _refresh(self, rel: str, path: str, entry: dict) -> dict:
+        """更新時刻が変わっていないディレクトリ: 毎回 stat するファイルのサイズだけを読む。"""
+        size = entry["size"]
+        for name in entry["live"]:
+            try:
+                size += os.stat(os.path.join(path, name)).st_size
+            except OSError:
+                pass
+        self.sizes[rel] = size
+        self.log_files += entry["logs"]
+        return entry
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or not isinstance(data.get("dirs"), dict):
+            return {}
+        return {rel: entry for rel, entry in data["dirs"].items() if _valid_entry(entry)}
+
+
+def _valid_entry(entry) -> bool:
+    return (isinstance(entry, dict)
+            and all(isinstance(entry.get(key), int) for key in ("files", "size", "json", "logs"))
+            and isinstance(entry.get("dirs"), list) and isinstance(entry.get("live"), list)
+            and all(isinstance(name, str) and name and "/" not in name and name not in (".", "..")
+                    for name in entry["dirs"] + entry["live"]))
+
+
+def _count_archived(insights_dir: str, loose_count: int | None) -> int:
+    """パックがなければ個別のファイル数（loose_count が None なら数える）、あれば ID の和集合。"""
+    from spec_hooks.insight_archive import packed_ids
+
+    archive_dir = os.path.join(insights_dir, 'archive')
+    if not os.path.isdir(archive_dir):
+        return 0
+    packed = packed_ids(insights_dir)
+    if not packed:
+        return count_json_files(archive_dir) if loose_count is None else loose_count
+    try:
+        with os.scandir(archive_dir) as entries:
+            loose = {entry.name[:-5] for entry in entries if _is_json(entry.name) and not entry.is_dir()}
+    except OSError:
+        loose = set()
+    return len(packed | loose)
+
+
+def _is_json(name: str) -> bool:
+    # glob の '*.json' と同じく隠しファイルを除く
+    return name.endswith('.json') and not name.startswith('.')
+
+
+def _category(rel: str) -> str:
+    for name, prefix in CATEGORIES:
+        if rel == prefix or rel.startswith(prefix + "/"):
+            return name
+    return "other"
+
+
+def _settled(mtime_ns: int) -> int | None:
+    """記録する更新時刻（RACY_INTERVAL 以内なら None = 次回も列挙し直す）。"""
+    if time.time_ns() - mtime_ns <= RACY_INTERVAL * 1e9:
+        return None
+    return mtime_ns
+
+
+def main(argv: list[str]) -> int:
+    by_category = "--by-category" in argv
+    args = [arg for arg in argv if arg != "--by-category"]
+    if args and args[0]:
+        workspace_id = args[0]
+        if not workspace.validate_workspace_id(workspace_id):
+            print("エラー: 無効なワークスペース ID", file=sys.stderr)
+            return 1
+    else:
+        workspace_id = workspace.get_workspace_id()
+    print(json.dumps(get_workspace_stats(workspace_id, by_category), indent=2))
+    return 0
@@ -0,0 +1,25 @@
+#!/bin/bash
+# SubagentStop フック: 完了ログとサマリー、インサイトキャプチャ、参照検証を1つのプロセスで実行
+# フック入力の読み取りとトランスクリプトの走査は1回だけ行い、各ステージにメッセージを渡す
+#
+# SubagentStop フック入力形式（Claude Code から）:
+#   {
+#     "session_id": "...",
+#     "transcript_path": "~/.claude/projects/.../xxx.jsonl",
+#     "agent_transcript_path": "~/.claude/projects/.../subagents/agent-yyy.jsonl",
+#     "agent_id": "yyy",
+#     "agent_type": "Explore",
+#     "permission_mode": "default",
+#     "hook_event_name": "SubagentStop",
+#     "stop_hook_active": true/false
+#   }
+#
+# 各ステージは単独のフックとしても実行できる（subagent_summary.sh、insight_capture.sh、
+# verify_references.py）。出力の判定（block、continue、systemMessage）は単独実行時と同じ。
+#
+# 処理本体: spec_hooks/subagent_stop.py
+# python3 がない環境では subagent_summary.sh のシェルだけの処理（完了ログとサマリー）を行う
+
+command -v python3 &> /dev/null || exec "$(dirname "$0")/subagent_summary.sh"
+
+exec python3 -I -S "$(dirname "$0")/run_hook.py" subagent-stop
@@ -8,18 +8,27 @@
   - 30% 超の参照が無効な場合: exit 0 で JSON {"decision": "block", "reason": "..."}（SubagentStop 制御）
   - それ以外: exit 0 で JSON {"systemMessage": "..."}（検証サマリーを含む）
 
+hooks.json からは subagent_stop.sh の ReferenceStage として実行される（ReferenceCollector、verify、
+error_result を使用）。単独では python3 -I -S run_hook.py verify-references で実行できる。
+
 一致する参照パターン:
   - file.ts:123
   - path/to/file.py:45
   - src/components/Button.tsx:100
   - /absolute/path/file.js:200
+
+参照の後の同じ行にインラインコードがある場合（`src/auth.py:42` の `def login(user):`）は、
+そのコードが参照の行の近くにあるかも確認する。シンボル名を添えた参照（`handle_request` in
+server.py:120）は、行がそのシンボルの定義の範囲内にあるかを確認する（spec_hooks.symbol_index）。
 """
 
 import sys
 import re
 import json
 import os
-from typing import List, Dict, Tuple, Optional
+import time
+
+from spec_hooks.transcript import AssistantMessages, validate_transcript_path
 
 # =============================================================================
 # 設定
@@ -28,11 +37,28 @@ from typing import List, Dict, Tuple, Optional
 # 無効な参照のしきい値（パーセンテージ）
 INVALID_THRESHOLD = 30
 
-# トランスクリプト処理の最大ファイルサイズ（100MB）
-MAX_TRANSCRIPT_SIZE = 100 * 1024 * 1024
+# トランスクリプトの読み取りの時間予算（秒）。hooks.json の timeout（5秒）から参照の検証の時間を残す
+TRANSCRIPT_TIME_BUDGET = 3.0
+
+# チェックする参照の最大数（パフォーマンス制限）。検証はファイルごとにまとめて並行に行うため、
+# 参照数ではなく一意なファイル数と VALIDATION_TIME_BUDGET が実際のコストを決める
+MAX_REFERENCES_TO_CHECK = 20000
+
+# 参照の検証の時間予算（秒）。期限までに確認できなかったファイルへの参照は未検証として集計から除く
+VALIDATION_TIME_BUDGET = 1.5
+
+# ファイルの確認（パスの解決、行数の取得、引用の確認）を並行して行うスレッド数
+VALIDATION_WORKERS = 8
+
+# 参照の横に引用されたコード（同じ行の `...`）を探す範囲（参照の行の前後の行数）
+SNIPPET_WINDOW = 5
 
-# チェックする参照の最大数（パフォーマンス制限）
-MAX_REFERENCES_TO_CHECK = 500
+# 確認する引用の最小の長さ（空白を詰めた文字数）。短い引用（`x`、`None` 等）はどこにでも現れるため確認しない
+MIN_SNIPPET_LENGTH = 8
+
+# 参照のパスに一致するファイルの候補を行番号で絞り込む最大数。これを超える参照は行数を取得せずに
+# 曖昧（未検証）として扱う
+MAX_PATH_CANDIDATES = 20
 
 # 参照パターン - file:line パターンに一致
 # キャプチャ: ファイル名（オプションのパス付き）、行番号
@@ -48,155 +74,190 @@ REFERENCE_PATTERN = re.compile(
     re.MULTILINE
 )
 
-# =============================================================================
-# パス検証
-# =============================================================================
+# インラインコード（参照の前後の同じ行にある引用またはシンボル名）
+SNIPPET_PATTERN = re.compile(r'`([^`\n]+)`')
 
-def validate_transcript_path(path: str) -> Tuple[bool, str, str]:
-    """
-    transcript_path のセキュリティ検証。
+# シンボル名として扱うインラインコード（handle_request、Server.handle_request、Server::new、run() 等）
+SYMBOL_PATTERN = re.compile(r'[A-Za-z_$][\w$]*(?:(?:\.|::)[A-Za-z_$][\w$]*)*(?:\(\))?')
 
-    戻り値: (is_valid, error_message, resolved_path)
-    """
-    if not path:
-        return False, "パスが空です", ""
+# シンボル名と参照の間の語（「`handle_request` in server.py:120」「server.py:120 の `handle_request`」）。
+# これ以外の語を挟む場合（「server.py:120 で `handle_request` を呼ぶ」）は引用として扱う
+SYMBOL_CONNECTOR = re.compile(r'[\s\-—–:：(（)）,、]*(?:in|at|of|の|は)?[\s\-—–:：(（)）,、]*', re.IGNORECASE)
 
-    expanded = os.path.expanduser(path)
-
-    try:
-        resolved = os.path.realpath(expanded)
-    except (OSError, ValueError) as e:
-        return False, f"パスの解決に失敗: {e}", ""
-
-    # パストラバーサルをチェック
-    if '..' in path:
-        return False, "パストラバーサルを検出", ""
-
-    # 期待される Claude ディレクトリパターンをチェック
-    valid_patterns = ['/.claude/', '/claude-code/', '/tmp/claude']
-    path_lower = resolved.lower()
-
-    if not any(pattern in path_lower for pattern in valid_patterns):
-        return False, "期待される Claude ディレクトリに含まれていないパス", ""
-
-    return True, "", resolved
+# 引用内の省略記号（前後の部分をそれぞれ順に探す）
+ELLIPSIS_PATTERN = re.compile(r'\.\.\.|…')
 
 # =============================================================================
-# トランスクリプトパース
+# 参照の抽出と検証
 # =============================================================================
 
-def extract_assistant_content(resolved_path: str, max_size: int) -> Tuple[str, bool]:
+def extract_references(text: str) -> list[dict]:
     """
-    JSONL トランスクリプトからアシスタントメッセージの内容を抽出。
+    テキストから file:line 参照を抽出。
 
-    戻り値: (content, was_skipped_due_to_size)
+    'file' と 'line' キーを持つ辞書のリストを返す。
     """
-    content_parts = []
-
-    try:
-        # ファイルサイズをチェック
-        try:
-            file_size = os.path.getsize(resolved_path)
-            if file_size > max_size:
-                return '', True
-        except OSError:
-            pass
-
-        with open(resolved_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    entry = json.loads(line)
-                    if entry.get('role') != 'assistant':
-                        continue
-
-                    content = entry.get('content', '')
-                    if isinstance(content, str):
-                        if content:
-                            content_parts.append(content)
-                    elif isinstance(content, list):
-                        for block in content:
-                            if isinstance(block, dict) and block.get('type') == 'text':
-                                text = block.get('text', '')
-                                if text:
-                                    content_parts.append(text)
-                            elif isinstance(block, str):
-                                content_parts.append(block)
-                except json.JSONDecodeError:
-                    continue
-
-    except (FileNotFoundError, PermissionError, IOError):
-        pass
-
-    return '\n'.join(content_parts), False
+    return collect_references([text])
 
-# =============================================================================
-# 参照の抽出と検証
-# =============================================================================
 
-def extract_references(text: str) -> List[Dict[str, any]]:
+def collect_references(texts) -> list[dict]:
     """
-    テキストから file:line 参照を抽出。
+    テキスト（メッセージごと）のイテラブルから file:line 参照を抽出。
 
-    'file' と 'line' キーを持つ辞書のリストを返す。
+    結果はテキストを "\n" で連結して extract_references を適用した場合と同じ（参照は改行を
+    またがない）。MAX_REFERENCES_TO_CHECK 件に達した時点で残りのテキストは読まない。
     """
-    references = []
-    seen = set()
+    collector = ReferenceCollector()
+    for text in texts:
+        collector.add(text)
+        if collector.done:
+            break
+    return collector.references
 
-    matches = REFERENCE_PATTERN.findall(text)
 
-    for filepath, line_str in matches:
-        if len(references) >= MAX_REFERENCES_TO_CHECK:
-            break
+class ReferenceCollector:
+    """
+    メッセージを1件ずつ受け取って file:line 参照を集める（重複排除済み、出現順）。
 
-        # 明らかにファイルでないパターンをスキップ
-        if filepath.startswith('http://') or filepath.startswith('https://'):
-            continue
-        if filepath.startswith('node_modules/'):
-            continue
-        if '::' in filepath:  # C++ のスコープ解決
-            continue
+    参照の前後の同じ行にあるインラインコードは find_context で 'symbol'（シンボル名）または
+    'snippet'（引用されたコード）として保持する。MAX_REFERENCES_TO_CHECK 件に達すると done が
+    True になり、以降の add は何もしない。
+    """
 
-        try:
-            line_num = int(line_str)
-        except ValueError:
-            continue
+    def __init__(self):
+        self.references = []
+        self.seen = set()
+        self.without_context = {}
+
+    @property
+    def done(self) -> bool:
+        return len(self.references) >= MAX_REFERENCES_TO_CHECK
+
+    def add(self, text: str):
+        matches = list(REFERENCE_PATTERN.finditer(text))
+        for position, match in enumerate(matches):
+            if self.done:
+                return
+            filepath, line_str = match.groups()
+
+            # 明らかにファイルでないパターンをスキップ
+            if filepath.startswith('http://') or filepath.startswith('https://'):
+                continue
+            if filepath.startswith('node_modules/'):
+                continue
+            if '::' in filepath:  # C++ のスコープ解決
+                continue
+
+            try:
+                line_num = int(line_str)
+            except ValueError:
+                continue
+
+            context = find_context(text, matches, position)
+
+            # 重複排除（シンボル名と引用は最初に現れたものを使う）
+            key = (filepath, line_num)
+            if key in self.seen:
+                if context and key in self.without_context:
+                    self.without_context.pop(key).update(context)
+                continue
+            self.seen.add(key)
+
+            ref = {
+                'file': filepath,
+                'line': line_num
+            }
+            if context:
+                ref.update(context)
+            else:
+                self.without_context[key] = ref
+            self.references.append(ref)
+
+
+def _is_symbol(code: str, gap: str, filepath: str) -> bool:
+    """インラインコードがシンボル名で、参照との間が SYMBOL_CONNECTOR だけか（ファイル名は除く）。"""
+    if not SYMBOL_PATTERN.fullmatch(code) or not SYMBOL_CONNECTOR.fullmatch(gap):
+        return False
+    return not code.endswith(os.path.splitext(filepath)[1] or '\0')
+
+
+def find_context(text: str, matches: list[re.Match], position: int) -> dict:
+    """
+    参照の前後（同じ行、隣の参照との間）にあるインラインコード。
 
-        # 重複排除
-        key = (filepath, line_num)
-        if key in seen:
-            continue
-        seen.add(key)
+    - 'symbol': 参照の直前または直後のシンボル名（「`handle_request` in server.py:120」）
+    - 'snippet': 参照の後の最初のインラインコード（MIN_SNIPPET_LENGTH 未満は無視）
 
-        references.append({
-            'file': filepath,
-            'line': line_num
-        })
+    どちらもない場合は空の辞書。
+    """
+    match = matches[position]
+    filepath = match.group(1)
+
+    # 参照の前: 行頭（または前の参照の後）から参照まで。参照自体を囲むバッククォートは除く
+    start = text.rfind('\n', 0, match.start(1)) + 1
+    if position > 0:
+        start = max(start, matches[position - 1].end(2))
+        if text.startswith('`', start):
+            start += 1
+    end = match.start(1)
+    if end > start and text[end - 1] == '`':
+        end -= 1
+    before = None
+    for before in SNIPPET_PATTERN.finditer(text, start, end):
+        pass
+    if before is not None and _is_symbol(before.group(1).strip(), text[before.end():end], filepath):
+        return {'symbol': before.group(1).strip()}
+
+    # 参照の後: 行末（または次の参照）まで
+    end = text.find('\n', match.end(2))
+    if end < 0:
+        end = len(text)
+    if position + 1 < len(matches):
+        end = min(end, matches[position + 1].start())
+    start = match.end(2)
+    if text.startswith('`', start):
+        start += 1
+    after = SNIPPET_PATTERN.search(text, start, end)
+    if after is None:
+        return {}
+    code = after.group(1).strip()
+    if _is_symbol(code, text[start:after.start()], filepath):
+        return {'symbol': code}
+    if len(''.join(code.split())) < MIN_SNIPPET_LENGTH:
+        return {}
+    return {'snippet': code}
+
+
+def resolve_file_path(reference_path: str) -> str | None:
+    """
+    参照パスをディスク上の実際のファイルに解決。
 
-    return references
+    戻り値: 解決された絶対パス、見つからない場合と複数のファイルに一致する場合は None
+    """
+    candidates = resolve_candidates(reference_path)
+    return candidates[0] if len(candidates) == 1 else None
 
 
-def resolve_file_path(reference_path: str) -> Optional[str]:
+def resolve_candidates(reference_path: str) -> list[str]:
     """
-    参照パスをディスク上の実際のファイルに解決。
+    参照パスに一致するディスク上のファイルの絶対パス。
     複数の戦略でファイルを検索。
 
-    戻り値: 解決された絶対パス、見つからない場合は None
+    戦略1〜3 で見つかった場合はそのファイルだけを返す。ファイルパスの索引（戦略4）では、ファイル名と
+    パスの末尾が一致するファイルを MAX_PATH_CANDIDATES + 1 個まで返す（`utils.py` は複数のファイルに一致しうる）。
+    戻り値: 見つからない場合は空のリスト
     """
     # 戦略1: 絶対パス
     if os.path.isabs(reference_path):
         if os.path.isfile(reference_path):
-            return reference_path
-        return None
+            return [reference_path]
+        return []
 
     # 戦略2: カレントワーキングディレクトリからの相対パス
     cwd = os.getcwd()
     cwd_path = os.path.join(cwd, reference_path)
     if os.path.isfile(cwd_path):
-        return os.path.abspath(cwd_path)
+        return [os.path.abspath(cwd_path)]
 
     # 戦略3: 一般的なプロジェクトルートを検索
     project_roots = [
@@ -209,29 +270,270 @@ def resolve_file_path(reference_path: str) -> Optional[str]:
     for root in project_roots:
         candidate = os.path.join(root, reference_path)
         if os.path.isfile(candidate):
-            return os.path.abspath(candidate)
+            return [os.path.abspath(candidate)]
+
+    # 戦略4: リポジトリのファイルパスの索引（ファイル名とパスの末尾が一致するファイル）
+    index = get_path_index()
+    if index is not None:
+        return index.candidates(reference_path, limit=MAX_PATH_CANDIDATES + 1)
+
+    return []
 
-    return None
+
+def choose_candidate(candidates: list[str], line_num: int, line_counts: dict) -> tuple[str | None, bool]:
+    """
+    参照の行番号でファイルの候補を1つに絞り込む。
+
+    候補が複数ある場合は、行番号が行数の範囲内にある候補が1つだけならそれを選ぶ。どの候補の範囲にもない
+    場合は行数が最大の候補を選ぶ（行数の超過として無効になる）。複数の候補の範囲内にある場合、または
+    候補が MAX_PATH_CANDIDATES を超える場合は曖昧とし、どれも選ばない。
+
+    戻り値: (解決済みパスまたは None, 曖昧か)
+    """
+    if len(candidates) <= 1:
+        return (candidates[0] if candidates else None), False
+    if len(candidates) > MAX_PATH_CANDIDATES:
+        return None, True
+    fitting = [path for path in candidates if 1 <= line_num <= line_counts[path]]
+    if len(fitting) > 1:
+        return None, True
+    return (fitting[0] if fitting else max(candidates, key=lambda path: line_counts[path])), False
+
+
+_loaded = {}
+
+
+def _load_once(name: str, loader):
+    """loader の結果をプロセス内で1回だけ作成して返す（check_files のスレッドから並行して呼ばれる）。"""
+    if name not in _loaded:
+        import threading
+
+        with _loaded.setdefault("lock", threading.Lock()):
+            if name not in _loaded:
+                _loaded[name] = loader()
+    return _loaded[name]
+
+
+def get_path_index():
+    """リポジトリのファイルパスの索引（spec_hooks.path_index。作成できない場合は None）。"""
+    return _load_once("path_index", _open_path_index)
+
+
+def _open_path_index():
+    from spec_hooks import path_index, workspace
+
+    workspace_id = workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        return None
+    try:
+        return path_index.open_index(workspace.get_path_index_file(workspace_id))
+    except (OSError, ValueError):
+        return None
+
+
+def get_line_index_cache():
+    """ファイルの改行位置の索引のキャッシュ（spec_hooks.line_index。ワークスペース ID が無効な場合はメモリ上のみ）。"""
+    return _load_once("line_index", _open_line_index_cache)
+
+
+def _open_line_index_cache():
+    from spec_hooks import workspace
+    from spec_hooks.line_index import LineIndexCache
+
+    workspace_id = workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        return LineIndexCache(None)
+    return LineIndexCache(workspace.get_line_index_file(workspace_id))
 
 
 def get_file_line_count(filepath: str) -> int:
     """
-    ファイルの行数を取得。
+    ファイルの行数を取得（テキストモードで開いて行を数えた場合と同じ。\n、\r\n、\r を行末とする）。
+
+    改行位置の索引（spec_hooks.line_index）から取得する。サイズと更新時刻が変わっていなければ
+    ファイルを読まない。
 
     戻り値: 行数、エラー時は -1
     """
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            return sum(1 for _ in f)
-    except (IOError, OSError):
-        return -1
+    index = get_line_index_cache().get(filepath)
+    return index.line_count if index is not None else -1
 
 
-def validate_reference(ref: Dict[str, any]) -> Dict[str, any]:
+def snippet_near(index, line_num: int, snippet: str) -> bool:
+    """
+    引用されたコードが line_num の前後 SNIPPET_WINDOW 行にあるか（空白の違いは無視する）。
+
+    省略記号（... または …）を含む引用は、前後の部分がこの順に現れればよい。
+    """
+    window = ' '.join(' '.join(line.split())
+                      for line in index.lines(line_num - SNIPPET_WINDOW, line_num + SNIPPET_WINDOW))
+    position = 0
+    for part in ELLIPSIS_PATTERN.split(snippet):
+        part = ' '.join(part.split())
+        if not part:
+            continue
+        position = window.find(part, position)
+        if position < 0:
+            return False
+        position += len(part)
+    return True
+
+
+def get_symbol_index_cache():
+    """ファイルごとのシンボルの索引のキャッシュ（spec_hooks.symbol_index。ワークスペース ID が無効な場合はメモリ上のみ）。"""
+    return _load_once("symbol_index", _open_symbol_index_cache)
+
+
+def _open_symbol_index_cache():
+    from spec_hooks import workspace
+    from spec_hooks.symbol_index import SymbolIndexCache
+
+    workspace_id = workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        return SymbolIndexCache(None)
+    return SymbolIndexCache(workspace.get_symbol_index_file(workspace_id))
+
+
+def context_mismatch(ref: dict, index) -> str | None:
+    """
+    参照に添えられたシンボル名または引用が、参照の行と一致しない場合の理由（一致した場合、
+    確認できない場合は None）。
+
+    - シンボル名: ファイル内に定義があれば、行がいずれかの定義の範囲内にあること。定義がなければ
+      （呼び出し等の使用箇所）、名前が行の前後 SNIPPET_WINDOW 行にあること。シンボルを抽出できない
+      ファイル（未対応の言語、構文エラー）は確認しない
+    - 引用: snippet_near
+    """
+    line_num = ref['line']
+    if ref.get('symbol'):
+        from spec_hooks.symbol_index import find_spans
+
+        symbols = get_symbol_index_cache().get(index.path)
+        if symbols is None:
+            return None
+        symbol = ref['symbol']
+        spans = find_spans(symbols, symbol)
+        if spans:
+            if any(start <= line_num <= end for start, end in spans):
+                return None
+            ranges = '、'.join(f'{start}-{end}' for start, end in spans[:3])
+            return f'symbol_mismatch（`{symbol}` の定義は {ranges} 行）'
+        name = symbol.removesuffix('()').replace('::', '.').rsplit('.', 1)[-1]
+        if snippet_near(index, line_num, name):
+            return None
+        return f'symbol_not_found（`{symbol}` の定義がなく、{line_num}±{SNIPPET_WINDOW} 行にもない）'
+    if ref.get('snippet') and not snippet_near(index, line_num, ref['snippet']):
+        return f'snippet_not_found（引用したコードが {line_num}±{SNIPPET_WINDOW} 行にない）'
+    return None
+
+
+def _run_workers(worker, count: int):
+    """worker を count 個のスレッドで実行して終了を待つ（1以下ならこのスレッドで実行）。"""
+    if count <= 1:
+        worker()
+        return
+    import threading
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check_files(paths, deadline: float, contexts: dict | None = None) -> tuple[dict, dict, dict]:
+    """
+    参照のファイルパスごとにパスを解決し、解決したファイルごとに行数を1回だけ取得する。
+
+    contexts（参照のパス → シンボル名または引用を持つ参照のリスト）を渡した場合は、すべてのパスの
+    確認の後で、各参照を context_mismatch で確認する（候補が複数ある場合は、行番号で1つに絞り込めた
+    参照だけ）。どちらも VALIDATION_WORKERS 個のスレッドでファイルごとに並行して処理し、
+    deadline（time.monotonic() の値）を過ぎた時点で残りは処理しない。
+
+    戻り値: (参照のパス → 解決済みパスの候補のリスト（resolve_candidates）, 解決済みパス → 行数,
+            (参照のパス, 行番号) → 一致しない理由または None)。deadline までに確認できなかった
+            パスと参照は含まない。候補が MAX_PATH_CANDIDATES を超えるパスは行数を取得しない
+    """
+    # list.pop と dict への代入はアトミックなため、スレッド間でロックを使わずに共有できる
+    pending = list(reversed(list(paths)))
+    resolved_paths = {}
+    line_counts = {}
+    line_indexes = {}
+    mismatches = {}
+    cache = get_line_index_cache()
+
+    def check_paths():
+        while time.monotonic() <= deadline:
+            try:
+                path = pending.pop()
+            except IndexError:
+                return
+            candidates = resolve_candidates(path)
+            if len(candidates) <= MAX_PATH_CANDIDATES:
+                indexes = []
+                for resolved in candidates:
+                    index = cache.get(resolved)
+                    line_counts[resolved] = index.line_count if index is not None else -1
+                    if index is not None:
+                        indexes.append(index)
+                line_indexes[path] = indexes
+            resolved_paths[path] = candidates
+
+    def check_contexts():
+        while time.monotonic() <= deadline:
+            try:
+                path, indexes = jobs.pop()
+            except IndexError:
+                return
+            for ref in sorted(contexts[path], key=lambda r: r['line']):
+                if time.monotonic() > deadline:
+                    return
+                # choose_candidate と同じく、行番号が範囲内の候補が1つだけの場合に確認する
+                fitting = [index for index in indexes if 1 <= ref['line'] <= index.line_count]
+                if len(fitting) == 1:
+                    try:
+                        mismatches[(path, ref['line'])] = context_mismatch(ref, fitting[0])
+                    except OSError:
+                        pass
+
+    _run_workers(check_paths, min(VALIDATION_WORKERS, len(pending)))
+    cache.save()
+    if contexts:
+        jobs = [(path, line_indexes[path]) for path in reversed(list(contexts)) if line_indexes.get(path)]
+        _run_workers(check_contexts, min(VALIDATION_WORKERS, len(jobs)))
+        if any(ref.get('symbol') for refs in contexts.values() for ref in refs):
+            get_symbol_index_cache().save()
+    return resolved_paths, line_counts, mismatches
+
+
+def validate_reference(ref: dict) -> dict:
     """
     単一の file:line 参照を検証。
 
-    検証結果の辞書を返す。
+    検証結果の辞書を返す。複数のファイルに一致して行番号でも絞り込めない参照は、valid が False、
+    reason が 'ambiguous_path' の結果になる（verify では有効とも無効とも数えない）。
+    """
+    candidates = resolve_candidates(ref['file'])
+    cache = get_line_index_cache()
+    indexes = {path: cache.get(path) for path in candidates} if len(candidates) <= MAX_PATH_CANDIDATES else {}
+    resolved, ambiguous = choose_candidate(
+        candidates, ref['line'], {path: index.line_count if index is not None else -1 for path, index in indexes.items()})
+    if ambiguous:
+        return {'file': ref['file'], 'line': ref['line'], 'valid': False, 'reason': 'ambiguous_path',
+                'candidates': candidates}
+    index = indexes.get(resolved)
+    mismatch = None
+    if index is not None and 1 <= ref['line'] <= index.line_count:
+        mismatch = context_mismatch(ref, index)
+    return reference_result(ref, resolved, index.line_count if index is not None else -1, mismatch)
+
+
+def reference_result(ref: dict, resolved: str | None, total_lines: int, mismatch: str | None = None) -> dict:
+    """
+    解決済みパスと行数から参照の検証結果の辞書を作成。
+
+    mismatch は添えられたシンボル名または引用が行と一致しない理由（context_mismatch。一致した場合、
+    確認していない場合は None）。
     """
     filepath = ref['file']
     line_num = ref['line']
@@ -243,16 +545,11 @@ def validate_reference(ref: Dict[str, any]) -> Dict[str, any]:
         'reason': None
     }
 
-    # ファイルパスを解決
-    resolved = resolve_file_path(filepath)
-
     if resolved is None:
         result['reason'] = 'file_not_found'
         return result
 
     # 行数をチェック
-    total_lines = get_file_line_count(resolved)
-
     if total_lines < 0:
         result['reason'] = 'file_read_error'
         return result
@@ -265,6 +562,10 @@ def validate_reference(ref: Dict[str, any]) -> Dict[str, any]:
         result['reason'] = 'invalid_line_number'
         return result
 
+    if mismatch:
+        result['reason'] = mismatch
+        return result
+
     result['valid'] = True
     result['resolved_path'] = resolved
     return result
@@ -273,64 +574,86 @@ def validate_reference(ref: Dict[str, any]) -> Dict[str, any]:
 # メイン
 # =============================================================================
 
-def main():
-    # stdin からフック入力を読み取り
-    try:
-        input_data = sys.stdin.read().strip()
-    except Exception as e:
-        sys.stderr.write(f"verify_references: stdin の読み取りに失敗: {e}\n")
-        sys.exit(0)  # デフォルトで許可
-
-    if not input_data:
-        sys.exit(0)  # デフォルトで許可
-
-    # フックメタデータをパース
-    try:
-        metadata = json.loads(input_data)
-    except json.JSONDecodeError:
-        sys.stderr.write("verify_references: 無効な JSON 入力\n")
-        sys.exit(0)  # デフォルトで許可
+def get_transcript_cache_dir() -> str | None:
+    """
+    トランスクリプトの読み取り位置を保存するディレクトリ（ワークスペース ID が無効な場合は None）。
 
-    # 無限ループを防ぐため stop_hook_active をチェック
-    if metadata.get('stop_hook_active', False):
-        sys.exit(0)  # デフォルトで許可
+    insight_capture と同じディレクトリを使用するため、同じトランスクリプトはどちらかのフックが
+    一度読めば、もう一方は追記分だけを読む。
+    """
+    from spec_hooks import workspace
 
-    # トランスクリプトパスを取得
-    # agent_transcript_path（サブエージェント自身のトランスクリプト）を transcript_path（メインセッション）より優先
-    transcript_path = metadata.get('agent_transcript_path', '') or metadata.get('transcript_path', '')
-    if not transcript_path:
-        sys.exit(0)  # デフォルトで許可
+    workspace_id = workspace.get_workspace_id()
+    if not workspace.validate_workspace_id(workspace_id):
+        return None
+    return workspace.get_transcript_cache_dir(workspace_id)
 
-    # トランスクリプトパスを検証
-    is_valid, error_msg, resolved_path = validate_transcript_path(transcript_path)
-    if not is_valid:
-        sys.stderr.write(f"verify_references: 無効なパス - {error_msg}\n")
-        sys.exit(0)  # デフォルトで許可
 
-    # トランスクリプトからコンテンツを抽出
-    content, was_size_skipped = extract_assistant_content(resolved_path, MAX_TRANSCRIPT_SIZE)
-    if was_size_skipped:
-        print(json.dumps({
-            "systemMessage": "verify_references: トランスクリプトが大きすぎるため、検証をスキップします"
-        }))
-        sys.exit(0)
+def partial_note(messages: AssistantMessages, time_budget: float) -> str:
+    """時間予算に達した場合にサマリーへ追加する注記（全体を読んだ場合は空文字列）。"""
+    if messages.complete:
+        return ""
+    return (
+        f"（時間制限 {time_budget:.0f}秒に達したため、トランスクリプトの "
+        f"{messages.bytes_read / (1024 * 1024):.1f}MB / {messages.size / (1024 * 1024):.1f}MB までを検証）"
+    )
 
-    if not content:
-        sys.exit(0)  # デフォルトで許可
 
-    # コンテンツから参照を抽出
-    references = extract_references(content)
+def verify(references: list[dict], note: str = "") -> dict | None:
+    """
+    参照を検証し、出力する JSON オブジェクトを返す（出力なしで許可する場合は None）。
 
+    note は時間予算に達した場合の注記（partial_note）。検証の時間予算に達した場合は、
+    未検証の参照を除いて集計する。
+    """
     if not references:
         # 参照が見つからない、検証するものなし
-        sys.exit(0)  # デフォルトで許可
+        if note:
+            return {"systemMessage": f"verify_references: 参照は見つかりませんでした{note}"}
+        return None
+
+    # 参照をファイルごとにまとめ、一意なファイルごとに1回だけ確認（並行、時間予算あり）
+    contexts = {}
+    for ref in references:
+        if ref.get('symbol') or ref.get('snippet'):
+            contexts.setdefault(ref['file'], []).append(ref)
+    resolved_paths, line_counts, mismatches = check_files(
+        dict.fromkeys(ref['file'] for ref in references), time.monotonic() + VALIDATION_TIME_BUDGET, contexts)
 
-    # 各参照を検証
     results = []
+    unchecked = 0
+    unchecked_contexts = 0
+    ambiguous = []
     for ref in references:
-        result = validate_reference(ref)
+        if ref['file'] not in resolved_paths:
+            unchecked += 1
+            continue
+        resolved, is_ambiguous = choose_candidate(resolved_paths[ref['file']], ref['line'], line_counts)
+        if is_ambiguous:
+            ambiguous.append(ref)
+            continue
+        result = reference_result(ref, resolved, line_counts[resolved] if resolved is not None else -1,
+                                  mismatches.get((ref['file'], ref['line'])))
+        if (result['valid'] and (ref.get('symbol') or ref.get('snippet'))
+                and (ref['file'], ref['line']) not in mismatches):
+            unchecked_contexts += 1
         results.append(result)
 
+    if unchecked:
+        # 時間予算に達した: 未検証の参照は集計から除く
+        note += f"（時間制限 {VALIDATION_TIME_BUDGET}秒に達したため {unchecked} 件の参照は未検証）"
+    if ambiguous:
+        # 複数のファイルに一致し、行番号でも絞り込めない参照: 有効とも無効とも数えずに報告する
+        examples = "、".join(f"{ref['file']}:{ref['line']}" for ref in ambiguous[:3])
+        more = " 等" if len(ambiguous) > 3 else ""
+        note += f"（{len(ambiguous)} 件の参照は複数のファイルに一致するため未検証: {examples}{more}）"
+    if not results:
+        return {"systemMessage": f"参照検証: {len(references)} 件の参照を検証できませんでした{note}"}
+    if unchecked_contexts:
+        # 行の範囲は確認済みで、シンボル名または引用だけが未確認の参照（有効として数える）
+        note += (f"（時間制限 {VALIDATION_TIME_BUDGET}秒に達したため {unchecked_contexts} 件の参照は"
+                 f"シンボル名・引用を未確認）")
+
     # 統計を計算
     total = len(results)
     valid_count = sum(1 for r in results if r['valid'])
@@ -355,17 +678,16 @@ def main():
             f"参照検証に失敗: file:line 参照の {invalid_percentage:.1f}% が無効です "
             f"({invalid_count}/{total})。\n"
             f"無効な参照:\n" + "\n".join(error_details) + "\n"
-            f"コード位置を参照する前に検証してください。"
+            f"コード位置を参照する前に検証してください。{note}"
         )
 
         sys.stderr.write(f"verify_references: {error_message}\n")
 
         # SubagentStop は exit 0 で decision control を使用（exit 2 は PreToolUse 用）
-        print(json.dumps({
+        return {
             "decision": "block",
             "reason": error_message
-        }))
-        sys.exit(0)
+        }
 
     # 成功 - systemMessage 経由でサマリーを出力
     if invalid_count > 0:
@@ -376,21 +698,77 @@ def main():
     else:
         summary = f"参照検証: 全 {total} 件の file:line 参照の検証に成功しました"
 
-    print(json.dumps({
-        "systemMessage": summary
-    }))
+    return {"systemMessage": summary + note}
+
+
+def error_result(error: Exception) -> dict:
+    """
+    例外時の出力（フェイルクローズド）。
+
+    ハルシネーションの可能性がある参照を検証なしで通過させない。
+    """
+    return {
+        "decision": "block",
+        "reason": f"エラーにより参照検証に失敗: {error}。サブエージェント出力にハルシネーションされた参照が含まれている可能性があります。"
+    }
+
+
+def verify_hook_input():
+    # stdin からフック入力を読み取り
+    try:
+        input_data = sys.stdin.read().strip()
+    except Exception as e:
+        sys.stderr.write(f"verify_references: stdin の読み取りに失敗: {e}\n")
+        sys.exit(0)  # デフォルトで許可
+
+    if not input_data:
+        sys.exit(0)  # デフォルトで許可
+
+    # フックメタデータをパース
+    try:
+        metadata = json.loads(input_data)
+    except json.JSONDecodeError:
+        sys.stderr.write("verify_references: 無効な JSON 入力\n")
+        sys.exit(0)  # デフォルトで許可
+
+    # 無限ループを防ぐため stop_hook_active をチェック
+    if metadata.get('stop_hook_active', False):
+        sys.exit(0)  # デフォルトで許可
+
+    # トランスクリプトパスを取得
+    # agent_transcript_path（サブエージェント自身のトランスクリプト）を transcript_path（メインセッション）より優先
+    transcript_path = metadata.get('agent_transcript_path', '') or metadata.get('transcript_path', '')
+    if not transcript_path:
+        sys.exit(0)  # デフォルトで許可
+
+    # トランスクリプトパスを検証
+    is_valid, error_msg, resolved_path = validate_transcript_path(transcript_path)
+    if not is_valid:
+        sys.stderr.write(f"verify_references: 無効なパス - {error_msg}\n")
+        sys.exit(0)  # デフォルトで許可
+
+    # トランスクリプトのメッセージを読みながら参照を抽出
+    messages = AssistantMessages(
+        resolved_path, get_transcript_cache_dir(), deadline=time.monotonic() + TRANSCRIPT_TIME_BUDGET)
+    references = collect_references(messages)
+
+    # 時間予算に達した場合は注記を追加（読み取り位置は保存済みのため、次回は続きから読む）
+    result = verify(references, partial_note(messages, TRANSCRIPT_TIME_BUDGET))
+    if result is not None:
+        print(json.dumps(result))
     sys.exit(0)
 
 
-if __name__ == '__main__':
+def main():
     try:
-        main()
+        verify_hook_input()
     except Exception as e:
         # 重要: 例外時はフェイルクローズド - ハルシネーションの可能性がある
         # 参照を検証なしで通過させない
         sys.stderr.write(f"verify_references 致命的エラー: {e}\n")
-        print(json.dumps({
-            "decision": "block",
-            "reason": f"エラーにより参照検証に失敗: {e}。サブエージェント出力にハルシネーションされた参照が含まれている可能性があります。"
-        }))
+        print(json.dumps(error_result(e)))
         sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,9 +17,135 @@
 # - 同じリポジトリの異なるワークツリーが異なる ID を取得
 # - 異なるブランチの同じディレクトリが異なる ID を取得
 # - 人間が識別しやすいブランチ名
+#
+# ほぼすべてのフックが呼び出すため、外部コマンドを起動しない:
+# - ブランチは .git/HEAD を直接読む（_find_git_head、ワークツリーの "gitdir:" ファイルに対応）
+# - ID は .claude/workspaces/.workspace-id にキャッシュし（spec_hooks/workspace.py と共有）、
+#   pwd と HEAD の内容が同じ間は再利用する。path-hash は pwd が同じならキャッシュの ID から取り出す
+# git の探索と結果が異なりうる構成では従来どおり git を実行する（_get_workspace_id_git）
 get_workspace_id() {
+    local cache=".claude/workspaces/.workspace-id"
+    local head="" head_line="" target="" branch="" path_hash=""
+    local cached_pwd="" cached_head="" cached_line="" cached_id=""
+
+    if [[ "$PWD" == *$'\n'* ]] || ! _find_git_head; then
+        _get_workspace_id_git
+        return
+    fi
+    head="$_GIT_HEAD"
+    if [ -n "$head" ]; then
+        IFS= read -r head_line < "$head" || [ -n "$head_line" ] || { _get_workspace_id_git; return; }
+    fi
+
+    # キャッシュ（4行すべてが改行で終わっていること）
+    if [ -f "$cache" ] && {
+        IFS= read -r cached_pwd && IFS= read -r cached_head && IFS= read -r cached_line && IFS= read -r cached_id
+    } < "$cache" 2>/dev/null && [ "$cached_pwd" = "$PWD" ] && [[ "$cached_id" =~ ^[a-zA-Z0-9._-]+_[0-9a-f]{8}$ ]]; then
+        if [ "$cached_head" = "$head" ] && [ "$cached_line" = "$head_line" ]; then
+            echo "$cached_id"
+            return
+        fi
+        path_hash="${cached_id##*_}"
+    fi
+
+    if [ -z "$head" ]; then
+        branch="no-git"
+    elif [[ "$head_line" == ref:* ]]; then
+        # git と同様に "ref:" の後と末尾の空白を除く
+        target="${head_line#ref:}"
+        target="${target#"${target%%[![:space:]]*}"}"
+        target="${target%"${target##*[![:space:]]}"}"
+        if [[ "$target" != refs/heads/* ]] || [ "$target" = "refs/heads/.invalid" ]; then
+            _get_workspace_id_git
+            return
+        fi
+        _sanitize_branch "${target#refs/heads/}" branch
+        if [ -z "$branch" ]; then
+            _get_workspace_id_git
+            return
+        fi
+    elif [[ "$head_line" =~ ^[0-9a-f]{40}([0-9a-f]{24})?$ ]]; then
+        branch="detached-$(git rev-parse --short HEAD 2>/dev/null || echo 'unknown')"
+    else
+        _get_workspace_id_git
+        return
+    fi
+    branch="${branch:0:50}"
+
+    if [ -z "$path_hash" ]; then
+        path_hash=$(_path_hash)
+    fi
+    local workspace_id="${branch}_${path_hash}"
+    if [ -d ".claude/workspaces" ]; then
+        printf '%s\n%s\n%s\n%s\n' "$PWD" "$head" "$head_line" "$workspace_id" > "$cache" 2>/dev/null
+    fi
+    echo "$workspace_id"
+}
+
+# .git を上位のディレクトリへ探し、HEAD ファイルのパスを _GIT_HEAD に設定する（Git リポジトリ外は空文字列）
+# 戻り値: git の探索と結果が異なりうる構成（GIT_DIR 等の環境変数、シンボリックリンクを含むパス、
+#         ベアリポジトリ、所有者の異なるリポジトリ、HEAD がない）では 1
+# 注意: コマンド置換（サブシェル）を避けるため、結果はグローバル変数で返す
+_find_git_head() {
+    local dir="$PWD" git_dir="" line=""
+    _GIT_HEAD=""
+
+    if [ -n "${GIT_DIR}${GIT_WORK_TREE}${GIT_COMMON_DIR}${GIT_CEILING_DIRECTORIES}${GIT_DISCOVERY_ACROSS_FILESYSTEM}" ]; then
+        return 1
+    fi
+    while :; do
+        # git は物理パスを探索する。論理パスとの違いを避けるためシンボリックリンクを含む場合は git に任せる
+        [ -L "$dir" ] && return 1
+        if [ -d "$dir/.git" ]; then
+            git_dir="$dir/.git"
+            break
+        elif [ -f "$dir/.git" ]; then
+            IFS= read -r line < "$dir/.git" || [ -n "$line" ] || return 1
+            line="${line%"${line##*[![:space:]]}"}"
+            [[ "$line" == "gitdir: "* ]] || return 1
+            git_dir="${line#gitdir: }"
+            [[ "$git_dir" == /* ]] || git_dir="$dir/$git_dir"
+            break
+        elif [ -e "$dir/HEAD" ]; then
+            return 1  # ベアリポジトリ、または .git の内部
+        fi
+        [ -z "$dir" ] && return 0  # ルートまで見つからない: Git リポジトリ外
+        dir="${dir%/*}"
+    done
+
+    # 所有者の異なるリポジトリは git が safe.directory の設定に従って拒否する
+    [ -O "${dir:-/}" ] && [ -O "$git_dir" ] && [ -f "$git_dir/HEAD" ] && [ ! -L "$git_dir/HEAD" ] || return 1
+    _GIT_HEAD="$git_dir/HEAD"
+}
+
+# ブランチ名をサニタイズして変数に設定（英数字、ドット、アンダースコア、ハイフン以外の全文字を除去。
+# tr -dc と同じくバイト単位）
+# 引数: $1 - ブランチ名、$2 - 結果を設定する変数名
+_sanitize_branch() {
+    local LC_ALL=C
+    local sanitized="${1//\//-}"
+    sanitized="${sanitized// /-}"
+    printf -v "$2" '%s' "${sanitized//[^a-zA-Z0-9._-]/}"
+}
+
+# 絶対作業ディレクトリパスのハッシュを生成
+# クロスプラットフォーム互換性のため md5sum を使用
+_path_hash() {
+    if command -v md5sum &> /dev/null; then
+        # Linux: md5sum は "hash  filename" を出力、ハッシュ部分のみ抽出
+        pwd | md5sum | awk '{print $1}' | cut -c1-8
+    elif command -v md5 &> /dev/null; then
+        # macOS: md5 はハッシュのみを出力（または -r で "MD5 (...) = hash"）
+        pwd | md5 | awk '{print $NF}' | cut -c1-8
+    else
+        # フォールバック: 単純なハッシュを使用
+        pwd | cksum | awk '{print $1}' | head -c8
+    fi
+}
+
+# git を実行してワークスペース ID を生成（get_workspace_id のフォールバック）
+_get_workspace_id_git() {
     local branch=""
-    local path_hash=""
 
     # 現在の Git ブランチを取得（ファイルシステム安全のためサニタイズ）
     # 英数字、ドット、アンダースコア、ハイフン以外の全文字を除去
@@ -35,20 +161,7 @@ get_workspace_id() {
         branch="no-git"
     fi
 
-    # 絶対作業ディレクトリパスのハッシュを生成
-    # クロスプラットフォーム互換性のため md5sum を使用
-    if command -v md5sum &> /dev/null; then
-        # Linux: md5sum は "hash  filename" を出力、ハッシュ部分のみ抽出
-        path_hash=$(pwd | md5sum | awk '{print $1}' | cut -c1-8)
-    elif command -v md5 &> /dev/null; then
-        # macOS: md5 はハッシュのみを出力（または -r で "MD5 (...) = hash"）
-        path_hash=$(pwd | md5 | awk '{print $NF}' | cut -c1-8)
-    else
-        # フォールバック: 単純なハッシュを使用
-        path_hash=$(pwd | cksum | awk '{print $1}' | head -c8)
-    fi
-
-    echo "${branch}_${path_hash}"
+    echo "${branch}_$(_path_hash)"
 }
 
 # ============================================================================
@@ -436,6 +549,16 @@ move_insight() {
     mv "$resolved_source" "$target_dir/$filename"
 }
 
+# 複数のインサイトを ID で指定して別のステータスディレクトリに一括移動
+# 使用方法: move_insights "applied|rejected|archive" "INS-xxx" "INS-yyy" ...
+# 戻り値: ID ごとの結果（moved / unchanged / error）を含む JSON。1件でも失敗すれば終了コード 1
+# move_insight と同じパスの検証を1プロセスで行い、影響を受けたディレクトリを1回ずつ fsync する
+move_insights() {
+    local target_status="$1"
+    shift
+    python3 -I -S "$(dirname "${BASH_SOURCE[0]:-$0}")/run_hook.py" insight-move "$(get_workspace_id)" "$target_status" "$@"
+}
+
 # 単一のインサイトファイルを読み取り JSON を出力
 # 使用方法: read_insight "insight-file-path"
 read_insight() {
@@ -516,6 +639,7 @@ cleanup_workspace_temp_files() {
 # 処理済みの古いインサイトをアーカイブ
 # applied/ と rejected/ のインサイトを archive/ ディレクトリに移動
 # フォルダベース: ディレクトリ間で単純にファイルを移動
+# SPEC_WORKFLOW_ARCHIVE_PACK=1 の場合、移動後に archive/ をパックする（spec_hooks/insight_archive.py）
 archive_processed_insights() {
     local workspace_id="${1:-$(get_workspace_id)}"
     local insights_dir="$(get_insights_dir "$workspace_id")"
@@ -529,7 +653,7 @@ archive_processed_insights() {
 
     # 適用済みインサイトをアーカイブに移動
     if [ -d "$applied_dir" ]; then
-        for file in "$applied_dir"/*.json 2>/dev/null; do
+        for file in "$applied_dir"/*.json; do
             [ -f "$file" ] || continue
             mv "$file" "$archive_dir/"
             archived_count=$((archived_count + 1))
@@ -538,7 +662,7 @@ archive_processed_insights() {
 
     # 却下済みインサイトをアーカイブに移動
     if [ -d "$rejected_dir" ]; then
-        for file in "$rejected_dir"/*.json 2>/dev/null; do
+        for file in "$rejected_dir"/*.json; do
             [ -f "$file" ] || continue
             mv "$file" "$archive_dir/"
             archived_count=$((archived_count + 1))
@@ -548,90 +672,20 @@ archive_processed_insights() {
     if [ "$archived_count" -gt 0 ]; then
         echo "処理済みインサイト $archived_count 件をアーカイブしました"
     fi
+
+    # オプトイン: archive/ の個別のファイルを圧縮したセグメントファイル（archive/packs/）にまとめる
+    if [ "${SPEC_WORKFLOW_ARCHIVE_PACK:-0}" = "1" ]; then
+        python3 -I -S "$(dirname "${BASH_SOURCE[0]:-$0}")/run_hook.py" insight-archive pack "$workspace_id"
+    fi
 }
 
 # ワークスペース統計を取得
+# 引数: $1 - ワークスペース ID（省略可）、$2 - --by-category（省略可。カテゴリ別のストレージを含める）
 # 戻り値: ディレクトリ別のインサイト数、ログ等を含む JSON
 # フォルダベース: pending/, applied/, rejected/, archive/ ディレクトリのファイル数をカウント
 get_workspace_stats() {
     local workspace_id="${1:-$(get_workspace_id)}"
-
-    if ! command -v python3 &> /dev/null; then
-        echo '{"error": "python3 が利用できません"}'
-        return
-    fi
-
-    WORKSPACE_ID_VAR="$workspace_id" \
-    WORKSPACE_DIR_VAR="$(get_workspace_dir "$workspace_id")" \
-    INSIGHTS_DIR_VAR="$(get_insights_dir "$workspace_id")" \
-    python3 << 'PYEOF'
-import json
-import os
-import glob
-
-workspace_id = os.environ.get('WORKSPACE_ID_VAR', '')
-workspace_dir = os.environ.get('WORKSPACE_DIR_VAR', '')
-insights_dir = os.environ.get('INSIGHTS_DIR_VAR', '')
-
-def count_json_files(directory):
-    """ディレクトリ内の .json ファイル数をカウント。"""
-    if not directory or not os.path.isdir(directory):
-        return 0
-    return len(glob.glob(os.path.join(directory, '*.json')))
-
-def get_dir_size(directory):
-    """ディレクトリ内のファイルの合計サイズを取得。"""
-    if not directory or not os.path.isdir(directory):
-        return 0
-    total = 0
-    for f in glob.glob(os.path.join(directory, '*')):
-        try:
-            total += os.path.getsize(f)
-        except OSError:
-            pass
-    return total
-
-# 各ディレクトリのインサイト数をカウント（フォルダベースアーキテクチャ）
-pending_count = count_json_files(os.path.join(insights_dir, 'pending')) if insights_dir else 0
-applied_count = count_json_files(os.path.join(insights_dir, 'applied')) if insights_dir else 0
-rejected_count = count_json_files(os.path.join(insights_dir, 'rejected')) if insights_dir else 0
-archived_count = count_json_files(os.path.join(insights_dir, 'archive')) if insights_dir else 0
-
-stats = {
-    'workspaceId': workspace_id,
-    'exists': os.path.isdir(workspace_dir) if workspace_dir else False,
-    'insights': {
-        'pending': pending_count,
-        'applied': applied_count,
-        'rejected': rejected_count,
-        'archived': archived_count,
-        'total': pending_count + applied_count + rejected_count + archived_count
-    },
-    'storage': {
-        'insightsSize': get_dir_size(insights_dir) if insights_dir else 0,
-        'logFiles': 0,
-        'totalSize': 0
-    }
-}
-
-if workspace_dir and os.path.isdir(workspace_dir):
-    # ストレージをカウント
-    total_size = 0
-    log_count = 0
-    for root, dirs, files in os.walk(workspace_dir):
-        for f in files:
-            fpath = os.path.join(root, f)
-            try:
-                total_size += os.path.getsize(fpath)
-                if f.endswith('.log') or f.endswith('.jsonl'):
-                    log_count += 1
-            except OSError:
-                pass
-    stats['storage']['totalSize'] = total_size
-    stats['storage']['logFiles'] = log_count
-
-print(json.dumps(stats, indent=2))
-PYEOF
+    python3 -I -S "$(dirname "${BASH_SOURCE[0]:-$0}")/run_hook.py" workspace-stats "$workspace_id" "${@:2}"
 }
 
 # ============================================================================